@@ -1,6 +1,14 @@
 import sys
 
-from ton_node_control.cli.app import main, cmds
+from ton_node_control.daemon import forward
 
 if __name__ == '__main__':
+    # Before the CLI is even imported: that is most of what a command
+    # the daemon answers would cost in-process.
+    code = forward(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+
+    from ton_node_control.cli.app import main, cmds  # noqa: F401
+
     sys.exit(cmds(standalone_mode=False))
@@ -0,0 +1,54 @@
+"""
+Batch address conversions against a naive per-address loop. Both sides
+share the same CRC16 routine, so only the batching is measured.
+
+    python -m benchmarks.bench_address [addresses]
+"""
+import base64
+import os
+import sys
+import time
+import typing as t
+
+from ton_node_control.core.address import Address, crc16, friendly_to_raw, raw_to_friendly
+
+
+def naive_to_friendly(address: str) -> str:
+    workchain, account_id = address.split(':')
+    payload: bytes = bytes([0x11, int(workchain) & 0xFF]) + bytes.fromhex(account_id)
+    return base64.urlsafe_b64encode(payload + crc16(payload).to_bytes(2, 'big')).decode()
+
+
+def naive_to_raw(address: str) -> str:
+    record: bytes = base64.urlsafe_b64decode(address)
+    if crc16(record[:34]) != int.from_bytes(record[34:], 'big'):
+        raise ValueError(address)
+    workchain: int = record[1] - 256 if record[1] > 127 else record[1]
+    return f'{workchain}:{record[2:34].hex()}'
+
+
+def measure(label: str, function: t.Callable[[], t.Any], count: int) -> float:
+    started: float = time.perf_counter()
+    function()
+    elapsed: float = time.perf_counter() - started
+    print(f'{label:<36} {elapsed * 1000:9.1f} ms  {count / elapsed:12.0f} addresses/s')
+    return elapsed
+
+
+def main(count: int = 50_000) -> None:
+    raw: t.List[str] = [f'{(-1, 0)[index % 2]}:{os.urandom(32).hex()}' for index in range(count)]
+    friendly: t.List[str] = raw_to_friendly(raw)
+    assert friendly == [naive_to_friendly(address) for address in raw]
+    assert friendly_to_raw(friendly) == raw
+
+    naive: float = measure('naive raw -> friendly', lambda: [naive_to_friendly(a) for a in raw], count)
+    batch: float = measure('batch raw -> friendly', lambda: raw_to_friendly(raw), count)
+    print(f'{"":<36} x{naive / batch:.1f}')
+    naive = measure('naive friendly -> raw', lambda: [naive_to_raw(a) for a in friendly], count)
+    batch = measure('batch friendly -> raw', lambda: friendly_to_raw(friendly), count)
+    print(f'{"":<36} x{naive / batch:.1f}')
+    measure('single-address fast path', lambda: [Address.parse(a).to_raw() for a in friendly], count)
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""
+Snapshot of a database-like tree: "tar | gzip", a first chunked backup on
+a process pool, a second one after a few files changed, then restores
+of it one chunk at a time and pipelined.
+
+    python -m benchmarks.bench_backup [megabytes] [workers]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from ton_node_control.backup import LocalTarget, run_backup, run_restore
+
+
+def make_tree(root: Path, megabytes: int) -> None:
+    rng = random.Random(0)
+    for index in range(megabytes // 8):
+        path: Path = root.joinpath('celldb' if index % 2 else 'archive', f'{index:06d}.sst')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Half random, half repetitive, like compressed blocks next to indexes.
+        path.write_bytes(rng.getrandbits(2 ** 25).to_bytes(2 ** 22, 'little') + bytes(range(256)) * (4 * 2 ** 12))
+
+
+def main(megabytes: int = 512, workers: int = os.cpu_count() or 1) -> None:
+    with tempfile.TemporaryDirectory() as temporary:
+        root: Path = Path(temporary, 'db')
+        make_tree(root, megabytes)
+        sources = {'db': root}
+
+        started: float = time.perf_counter()
+        subprocess.run(
+            f'tar -C {temporary} -cf - db | gzip -3 > {temporary}/db.tar.gz',
+            shell=True,
+            check=True,
+        )
+        print(f'tar | gzip -3:      {time.perf_counter() - started:7.2f}s, '
+              f'{os.path.getsize(f"{temporary}/db.tar.gz") / 2 ** 20:.0f} MiB')
+
+        target = LocalTarget(Path(temporary, 'snapshots'))
+        report = run_backup(target, sources, name='first', workers=workers)
+        print(f'first snapshot:     {report.duration:7.2f}s, {report.stored / 2 ** 20:.0f} MiB, '
+              f'{report.new_chunks} chunks, {workers} workers')
+
+        for path in sorted(root.rglob('*.sst'))[::16]:
+            with open(path, 'r+b') as file:
+                file.seek(2 ** 20)
+                file.write(b'changed')
+        report = run_backup(target, sources, name='second', workers=workers)
+        print(f'second snapshot:    {report.duration:7.2f}s, {report.stored / 2 ** 20:.0f} MiB new, '
+              f'{report.new_chunks} new chunks, {report.reused_files} files unchanged')
+
+        for label, fetches, pool in (('serial restore:', 1, 1), ('pipelined restore:', 8, workers)):
+            progress = run_restore(target, Path(temporary, label.split()[0]), fetches=fetches, workers=pool)
+            print(f'{label:<20}{progress.duration:7.2f}s, '
+                  + ', '.join(
+                      f'{stage} busy {getattr(progress, stage).busy:.2f}s'
+                      for stage in ('fetch', 'decompress', 'write')
+                  ))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
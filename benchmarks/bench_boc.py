@@ -0,0 +1,70 @@
+"""
+Decoding throughput of "BagOfCells" on synthetic multi-megabyte BOCs.
+
+    python -m benchmarks.bench_boc [cells]
+"""
+import os
+import sys
+import tempfile
+import time
+import typing as t
+
+from ton_node_control.core.boc import BagOfCells
+
+
+def make_boc(cells: int, *, with_index: bool, data_bytes: int = 96) -> bytes:
+    size: int = (cells.bit_length() + 7) // 8
+    offset_bytes: int = 4
+    body = bytearray()
+    ends: t.List[int] = []
+    for index in range(cells):
+        references: t.List[int] = [child for child in (2 * index + 1, 2 * index + 2) if child < cells]
+        body += bytes([len(references), data_bytes * 2])
+        body += os.urandom(data_bytes)
+        for reference in references:
+            body += reference.to_bytes(size, 'big')
+        ends.append(len(body))
+    header = bytearray(bytes.fromhex('b5ee9c72'))
+    header.append((0x80 if with_index else 0) | size)
+    header.append(offset_bytes)
+    header += cells.to_bytes(size, 'big') + (1).to_bytes(size, 'big') + (0).to_bytes(size, 'big')
+    header += len(body).to_bytes(offset_bytes, 'big')
+    header += (0).to_bytes(size, 'big')
+    if with_index:
+        for end in ends:
+            header += end.to_bytes(offset_bytes, 'big')
+    return bytes(header + body)
+
+
+def measure(label: str, function: t.Callable[[], t.Any], size: int) -> None:
+    started: float = time.perf_counter()
+    function()
+    elapsed: float = time.perf_counter() - started
+    print(f'{label:<32} {elapsed * 1000:9.1f} ms  {size / elapsed / 2 ** 20:9.1f} MiB/s')
+
+
+def main(cells: int = 200_000) -> None:
+    for with_index in (False, True):
+        data: bytes = make_boc(cells, with_index=with_index)
+        print(f'{cells} cells, {len(data) / 2 ** 20:.1f} MiB, index={with_index}')
+        measure('decode (bytes)', lambda: BagOfCells(data), len(data))
+        with tempfile.NamedTemporaryFile(suffix='.boc') as file:
+            file.write(data)
+            file.flush()
+            measure('decode (mmap)', lambda: BagOfCells.open(file.name).close(), len(data))
+        boc = BagOfCells(data)
+        measure('walk every cell', lambda: sum(1 for _ in boc.walk()), len(data))
+        measure('root to leaf path', lambda: _descend(boc), len(data))
+
+
+def _descend(boc: BagOfCells) -> int:
+    cell = boc.root
+    depth: int = 0
+    while cell.reference_indexes:
+        cell = cell.refs[-1]
+        depth += 1
+    return depth
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
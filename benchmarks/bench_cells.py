@@ -0,0 +1,80 @@
+"""
+Memory and throughput of "CellStore" when several versions of a state,
+each differing in a single leaf, are kept at the same time.
+
+    python -m benchmarks.bench_cells [cells] [versions]
+"""
+import os
+import random
+import sys
+import time
+import typing as t
+
+from benchmarks.bench_boc import make_boc
+from ton_node_control.core.boc import BagOfCells
+from ton_node_control.core.cells import CellStore
+
+
+def change_leaf(store: CellStore, root: int, rng: random.Random) -> int:
+    """
+    Path copy: replaces the data of one random leaf and re-interns
+    every cell on the way back to the root.
+    """
+    path: t.List[t.Tuple[int, int]] = []
+    cell: int = root
+    while len(store.references(cell)):
+        references = store.references(cell)
+        position: int = rng.randrange(len(references))
+        path.append((cell, position))
+        cell = references[position]
+    d1, d2 = store.descriptors(cell)
+    replaced: int = store.intern(d1, d2, os.urandom(len(store.data(cell))))
+    for parent, position in reversed(path):
+        references = list(store.references(parent))
+        references[position] = replaced
+        d1, d2 = store.descriptors(parent)
+        replaced = store.intern(d1, d2, store.data(parent), references)
+    return replaced
+
+
+def main(cells: int = 100_000, versions: int = 100) -> None:
+    data: bytes = make_boc(cells, with_index=True)
+    boc = BagOfCells(data)
+    store = CellStore()
+
+    started: float = time.perf_counter()
+    root: int = store.load_boc(boc)[0]
+    elapsed: float = time.perf_counter() - started
+    print(f'intern {cells} cells:           {elapsed * 1000:9.1f} ms  {cells / elapsed:12.0f} cells/s')
+
+    started = time.perf_counter()
+    again: int = store.load_boc(boc)[0]
+    elapsed = time.perf_counter() - started
+    assert again == root
+    print(f're-intern identical state:      {elapsed * 1000:9.1f} ms  {cells / elapsed:12.0f} cells/s')
+
+    rng = random.Random(0)
+    roots: t.List[int] = [root]
+    started = time.perf_counter()
+    for _ in range(versions):
+        roots.append(change_leaf(store, roots[-1], rng))
+    elapsed = time.perf_counter() - started
+    print(f'{versions} single-leaf versions:       {elapsed * 1000:9.1f} ms')
+
+    started = time.perf_counter()
+    changed: int = sum(1 for _ in store.diff(roots[0], roots[-1]))
+    elapsed = time.perf_counter() - started
+    print(f'diff first/last ({changed} pairs):  {elapsed * 1000:9.3f} ms')
+
+    started = time.perf_counter()
+    walked: int = sum(1 for _ in store.walk(roots[-1]))
+    elapsed = time.perf_counter() - started
+    print(f'full walk ({walked} cells):     {elapsed * 1000:9.1f} ms')
+
+    naive: int = len(data) * (versions + 1)
+    print(f'store cells: {len(store)}, storage {store.memory_usage / 2 ** 20:.1f} MiB, '
+          f'{versions + 1} raw BOC copies {naive / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
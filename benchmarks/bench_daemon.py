@@ -0,0 +1,72 @@
+"""
+Latency of a CLI command run in-process against the same command
+forwarded to a running daemon, both measured as a cron job sees it:
+from starting the process to its exit.
+
+    python -m benchmarks.bench_daemon [runs] [command ...]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from ton_node_control.daemon import NO_DAEMON_VARIABLE, SOCKET_VARIABLE, connect
+
+ENTRY_POINT: Path = Path(__file__).resolve().parent.parent.joinpath('__main__.py')
+
+
+def measure(command: list, runs: int, environment: dict) -> list:
+    latencies: list = []
+    for _ in range(runs):
+        started: float = time.perf_counter()
+        subprocess.run([sys.executable, str(ENTRY_POINT), *command], env=environment, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(mode: str, latencies: list) -> None:
+    ordered: list = sorted(latencies)
+    print(
+        f'{mode:<11} median {statistics.median(ordered) * 1000:7.1f} ms, '
+        f'p95 {ordered[int(len(ordered) * 0.95) - 1] * 1000:7.1f} ms, '
+        f'min {ordered[0] * 1000:7.1f} ms',
+    )
+
+
+def main(runs: int = 50, command: tuple = ('history',)) -> None:
+    with tempfile.TemporaryDirectory() as temporary:
+        socket: str = os.path.join(temporary, 'daemon.sock')
+        environment: dict = {
+            **os.environ,
+            'TON_NODE_CONTROL_HOME': os.environ.get('TON_NODE_CONTROL_HOME', temporary),
+            SOCKET_VARIABLE: socket,
+        }
+        in_process: list = measure(list(command), runs, {**environment, NO_DAEMON_VARIABLE: '1'})
+        daemon = subprocess.Popen(
+            [sys.executable, str(ENTRY_POINT), 'daemon', '--status-every', '0', '--disk-every', '0'],
+            env=environment,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            while connect(socket) is None:
+                if daemon.poll() is not None:
+                    raise SystemExit('The daemon did not start')
+                time.sleep(0.05)
+            # One run to warm the daemon's caches and connections up.
+            measure(list(command), 1, environment)
+            forwarded: list = measure(list(command), runs, environment)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    print(f'{runs} runs of "{" ".join(command)}"')
+    report('in-process', in_process)
+    report('forwarded', forwarded)
+    print(f'speed-up    {statistics.median(in_process) / statistics.median(forwarded):.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50, tuple(sys.argv[2:]) or ('history',))
@@ -0,0 +1,81 @@
+"""
+Requests per second of the pooled datasource layer against a local ASGI
+stand-in of a toncenter-style JSON-RPC API.
+
+    python -m benchmarks.bench_datasources [requests] [concurrency]
+"""
+import asyncio
+import json
+import sys
+import time
+import typing as t
+
+import httpx
+
+from ton_node_control.core.datasources import ClientPool, JsonRpcDataSource, TonCenterDataSource
+
+MASTERCHAIN_INFO: t.Dict[str, t.Any] = {
+    'last': {'workchain': -1, 'shard': '-9223372036854775808', 'seqno': 1, 'root_hash': '', 'file_hash': ''},
+    'state_root_hash': '',
+    'init': {'workchain': -1, 'shard': '0', 'seqno': 0, 'root_hash': '', 'file_hash': ''},
+}
+
+
+def answer(request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    if request.get('method') == 'getMasterchainInfo':
+        result: t.Any = MASTERCHAIN_INFO
+    else:
+        result = {'balance': 1, 'state': 'active'}
+    return {'ok': True, 'result': result, 'id': request.get('id'), 'jsonrpc': '2.0'}
+
+
+async def json_rpc_app(scope: t.Dict[str, t.Any], receive: t.Callable, send: t.Callable) -> None:
+    body: bytes = b''
+    while True:
+        message: t.Dict[str, t.Any] = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    payload: t.Any = json.loads(body)
+    response: t.Any = [answer(item) for item in payload] if isinstance(payload, list) else answer(payload)
+    content: bytes = json.dumps(response).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(content)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def run(requests: int = 5000, concurrency: int = 64) -> None:
+    transport = httpx.ASGITransport(app=json_rpc_app)
+    pool = ClientPool()
+    toncenter = TonCenterDataSource('http://stand-in/api/v2', transport=transport, pool=pool)
+    batching = JsonRpcDataSource('http://stand-in/api/v2', transport=transport, pool=pool)
+    batching.endpoint = 'jsonRPC'
+    for datasource in (toncenter, batching):
+        # The stand-in does not throttle, measure the layer itself.
+        datasource.rate_limit = datasource.rate_burst = 10 ** 6
+        datasource.concurrency = datasource.max_concurrency = concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await toncenter.get_masterchain_info()
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed: float = time.perf_counter() - started
+    print(f'single calls   {requests / elapsed:10.0f} requests/s')
+
+    calls = [('getAddressInformation', {'address': str(index)}) for index in range(requests)]
+    started = time.perf_counter()
+    results = await batching.batch(calls)
+    elapsed = time.perf_counter() - started
+    assert len(results) == requests
+    print(f'batched calls  {requests / elapsed:10.0f} calls/s ({batching.max_batch_size} per request)')
+    await pool.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(run(*(int(argument) for argument in sys.argv[1:])))
@@ -0,0 +1,52 @@
+"""
+Time to size a database-like tree: "du", a first parallel scan, and a
+rescan after a few directories changed.
+
+    python -m benchmarks.bench_disk [directories] [files per directory]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from ton_node_control.disk import DiskAnalyzer
+
+COMPONENTS = ('archive', 'celldb', 'files', 'state')
+
+
+def make_tree(root: Path, directories: int, files: int) -> None:
+    for index in range(directories):
+        directory: Path = root.joinpath(COMPONENTS[index % len(COMPONENTS)], f'{index // 100:04d}', f'{index:06d}')
+        directory.mkdir(parents=True)
+        for number in range(files):
+            directory.joinpath(f'{number}.pack').write_bytes(b'\0' * (number * 97 % 4096))
+
+
+def main(directories: int = 5_000, files: int = 40) -> None:
+    with tempfile.TemporaryDirectory() as temporary:
+        root: Path = Path(temporary, 'db')
+        make_tree(root, directories, files)
+        # Listings are only cached once older than the racy window.
+        time.sleep(2.1)
+        analyzer = DiskAnalyzer(root, cache_directory=Path(temporary, 'cache'))
+
+        started: float = time.perf_counter()
+        subprocess.run(['du', '-s', str(root)], check=True, stdout=subprocess.DEVNULL)
+        print(f'du -s:             {time.perf_counter() - started:7.3f}s')
+
+        usage = analyzer.scan(full=True)
+        print(f'first scan:        {usage.duration:7.3f}s, {usage.scanned} directories listed')
+
+        for index in range(0, directories, max(directories // 20, 1)):
+            directory: Path = root.joinpath(COMPONENTS[index % len(COMPONENTS)], f'{index // 100:04d}', f'{index:06d}')
+            directory.joinpath('new.pack').write_bytes(b'\0' * 1024)
+        usage = analyzer.scan()
+        print(f'incremental scan:  {usage.duration:7.3f}s, {usage.scanned} listed, {usage.reused} unchanged')
+        print(f'total: {usage.total.files} files, {usage.total.allocated} bytes, {os.cpu_count()} CPUs')
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
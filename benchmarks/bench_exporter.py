@@ -0,0 +1,59 @@
+"""
+Scrape throughput of "MetricsExporter" with many concurrent scrapers
+over keep-alive connections, and how often the probes ran meanwhile.
+
+    python -m benchmarks.bench_exporter [scrapers] [scrapes]
+"""
+import asyncio
+import sys
+import time
+
+from ton_node_control.exporter import MetricsExporter
+from ton_node_control.status import MetricFamily, Probe
+
+
+async def scrape(port: int, scrapes: int, gzip: bool) -> int:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    encoding: str = 'Accept-Encoding: gzip\r\n' if gzip else ''
+    received: int = 0
+    for _ in range(scrapes):
+        writer.write(f'GET /metrics HTTP/1.1\r\nHost: bench\r\n{encoding}\r\n'.encode())
+        head: bytes = await reader.readuntil(b'\r\n\r\n')
+        length: int = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+        received += len(await reader.readexactly(length))
+    writer.close()
+    return received
+
+
+async def run(scrapers: int, scrapes: int) -> None:
+    collections: int = 0
+
+    async def collect(values: dict) -> None:
+        nonlocal collections
+        collections += 1
+        values.update({f'value_{index}': index for index in range(50)})
+
+    families = tuple(MetricFamily(f'value_{index}', f'bench_value_{index}', 'Benchmark value.') for index in range(50))
+    exporter = MetricsExporter([Probe('bench', collect, families=families)], interval=60.0)
+    server = asyncio.ensure_future(exporter.serve('127.0.0.1', 19150))
+    while exporter.exposition is None:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+    for gzip in (False, True):
+        started: float = time.perf_counter()
+        received = await asyncio.gather(*(scrape(19150, scrapes, gzip) for _ in range(scrapers)))
+        elapsed: float = time.perf_counter() - started
+        total: int = scrapers * scrapes
+        print(f'{"gzip" if gzip else "plain"}: {total} scrapes by {scrapers} scrapers in {elapsed:.2f} s, '
+              f'{total / elapsed:.0f} scrapes/s, {sum(received) / total:.0f} bytes each')
+    print(f'probe collections meanwhile: {collections}')
+    server.cancel()
+
+
+def main(scrapers: int = 50, scrapes: int = 200) -> None:
+    asyncio.run(run(scrapers, scrapes))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""
+Throughput and CPU cost of following a validator-engine log with a
+level and regex filter, against decoding and matching every line.
+
+    python -m benchmarks.bench_logs [megabytes] [peak MB/s]
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+from ton_node_control.logs import LineFilter, LogFollower, LogLevel
+
+SOURCES = [b'validator-group.cpp:213', b'manager.cpp:1432', b'adnl-peer.cpp:88', b'catchain-receiver.cpp:511']
+
+
+def make_log(path: str, megabytes: int) -> None:
+    rng = random.Random(0)
+    with open(path, 'wb') as file:
+        written: int = 0
+        while written < megabytes * 2 ** 20:
+            lines = b''.join(
+                b'[ %d][t %2d][2022-10-19 10:%02d:%02d.%09d][%s][!validatorgroup] block %d accepted from %x\n' % (
+                    rng.choice((1, 2, 3, 3, 3, 4, 4, 4, 4)), rng.randrange(16), rng.randrange(60),
+                    rng.randrange(60), rng.randrange(10 ** 9), rng.choice(SOURCES),
+                    rng.randrange(10 ** 7), rng.getrandbits(64),
+                )
+                for _ in range(10_000)
+            )
+            file.write(lines)
+            written += len(lines)
+
+
+def main(megabytes: int = 256, peak: float = 20.0) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'log')
+        make_log(path, megabytes)
+        size: int = os.path.getsize(path)
+
+        line_filter = LineFilter(pattern=rb'block 42\d{4} ', max_level=LogLevel.warning)
+        started, cpu = time.perf_counter(), time.process_time()
+        matched: int = sum(
+            1 for chunk in LogFollower(path, from_start=True).chunks(follow=False)
+            for _ in line_filter.lines(chunk)
+        )
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu
+        print(f'follower + byte filter: {size / elapsed / 2 ** 20:8.1f} MB/s, {matched} lines, '
+              f'{100 * cpu * peak * 2 ** 20 / size:.2f}% CPU at {peak:g} MB/s')
+
+        pattern = re.compile(r'block 42\d{4} ')
+        started, cpu = time.perf_counter(), time.process_time()
+        with open(path, encoding='utf-8', errors='replace') as file:
+            matched = sum(
+                1 for line in file
+                if pattern.search(line) and int(line[1:3]) <= LogLevel.warning
+            )
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu
+        print(f'decode + per-line match: {size / elapsed / 2 ** 20:7.1f} MB/s, {matched} lines, '
+              f'{100 * cpu * peak * 2 ** 20 / size:.2f}% CPU at {peak:g} MB/s')
+
+
+if __name__ == '__main__':
+    main(*(float(argument) if index else int(argument) for index, argument in enumerate(sys.argv[1:])))
@@ -0,0 +1,44 @@
+"""
+Append and window-query throughput of "MetricsStore" over a day of
+one-second samples, and its memory use against the same history kept
+as a list of tuples.
+
+    python -m benchmarks.bench_metrics [series] [seconds]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from ton_node_control.metrics import HOUR, MINUTE, MetricsStore
+
+
+def main(series: int = 20, seconds: int = 24 * 3600) -> None:
+    rng = random.Random(0)
+    names = [f'series.{index}' for index in range(series)]
+    tracemalloc.start()
+    store = MetricsStore()
+    started: float = time.perf_counter()
+    for second in range(seconds):
+        for name in names:
+            store.record(name, rng.random(), float(second))
+    elapsed: float = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    samples: int = series * seconds
+    print(f'append {samples} samples:   {elapsed:8.2f} s  {samples / elapsed:12.0f} samples/s')
+    print(f'store memory: {store.memory_usage() / 2 ** 20:.1f} MiB (peak traced {peak / 2 ** 20:.1f} MiB), '
+          f'list of tuples would be about {samples * 72 / 2 ** 20:.0f} MiB')
+
+    now: float = float(seconds)
+    for label, window in (('10 minutes', 10 * MINUTE), ('1 day', 24 * HOUR), ('1 week', 7 * 24 * HOUR)):
+        started = time.perf_counter()
+        rounds: int = 1000
+        for _ in range(rounds):
+            store.aggregate(names[0], now - window, now)
+        elapsed = time.perf_counter() - started
+        print(f'aggregate over {label:<10}  {elapsed / rounds * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,97 @@
+"""
+Throughput of the generated TL codec on random objects of every combinator,
+round trips and malformed input are covered by "tests/test_tl.py".
+
+    python -m benchmarks.bench_tl [schema.tl ...]
+
+Without arguments the schemas of the installed ton sources are used.
+"""
+import random
+import sys
+import time
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.core.tl import TlCodec, TlCombinator, TlObject, TlSchema
+from ton_node_control.core.tl.schema import locate_schemas
+
+FIXED_VALUES: t.Dict[str, t.Callable[[random.Random], t.Any]] = {
+    '#': lambda rng: rng.getrandbits(32),
+    'int': lambda rng: rng.getrandbits(32) - 2 ** 31,
+    'long': lambda rng: rng.getrandbits(64) - 2 ** 63,
+    'double': lambda rng: rng.random(),
+    'int128': lambda rng: rng.getrandbits(128).to_bytes(16, 'big'),
+    'int256': lambda rng: rng.getrandbits(256).to_bytes(32, 'big'),
+    'Bool': lambda rng: rng.random() < 0.5,
+    'bytes': lambda rng: bytes(rng.getrandbits(8) for _ in range(rng.choice((0, 3, 253, 254, 300)))),
+    'secureBytes': lambda rng: bytes(rng.getrandbits(8) for _ in range(rng.randrange(64))),
+    'string': lambda rng: ''.join(chr(rng.randrange(32, 0x2fff)) for _ in range(rng.randrange(40))),
+    'secureString': lambda rng: ''.join(chr(rng.randrange(32, 127)) for _ in range(rng.randrange(40))),
+}
+
+
+class Fuzzer:
+    def __init__(self, schema: TlSchema, seed: int = 0) -> None:
+        self.schema: TlSchema = schema
+        self.rng = random.Random(seed)
+        self.types: t.Dict[str, t.List[TlCombinator]] = {}
+        for combinator in schema.combinators:
+            if not combinator.is_function:
+                self.types.setdefault(combinator.result, []).append(combinator)
+
+    def value(self, type_name: str, depth: int) -> t.Any:
+        if type_name in FIXED_VALUES:
+            return FIXED_VALUES[type_name](self.rng)
+        if type_name.startswith('(') or type_name.startswith('vector'):
+            element: str = type_name.strip('()').split()[1]
+            return [self.value(element, depth + 1) for _ in range(self.rng.randrange(3 if depth < 3 else 1))]
+        if type_name in self.schema.by_name:
+            return self.instance(self.schema.by_name[type_name], depth + 1)
+        candidates: t.List[TlCombinator] = self.types.get(type_name) or [
+            combinator for combinator in self.schema.combinators
+            if not combinator.is_function and not combinator.parameters
+        ]
+        return self.instance(self.rng.choice(candidates), depth + 1)
+
+    def instance(self, combinator: TlCombinator, depth: int = 0) -> TlObject:
+        value: TlObject = {'@type': combinator.name}
+        for parameter in combinator.parameters:
+            if parameter.condition is not None:
+                flags, bit = parameter.condition
+                if not value[flags] & (1 << bit):
+                    value[parameter.name] = None
+                    continue
+            value[parameter.name] = True if parameter.type == 'true' else self.value(parameter.type, depth)
+        return value
+
+
+def main(*paths: str) -> None:
+    codec: TlCodec = TlCodec.from_files([Path(path) for path in paths] or locate_schemas())
+    fuzzer = Fuzzer(codec.schema)
+    samples: t.List[TlObject] = []
+    for combinator in codec.schema.combinators:
+        for _ in range(20):
+            try:
+                samples.append(fuzzer.instance(combinator))
+            except (IndexError, KeyError):
+                continue
+    print(f'{len(samples)} random objects of {len(codec.schema.combinators)} combinators')
+
+    encoded: t.List[bytes] = [codec.serialize(value) for value in samples]
+    for label, function, inputs in (
+        ('serialize', codec.serialize, samples),
+        ('deserialize', codec.deserialize, encoded),
+    ):
+        rounds: int = 0
+        started: float = time.perf_counter()
+        while time.perf_counter() - started < 1:
+            for item in inputs:
+                function(item)
+            rounds += 1
+        elapsed: float = time.perf_counter() - started
+        print(f'{label:<12} {rounds * len(inputs) / elapsed:12.0f} messages/s')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,39 @@
+import pytest
+
+from ton_node_control.core.address import (
+    Address,
+    AddressError,
+    convert_bounceability,
+    decode_records,
+    friendly_to_raw,
+    raw_to_friendly,
+)
+
+RAW: list = ['0:' + 'ab' * 32, '-1:' + 'cd' * 32]
+
+
+def test_round_trip() -> None:
+    friendly: list = raw_to_friendly(RAW)
+    assert friendly == [Address.from_raw(address).to_friendly() for address in RAW]
+    assert friendly_to_raw(friendly) == RAW
+    assert friendly_to_raw(raw_to_friendly(RAW, url_safe=False)) == RAW
+
+
+def test_convert_bounceability() -> None:
+    converted: list = convert_bounceability(raw_to_friendly(RAW), bounceable=False)
+    assert [Address.parse(address).bounceable for address in converted] == [False, False]
+    assert friendly_to_raw(converted) == RAW
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda address: address[:47] + '=',
+    lambda address: address[:46] + '==',
+    lambda address: address[:47] + '!',
+    lambda address: address[:47] + '\n',
+    lambda address: address[:47] + ('A' if address[47] != 'A' else 'B'),
+    lambda address: address[:-1],
+])
+def test_decode_rejects_corrupt_addresses(corrupt) -> None:
+    first, second = raw_to_friendly(RAW)
+    with pytest.raises(AddressError):
+        decode_records([corrupt(first), second])
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import random
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.backup import BackupReport, BackupWriter, ChunkParameters, LocalTarget, Manifest, StoredChunk
+from ton_node_control.backup.chunking import ANCHOR, ChunkSpan, find_boundaries, unpack_chunk
+
+PARAMETERS: ChunkParameters = ChunkParameters(minimum=1024, maximum=8192, window=64 * 1024)
+
+
+def _content(seed: int, size: int) -> bytes:
+    generator: random.Random = random.Random(seed)
+    data: bytearray = bytearray(generator.getrandbits(8 * size).to_bytes(size, 'little'))
+    # Anchors every 2 KiB or so, random data alone has about one per MiB.
+    for position in range(0, size - 8, 2000):
+        position += generator.randrange(500)
+        data[position:position + 3] = ANCHOR + b'\x00'
+    return bytes(data)
+
+
+def test_boundaries_only_move_around_an_insertion() -> None:
+    data: bytes = _content(1, 200_000)
+    edited: bytes = data[:50_000] + b'inserted' + data[50_000:]
+    before: t.List[int] = find_boundaries(data, 0, len(data), PARAMETERS)
+    after: t.List[int] = find_boundaries(edited, 0, len(edited), PARAMETERS)
+    assert before[-1] == len(data) and after[-1] == len(edited)
+    assert all(PARAMETERS.minimum < end - start <= PARAMETERS.maximum for start, end in zip([0, *before], before[:-1]))
+    unchanged: t.List[int] = [end for end in before if end < 50_000]
+    assert after[:len(unchanged)] == unchanged
+    # Past the edit, the same cuts shifted by the insertion.
+    shifted: t.Set[int] = {end + len(b'inserted') for end in before if end > 60_000}
+    assert len(shifted - set(after)) <= 1 and len(shifted) > 50
+
+
+def test_boundaries_without_anchors_cut_at_the_maximum() -> None:
+    data: bytes = bytes(20_000)
+    assert find_boundaries(data, 0, len(data), PARAMETERS) == [8192, 16384, 20_000]
+    assert find_boundaries(data, 0, 1000, PARAMETERS) == [1000]
+    assert find_boundaries(data, 0, 0, PARAMETERS) == []
+
+
+class CountingTarget(LocalTarget):
+    """
+    Counts how often the writer asks whether a chunk is stored.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__(directory)
+        self.size_queries: int = 0
+
+    async def stored_size(self, digest: str) -> t.Optional[int]:
+        self.size_queries += 1
+        return await super().stored_size(digest)
+
+
+def _backup(writer: BackupWriter, sources: t.Mapping[str, Path], name: str) -> BackupReport:
+    return asyncio.run(writer.backup(sources, name))
+
+
+def _manifest(target: LocalTarget, name: str) -> Manifest:
+    return Manifest.from_json(target.directory.joinpath(target.manifest_name(name)).read_bytes())
+
+
+def _restored(target: LocalTarget, manifest: Manifest, path: str) -> bytes:
+    chunks: t.List[str] = next(entry for entry in manifest.files if entry.path == path).chunks
+    return b''.join(
+        unpack_chunk(target.directory.joinpath(target.chunk_name(digest)).read_bytes(), digest) for digest in chunks
+    )
+
+
+def test_snapshots_share_chunks(tmp_path: Path) -> None:
+    source: Path = tmp_path.joinpath('db')
+    source.mkdir()
+    source.joinpath('a.sst').write_bytes(_content(2, 100_000))
+    # The same content twice: stored once.
+    source.joinpath('b.sst').write_bytes(_content(2, 100_000))
+    source.joinpath('link').symlink_to('a.sst')
+    target: CountingTarget = CountingTarget(tmp_path.joinpath('snapshots'))
+    writer: BackupWriter = BackupWriter(target, workers=1, parameters=PARAMETERS)
+
+    first: BackupReport = _backup(writer, {'db': source}, 'first')
+    assert (first.files, first.size) == (3, 200_000)
+    assert first.new_chunks == first.chunks == len(list(target.directory.glob('chunks/*/*')))
+    manifest: Manifest = _manifest(target, 'first')
+    assert _restored(target, manifest, 'db/b.sst') == _content(2, 100_000)
+    assert next(entry for entry in manifest.files if entry.path == 'db/link').link == 'a.sst'
+
+    # One file changed near its start: only the chunks around it are new.
+    with open(source.joinpath('a.sst'), 'r+b') as file:
+        file.seek(10)
+        file.write(b'changed')
+    second: BackupReport = _backup(writer, {'db': source}, 'second')
+    assert second.reused_files == 1
+    assert 0 < second.new_chunks <= 2
+    assert _restored(target, _manifest(target, 'second'), 'db/a.sst')[10:17] == b'changed'
+    assert (target.directory.joinpath('LATEST').read_text()) == 'second'
+
+
+def test_unchanged_files_are_not_read_again(tmp_path: Path) -> None:
+    source: Path = tmp_path.joinpath('db')
+    source.mkdir()
+    source.joinpath('a.sst').write_bytes(_content(3, 50_000))
+    target: CountingTarget = CountingTarget(tmp_path.joinpath('snapshots'))
+    writer: BackupWriter = BackupWriter(target, workers=1, parameters=PARAMETERS)
+    _backup(writer, {'db': source}, 'first')
+    queries: int = target.size_queries
+
+    report: BackupReport = _backup(writer, {'db': source}, 'second')
+    assert (report.reused_files, report.new_chunks) == (1, 0)
+    assert _manifest(target, 'second').files[0].chunks == _manifest(target, 'first').files[0].chunks
+    # Touched but the same content: read again, yet every chunk is known
+    # from the previous manifest without asking the target.
+    os.utime(source.joinpath('a.sst'), ns=(1, 1))
+    report = _backup(writer, {'db': source}, 'third')
+    assert (report.reused_files, report.new_chunks) == (0, 0)
+    assert target.size_queries == queries
+    assert _manifest(target, 'third').chunks == _manifest(target, 'first').chunks
+    assert all(isinstance(chunk, StoredChunk) for chunk in _manifest(target, 'third').chunks.values())
+
+
+class ChangingWriter(BackupWriter):
+    """
+    Rewrites the file right after its first scan, as the node would.
+    """
+
+    changes: int = 0
+
+    async def _scan(self, source: t.Any) -> t.List[ChunkSpan]:
+        spans: t.List[ChunkSpan] = await super()._scan(source)
+        if not self.changes:
+            self.changes += 1
+            source.path.write_bytes(_content(5, 30_000))
+        return spans
+
+
+def test_changed_chunks_are_read_again(tmp_path: Path) -> None:
+    source: Path = tmp_path.joinpath('db')
+    source.mkdir()
+    source.joinpath('a.sst').write_bytes(_content(4, 30_000))
+    target: LocalTarget = LocalTarget(tmp_path.joinpath('snapshots'))
+    writer: ChangingWriter = ChangingWriter(target, workers=1, parameters=PARAMETERS)
+    report: BackupReport = _backup(writer, {'db': source}, 'first')
+    assert writer.changes == 1
+    assert (report.files, report.skipped) == (1, [])
+    assert _restored(target, _manifest(target, 'first'), 'db/a.sst') == _content(5, 30_000)
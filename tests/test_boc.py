@@ -0,0 +1,159 @@
+import base64
+import random
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.core.boc import BagOfCells, BocError, crc32c
+from ton_node_control.core.cells import CellStore
+
+EMPTY_CELL: bytes = base64.b64decode('te6ccgEBAQEAAgAAAA==')
+EMPTY_CELL_HASH: str = '96a296d224f285c67bee93c30f8a309157f0daa35dc5b87e410b78630a09cfc7'
+WALLET_V3R2_CODE: bytes = base64.b64decode(
+    'te6cckEBAQEAcQAA3v8AIN0gggFMl7ohggEznLqxn3Gw7UTQ0x/THzHXC//jBOCk8mCDCNcYINMf0x/TH/gjE7vyY+1E0NMf0x/T/9FRMrry'
+    'oVFEuvKiBPkBVBBV+RDyo/gAkyDXSpbTB9QC+wDo0QGkyMsfyx/L/8ntVBC9ba0=',
+)
+WALLET_V3R2_CODE_HASH: str = '84dafa449f98a6987789ba232358072bc0f76dc4524002a5d0918b9a75d2d599'
+
+# Descriptors, data with its completion tag, references: a root with two
+# children sharing a leaf.
+CELLS: t.List[t.Tuple[int, int, bytes, t.List[int]]] = [
+    (2, 3, b'\xab\x80', [1, 2]),
+    (1, 2, b'\x01', [3]),
+    (1, 1, b'\x28', [3]),
+    (0, 8, b'\xde\xad\xbe\xef', []),
+]
+
+
+def serialize(
+    cells: t.Sequence[t.Tuple[int, int, bytes, t.List[int]]] = CELLS,
+    *,
+    index: bool = False,
+    crc: bool = False,
+    cache_bits: bool = False,
+) -> bytes:
+    size: int = 1
+    serialized: t.List[bytes] = [
+        bytes((d1, d2)) + data + b''.join(reference.to_bytes(size, 'big') for reference in references)
+        for d1, d2, data, references in cells
+    ]
+    total: int = sum(map(len, serialized))
+    offset_bytes: int = 2
+    flags: int = (index << 7) | (crc << 6) | (cache_bits << 5) | size
+    header: bytes = bytes.fromhex('b5ee9c72') + bytes((flags, offset_bytes))
+    header += bytes((len(cells), 1, 0)) + total.to_bytes(offset_bytes, 'big') + bytes((0,))
+    if index:
+        end: int = 0
+        for cell in serialized:
+            end += len(cell)
+            header += ((end << 1) if cache_bits else end).to_bytes(offset_bytes, 'big')
+    payload: bytes = header + b''.join(serialized)
+    if crc:
+        payload += crc32c(payload).to_bytes(4, 'little')
+    return payload
+
+
+def _read_everything(boc: BagOfCells) -> t.List[t.Tuple[str, t.List[int]]]:
+    return [(boc.cell(index).bits(), boc.references(index)) for index in boc.walk()]
+
+
+def test_empty_cell() -> None:
+    boc: BagOfCells = BagOfCells(EMPTY_CELL)
+    assert len(boc) == 1
+    assert (boc.root.bits_length, boc.root.refs, boc.root.bits()) == (0, [], '')
+    store: CellStore = CellStore()
+    assert store.hash(store.load_boc(boc)[0]).hex() == EMPTY_CELL_HASH
+
+
+def test_wallet_code_with_checksum() -> None:
+    boc: BagOfCells = BagOfCells(WALLET_V3R2_CODE, verify=True)
+    assert (len(boc), boc.root.bits_length, boc.root.is_exotic) == (1, 888, False)
+    assert bytes(boc.root.data[:4]).hex() == 'ff0020dd'
+    store: CellStore = CellStore()
+    assert store.hash(store.load_boc(boc)[0]).hex() == WALLET_V3R2_CODE_HASH
+
+
+def test_checksum_mismatch() -> None:
+    corrupted: bytearray = bytearray(WALLET_V3R2_CODE)
+    corrupted[20] ^= 1
+    # Only looked at when asked to.
+    BagOfCells(bytes(corrupted))
+    with pytest.raises(BocError, match='CRC32C'):
+        BagOfCells(bytes(corrupted), verify=True)
+
+
+@pytest.mark.parametrize('options', [{}, {'index': True}, {'index': True, 'cache_bits': True}, {'crc': True}])
+def test_indexed_and_scanned_decode_alike(options: t.Dict[str, bool]) -> None:
+    boc: BagOfCells = BagOfCells(serialize(**options), verify=True)
+    assert len(boc) == 4
+    assert list(boc.walk()) == [0, 1, 3, 2]
+    assert boc.root.bits() == '10101011'
+    assert boc.cell(2).bits() == '0010'
+    assert [cell.index for cell in boc.root.refs] == [1, 2]
+    assert bytes(boc.cell(3).data) == b'\xde\xad\xbe\xef'
+    scanned: BagOfCells = BagOfCells(serialize())
+    assert [offset - boc.offsets[0] for offset in boc.offsets] == [
+        offset - scanned.offsets[0] for offset in scanned.offsets
+    ]
+
+
+def test_shared_leaf_interned_once() -> None:
+    store: CellStore = CellStore()
+    store.load_boc(BagOfCells(serialize(index=True)))
+    assert len(store) == 4
+
+
+def test_open_maps_the_file(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('code.boc')
+    path.write_bytes(WALLET_V3R2_CODE)
+    with BagOfCells.open(path, verify=True) as boc:
+        assert boc.root.bits_length == 888
+
+
+@pytest.mark.parametrize('options', [{}, {'index': True}, {'crc': True}])
+def test_truncated_input(options: t.Dict[str, bool]) -> None:
+    payload: bytes = serialize(**options)
+    for length in range(len(payload)):
+        with pytest.raises(BocError):
+            _read_everything(BagOfCells(payload[:length]))
+
+
+@pytest.mark.parametrize('options', [{}, {'index': True}])
+def test_corrupt_input_raises_boc_errors_only(options: t.Dict[str, bool]) -> None:
+    payload: bytes = serialize(**options)
+    rng: random.Random = random.Random(30)
+    for _ in range(3000):
+        corrupted: bytearray = bytearray(payload)
+        for _ in range(rng.randint(1, 3)):
+            corrupted[rng.randrange(len(corrupted))] = rng.randrange(256)
+        try:
+            _read_everything(BagOfCells(bytes(corrupted)))
+        except BocError:
+            pass
+
+
+def test_header_errors() -> None:
+    with pytest.raises(BocError, match='magic'):
+        BagOfCells(b'\x00' * 16)
+    with pytest.raises(BocError):
+        BagOfCells(b'')
+    payload: bytearray = bytearray(serialize())
+    # A root past the last cell.
+    payload[11] = 9
+    with pytest.raises(BocError, match='Root'):
+        BagOfCells(bytes(payload))
+    # Children must come after their parent.
+    backwards: bytes = serialize([(1, 0, b'', [1]), (1, 0, b'', [0])])
+    with pytest.raises(BocError, match='out of order'):
+        list(BagOfCells(backwards).walk())
+
+
+def test_index_pointing_out_of_the_data() -> None:
+    payload: bytearray = bytearray(serialize(index=True))
+    # Header of 12 bytes then a 2-byte index entry per cell: the first
+    # cell ends past the second one.
+    payload[12:14] = (40).to_bytes(2, 'big')
+    with pytest.raises(BocError):
+        BagOfCells(bytes(payload)).descriptors(1)
@@ -0,0 +1,104 @@
+import asyncio
+import typing as t
+
+from ton_node_control.core.shards import SHARD_FULL, ShardDescriptor
+from ton_node_control.events import DropPolicy, Event, EventBus, MasterchainBlock, ShardBlock, Subscription
+
+
+def _block(seqno: int) -> MasterchainBlock:
+    return MasterchainBlock(ShardDescriptor(-1, SHARD_FULL, seqno))
+
+
+def _seqnos(subscription: Subscription) -> t.List[int]:
+    seqnos: t.List[int] = []
+    while subscription.pending:
+        seqnos.append(t.cast(MasterchainBlock, subscription._queue.get_nowait()).block.seqno)
+    return seqnos
+
+
+def test_delivery_by_type() -> None:
+    bus: EventBus = EventBus()
+    blocks: Subscription = bus.subscribe(MasterchainBlock)
+    everything: Subscription = bus.subscribe()
+    assert bus.has_subscribers(MasterchainBlock) and bus.has_subscribers(ShardBlock)
+    assert asyncio.run(bus.publish(_block(1))) == 2
+    assert asyncio.run(bus.publish(ShardBlock(ShardDescriptor(0, SHARD_FULL, 5), 1))) == 1
+    assert (blocks.pending, everything.pending) == (1, 2)
+    assert bus.published == {'MasterchainBlock': 1, 'ShardBlock': 1}
+    blocks.close()
+    everything.close()
+    assert not bus.has_subscribers(Event)
+
+
+def test_drop_oldest() -> None:
+    bus: EventBus = EventBus()
+    subscription: Subscription = bus.subscribe(MasterchainBlock, maxsize=2, policy=DropPolicy.drop_oldest)
+    for seqno in range(1, 5):
+        assert asyncio.run(bus.publish(_block(seqno))) == 1
+    assert (subscription.delivered, subscription.dropped) == (4, 2)
+    assert _seqnos(subscription) == [3, 4]
+
+
+def test_drop_newest() -> None:
+    bus: EventBus = EventBus()
+    subscription: Subscription = bus.subscribe(MasterchainBlock, maxsize=2, policy=DropPolicy.drop_newest)
+    delivered: t.List[int] = [asyncio.run(bus.publish(_block(seqno))) for seqno in range(1, 5)]
+    assert delivered == [1, 1, 0, 0]
+    assert (subscription.delivered, subscription.dropped) == (2, 2)
+    assert _seqnos(subscription) == [1, 2]
+
+
+def test_block_waits_for_the_consumer() -> None:
+    bus: EventBus = EventBus()
+    subscription: Subscription = bus.subscribe(MasterchainBlock, maxsize=1, policy=DropPolicy.block)
+    received: t.List[int] = []
+
+    async def main() -> None:
+        await bus.publish(_block(1))
+        publishing: asyncio.Future = asyncio.ensure_future(bus.publish(_block(2)))
+        await asyncio.sleep(0.05)
+        # Held up until the consumer makes room.
+        assert not publishing.done()
+        received.append(t.cast(MasterchainBlock, await subscription.get()).block.seqno)
+        assert await publishing == 1
+        received.append(t.cast(MasterchainBlock, await subscription.get()).block.seqno)
+
+    asyncio.run(main())
+    assert received == [1, 2]
+    assert subscription.dropped == 0
+
+
+def test_block_with_a_timeout_drops() -> None:
+    bus: EventBus = EventBus()
+    subscription: Subscription = bus.subscribe(MasterchainBlock, maxsize=1, policy=DropPolicy.block, timeout=0.05)
+    other: Subscription = bus.subscribe(MasterchainBlock, policy=DropPolicy.drop_oldest)
+
+    async def main() -> t.Tuple[int, float]:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        await bus.publish(_block(1))
+        started: float = loop.time()
+        delivered: int = await bus.publish(_block(2))
+        return delivered, loop.time() - started
+
+    delivered, waited = asyncio.run(main())
+    # Given up on the slow subscriber, the other one got it.
+    assert delivered == 1
+    assert 0.04 <= waited < 1.0
+    assert (subscription.dropped, _seqnos(subscription)) == (1, [1])
+    assert _seqnos(other) == [1, 2]
+
+
+def test_closing_ends_iteration_and_releases_the_publisher() -> None:
+    bus: EventBus = EventBus()
+    subscription: Subscription = bus.subscribe(MasterchainBlock, maxsize=1, policy=DropPolicy.block)
+
+    async def main() -> t.List[int]:
+        await bus.publish(_block(1))
+        publishing: asyncio.Future = asyncio.ensure_future(bus.publish(_block(2)))
+        await asyncio.sleep(0.01)
+        subscription.close()
+        assert await publishing == 0
+        return [t.cast(MasterchainBlock, event).block.seqno async for event in subscription]
+
+    assert asyncio.run(main()) == [1]
+    assert not bus.subscriptions
@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import typing as t
+
+import pytest
+
+from ton_node_control.core.boc import BagOfCells, Cell
+from ton_node_control.core.cells import CellStore
+
+WALLET_V3R2_CODE: bytes = base64.b64decode(
+    'te6cckEBAQEAcQAA3v8AIN0gggFMl7ohggEznLqxn3Gw7UTQ0x/THzHXC//jBOCk8mCDCNcYINMf0x/TH/gjE7vyY+1E0NMf0x/T/9FRMrry'
+    'oVFEuvKiBPkBVBBV+RDyo/gAkyDXSpbTB9QC+wDo0QGkyMsfyx/L/8ntVBC9ba0=',
+)
+WALLET_V3R2_CODE_HASH: str = '84dafa449f98a6987789ba232358072bc0f76dc4524002a5d0918b9a75d2d599'
+
+# Root -> (left, right), both pointing at one shared leaf.
+TREE: bytes = bytes.fromhex(
+    'b5ee9c72'  # magic
+    '0101'  # no index, 1-byte references and offsets
+    '040100'  # 4 cells, 1 root, no absent cells
+    '14'  # cells data size
+    '00'  # root index
+    '0203ab800102'
+    '01020103'
+    '01012803'
+    '0008deadbeef'
+)
+
+
+def _reference_hash(cell: Cell) -> t.Tuple[bytes, int]:
+    """
+    Representation hash and depth of an ordinary cell, computed
+    recursively and straight from the decoded BOC.
+    """
+    children: t.List[t.Tuple[bytes, int]] = [_reference_hash(child) for child in cell.refs]
+    d1, d2 = cell.descriptors
+    representation: bytes = bytes((d1, d2)) + bytes(cell.data)
+    representation += b''.join(depth.to_bytes(2, 'big') for _, depth in children)
+    representation += b''.join(child_hash for child_hash, _ in children)
+    depth: int = max((child_depth + 1 for _, child_depth in children), default=0)
+    return hashlib.sha256(representation).digest(), depth
+
+
+def _leaf(store: CellStore, value: int) -> int:
+    return store.intern(0, 2, value.to_bytes(1, 'big'))
+
+
+def _node(store: CellStore, value: int, *children: int) -> int:
+    return store.intern(len(children), 2, value.to_bytes(1, 'big'), children)
+
+
+def _tree(store: CellStore, leaves: t.Sequence[int]) -> int:
+    """
+    Balanced tree of depth 3 over eight leaves.
+    """
+    level: t.List[int] = [_leaf(store, value) for value in leaves]
+    while len(level) > 1:
+        level = [_node(store, 0, level[position], level[position + 1]) for position in range(0, len(level), 2)]
+    return level[0]
+
+
+def test_hashes_match_the_boc() -> None:
+    store: CellStore = CellStore()
+    boc: BagOfCells = BagOfCells(TREE)
+    root: int = store.load_boc(boc)[0]
+    for index in range(len(boc)):
+        cell_hash, depth = _reference_hash(boc.cell(index))
+        cell_id: t.Optional[int] = store.find(cell_hash)
+        assert cell_id is not None
+        assert (store.hash(cell_id), store.depth(cell_id)) == (cell_hash, depth)
+        assert store.data(cell_id) == bytes(boc.data(index))
+        assert store.descriptors(cell_id) == boc.descriptors(index)
+    assert store.hash(root) == _reference_hash(boc.root)[0]
+    # The shared leaf is stored once.
+    assert len(store) == 4
+
+    wallet: int = store.load_boc(BagOfCells(WALLET_V3R2_CODE))[0]
+    assert store.hash(wallet).hex() == WALLET_V3R2_CODE_HASH
+
+
+def test_versions_share_unchanged_subtrees() -> None:
+    store: CellStore = CellStore()
+    first: int = _tree(store, range(8))
+    size: int = len(store)
+    memory: int = store.memory_usage
+    assert _tree(store, range(8)) == first
+    assert (len(store), store.memory_usage) == (size, memory)
+
+    second: int = _tree(store, [0, 1, 2, 3, 4, 5, 6, 99])
+    # A new leaf and the path to the root, nothing else.
+    assert len(store) == size + 4
+    assert second != first
+    assert len(set(store.walk(first)) & set(store.walk(second))) == size - 4
+
+
+def test_diff_returns_only_changed_cells() -> None:
+    store: CellStore = CellStore()
+    first: int = _tree(store, range(8))
+    second: int = _tree(store, [0, 1, 2, 3, 4, 5, 6, 99])
+    changed: t.List[t.Tuple[t.Optional[int], t.Optional[int]]] = list(store.diff(first, second))
+    assert len(changed) == 4
+    assert changed[0] == (first, second)
+    assert changed[-1] == (_leaf(store, 7), _leaf(store, 99))
+    assert list(store.diff(first, first)) == []
+
+
+def test_diff_reports_one_sided_subtrees_by_their_roots() -> None:
+    store: CellStore = CellStore()
+    leaf: int = _leaf(store, 1)
+    extra: int = _node(store, 2, _leaf(store, 3))
+    old: int = _node(store, 0, leaf)
+    new: int = _node(store, 0, leaf, extra)
+    assert list(store.diff(old, new)) == [(old, new), (None, extra)]
+
+
+def test_compact_keeps_reachable_cells() -> None:
+    store: CellStore = CellStore()
+    first: int = _tree(store, range(8))
+    second: int = _tree(store, [0, 1, 2, 3, 4, 5, 6, 99])
+    compacted, mapping = store.compact([second])
+    assert len(compacted) == len(list(store.walk(second)))
+    assert compacted.hash(mapping[second]) == store.hash(second)
+    assert first not in mapping
+
+
+def test_intern_checks_the_reference_count() -> None:
+    store: CellStore = CellStore()
+    with pytest.raises(ValueError):
+        store.intern(1, 2, b'\x01')
@@ -0,0 +1,133 @@
+import shutil
+import stat
+import sys
+import textwrap
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.core.contracts import Contract, ContractArtifact, ContractBuilder, IncludeGraph
+from ton_node_control.core.exceptions import ContractBuildError
+from ton_node_control.core.fift import FiftResult
+
+# Concatenates its sources into the output and logs each compilation;
+# a source holding "syntax error" fails.
+FAKE_FUNC: str = textwrap.dedent('''
+    import sys
+
+    arguments = sys.argv[1:]
+    if arguments == ['-V']:
+        print('func build information: [ Commit: fake ]')
+        sys.exit(0)
+    output = arguments[arguments.index('-o') + 1]
+    sources = [argument for argument in arguments[arguments.index('-o') + 2:]]
+    text = ''.join(open(source).read() for source in sources)
+    if 'syntax error' in text:
+        print(sources[-1] + ':1:1: error: syntax error')
+        sys.exit(1)
+    with open(output, 'w') as file:
+        file.write(text)
+    with open(sys.argv[0] + '.log', 'a') as log:
+        log.write(' '.join(sources) + '\\n')
+''')
+
+
+class FakeFiftPool:
+    def run(self, script: str, *, outputs: t.Sequence[str] = ()) -> FiftResult:
+        assembly: str = script.split('"')[1]
+        return FiftResult(output='', files={'contract.boc': b'boc:' + Path(assembly).read_bytes()})
+
+
+@pytest.fixture
+def func_path(tmp_path: Path) -> Path:
+    path: Path = tmp_path.joinpath('bin', 'func')
+    path.parent.mkdir()
+    path.write_text(f'#!{sys.executable}\n{FAKE_FUNC}')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+@pytest.fixture
+def sources(tmp_path: Path) -> Path:
+    directory: Path = tmp_path.joinpath('src')
+    directory.joinpath('imports').mkdir(parents=True)
+    directory.joinpath('stdlib.fc').write_text(';; stdlib\n')
+    directory.joinpath('wallet.fc').write_text('#include "imports/constants.fc"\n;; wallet\n')
+    directory.joinpath('imports', 'constants.fc').write_text('#include "errors.fc"\nconst a = 1;\n')
+    directory.joinpath('imports', 'errors.fc').write_text('const error::low = 100;\n')
+    return directory
+
+
+def _builder(func_path: Path, cache: Path) -> ContractBuilder:
+    return ContractBuilder(func_path=func_path, fift_pool=FakeFiftPool(), cache_directory=cache)  # type: ignore
+
+
+def _compilations(func_path: Path) -> int:
+    log: Path = func_path.with_name('func.log')
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def _wallet(directory: Path) -> Contract:
+    return Contract.make('wallet', directory.joinpath('stdlib.fc'), directory.joinpath('wallet.fc'))
+
+
+def test_include_closure(sources: Path) -> None:
+    graph: IncludeGraph = IncludeGraph()
+    closure: t.Tuple[Path, ...] = graph.closure([sources.joinpath('stdlib.fc'), sources.joinpath('wallet.fc')])
+    assert [path.relative_to(sources).as_posix() for path in closure] == [
+        'stdlib.fc', 'wallet.fc', 'imports/constants.fc', 'imports/errors.fc',
+    ]
+    sources.joinpath('imports', 'errors.fc').write_text('#include "missing.fc"\n')
+    with pytest.raises(ContractBuildError):
+        graph.closure([sources.joinpath('wallet.fc')])
+
+
+def test_unchanged_rebuild_is_cached(func_path: Path, sources: Path, tmp_path: Path) -> None:
+    builder: ContractBuilder = _builder(func_path, tmp_path.joinpath('cache'))
+    first: ContractArtifact = builder.build(_wallet(sources))
+    second: ContractArtifact = _builder(func_path, tmp_path.joinpath('cache')).build(_wallet(sources))
+    assert (first.cached, second.cached) == (False, True)
+    assert second.key == first.key
+    assert second.boc_path.read_bytes().startswith(b'boc:;; stdlib')
+    assert _compilations(func_path) == 1
+    assert builder.build(_wallet(sources), force=True).cached is False
+    assert _compilations(func_path) == 2
+
+
+def test_edited_include_invalidates_the_build(func_path: Path, sources: Path, tmp_path: Path) -> None:
+    builder: ContractBuilder = _builder(func_path, tmp_path.joinpath('cache'))
+    first: ContractArtifact = builder.build(_wallet(sources))
+    # Two levels down, and the same size, so only the content tells.
+    sources.joinpath('imports', 'errors.fc').write_text('const error::low = 101;\n')
+    second: ContractArtifact = builder.build(_wallet(sources))
+    assert second.cached is False
+    assert second.key != first.key
+    assert _compilations(func_path) == 2
+
+
+def test_key_covers_options_and_compiler(func_path: Path, sources: Path, tmp_path: Path) -> None:
+    builder: ContractBuilder = _builder(func_path, tmp_path.joinpath('cache'))
+    contract: Contract = _wallet(sources)
+    dependencies: t.Tuple[Path, ...] = builder.graph.closure(contract.sources)
+    key: str = builder.key(contract, dependencies)
+    with_options: Contract = Contract.make('wallet', *contract.sources, options=['-SP'])
+    assert builder.key(with_options, dependencies) != key
+    builder._func_version = 'func 2'
+    assert builder.key(contract, dependencies) != key
+
+
+def test_key_does_not_depend_on_the_checkout(func_path: Path, sources: Path, tmp_path: Path) -> None:
+    builder: ContractBuilder = _builder(func_path, tmp_path.joinpath('cache'))
+    elsewhere: Path = Path(shutil.copytree(sources, tmp_path.joinpath('elsewhere', 'src')))
+    assert builder.build(_wallet(sources)).key == builder.build(_wallet(elsewhere)).key
+    assert _compilations(func_path) == 1
+
+
+def test_compile_errors_carry_the_log(func_path: Path, sources: Path, tmp_path: Path) -> None:
+    sources.joinpath('wallet.fc').write_text('syntax error\n')
+    with pytest.raises(ContractBuildError) as caught:
+        _builder(func_path, tmp_path.joinpath('cache')).build(_wallet(sources))
+    assert 'syntax error' in caught.value.log
+    assert not list(tmp_path.joinpath('cache').rglob('meta.json'))
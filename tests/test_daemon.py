@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import os
+import socket
+import sys
+import typing as t
+
+from pathlib import Path
+
+import click
+import pytest
+
+from ton_node_control.cli.utils.paths import WorkingPath
+from ton_node_control.daemon.protocol import STDERR, STDOUT, environment, receive_frame
+from ton_node_control.core.shards import SHARD_FULL, ShardDescriptor
+from ton_node_control.daemon.server import Daemon, _StreamProxy
+from ton_node_control.events import MasterchainBlock
+from ton_node_control.scheduler import Task
+
+
+@click.group()
+def commands() -> None:
+    pass
+
+
+@commands.command()
+@click.argument('path', type=WorkingPath(path_type=Path))
+def disk(path: Path) -> int:
+    click.echo(str(path))
+    return 1
+
+
+@commands.command()
+def status() -> None:
+    raise ValueError('no console')
+
+
+@pytest.fixture(autouse=True)
+def proxies(monkeypatch: pytest.MonkeyPatch) -> None:
+    # What "serve_forever" sets up.
+    monkeypatch.setattr(sys, 'stdout', _StreamProxy('stdout', sys.stdout))
+    monkeypatch.setattr(sys, 'stderr', _StreamProxy('stderr', sys.stderr))
+
+
+def _execute(daemon: Daemon, argv: t.List[str], cwd: str) -> t.Tuple[int, str, str]:
+    server, client = socket.socketpair()
+    with server, client:
+        code: int = daemon.execute({'argv': argv, 'cwd': cwd, 'environment': environment()}, server)
+        server.close()
+        output: t.Dict[bytes, bytes] = {STDOUT: b'', STDERR: b''}
+        while True:
+            frame: t.Optional[t.Tuple[bytes, bytes]] = receive_frame(client)
+            if frame is None:
+                break
+            output[frame[0]] += frame[1]
+    return code, output[STDOUT].decode(), output[STDERR].decode()
+
+
+def test_relative_paths_are_taken_from_the_client(tmp_path: Path) -> None:
+    tmp_path.joinpath('db').mkdir()
+    cwd: str = os.getcwd()
+    code, stdout, _ = _execute(Daemon(commands, path=str(tmp_path / 'socket')), ['disk', 'db'], str(tmp_path))
+    assert code == 1
+    assert stdout.strip() == str(tmp_path / 'db')
+    assert os.getcwd() == cwd
+
+
+def test_errors_end_as_in_process(tmp_path: Path) -> None:
+    code, _, stderr = _execute(Daemon(commands, path=str(tmp_path / 'socket')), ['status'], str(tmp_path))
+    assert code == 1
+    assert stderr.startswith('Traceback (most recent call last):')
+    assert stderr.strip().endswith('ValueError: no console')
+
+
+def test_refuses_what_it_does_not_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    daemon: Daemon = Daemon(commands, path=str(tmp_path / 'socket'))
+    monkeypatch.setenv('TON_NODE_CONTROL_HOME', str(tmp_path))
+    assert daemon.refusal({'argv': ['status'], 'environment': environment()}) is None
+    assert daemon.refusal({'argv': ['wallet'], 'environment': environment()}) is not None
+    assert daemon.refusal({'argv': ['status'], 'environment': {'TON_NODE_CONTROL_HOME': '/elsewhere'}}) is not None
+
+
+def test_exclusive_tasks_skip_their_turn_while_the_command_runs(tmp_path: Path) -> None:
+    runs: t.List[str] = []
+    daemon: Daemon = Daemon(
+        commands,
+        path=str(tmp_path / 'socket'),
+        tasks=[Task(name, functools.partial(runs.append, name), 60.0, blocking=True) for name in ('disk', 'status')],
+    )
+    with daemon._exclusive['disk']:
+        for task in daemon.scheduler.tasks.values():
+            task.run()
+    assert runs == ['status']
+    daemon.scheduler.tasks['disk'].run()
+    assert runs == ['status', 'disk']
+    assert 'status' not in daemon._exclusive
+
+
+def test_blocks_trigger_their_tasks(tmp_path: Path) -> None:
+    runs: t.List[str] = []
+    daemon: Daemon = Daemon(
+        commands,
+        path=str(tmp_path / 'socket'),
+        # Not due on their own for a good while.
+        tasks=[
+            Task(name, functools.partial(runs.append, name), 4.0, delay=1.9, blocking=True)
+            for name in ('status', 'other')
+        ],
+        on_block=('status',),
+    )
+
+    async def main() -> None:
+        running: t.List[asyncio.Future] = [
+            asyncio.ensure_future(daemon.scheduler.run()),
+            asyncio.ensure_future(daemon._trigger_on_blocks()),
+        ]
+        await asyncio.sleep(0.05)
+        await daemon.bus.publish(MasterchainBlock(ShardDescriptor(-1, SHARD_FULL, 7)))
+        await asyncio.sleep(0.1)
+        assert runs == ['status']
+        daemon.scheduler.stop()
+        for future in running:
+            future.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    asyncio.run(main())
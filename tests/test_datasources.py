@@ -0,0 +1,179 @@
+import asyncio
+import json
+import typing as t
+
+import httpx
+import pytest
+
+from ton_node_control.core.datasources import (
+    AdaptiveLimiter,
+    ClientPool,
+    JsonRpcDataSource,
+    RequestPriority,
+    TonCenterDataSource,
+)
+from ton_node_control.core.exceptions import DataSourceError
+
+BASE_URL: str = 'https://api.example.com/v2'
+
+Handler = t.Callable[[httpx.Request], httpx.Response]
+
+
+class Recorder:
+    def __init__(self, *responses: t.Union[httpx.Response, Handler]) -> None:
+        self.responses: t.List[t.Union[httpx.Response, Handler]] = list(responses)
+        self.requests: t.List[httpx.Request] = []
+        self.transport: httpx.MockTransport = httpx.MockTransport(self)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return response(request) if callable(response) else response
+
+
+def rpc_result(request: httpx.Request) -> httpx.Response:
+    payload: t.Any = json.loads(request.content)
+    if isinstance(payload, list):
+        return httpx.Response(200, json=[
+            {'jsonrpc': '2.0', 'id': call['id'], 'result': call['method']} for call in reversed(payload)
+        ])
+    return httpx.Response(200, json={'ok': True, 'id': payload['id'], 'result': payload['method']})
+
+
+def datasource(recorder: Recorder, cls: t.Type[JsonRpcDataSource] = JsonRpcDataSource, **kwargs: t.Any):
+    return cls(BASE_URL, transport=recorder.transport, pool=ClientPool(), **kwargs)
+
+
+def test_pool_shares_clients_per_origin_and_loop() -> None:
+    pool: ClientPool = ClientPool()
+    transport: httpx.MockTransport = httpx.MockTransport(rpc_result)
+
+    async def clients() -> t.List[httpx.AsyncClient]:
+        try:
+            return [
+                pool.get('https://a.example.com/v2', transport=transport),
+                pool.get('https://a.example.com/other', transport=transport),
+                pool.get('https://b.example.com/v2', transport=transport),
+            ]
+        finally:
+            await pool.aclose()
+
+    first: t.List[httpx.AsyncClient] = asyncio.run(clients())
+    assert first[0] is first[1]
+    assert first[0] is not first[2]
+    assert all(client.is_closed for client in first)
+    # A new loop gets clients of its own.
+    second: t.List[httpx.AsyncClient] = asyncio.run(clients())
+    assert second[0] is not first[0]
+
+
+def test_datasources_of_one_origin_share_a_connection_pool() -> None:
+    pool: ClientPool = ClientPool()
+    transport: httpx.MockTransport = httpx.MockTransport(rpc_result)
+    first: JsonRpcDataSource = JsonRpcDataSource(BASE_URL, transport=transport, pool=pool)
+    second: JsonRpcDataSource = JsonRpcDataSource(f'{BASE_URL}/', transport=transport, pool=pool)
+
+    async def run() -> None:
+        assert first.client is second.client
+        assert await first.call('first') == 'first'
+        assert await second.call('second') == 'second'
+        await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_throttled_request_is_retried() -> None:
+    recorder: Recorder = Recorder(
+        httpx.Response(429, headers={'Retry-After': '0.05'}),
+        rpc_result,
+    )
+    source: JsonRpcDataSource = datasource(recorder)
+    assert asyncio.run(source.call('getMasterchainInfo')) == 'getMasterchainInfo'
+    assert len(recorder.requests) == 2
+
+
+def test_throttled_retries_are_limited() -> None:
+    recorder: Recorder = Recorder(httpx.Response(429, headers={'Retry-After': '0'}))
+    source: JsonRpcDataSource = datasource(recorder)
+    with pytest.raises(DataSourceError) as error:
+        asyncio.run(source.call('getMasterchainInfo'))
+    assert error.value.status_code == 429
+    assert len(recorder.requests) == source.throttled_retries + 1
+
+
+def test_server_errors_are_not_retried() -> None:
+    recorder: Recorder = Recorder(httpx.Response(502, text='bad gateway'))
+    source: JsonRpcDataSource = datasource(recorder)
+    with pytest.raises(DataSourceError) as error:
+        asyncio.run(source.call('getMasterchainInfo'))
+    assert (error.value.status_code, error.value.log) == (502, 'bad gateway')
+    assert len(recorder.requests) == 1
+
+
+def test_transport_errors_are_datasource_errors() -> None:
+    def fail(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError('refused', request=request)
+
+    with pytest.raises(DataSourceError, match='refused'):
+        asyncio.run(datasource(Recorder(fail)).call('getMasterchainInfo'))
+
+
+def test_json_rpc_errors() -> None:
+    recorder: Recorder = Recorder(httpx.Response(200, json={'ok': False, 'error': 'no such block', 'code': 404}))
+    with pytest.raises(DataSourceError, match='no such block') as error:
+        asyncio.run(datasource(recorder).call('shards', {'seqno': 1}))
+    assert error.value.status_code == 404
+
+
+def test_batch_matches_answers_by_id() -> None:
+    recorder: Recorder = Recorder(rpc_result)
+    source: JsonRpcDataSource = datasource(recorder)
+    source.max_batch_size = 2
+    methods: t.List[str] = [f'method{index}' for index in range(5)]
+    assert asyncio.run(source.batch([(method, None) for method in methods])) == methods
+    assert len(recorder.requests) == 3
+
+
+def test_batch_without_batching_support() -> None:
+    recorder: Recorder = Recorder(rpc_result)
+    source: TonCenterDataSource = datasource(recorder, TonCenterDataSource, api_key='secret')
+    methods: t.List[str] = ['first', 'second', 'third']
+    assert asyncio.run(source.batch([(method, None) for method in methods])) == methods
+    assert len(recorder.requests) == 3
+    assert all(request.headers['X-API-Key'] == 'secret' for request in recorder.requests)
+
+
+def test_limiter_admits_by_priority() -> None:
+    async def run() -> t.List[RequestPriority]:
+        limiter: AdaptiveLimiter = AdaptiveLimiter(rate=1000, burst=1000, concurrency=1)
+        admitted: t.List[RequestPriority] = []
+
+        async def request(priority: RequestPriority) -> None:
+            async with limiter.slot(priority):
+                admitted.append(priority)
+                await asyncio.sleep(0.01)
+
+        blocker: asyncio.Task = asyncio.ensure_future(request(RequestPriority.interactive))
+        await asyncio.sleep(0)
+        await asyncio.gather(
+            request(RequestPriority.background),
+            request(RequestPriority.interactive),
+            request(RequestPriority.alerting),
+            blocker,
+        )
+        return admitted
+
+    assert asyncio.run(run()) == [
+        RequestPriority.interactive,
+        RequestPriority.alerting,
+        RequestPriority.interactive,
+        RequestPriority.background,
+    ]
+
+
+def test_limiter_follows_rate_limit_headers() -> None:
+    limiter: AdaptiveLimiter = AdaptiveLimiter(rate=10, burst=10)
+    limiter.record(0.01, status_code=200, headers=httpx.Headers({'RateLimit-Policy': '30;w=60'}))
+    assert limiter.stats.rate == 0.5
+    limiter.record(0.01, status_code=429, headers=httpx.Headers({'Retry-After': '5'}))
+    assert limiter.bucket.delay() > 4
@@ -0,0 +1,55 @@
+import os
+import time
+
+from pathlib import Path
+
+from ton_node_control.disk import DiskAnalyzer, DiskUsage
+
+
+def _age(path: Path, seconds: float) -> None:
+    moment: float = time.time() - seconds
+    os.utime(path, (moment, moment))
+
+
+def test_totals_by_component(tmp_path: Path) -> None:
+    database: Path = tmp_path.joinpath('db')
+    database.joinpath('archive', 'packages').mkdir(parents=True)
+    database.joinpath('celldb').mkdir()
+    database.joinpath('archive', 'packages', 'archive.00000.pack').write_bytes(b'x' * 1000)
+    database.joinpath('celldb', '000001.sst').write_bytes(b'x' * 500)
+    database.joinpath('config.json').write_bytes(b'{}')
+    usage: DiskUsage = DiskAnalyzer(database, cache_directory=tmp_path.joinpath('cache')).scan()
+    components = usage.components()
+    assert {name: total.size for name, total in components.items()} == {'archive': 1000, 'celldb': 500, '.': 2}
+    assert usage.total.files == 3
+
+
+def test_unchanged_directories_are_reused(tmp_path: Path) -> None:
+    database: Path = tmp_path.joinpath('db')
+    old: Path = database.joinpath('old')
+    old.mkdir(parents=True)
+    old.joinpath('file').write_bytes(b'x' * 10)
+    _age(old.joinpath('file'), 2 * 86400)
+    _age(old, 2 * 86400)
+    _age(database, 2 * 86400)
+    analyzer: DiskAnalyzer = DiskAnalyzer(database, cache_directory=tmp_path.joinpath('cache'))
+    assert analyzer.scan().reused == 0
+    usage: DiskUsage = analyzer.scan()
+    assert (usage.scanned, usage.reused) == (0, 2)
+    assert analyzer.scan(full=True).reused == 0
+
+
+def test_files_growing_in_place_are_seen(tmp_path: Path) -> None:
+    database: Path = tmp_path.joinpath('db')
+    packages: Path = database.joinpath('archive')
+    packages.mkdir(parents=True)
+    package: Path = packages.joinpath('archive.00100.pack')
+    package.write_bytes(b'x' * 1000)
+    # The directory itself has not changed for a while.
+    _age(packages, 60)
+    analyzer: DiskAnalyzer = DiskAnalyzer(database, cache_directory=tmp_path.joinpath('cache'))
+    assert analyzer.scan().components()['archive'].size == 1000
+    with open(package, 'ab') as file:
+        file.write(b'x' * 1000)
+    _age(packages, 60)
+    assert analyzer.scan().components()['archive'].size == 2000
@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+import typing as t
+
+from ton_node_control.exporter.exposition import render_exposition
+from ton_node_control.exporter.server import COLLECT_TASK, MetricsExporter
+from ton_node_control.scheduler import TaskMetrics
+from ton_node_control.status.engine import MetricFamily, Probe, ProbeResult, ProbeState, StatusReport
+
+FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('seqno', 'ton_node_seqno', 'Last "seqno"\nof the node \\ masterchain.'),
+    MetricFamily('lag', 'ton_node_lag_seconds', 'Sync lag.'),
+)
+
+
+async def answering(values: dict) -> None:
+    values['seqno'] = 42
+    values['lag'] = 1.5
+
+
+def _exporter() -> MetricsExporter:
+    return MetricsExporter([Probe('node', answering, families=FAMILIES)], interval=15.0, budget=1.0)
+
+
+def _lines(body: bytes, prefix: str) -> t.List[str]:
+    return [line for line in body.decode().splitlines() if line.startswith(prefix)]
+
+
+def test_exposition_escaping() -> None:
+    report: StatusReport = StatusReport(
+        (ProbeResult('node "main"\n', ProbeState.ok, {'seqno': 7, 'lag': 0.25}, 0.5),),
+        0.5,
+    )
+    body: bytes = render_exposition([Probe('node "main"\n', answering, families=FAMILIES)], report)
+    assert _lines(body, '# HELP ton_node_seqno') == [
+        '# HELP ton_node_seqno Last "seqno"\\nof the node \\\\ masterchain.',
+    ]
+    assert _lines(body, 'ton_node_seqno') == ['ton_node_seqno 7']
+    assert _lines(body, 'ton_node_lag_seconds') == ['ton_node_lag_seconds 0.25']
+    assert _lines(body, 'ton_node_control_probe_success') == [
+        'ton_node_control_probe_success{probe="node \\"main\\"\\n"} 1',
+    ]
+
+
+def test_timed_out_probes_leave_their_families_empty() -> None:
+    report: StatusReport = StatusReport(
+        (ProbeResult('node', ProbeState.partial, {'seqno': 7}, 1.0, 'No answer within 1.00s'),),
+        1.0,
+    )
+    body: bytes = render_exposition([Probe('node', answering, families=FAMILIES)], report)
+    assert _lines(body, 'ton_node_seqno') == ['ton_node_seqno 7']
+    # Declared, without a sample.
+    assert _lines(body, '# TYPE ton_node_lag_seconds') == ['# TYPE ton_node_lag_seconds gauge']
+    assert _lines(body, 'ton_node_lag_seconds') == []
+    assert _lines(body, 'ton_node_control_probe_success') == ['ton_node_control_probe_success{probe="node"} 0']
+
+
+def test_answers_before_the_first_collection() -> None:
+    exporter: MetricsExporter = _exporter()
+    head, _ = exporter.answer('GET', '/metrics', {})
+    assert head.startswith(b'HTTP/1.1 503 ')
+    assert b'Retry-After: 1' in head
+    assert exporter.scrapes == 0
+
+
+def test_routing_and_methods() -> None:
+    exporter: MetricsExporter = _exporter()
+    asyncio.run(exporter.refresh())
+    assert exporter.answer('GET', '/other', {})[0].startswith(b'HTTP/1.1 404 ')
+    head, _ = exporter.answer('POST', '/metrics', {})
+    assert head.startswith(b'HTTP/1.1 405 ')
+    assert b'Allow: GET, HEAD' in head
+    assert exporter.answer('GET', '/metrics?name[]=x', {})[0].startswith(b'HTTP/1.1 200 ')
+
+
+def test_etag_and_gzip() -> None:
+    exporter: MetricsExporter = _exporter()
+    asyncio.run(exporter.refresh())
+    etag: str = exporter.exposition.etag
+    head, body = exporter.answer('GET', '/metrics', {})
+    assert f'ETag: {etag}'.encode() in head
+    assert b'Content-Encoding' not in head
+    assert _lines(body, 'ton_node_seqno') == ['ton_node_seqno 42']
+
+    head, gzipped = exporter.answer('GET', '/metrics', {'accept-encoding': 'deflate, gzip;q=1.0'})
+    assert b'Content-Encoding: gzip' in head
+    assert f'Content-Length: {len(gzipped)}'.encode() in head
+    assert gzip.decompress(gzipped) == body
+
+    head, body = exporter.answer('GET', '/metrics', {'if-none-match': f'"other", {etag}'})
+    assert head.startswith(b'HTTP/1.1 304 ') and body == b''
+    assert exporter.answer('GET', '/metrics', {'if-none-match': '"other"'})[0].startswith(b'HTTP/1.1 200 ')
+    assert exporter.scrapes == 4
+
+
+def test_gzip_negotiation() -> None:
+    exporter: MetricsExporter = _exporter()
+    asyncio.run(exporter.refresh())
+    for accepted, expected in (
+        ('gzip', True),
+        ('GZIP', True),
+        ('br, gzip', True),
+        ('gzip;q=0.5, identity', True),
+        ('gzip;q=0', False),
+        ('gzip; q=0.00, identity', False),
+        ('x-gzip-like', False),
+        ('identity', False),
+    ):
+        head, _ = exporter.answer('GET', '/metrics', {'accept-encoding': accepted})
+        assert (b'Content-Encoding: gzip' in head) is expected, accepted
+
+
+def test_keep_alive() -> None:
+    exporter: MetricsExporter = _exporter()
+
+    async def _scrape() -> t.List[bytes]:
+        await exporter.refresh()
+        server: asyncio.AbstractServer = await asyncio.start_server(exporter._handle, '127.0.0.1', 0)
+        port: int = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        heads: t.List[bytes] = []
+        # Three requests over one connection, the last one closing it.
+        for connection in ('keep-alive', '', 'close'):
+            writer.write(f'HEAD /metrics HTTP/1.1\r\nHost: x\r\nConnection: {connection}\r\n\r\n'.encode())
+            heads.append(await reader.readuntil(b'\r\n\r\n'))
+        rest: bytes = await asyncio.wait_for(reader.read(), 1.0)
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return [*heads, rest]
+
+    *heads, rest = asyncio.run(_scrape())
+    assert all(head.startswith(b'HTTP/1.1 200 ') for head in heads)
+    # Nothing after the answers: HEAD sends no body, and the server closed.
+    assert rest == b''
+    assert exporter.scrapes == 3
+
+
+def test_collection_runs_as_a_scheduler_task() -> None:
+    exporter: MetricsExporter = MetricsExporter([Probe('node', answering, families=FAMILIES)], interval=0.05)
+
+    async def _serve() -> None:
+        serving: asyncio.Future = asyncio.ensure_future(exporter.serve('127.0.0.1', 0))
+        while exporter.scheduler.metrics().get(COLLECT_TASK, TaskMetrics()).runs < 2:
+            await asyncio.sleep(0.01)
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+    asyncio.run(_serve())
+    _, body = exporter.answer('GET', '/metrics', {})
+    assert _lines(body, 'ton_node_seqno') == ['ton_node_seqno 42']
+    # Rendered by the second run, which sees the first one.
+    assert _lines(body, 'ton_node_control_task_runs_total') == [
+        f'ton_node_control_task_runs_total{{task="{COLLECT_TASK}"}} 1',
+    ]
+    assert COLLECT_TASK not in exporter.scheduler.tasks
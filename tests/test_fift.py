@@ -0,0 +1,160 @@
+import stat
+import sys
+import textwrap
+import threading
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.core.exceptions import ConsoleError, FiftError
+from ton_node_control.core.fift import FiftCache, FiftPool, FiftToolchain, FiftWorker
+
+# Understands the few words the pool sends, and runs "scripts" made of
+# lines such as "print $1", "write name text", "pid" or "undefined", the
+# last one failing the way fift does on an unknown word.
+FAKE_FIFT: str = textwrap.dedent('''
+    import os
+    import re
+    import sys
+
+    def run(path, arguments):
+        for number, line in enumerate(open(path).read().splitlines(), 1):
+            for position, value in enumerate(arguments):
+                line = line.replace('$' + str(position), value)
+            word, _, rest = line.partition(' ')
+            if word == 'print':
+                print(rest)
+            elif word == 'write':
+                name, _, text = rest.partition(' ')
+                with open(name, 'w') as file:
+                    file.write(text)
+            elif word == 'pid':
+                print(os.getpid())
+            elif word == 'undefined':
+                print(f'{path}:{number}:\\tundefined:-?')
+                return False
+        return True
+
+    if sys.argv[1] == '-V':
+        print('Fift build information: [ Commit: fake ]')
+    elif '-s' in sys.argv:
+        position = sys.argv.index('-s')
+        if not run(sys.argv[position + 1], sys.argv[position + 1:]):
+            print('Error interpreting file')
+            sys.exit(2)
+    else:
+        constants = {}
+        for line in sys.stdin:
+            line = line.strip()
+            constant = re.match(r'^"(.*)" constant (\\$\\d+)$', line)
+            include = re.match(r'^"(.*)" include$', line)
+            marker = re.match(r'^cr \\."(.*)" cr$', line)
+            if constant:
+                constants[constant.group(2)] = constant.group(1)
+            elif line.startswith('forget '):
+                constants.pop(line.split()[1], None)
+            elif include and not include.group(1).endswith('Asm.fif'):
+                count = len(constants)
+                run(include.group(1), [constants[f'${position}'] for position in range(count)])
+            elif marker:
+                print()
+                print(marker.group(1))
+            print(' ok')
+            sys.stdout.flush()
+''')
+
+
+@pytest.fixture
+def toolchain(tmp_path: Path) -> FiftToolchain:
+    path: Path = tmp_path.joinpath('fift')
+    path.write_text(f'#!{sys.executable}\n{FAKE_FIFT}')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return FiftToolchain(fift_path=path, includes=(tmp_path,), version='fake')
+
+
+@pytest.fixture
+def pool(toolchain: FiftToolchain, tmp_path: Path) -> FiftPool:
+    pool: FiftPool = FiftPool(toolchain, size=1, cache=FiftCache(tmp_path.joinpath('cache')), timeout=2.0)
+    yield pool
+    pool.close()
+
+
+def test_runs_scripts_in_a_warm_interpreter(pool: FiftPool) -> None:
+    first = pool.run('pid\nprint $1 and $2\nwrite out.boc payload', ['one', 'two'], outputs=['out.boc'])
+    second = pool.run('pid\nprint $1', ['three'])
+    assert first.output.splitlines()[1:] == ['one and two']
+    assert first.files == {'out.boc': b'payload'}
+    # One process answered both.
+    assert first.output.splitlines()[0] == second.output.splitlines()[0]
+    assert second.output.splitlines()[1:] == ['three']
+
+
+def test_printed_errors_are_not_failures(pool: FiftPool) -> None:
+    assert pool.run('print error: none, abort skipped').output.strip() == 'error: none, abort skipped'
+
+
+def test_failed_script_restarts_the_worker(pool: FiftPool) -> None:
+    before: str = pool.run('pid').output.strip()
+    with pytest.raises(FiftError) as caught:
+        pool.run('print started\nundefined')
+    assert 'undefined:-?' in caught.value.log
+    assert pool.run('pid').output.strip() != before
+
+
+def test_arguments_fift_cannot_quote_run_cold(pool: FiftPool) -> None:
+    assert pool.run('print $1', ['say "hi"']).output.strip() == 'say "hi"'
+    with pytest.raises(FiftError) as caught:
+        pool.run('undefined', ['"'])
+    assert caught.value.return_code == 2
+
+
+def test_deterministic_runs_are_cached(pool: FiftPool, tmp_path: Path) -> None:
+    source: Path = tmp_path.joinpath('input.txt')
+    source.write_text('one')
+    first = pool.run('pid', deterministic=True, inputs=[source])
+    second = pool.run('pid', deterministic=True, inputs=[source])
+    assert (first.cached, second.cached) == (False, True)
+    assert second.output == first.output
+    source.write_text('two')
+    assert pool.run('pid', deterministic=True, inputs=[source]).cached is False
+
+
+def test_cache_key_covers_every_part() -> None:
+    key: str = FiftCache.key('v1', b'script', ['a'], {'x': b'1'}, ['out'])
+    assert key == FiftCache.key('v1', b'script', ['a'], {'x': b'1'}, ['out'])
+    assert key != FiftCache.key('v2', b'script', ['a'], {'x': b'1'}, ['out'])
+    assert key != FiftCache.key('v1', b'script', ['a', ''], {'x': b'1'}, ['out'])
+    assert key != FiftCache.key('v1', b'script', ['a'], {'x': b'2'}, ['out'])
+    assert key != FiftCache.key('v1', b'script', ['a'], {'x': b'1'}, [])
+
+
+def test_busy_pool_times_out_as_a_console_error(toolchain: FiftToolchain, tmp_path: Path) -> None:
+    pool: FiftPool = FiftPool(toolchain, size=1, cache=FiftCache(tmp_path), timeout=0.2)
+    try:
+        held: FiftWorker = pool._acquire()
+        with pytest.raises(ConsoleError):
+            pool.run('pid')
+        pool._idle.put(held)
+        assert pool.run('print free').output.strip() == 'free'
+    finally:
+        pool.close()
+
+
+def test_concurrent_runs_share_the_workers(toolchain: FiftToolchain, tmp_path: Path) -> None:
+    pool: FiftPool = FiftPool(toolchain, size=2, cache=FiftCache(tmp_path), timeout=5.0)
+    outputs: list = []
+
+    def run(number: int) -> None:
+        outputs.append(pool.run('print $1', [str(number)]).output.strip())
+
+    try:
+        threads: list = [threading.Thread(target=run, args=(number,)) for number in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(outputs) == [str(number) for number in range(6)]
+        assert len(pool._workers) <= 2
+    finally:
+        pool.close()
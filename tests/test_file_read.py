@@ -0,0 +1,104 @@
+import os
+import random
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.cli.utils import file_read
+from ton_node_control.cli.utils.file_read import iter_chunks, iter_records, map_file, read_config
+
+
+def test_map_file(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('dump.boc')
+    path.write_bytes(b'\xb5\xee\x9cr' + bytes(range(256)))
+    with map_file(path) as view:
+        assert view.readonly
+        assert bytes(view[:4]) == b'\xb5\xee\x9cr'
+        assert view[4 + 255] == 255
+    # Released with the mapping.
+    with pytest.raises(ValueError):
+        len(view)
+
+    path.write_bytes(b'')
+    with map_file(path) as view:
+        assert bytes(view) == b''
+
+
+def test_iter_chunks_reuses_the_buffer(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('data')
+    data: bytes = bytes(range(256)) * 5
+    path.write_bytes(data)
+    buffer: bytearray = bytearray(100)
+    chunks: t.List[bytes] = []
+    for chunk in iter_chunks(path, buffer=buffer):
+        assert chunk.obj is buffer
+        chunks.append(bytes(chunk))
+    assert [len(chunk) for chunk in chunks] == [100] * 12 + [80]
+    assert b''.join(chunks) == data
+    path.write_bytes(b'')
+    assert list(iter_chunks(path, chunk_size=10)) == []
+
+
+def test_iter_records(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('log')
+    path.write_bytes(b'one\ntwo\n\nthree')
+    for chunk_size in (1, 2, 3, 5, 64):
+        assert list(iter_records(path, chunk_size=chunk_size)) == [b'one', b'two', b'', b'three']
+    path.write_bytes(b'one\n')
+    assert list(iter_records(path, chunk_size=2)) == [b'one']
+    path.write_bytes(b'')
+    assert list(iter_records(path)) == []
+
+
+def test_separator_straddling_chunks(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('records')
+    # "\r\n" split between the second and the third chunk of four bytes.
+    path.write_bytes(b'abcdefg\r\nhij\r\n')
+    assert list(iter_records(path, separator=b'\r\n', chunk_size=4)) == [b'abcdefg', b'hij']
+    # A lone half of the separator is part of the record.
+    path.write_bytes(b'abc\rdef\r\r\n\n')
+    assert list(iter_records(path, separator=b'\r\n', chunk_size=4)) == [b'abc\rdef\r', b'\n']
+
+
+def test_records_match_split_whatever_the_chunk_size(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('records')
+    generator: random.Random = random.Random(43)
+    data: bytes = bytes(generator.choice(b'ab|') for _ in range(2000))
+    path.write_bytes(data)
+    for separator in (b'|', b'a|', b'|b|'):
+        expected: t.List[bytes] = data.split(separator)
+        if expected[-1] == b'':
+            expected.pop()
+        for chunk_size in (1, 2, 3, 7, 64, 4096):
+            assert list(iter_records(path, separator=separator, chunk_size=chunk_size)) == expected, (
+                separator, chunk_size,
+            )
+
+
+def test_read_config_is_cached_until_the_file_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    toml_path: Path = tmp_path.joinpath('config.toml')
+    toml_path.write_text('[node]\nlog = "/var/log/ton"\n')
+    json_path: Path = tmp_path.joinpath('global.config.json')
+    json_path.write_text('{"validator": {"init_block": {"seqno": 1}}}')
+    assert read_config(toml_path) == {'node': {'log': '/var/log/ton'}}
+    assert read_config(json_path)['validator']['init_block']['seqno'] == 1
+    assert read_config(toml_path) is read_config(toml_path)
+
+    first: t.Any = read_config(json_path)
+    json_path.write_text('{"validator": {"init_block": {"seqno": 22}}}')
+    assert read_config(json_path)['validator']['init_block']['seqno'] == 22
+    assert read_config(json_path) is not first
+
+    # Bounded: the oldest entry goes first.
+    monkeypatch.setattr(file_read, 'CONFIG_CACHE_SIZE', 2)
+    monkeypatch.setattr(file_read, '_config_cache', {})
+    paths: t.List[Path] = [tmp_path.joinpath(f'{index}.json') for index in range(3)]
+    for index, path in enumerate(paths):
+        path.write_text(str(index))
+        assert read_config(path) == index
+    assert list(file_read._config_cache) == paths[1:]
+    os.unlink(paths[2])
+    with pytest.raises(FileNotFoundError):
+        read_config(paths[2])
@@ -0,0 +1,152 @@
+import asyncio
+import typing as t
+
+import pytest
+
+from ton_node_control.core.client.hedging import HedgeBudget, HedgedReader, HedgingError, LatencyHistogram
+
+
+class FakeSource:
+    """
+    Answers after "delay" seconds, or fails, and remembers whether the
+    query was cancelled on its way.
+    """
+
+    def __init__(self, answer: t.Any, delay: float = 0.0, *, error: t.Optional[Exception] = None) -> None:
+        self.answer: t.Any = answer
+        self.delay: float = delay
+        self.error: t.Optional[Exception] = error
+        self.calls: int = 0
+        self.cancelled: bool = False
+
+    async def query(self) -> t.Any:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+async def _query(source: FakeSource) -> t.Any:
+    return await source.query()
+
+
+def _reader(sources: t.Dict[str, FakeSource], **kwargs: t.Any) -> HedgedReader:
+    reader: HedgedReader = HedgedReader(sources, default_delay=0.05, **kwargs)
+    # Keep the order of the mapping: the first source is the primary.
+    reader.ranking = lambda: list(sources)  # type: ignore
+    return reader
+
+
+def test_histogram_quantiles() -> None:
+    histogram: LatencyHistogram = LatencyHistogram()
+    assert histogram.quantile(0.95) is None
+    for _ in range(95):
+        histogram.record(0.010)
+    for _ in range(5):
+        histogram.record(1.0)
+    # Bucket upper bounds are within about 10% of the latency.
+    assert 0.010 <= histogram.quantile(0.95) <= 0.011
+    assert 1.0 <= histogram.quantile(0.99) <= 1.1
+    assert histogram.quantile(0.0) == histogram.minimum
+
+
+def test_histogram_decays() -> None:
+    histogram: LatencyHistogram = LatencyHistogram(half_life=100)
+    for _ in range(99):
+        histogram.record(1.0)
+    for _ in range(1000):
+        histogram.record(0.010)
+    assert histogram.quantile(0.95) <= 0.011
+
+
+def test_hedge_delay_follows_the_p95() -> None:
+    reader: HedgedReader = HedgedReader({'a': FakeSource(1)}, default_delay=0.5, minimum_delay=0.005)
+    histogram: LatencyHistogram = reader.stats['a'].histogram
+    for _ in range(19):
+        histogram.record(0.1)
+    # Too little history yet.
+    assert reader.hedge_delay('a') == 0.5
+    histogram.record(0.1)
+    assert 0.1 <= reader.hedge_delay('a') <= 0.11
+    for _ in range(1000):
+        histogram.record(0.0001)
+    assert reader.hedge_delay('a') == 0.005
+
+
+def test_budget_caps_hedges() -> None:
+    budget: HedgeBudget = HedgeBudget(0.1, window=100.0)
+    # A single hedge is allowed before any history.
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    for _ in range(20):
+        budget.record_primary()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    for _ in range(200):
+        budget.record_primary()
+    # Up to a tenth of the window, less what is left of the two
+    # earlier hedges once decayed.
+    assert [budget.try_spend() for _ in range(20)].count(True) == 9
+
+
+def test_slow_primary_is_hedged_and_cancelled() -> None:
+    slow: FakeSource = FakeSource('slow', delay=5.0)
+    fast: FakeSource = FakeSource('fast', delay=0.0)
+    reader: HedgedReader = _reader({'slow': slow, 'fast': fast})
+
+    async def _read() -> t.Any:
+        result: t.Any = await reader.read(_query)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(_read()) == 'fast'
+    assert (reader.hedges, reader.stats['fast'].wins) == (1, 1)
+    assert slow.cancelled
+    assert reader.stats['slow'].failures == 0
+
+
+def test_fast_primary_is_not_hedged() -> None:
+    primary: FakeSource = FakeSource('primary')
+    secondary: FakeSource = FakeSource('secondary')
+    reader: HedgedReader = _reader({'primary': primary, 'secondary': secondary})
+    assert asyncio.run(reader.read(_query)) == 'primary'
+    assert (secondary.calls, reader.hedges) == (0, 0)
+
+
+def test_first_consistent_answer_wins() -> None:
+    stale: FakeSource = FakeSource(1)
+    behind: FakeSource = FakeSource(2, delay=0.01)
+    current: FakeSource = FakeSource(3, delay=0.02)
+    reader: HedgedReader = _reader({'stale': stale, 'behind': behind, 'current': current})
+    # Rejected answers move on at once, without spending the budget.
+    assert asyncio.run(reader.read(_query, accept=lambda value: value >= 3)) == 3
+    assert reader.hedges == 0
+    assert [source.calls for source in (stale, behind, current)] == [1, 1, 1]
+
+
+def test_failures_move_on_and_are_reported() -> None:
+    broken: FakeSource = FakeSource(None, error=ConnectionError('refused'))
+    working: FakeSource = FakeSource('answer')
+    reader: HedgedReader = _reader({'broken': broken, 'working': working})
+    assert asyncio.run(reader.read(_query)) == 'answer'
+    assert reader.stats['broken'].failures == 1
+
+    reader = _reader({'broken': broken})
+    with pytest.raises(HedgingError) as caught:
+        asyncio.run(reader.read(_query))
+    assert isinstance(caught.value.errors[0], ConnectionError)
+
+
+def test_exhausted_budget_waits_for_the_primary() -> None:
+    slow: FakeSource = FakeSource('slow', delay=0.1)
+    spare: FakeSource = FakeSource('spare')
+    budget: HedgeBudget = HedgeBudget()
+    assert budget.try_spend()
+    reader: HedgedReader = _reader({'slow': slow, 'spare': spare}, budget=budget)
+    assert asyncio.run(reader.read(_query)) == 'slow'
+    assert (spare.calls, reader.hedges) == (0, 0)
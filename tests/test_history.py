@@ -0,0 +1,78 @@
+import math
+import multiprocessing
+import os
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.metrics import HistoryStore, MetricsError
+from ton_node_control.metrics.history import BLOCK_RECORDS, Segment
+
+START: float = 1_700_006_400.0
+
+
+def _append(directory: str, offset: int, count: int) -> int:
+    store: HistoryStore = HistoryStore(Path(directory))
+    try:
+        return sum(store.record('series', float(index), START + index * 3 + offset) for index in range(count))
+    finally:
+        store.close()
+
+
+def test_append_and_query(tmp_path: Path) -> None:
+    store: HistoryStore = HistoryStore(tmp_path)
+    for index in range(BLOCK_RECORDS * 2 + 10):
+        assert store.record('series', float(index), START + index)
+    assert not store.record('series', 0.0, START)
+    samples = store.query('series', START + 100, START + 300)
+    assert list(samples.values) == [float(index) for index in range(100, 300)]
+    assert store.names() == ['series']
+    store.close()
+
+
+def test_writers_of_one_series_do_not_overwrite_each_other(tmp_path: Path) -> None:
+    context = multiprocessing.get_context('fork')
+    with context.Pool(3) as pool:
+        written: list = pool.starmap(_append, [(str(tmp_path), offset, 1000) for offset in range(3)])
+    samples = HistoryStore(tmp_path).query('series', 0)
+    assert len(samples) == sum(written)
+    assert list(samples.timestamps) == sorted(samples.timestamps)
+
+
+def test_writers_in_one_process_share_the_file(tmp_path: Path) -> None:
+    first: HistoryStore = HistoryStore(tmp_path)
+    second: HistoryStore = HistoryStore(tmp_path)
+    for index in range(BLOCK_RECORDS + 5):
+        assert (first if index % 2 else second).record('series', float(index), START + index)
+    assert not first.record('series', 0.0, START)
+    assert len(HistoryStore(tmp_path).query('series', 0)) == BLOCK_RECORDS + 5
+
+
+def test_torn_tail_is_dropped(tmp_path: Path) -> None:
+    store: HistoryStore = HistoryStore(tmp_path)
+    for index in range(10):
+        store.record('series', float(index), START + index)
+    store.close()
+    path: Path = next(tmp_path.joinpath('series').glob('*.seg'))
+    # A value written without its timestamp, then a partly grown file.
+    with open(path, 'r+b') as file:
+        file.seek(0, os.SEEK_END)
+        file.write(b'\xff' * 100)
+    with Segment(path, writable=True) as segment:
+        assert segment.records == 10
+        assert segment.last_timestamp == START + 9
+        assert segment.append(START + 10, 10.0)
+    assert len(HistoryStore(tmp_path).query('series', 0, math.inf)) == 11
+
+
+@pytest.mark.parametrize('name', ['.', '..', '...', 'a/b', '', 'with space'])
+def test_invalid_series_names(tmp_path: Path, name: str) -> None:
+    with pytest.raises(MetricsError):
+        HistoryStore(tmp_path).series(name)
+
+
+def test_dotted_series_names(tmp_path: Path) -> None:
+    store: HistoryStore = HistoryStore(tmp_path)
+    assert store.record('node.sync.lag', 1.0, START)
+    assert store.names() == ['node.sync.lag']
@@ -0,0 +1,146 @@
+import calendar
+import os
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.logs import LogIndex, parse_timestamp
+from ton_node_control.logs.index import INDEX_ENTRY, INDEX_HEADER, SegmentIndex
+
+START: float = float(calendar.timegm((2024, 5, 1, 10, 0, 0)))
+
+
+def _line(second: float, message: str = 'tick') -> bytes:
+    whole, fraction = divmod(second, 1)
+    stamp: str = f'2024-05-01 {10 + int(whole) // 3600:02d}:{int(whole) // 60 % 60:02d}:{int(whole) % 60:02d}'
+    return f'[ 3][t 1][{stamp}.{int(fraction * 1000):03d}][x.cpp:1]\t{message} {second:g}\n'.encode()
+
+
+def _write(path: Path, seconds: t.Iterable[float], *, mode: str = 'wb') -> None:
+    with open(path, mode) as file:
+        for second in seconds:
+            file.write(_line(second))
+
+
+def _seconds(lines: t.Iterable[bytes]) -> t.List[float]:
+    return [t.cast(float, parse_timestamp(line)) - START for line in lines]
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> LogIndex:
+    return LogIndex(tmp_path.joinpath('logs', 'log'), directory=tmp_path.joinpath('index'), stride=512)
+
+
+def test_parse_timestamp() -> None:
+    assert parse_timestamp(_line(61.25)) == START + 61.25
+    assert parse_timestamp(b'\tcontinued message') is None
+
+
+def test_query_window_edges(index: LogIndex) -> None:
+    index.path.parent.mkdir()
+    _write(index.path, range(600))
+    # Half open, whatever the checkpoints in between.
+    assert _seconds(index.query(START + 100, START + 200)) == list(range(100, 200))
+    assert _seconds(index.query(START + 99.5, START + 100.5)) == [100]
+    assert _seconds(index.query(START - 100, START + 2)) == [0, 1]
+    assert _seconds(index.query(START + 598, START + 10_000)) == [598, 599]
+    assert list(index.query(START + 700, START + 800)) == []
+    segment: SegmentIndex = index.update()[0][0]
+    assert len(segment.offsets) > 10
+    # Indexing again finds nothing new.
+    assert index.update()[0][1] == 0
+
+
+def test_out_of_order_lines_within_the_slack(index: LogIndex) -> None:
+    index.path.parent.mkdir()
+    # A line of a slower thread lands after later ones, and a continuation
+    # line goes with the line before it.
+    _write(index.path, [*range(0, 300), 301, 302, 300.5, *range(303, 400)])
+    with open(index.path, 'ab') as file:
+        file.write(b'\tcontinued\n')
+    lines: t.List[bytes] = list(index.query(START + 300.5, START + 303))
+    assert _seconds(lines) == [301, 302, 300.5]
+    assert lines[-1].endswith(b'300.5')
+    assert list(index.query(START + 399, START + 400))[-1] == b'\tcontinued'
+
+
+def test_start_offset_keeps_the_slack(index: LogIndex) -> None:
+    index.path.parent.mkdir()
+    _write(index.path, range(600))
+    segment: SegmentIndex = index.update()[0][0]
+    for position, timestamp in enumerate(segment.timestamps):
+        # Starts from the last checkpoint more than the slack before.
+        before: int = segment.offsets[position - 1] if position else 0
+        assert segment.start_offset(timestamp, slack=2.0) == before
+        assert segment.start_offset(timestamp + 2.0, slack=2.0) == before
+        assert segment.start_offset(timestamp + 2.5, slack=2.0) == segment.offsets[position]
+    assert segment.start_offset(START - 1) == 0
+
+
+def test_rotation_reuses_the_segment_index(index: LogIndex, tmp_path: Path) -> None:
+    index.path.parent.mkdir()
+    _write(index.path, range(300))
+    first: SegmentIndex = index.update()[0][0]
+    os.rename(index.path, index.path.with_name('log.1'))
+    _write(index.path, range(300, 600))
+    updated: t.List[t.Tuple[SegmentIndex, int]] = index.update()
+    # The rotated segment kept its index and was not read again.
+    assert [(segment.path.name, added) for segment, added in updated][0] == ('log.1', 0)
+    assert updated[0][0] is first
+    assert updated[1][1] > 0
+    assert _seconds(index.query(START + 290, START + 310)) == list(range(290, 310))
+    assert len(list(index.directory.glob('*.idx'))) == 2
+
+    # Gone for good: its index goes too.
+    index.path.with_name('log.1').unlink()
+    assert len(index.update()) == 1
+    assert len(list(index.directory.glob('*.idx'))) == 1
+
+
+def test_torn_index_file_is_extended(index: LogIndex) -> None:
+    index.path.parent.mkdir()
+    _write(index.path, range(600))
+    complete: SegmentIndex = index.update()[0][0]
+    index_path: Path = complete.index_path
+    # Cut in the middle of the fifth entry.
+    data: bytes = index_path.read_bytes()
+    index_path.write_bytes(data[:INDEX_HEADER.size + 4 * INDEX_ENTRY.size + 7])
+    torn: SegmentIndex = SegmentIndex(index.path, index_path, stride=512)
+    assert list(torn.offsets) == list(complete.offsets[:4])
+    assert torn.indexed_until == complete.offsets[3] + 1
+    with open(index.path, 'rb') as file:
+        assert torn.update(file.fileno()) > 0
+    assert list(torn.offsets[:4]) == list(complete.offsets[:4])
+    assert list(torn.offsets) == sorted(set(torn.offsets))
+    assert SegmentIndex(index.path, index_path, stride=512).indexed_until == torn.indexed_until
+    reopened: LogIndex = LogIndex(index.path, directory=index.directory.parent, stride=512)
+    assert _seconds(reopened.query(START + 100, START + 500)) == list(range(100, 500))
+
+    # Garbage, or another stride, is no index at all.
+    index_path.write_bytes(b'garbage')
+    assert len(SegmentIndex(index.path, index_path, stride=512).offsets) == 0
+    assert len(SegmentIndex(index.path, complete.index_path, stride=1024).offsets) == 0
+
+
+def test_truncated_log_is_indexed_again(index: LogIndex) -> None:
+    index.path.parent.mkdir()
+    _write(index.path, range(600))
+    index.update()
+    _write(index.path, range(1000, 1010))
+    assert _seconds(index.query(START, START + 2000)) == list(range(1000, 1010))
+
+
+def test_logs_do_not_prune_each_other(tmp_path: Path) -> None:
+    logs: Path = tmp_path.joinpath('logs')
+    logs.mkdir()
+    indexes: t.List[LogIndex] = [
+        LogIndex(logs.joinpath(name), directory=tmp_path.joinpath('index'), stride=512) for name in ('a', 'b')
+    ]
+    for log_index in indexes:
+        _write(log_index.path, range(100))
+        log_index.update()
+    indexes[0].update()
+    assert indexes[0].directory != indexes[1].directory
+    assert all(len(list(log_index.directory.glob('*.idx'))) == 1 for log_index in indexes)
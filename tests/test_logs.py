@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+import time
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.logs import LineFilter, LogFollower, LogLevel, inotify, tail_offset
+
+LOG: bytes = (
+    b'[ 1][t 0][2024-05-01 10:00:00.000][validator.cpp:10]\tfailed to download block\n'
+    b'[ 3][t 1][2024-05-01 10:00:01.000][manager.cpp:20]\tnew block (0,8000000000000000,7)\n'
+    b'[ 2][t 2][2024-05-01 10:00:02.000][manager.cpp:30]\tslow block (0,8000000000000000,8) block\n'
+    b'[ 4][t 3][2024-05-01 10:00:03.000][adnl.cpp:40]\tping\n'
+)
+
+
+def _tail(path: Path, lines: int, *, chunk_size: int = 7) -> bytes:
+    descriptor: int = os.open(path, os.O_RDONLY)
+    try:
+        return path.read_bytes()[tail_offset(descriptor, lines, chunk_size=chunk_size):]
+    finally:
+        os.close(descriptor)
+
+
+def test_tail_offset(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('log')
+    path.write_bytes(b'one\ntwo\nthree\n')
+    assert _tail(path, 1) == b'three\n'
+    assert _tail(path, 2) == b'two\nthree\n'
+    assert _tail(path, 5) == b'one\ntwo\nthree\n'
+    assert _tail(path, 0) == b''
+
+
+def test_tail_offset_without_a_final_line_break(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('log')
+    # The last line is still being written, it counts as one.
+    path.write_bytes(b'one\ntwo\nthr')
+    assert _tail(path, 1) == b'thr'
+    assert _tail(path, 2, chunk_size=1) == b'two\nthr'
+    assert _tail(path, 3) == b'one\ntwo\nthr'
+    path.write_bytes(b'')
+    assert _tail(path, 3) == b''
+
+
+def test_filter_by_pattern() -> None:
+    assert list(LineFilter(pattern='download').lines(LOG)) == [LOG.splitlines()[0]]
+    assert list(LineFilter(pattern=b'BLOCK', ignore_case=True).lines(LOG)) == LOG.splitlines()[:3]
+
+
+def test_filter_by_level() -> None:
+    assert list(LineFilter(max_level=LogLevel.error).lines(LOG)) == [LOG.splitlines()[0]]
+    assert list(LineFilter(max_level=LogLevel.parse('warning')).lines(LOG)) == [
+        LOG.splitlines()[0], LOG.splitlines()[2],
+    ]
+    assert len(list(LineFilter(max_level=LogLevel.parse(4)).lines(LOG))) == 4
+    with pytest.raises(ValueError):
+        LogLevel.parse('verbose')
+
+
+def test_filter_by_pattern_and_level() -> None:
+    selected: t.List[bytes] = list(LineFilter(pattern=r'block \(0,', max_level=LogLevel.warning).lines(LOG))
+    assert selected == [LOG.splitlines()[2]]
+
+
+def test_pattern_twice_on_one_line_selects_it_once() -> None:
+    # The third line holds "block" twice, and the last one ends the chunk
+    # without a line break.
+    chunk: bytes = LOG + b'[ 2][t 0][2024-05-01 10:00:04.000][x.cpp:1]\tblock block'
+    selected: t.List[bytes] = list(LineFilter(pattern='block').lines(chunk))
+    assert selected == [*LOG.splitlines()[:3], chunk.splitlines()[-1]]
+
+
+def test_pass_through() -> None:
+    line_filter: LineFilter = LineFilter()
+    assert line_filter.is_pass_through
+    assert list(line_filter.lines(LOG)) == LOG.splitlines()
+    assert list(line_filter.lines(b'')) == []
+
+
+def test_follower_reads_once_to_the_end(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('log')
+    path.write_bytes(b'one\ntwo\nthree\nfour')
+    assert b''.join(LogFollower(path, lines=2, chunk_size=4).chunks(follow=False)) == b'three\nfour\n'
+    assert b''.join(LogFollower(path, from_start=True).chunks(follow=False)) == b'one\ntwo\nthree\nfour\n'
+
+
+class _Following:
+    """
+    Follows a file on a thread of its own, handing out the lines read.
+    """
+
+    def __init__(self, follower: LogFollower) -> None:
+        self.follower: LogFollower = follower
+        self.lines: queue.Queue = queue.Queue()
+        self._thread: threading.Thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        for line in self.follower:
+            self.lines.put(line)
+
+    def next(self, count: int) -> t.List[bytes]:
+        return [self.lines.get(timeout=5) for _ in range(count)]
+
+    def stop(self) -> None:
+        self.follower.stop()
+        self._thread.join(5)
+
+
+def _append(path: Path, data: bytes) -> None:
+    with open(path, 'ab') as file:
+        file.write(data)
+
+
+def test_follower_handles_rotation_and_truncation(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Without inotify, as on systems that lack it.
+    monkeypatch.setattr(inotify, '_libc', lambda: None)
+    path: Path = tmp_path.joinpath('validator.log')
+    path.write_bytes(b'old\n')
+    following: _Following = _Following(LogFollower(path, chunk_size=8, poll_interval=0.02))
+    try:
+        time.sleep(0.1)
+        _append(path, b'first\nsecond line, longer than a chunk\nunfin')
+        assert following.next(2) == [b'first', b'second line, longer than a chunk']
+        _append(path, b'ished\n')
+        assert following.next(1) == [b'unfinished']
+
+        # Rotated the way logrotate does, with a last line written late.
+        os.rename(path, tmp_path.joinpath('validator.log.1'))
+        _append(tmp_path.joinpath('validator.log.1'), b'late\n')
+        path.write_bytes(b'new\n')
+        assert following.next(2) == [b'late', b'new']
+        assert following.follower.rotations == 1
+
+        with open(path, 'r+b') as file:
+            file.truncate(0)
+        time.sleep(0.2)
+        _append(path, b'again\n')
+        assert following.next(1) == [b'again']
+        assert following.follower.truncations == 1
+        assert following.lines.empty()
+    finally:
+        following.stop()
@@ -0,0 +1,113 @@
+import threading
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.metrics import HOUR, MINUTE, Aggregate, HistoryStore, MetricsError, MetricsStore, SeriesLayout
+
+START: float = 1_700_006_400.0
+SMALL: SeriesLayout = SeriesLayout(samples=10, minutes=5, hours=3)
+
+
+def test_minute_and_hour_rollups() -> None:
+    store: MetricsStore = MetricsStore()
+    # Two minutes of one sample every 10 seconds, 0 to 11.
+    for index in range(12):
+        assert store.record('lag', float(index), START + index * 10)
+    minutes = store.rollups('lag', MINUTE, START, START + 2 * MINUTE)
+    assert list(minutes.timestamps) == [START, START + MINUTE]
+    assert (list(minutes.minimum), list(minutes.maximum)) == ([0.0, 6.0], [5.0, 11.0])
+    assert (list(minutes.last), list(minutes.count)) == ([5.0, 11.0], [6, 6])
+    assert minutes.average == [2.5, 8.5]
+    hours = store.rollups('lag', HOUR, START, START + HOUR)
+    assert (list(hours.count), list(hours.total)) == ([12], [66.0])
+    with pytest.raises(MetricsError):
+        store.rollups('lag', 10.0, START)
+
+
+def test_window_bounds() -> None:
+    store: MetricsStore = MetricsStore()
+    for index in range(10):
+        store.record('seqno', float(index), START + index)
+    # Half open: from "since" included to "until" excluded.
+    assert list(store.samples('seqno', START + 2, START + 5).values) == [2.0, 3.0, 4.0]
+    assert list(store.samples('seqno', START + 2.5).values) == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert len(store.samples('seqno', START + 20)) == 0
+    assert store.rate('seqno', START) == 1.0
+    assert store.rate('seqno', START + 9) is None
+    # Late samples are dropped, the rings stay ordered.
+    assert not store.record('seqno', 100.0, START)
+    with pytest.raises(MetricsError):
+        store.samples('unknown', START)
+
+
+def test_wraparound_keeps_the_latest_rows() -> None:
+    store: MetricsStore = MetricsStore(layout=SMALL)
+    for index in range(25):
+        store.record('value', float(index), START + index * 30)
+    samples = store.samples('value', 0)
+    assert list(samples.values) == [float(index) for index in range(15, 25)]
+    assert list(samples.timestamps) == sorted(samples.timestamps)
+    # Windows straddling the wrap point of the ring.
+    assert list(store.samples('value', START + 17 * 30, START + 20 * 30).values) == [17.0, 18.0, 19.0]
+    minutes = store.rollups('value', MINUTE, 0)
+    assert len(minutes) == 5
+    assert list(minutes.last) == [17.0, 19.0, 21.0, 23.0, 24.0]
+
+
+def test_aggregate_picks_the_finest_covering_resolution() -> None:
+    # Raw samples hold two minutes, minute rollups five.
+    store: MetricsStore = MetricsStore(layout=SeriesLayout(samples=4, minutes=5, hours=3))
+    for index in range(25):
+        store.record('value', float(index), START + index * 30)
+    assert store.aggregate('value', START + 21 * 30) == Aggregate(4, 21.0, 24.0, 22.5, 24.0)
+    assert store.aggregate('value', START + 18 * 30) == Aggregate(7, 18.0, 24.0, 21.0, 24.0)
+    # Only the hours go back that far.
+    assert store.aggregate('value', START) == Aggregate(25, 0.0, 24.0, 12.0, 24.0)
+    assert store.aggregate('value', START + HOUR) is None
+
+
+def test_memory_budget() -> None:
+    store: MetricsStore = MetricsStore(memory_budget=SMALL.nbytes * 2, layout=SMALL)
+    assert store.max_series == 2
+    store.record('one', 1.0)
+    store.record('two', 2.0)
+    with pytest.raises(MetricsError):
+        store.record('three', 3.0)
+    assert store.names() == ['one', 'two']
+    assert store.memory_usage() <= store.memory_budget
+
+
+def test_concurrent_writers() -> None:
+    store: MetricsStore = MetricsStore()
+    barrier: threading.Barrier = threading.Barrier(4)
+
+    def write(offset: int) -> None:
+        barrier.wait()
+        for index in range(400):
+            store.record_many({f'series.{index % 7}': index, 'shared': offset}, START + index)
+
+    threads: t.List[threading.Thread] = [threading.Thread(target=write, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.names()) == 8
+    shared = store.rollups('shared', HOUR, 0)
+    assert sum(shared.count) == len(store.samples('shared', 0)) <= 1600
+
+
+def test_history_summarises_what_memory_has_seen(tmp_path: Path) -> None:
+    history: HistoryStore = HistoryStore(tmp_path)
+    history.record('lag', 100.0, START)
+    history.memory = MetricsStore()
+    for index in range(1, 11):
+        history.record('lag', float(index), START + index)
+    # The memory store did not see the first sample.
+    assert history.aggregate('lag', START) == Aggregate(11, 1.0, 100.0, 155 / 11, 10.0)
+    assert history.memory.covers('lag', START + 1)
+    history.memory.record('lag', -1.0, START + 11)
+    assert history.aggregate('lag', START + 1) == Aggregate(11, -1.0, 10.0, 54 / 11, -1.0)
+    history.close()
@@ -0,0 +1,55 @@
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.disk import ArchivePruner, ArchiveSlice, PruneReport, find_archive_slices
+from ton_node_control.disk import pruning
+
+
+def _database(tmp_path: Path, packages: t.Sequence[int], size: int = 4096) -> Path:
+    directory: Path = tmp_path.joinpath('archive', 'packages', 'arch0000')
+    directory.mkdir(parents=True)
+    for package in packages:
+        directory.joinpath(f'archive.{package:05d}.pack').write_bytes(b'x' * size)
+        directory.joinpath(f'archive.{package:05d}.index').write_bytes(b'i' * 16)
+    return tmp_path
+
+
+def test_removes_slices_with_their_package_files(tmp_path: Path) -> None:
+    database: Path = _database(tmp_path, [0, 100])
+    pruner: ArchivePruner = ArchivePruner(bytes_per_second=1e12, operations_per_second=1e9, step=1024)
+    report: PruneReport = pruner.prune(find_archive_slices(database))
+    assert report.slices == 2
+    assert report.files == 4
+    assert not list(database.joinpath('archive', 'packages', 'arch0000').iterdir())
+
+
+def test_stopped_removal_leaves_no_truncated_file(tmp_path: Path) -> None:
+    database: Path = _database(tmp_path, [0], size=64 * 1024)
+    pruner: ArchivePruner = ArchivePruner(bytes_per_second=1e12, operations_per_second=1e9, step=1024)
+    acquire = pruner._acquire
+
+    def stop_after_first(report: PruneReport, size: int) -> None:
+        acquire(report, size)
+        pruner.stop()
+
+    pruner._acquire = stop_after_first  # type: ignore[assignment]
+    report: PruneReport = pruner.prune(find_archive_slices(database))
+    # Gone as soon as its removal started, never left shrunk in place.
+    assert not list(database.joinpath('archive', 'packages', 'arch0000').iterdir())
+    assert report.slices == 0
+    assert report.files == 2
+
+
+def test_open_files_are_checked_before_each_slice(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    database: Path = _database(tmp_path, [0, 100])
+    slices: t.List[ArchiveSlice] = find_archive_slices(database)
+    opened: t.List[t.Set[str]] = [set(), {str(slices[1].path)}]
+    monkeypatch.setattr(pruning, 'open_files', lambda pid: opened.pop(0))
+    pruner: ArchivePruner = ArchivePruner(bytes_per_second=1e12, operations_per_second=1e9, validator_pid=1)
+    report: PruneReport = pruner.prune(slices)
+    assert report.slices == 1
+    assert report.skipped == [slices[1].path]
+    assert slices[1].path.exists()
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import stat
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.backup import (
+    BackupError,
+    BackupWriter,
+    ChunkChanged,
+    ChunkParameters,
+    FileEntry,
+    LocalTarget,
+    Manifest,
+    RestoreProgress,
+    SnapshotRestorer,
+)
+from ton_node_control.backup.chunking import chunk_digest, pack_chunk
+from ton_node_control.backup.restore import STATE_PREFIX, RestoreState, _preallocate
+
+PARAMETERS: ChunkParameters = ChunkParameters(minimum=1024, maximum=4096, window=64 * 1024)
+MTIME: int = 1_700_000_000_123_456_789
+
+
+def _make_snapshot(tmp_path: Path) -> LocalTarget:
+    source: Path = tmp_path.joinpath('db')
+    source.joinpath('archive').mkdir(parents=True)
+    source.joinpath('archive', 'a.pack').write_bytes(os.urandom(20_000))
+    source.joinpath('b.sst').write_bytes(bytes(range(256)) * 40)
+    source.joinpath('config.json').write_bytes(b'{}')
+    source.joinpath('empty').write_bytes(b'')
+    source.joinpath('current').symlink_to('b.sst')
+    os.chmod(source.joinpath('config.json'), 0o444)
+    for path in source.rglob('*'):
+        if path.is_file() and not path.is_symlink():
+            os.utime(path, ns=(MTIME, MTIME))
+    target: LocalTarget = LocalTarget(tmp_path.joinpath('snapshots'))
+    asyncio.run(BackupWriter(target, workers=1, parameters=PARAMETERS).backup({'db': source}, 'first'))
+    return target
+
+
+def _restore(target: LocalTarget, destination: Path) -> RestoreProgress:
+    return asyncio.run(SnapshotRestorer(target, destination, workers=1, fetches=1).restore())
+
+
+def _assert_restored(tmp_path: Path, destination: Path) -> None:
+    for path in tmp_path.joinpath('db').rglob('*'):
+        restored: Path = destination.joinpath('db', path.relative_to(tmp_path.joinpath('db')))
+        if path.is_symlink():
+            assert os.readlink(restored) == os.readlink(path)
+        elif path.is_file():
+            assert restored.read_bytes() == path.read_bytes(), path
+            assert (restored.stat().st_mode, restored.stat().st_mtime_ns) == (path.stat().st_mode, MTIME)
+    assert not list(destination.glob(f'{STATE_PREFIX}*'))
+
+
+def test_restore(tmp_path: Path) -> None:
+    target: LocalTarget = _make_snapshot(tmp_path)
+    progress: RestoreProgress = _restore(target, tmp_path.joinpath('restored'))
+    _assert_restored(tmp_path, tmp_path.joinpath('restored'))
+    assert progress.done_bytes == progress.total_bytes == 20_000 + 256 * 40 + 2
+    assert progress.write.chunks == progress.total_chunks
+    assert progress.skipped_bytes == 0
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedTarget(LocalTarget):
+    """
+    Fails for good after serving a few chunks.
+    """
+
+    def __init__(self, directory: Path, chunks: int) -> None:
+        super().__init__(directory)
+        self.chunks: int = chunks
+
+    async def get_chunk(self, digest: str) -> bytes:
+        if self.chunks == 0:
+            raise Interrupted()
+        self.chunks -= 1
+        return await super().get_chunk(digest)
+
+
+def test_interrupted_restore_resumes(tmp_path: Path) -> None:
+    target: LocalTarget = _make_snapshot(tmp_path)
+    destination: Path = tmp_path.joinpath('restored')
+    with pytest.raises(Interrupted):
+        _restore(InterruptedTarget(target.directory, 3), destination)
+    # What was written is journaled on the way out, a chunk found twice in
+    # the snapshot at both of its places.
+    state: RestoreState = RestoreState(destination.joinpath(f'{STATE_PREFIX}first'))
+    assert len(state.done) >= 3
+
+    progress: RestoreProgress = _restore(target, destination)
+    assert progress.skipped_bytes > 0
+    assert progress.done_bytes == progress.total_bytes
+    assert progress.write.chunks == progress.total_chunks - len(state.done)
+    _assert_restored(tmp_path, destination)
+
+
+def test_restore_state_journal(tmp_path: Path) -> None:
+    data: Path = tmp_path.joinpath('data')
+    data.write_bytes(b'x')
+    state: RestoreState = RestoreState(tmp_path.joinpath('journal'))
+    assert not state.exists
+    state.mark(data, 0, 0, 1)
+    state.mark(data, 0, 1, 1)
+    assert not state.is_due()
+    batch = state.take()
+    assert batch == ([(0, 0), (0, 1)], {data})
+    state.checkpoint(batch)
+    assert state.done == {(0, 0), (0, 1)}
+    # A torn last line is not done.
+    with open(state.path, 'a') as file:
+        file.write('1 0\n2')
+    assert RestoreState(state.path).done == {(0, 0), (0, 1), (1, 0)}
+    state.remove()
+    assert not state.exists
+
+
+def test_read_only_files_are_writable_again_on_resume(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath('config.json')
+    path.write_bytes(b'{}')
+    os.chmod(path, 0o444)
+    _preallocate(path, 10)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert path.stat().st_size == 10
+
+
+def test_refuses_a_non_empty_destination(tmp_path: Path) -> None:
+    target: LocalTarget = _make_snapshot(tmp_path)
+    destination: Path = tmp_path.joinpath('restored')
+    destination.mkdir()
+    destination.joinpath('keep').write_bytes(b'')
+    with pytest.raises(BackupError, match='not empty'):
+        _restore(target, destination)
+
+
+def test_refuses_paths_outside_of_the_destination(tmp_path: Path) -> None:
+    target: LocalTarget = LocalTarget(tmp_path.joinpath('snapshots'))
+    for path in ('../escaped', '/etc/escaped', 'db/../../escaped'):
+        manifest: Manifest = Manifest('evil', 0.0, files=[FileEntry(path, 0, 0o644, MTIME)])
+        asyncio.run(target.put_manifest('evil', manifest.to_json()))
+        with pytest.raises(BackupError, match='outside of the destination'):
+            _restore(target, tmp_path.joinpath('restored'))
+    assert not tmp_path.joinpath('escaped').exists()
+
+
+def test_chunks_are_checked_against_their_digest(tmp_path: Path) -> None:
+    target: LocalTarget = _make_snapshot(tmp_path)
+    # A chunk replaced by a well-formed one of other content.
+    other: Path = tmp_path.joinpath('other')
+    other.write_bytes(b'other content')
+    chunk: Path = next(target.directory.glob('chunks/*/*'))
+    chunk.write_bytes(pack_chunk(str(other), 0, 13, chunk_digest(b'other content'), 'zlib', 3))
+    with pytest.raises(ChunkChanged, match='does not match'):
+        _restore(target, tmp_path.joinpath('restored'))
+
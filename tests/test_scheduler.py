@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+import typing as t
+
+from ton_node_control.scheduler import Scheduler, Task
+
+
+def test_overrunning_blocking_task_stays_busy() -> None:
+    release: threading.Event = threading.Event()
+    active: t.List[int] = []
+    starts: t.List[float] = []
+
+    def slow() -> None:
+        starts.append(time.monotonic())
+        active.append(1)
+        try:
+            assert len(active) == 1
+            release.wait(5.0)
+        finally:
+            active.pop()
+
+    scheduler: Scheduler = Scheduler(
+        [Task('slow', slow, 0.05, jitter=0.0, blocking=True, timeout=0.05, delay=0.0)],
+        workers=2,
+        coalesce_window=0.0,
+    )
+
+    async def main() -> None:
+        running: asyncio.Task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.4)
+        # Timed out long ago, but its thread is still in there.
+        assert len(starts) == 1
+        assert scheduler.task_metrics['slow'].skipped >= 3
+        release.set()
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+        await running
+
+    asyncio.run(main())
+    assert len(starts) >= 2
+    assert scheduler.task_metrics['slow'].failures >= 1
+
+
+def test_overrunning_coroutine_is_cancelled() -> None:
+    cancelled: t.List[bool] = []
+
+    async def slow() -> None:
+        try:
+            await asyncio.sleep(5.0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    scheduler: Scheduler = Scheduler([Task('slow', slow, 10.0, timeout=0.05, delay=0.0)])
+
+    async def main() -> None:
+        running: asyncio.Task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+        await running
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert scheduler.task_metrics['slow'].last_error == 'No answer within 0.05s'
+
+
+def test_trigger_pulls_the_next_run_forward() -> None:
+    runs: t.List[float] = []
+    scheduler: Scheduler = Scheduler(
+        [Task('status', lambda: runs.append(time.monotonic()), 1.0, jitter=0.0, delay=0.0, blocking=True)],
+        coalesce_window=0.0,
+    )
+    # Not running yet.
+    assert not scheduler.trigger('status')
+
+    async def main() -> None:
+        running: asyncio.Task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.1)
+        assert len(runs) == 1
+        # Ran less than half an interval ago.
+        assert not scheduler.trigger('status')
+        await asyncio.sleep(0.5)
+        assert scheduler.trigger('status')
+        await asyncio.sleep(0.1)
+        assert len(runs) == 2
+        assert not scheduler.trigger('unknown')
+        scheduler.stop()
+        await running
+
+    asyncio.run(main())
+    assert 0.5 <= runs[1] - runs[0] < 0.7
+    assert scheduler.task_metrics['status'].skipped == 0
@@ -0,0 +1,137 @@
+import pytest
+
+from ton_node_control.core.shards import (
+    MASTERCHAIN,
+    SHARD_FULL,
+    ShardDescriptor,
+    ShardTopology,
+    ShardTrie,
+    account_prefix,
+    parse_block_ids,
+    shard_prefix_length,
+)
+
+LEFT: int = 0x4000000000000000
+RIGHT: int = 0xC000000000000000
+# The four quarters after splitting both halves.
+QUARTERS: tuple = (0x2000000000000000, 0x6000000000000000, 0xA000000000000000, 0xE000000000000000)
+
+
+def _account(top_byte: int) -> str:
+    return f'{top_byte:02x}' + '11' * 31
+
+
+def _shards(*shards: int, seqno: int = 1) -> list:
+    return [ShardDescriptor(0, shard, seqno) for shard in shards]
+
+
+def test_prefix_length() -> None:
+    assert shard_prefix_length(SHARD_FULL) == 0
+    assert shard_prefix_length(LEFT) == 1
+    assert shard_prefix_length(QUARTERS[0]) == 2
+    assert shard_prefix_length(1) == 63
+    for invalid in (0, 1 << 64):
+        with pytest.raises(ValueError):
+            shard_prefix_length(invalid)
+
+
+def test_account_prefix() -> None:
+    account: str = _account(0xAB)
+    expected: int = int(account[:16], 16)
+    assert account_prefix(account) == expected
+    assert account_prefix(f'0:{account}') == expected
+    assert account_prefix(bytes.fromhex(account)) == expected
+    assert account_prefix(int(account, 16)) == expected
+    with pytest.raises(ValueError):
+        account_prefix(b'short')
+
+
+def test_trie_with_a_single_shard_covers_everything() -> None:
+    trie: ShardTrie = ShardTrie()
+    trie.insert(ShardDescriptor(0, SHARD_FULL, 7))
+    assert len(trie) == 1
+    for prefix in (0, SHARD_FULL, 0xFFFFFFFFFFFFFFFF):
+        assert trie.lookup(prefix).shard == SHARD_FULL
+
+
+def test_trie_lookup_follows_the_longest_prefix() -> None:
+    trie: ShardTrie = ShardTrie()
+    # The left half as a whole, the right one split in two.
+    for descriptor in _shards(LEFT, QUARTERS[2], QUARTERS[3]):
+        trie.insert(descriptor)
+    assert trie.lookup(0x0000000000000000).shard == LEFT
+    assert trie.lookup(0x7FFFFFFFFFFFFFFF).shard == LEFT
+    assert trie.lookup(0x8000000000000000).shard == QUARTERS[2]
+    assert trie.lookup(0xBFFFFFFFFFFFFFFF).shard == QUARTERS[2]
+    assert trie.lookup(0xC000000000000000).shard == QUARTERS[3]
+    assert sorted(descriptor.shard for descriptor in trie) == [LEFT, QUARTERS[2], QUARTERS[3]]
+
+
+def test_trie_remove_prunes_empty_branches() -> None:
+    trie: ShardTrie = ShardTrie()
+    trie.insert(ShardDescriptor(0, 1, 1))
+    assert trie.lookup(0).shard == 1
+    assert trie.remove(1).shard == 1
+    assert trie.remove(1) is None
+    assert trie.remove(QUARTERS[0]) is None
+    assert len(trie) == 0
+    assert trie._root.children == [None, None]
+
+
+def test_trie_insert_replaces_the_same_shard() -> None:
+    trie: ShardTrie = ShardTrie()
+    trie.insert(ShardDescriptor(0, LEFT, 1))
+    trie.insert(ShardDescriptor(0, LEFT, 2))
+    assert len(trie) == 1
+    assert trie.lookup(0).seqno == 2
+
+
+def test_route_across_split_and_merge() -> None:
+    topology: ShardTopology = ShardTopology()
+    assert topology.update(10, _shards(SHARD_FULL))
+    assert topology.route(0, _account(0x10)).shard == SHARD_FULL
+
+    assert topology.update(11, _shards(LEFT, RIGHT, seqno=2))
+    assert topology.route(0, _account(0x10)).shard == LEFT
+    assert topology.route_address(f'0:{_account(0x90)}').shard == RIGHT
+
+    assert topology.update(12, _shards(*QUARTERS, seqno=3))
+    assert [topology.route(0, _account(byte)).shard for byte in (0x10, 0x50, 0x90, 0xD0)] == list(QUARTERS)
+
+    # Merged back.
+    assert topology.update(13, _shards(LEFT, RIGHT, seqno=4))
+    assert [descriptor.shard for descriptor in topology.shards(0)] == [LEFT, RIGHT]
+    assert topology.route(0, _account(0x50)).shard == LEFT
+
+
+def test_update_ignores_older_and_unchanged_blocks() -> None:
+    topology: ShardTopology = ShardTopology()
+    assert topology.update(10, _shards(LEFT, RIGHT))
+    assert not topology.update(9, _shards(SHARD_FULL))
+    assert not topology.update(10, _shards(SHARD_FULL))
+    assert not topology.update(11, _shards(LEFT, RIGHT))
+    assert topology.masterchain_seqno == 11
+    assert topology.update(12, _shards(LEFT, RIGHT, seqno=2))
+
+
+def test_route_masterchain_and_unknown_workchains() -> None:
+    topology: ShardTopology = ShardTopology()
+    topology.update(10, [*_shards(SHARD_FULL), ShardDescriptor(MASTERCHAIN, SHARD_FULL, 10)])
+    assert topology.workchains == [0]
+    assert topology.route_address(f'-1:{_account(0)}') == ShardDescriptor(MASTERCHAIN, SHARD_FULL, 10)
+    with pytest.raises(LookupError):
+        topology.route(1, _account(0))
+
+
+def test_update_from_text() -> None:
+    text: str = (
+        'shard #1 : (0,4000000000000000,8):' + 'A' * 64 + ':' + 'b' * 64 + '\n'
+        'shard #2 : (0,c000000000000000,9):' + 'C' * 64 + ':' + 'D' * 64 + '\n'
+    )
+    assert [str(descriptor) for descriptor in parse_block_ids(text)] == [
+        '(0,4000000000000000,8)', '(0,c000000000000000,9)',
+    ]
+    topology: ShardTopology = ShardTopology()
+    assert topology.update_from_text(5, text)
+    routed: ShardDescriptor = topology.route(0, _account(0xFF))
+    assert (routed.seqno, routed.file_hash) == (9, 'D' * 64)
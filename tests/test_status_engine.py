@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ton_node_control.core.client.validator_console import LocalValidatorConsole
+from ton_node_control.status.engine import Probe, ProbeSkipped, ProbeState, StatusEngine, StatusReport
+from ton_node_control.status.probes import SYNC_FAMILIES, sync_probe
+from ton_node_control.status.report import render_report
+
+
+def stuck(values: dict) -> None:
+    values['started'] = True
+    time.sleep(2)
+
+
+def counting(values: dict) -> None:
+    # Keeps writing long after it is abandoned.
+    deadline: float = time.monotonic() + 1
+    while time.monotonic() < deadline:
+        values[f'value{len(values)}'] = len(values)
+
+
+def failing(values: dict) -> None:
+    raise RuntimeError('broken')
+
+
+def skipped(values: dict) -> None:
+    raise ProbeSkipped('not configured')
+
+
+async def answering(values: dict) -> None:
+    values['value'] = 1
+
+
+def collect(*probes: Probe) -> StatusReport:
+    return asyncio.run(StatusEngine(probes, budget=0.5).collect())
+
+
+def test_states() -> None:
+    report: StatusReport = collect(
+        Probe('stuck', stuck, 0.2, blocking=True),
+        Probe('failing', failing, blocking=True),
+        Probe('skipped', skipped, blocking=True),
+        Probe('answering', answering),
+    )
+    assert [result.state for result in report.results] == [
+        ProbeState.partial,
+        ProbeState.failed,
+        ProbeState.skipped,
+        ProbeState.ok,
+    ]
+    assert report['stuck'].values == {'started': True}
+    assert report['failing'].error == 'broken'
+    assert report.values() == {'stuck.started': True, 'answering.value': 1}
+    assert report.duration < 1
+
+
+def test_stuck_probes_run_on_daemon_threads() -> None:
+    collect(Probe('stuck', stuck, 0.1, blocking=True))
+    threads: list = [thread for thread in threading.enumerate() if thread.name == 'status-probe-stuck']
+    assert threads and all(thread.daemon for thread in threads)
+
+
+def test_report_tells_failures_from_timeouts() -> None:
+    failed: str = render_report(collect(Probe('failing', failing, blocking=True))).splitlines()[-1]
+    assert failed.endswith(', some probes failed')
+    timed_out: str = render_report(collect(Probe('stuck', stuck, 0.1, blocking=True))).splitlines()[-1]
+    assert timed_out.endswith(', some probes did not answer in time')
+    complete: str = render_report(collect(Probe('answering', answering))).splitlines()[-1]
+    assert complete.startswith('Collected in') and 'some' not in complete
+
+
+def test_abandoned_probes_do_not_change_the_report() -> None:
+    report: StatusReport = collect(Probe('counting', counting, 0.1, blocking=True))
+    assert report['counting'].state is ProbeState.partial
+    reported: dict = dict(report['counting'].values)
+    time.sleep(0.1)
+    assert report['counting'].values == reported
+
+
+def test_sync_probe_reuses_one_session() -> None:
+    console: LocalValidatorConsole = LocalValidatorConsole(masterchain_seqno=42, sync_lag=3)
+    console.close = lambda: pytest.fail('The session was closed')  # type: ignore
+    probe: Probe = Probe('node.sync', sync_probe(console), blocking=True, families=SYNC_FAMILIES)
+    for _ in range(3):
+        assert collect(probe)['node.sync'].values == {'sync_lag': 3, 'masterchain_seqno': 42, 'shard_client_lag': 0}
+    assert console.batches == 3
@@ -0,0 +1,140 @@
+import random
+import struct
+import typing as t
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.core.tl import TlCodec, TlObject, parse_schema
+
+SCHEMA: str = '''
+test.point x:int y:int = test.Point;
+test.item id:long name:string data:bytes flag:Bool ratio:double = test.Item;
+test.bag flags:# ids:(vector int) items:(vector test.item) hashes:(vector int256) point:flags.0?test.Point
+    note:flags.1?string big:flags.2?int128 done:flags.3?true = test.Bag;
+test.wrapped value:test.Bag tags:(vector string) = test.Wrapped;
+'''
+
+
+@pytest.fixture(scope='module')
+def codec(tmp_path_factory: pytest.TempPathFactory) -> TlCodec:
+    return TlCodec.from_sources([SCHEMA], cache_directory=tmp_path_factory.mktemp('tl'))
+
+
+def random_item(rng: random.Random) -> TlObject:
+    return {
+        '@type': 'test.item',
+        'id': rng.getrandbits(64) - 2 ** 63,
+        'name': ''.join(chr(rng.randrange(32, 0x2fff)) for _ in range(rng.randrange(40))),
+        'data': bytes(rng.getrandbits(8) for _ in range(rng.choice((0, 3, 253, 254, 300)))),
+        'flag': rng.random() < 0.5,
+        'ratio': rng.random(),
+    }
+
+
+def random_bag(rng: random.Random) -> TlObject:
+    flags: int = rng.getrandbits(4)
+    return {
+        '@type': 'test.bag',
+        'flags': flags,
+        'ids': [rng.getrandbits(32) - 2 ** 31 for _ in range(rng.randrange(5))],
+        'items': [random_item(rng) for _ in range(rng.randrange(3))],
+        'hashes': [rng.getrandbits(256).to_bytes(32, 'big') for _ in range(rng.randrange(3))],
+        'point': {'@type': 'test.point', 'x': rng.randrange(100), 'y': -rng.randrange(100)} if flags & 1 else None,
+        'note': 'note' if flags & 2 else None,
+        'big': bytes(16) if flags & 4 else None,
+        'done': True if flags & 8 else None,
+    }
+
+
+def random_object(rng: random.Random) -> TlObject:
+    if rng.random() < 0.5:
+        return random_bag(rng)
+    return {'@type': 'test.wrapped', 'value': random_bag(rng), 'tags': [str(rng.random()) for _ in range(2)]}
+
+
+def test_round_trip(codec: TlCodec) -> None:
+    value: TlObject = {'@type': 'test.point', 'x': 1, 'y': -2}
+    encoded: bytes = codec.serialize(value)
+    assert len(encoded) == 12
+    assert codec.deserialize(encoded) == value
+    assert codec.deserialize(memoryview(encoded)) == value
+
+
+def test_round_trip_fuzz(codec: TlCodec) -> None:
+    rng: random.Random = random.Random(0)
+    for _ in range(500):
+        value: TlObject = random_object(rng)
+        assert codec.deserialize(codec.serialize(value)) == value
+
+
+def test_cached_module_is_reused(codec: TlCodec, tmp_path: Path) -> None:
+    first: TlCodec = TlCodec.from_sources([SCHEMA], cache_directory=tmp_path)
+    second: TlCodec = TlCodec.from_sources([SCHEMA], cache_directory=tmp_path)
+    assert first.module.__file__ == second.module.__file__
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+@pytest.mark.parametrize('value', [
+    {'@type': 'test.missing'},
+    {'@type': 'test.point', 'x': 1},
+    {'@type': 'test.point', 'x': 2 ** 40, 'y': 0},
+])
+def test_serialize_invalid(codec: TlCodec, value: TlObject) -> None:
+    with pytest.raises((TypeError, KeyError, struct.error)):
+        codec.serialize(value)
+
+
+def constructor_id(name: str) -> bytes:
+    return (parse_schema(SCHEMA).by_name[name].id & 0xffffffff).to_bytes(4, 'little')
+
+
+def bag_header(count: int) -> bytes:
+    # "flags", then the count of "ids".
+    return constructor_id('test.bag') + struct.pack('<II', 0, count)
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'\x01\x02',
+    b'\xff\xff\xff\xff',
+    bag_header(0xffffffff),
+    bag_header(3) + struct.pack('<i', 1),
+    bag_header(0) + struct.pack('<I', 0x10000000),
+    bag_header(0) + struct.pack('<I', 1) + b'\0' * 8 + b'\xfe\xff\xff',
+    bag_header(0) + struct.pack('<I', 1) + b'\0' * 8 + b'\xfe\x01',
+    bag_header(0) + struct.pack('<I', 1) + b'\0' * 8,
+    bag_header(0) + struct.pack('<III', 0, 0, 0) + b'\0',
+])
+def test_deserialize_malformed(codec: TlCodec, data: bytes) -> None:
+    with pytest.raises(codec.error):
+        codec.deserialize(data)
+
+
+def test_deserialize_invalid_bool(codec: TlCodec) -> None:
+    item: bytearray = bytearray(codec.serialize(random_item(random.Random(1))))
+    item[-12:-8] = b'\0\0\0\0'
+    with pytest.raises(codec.error, match='Bool'):
+        codec.deserialize(bytes(item))
+
+
+def test_deserialize_mutations_fuzz(codec: TlCodec) -> None:
+    rng: random.Random = random.Random(1)
+    for _ in range(2000):
+        data: bytearray = bytearray(codec.serialize(random_object(rng)))
+        for _ in range(rng.randrange(1, 4)):
+            action: int = rng.randrange(3)
+            position: int = rng.randrange(len(data))
+            if action == 0:
+                data[position] = rng.getrandbits(8)
+            elif action == 1:
+                del data[position:]
+            else:
+                data[position:position] = bytes(rng.getrandbits(8) for _ in range(rng.randrange(1, 5)))
+            if not data:
+                break
+        try:
+            codec.deserialize(bytes(data))
+        except codec.error:
+            pass
@@ -0,0 +1,119 @@
+import stat
+import sys
+import textwrap
+import time
+
+from pathlib import Path
+
+import pytest
+
+from ton_node_control.core.client.validator_console import ValidatorConsole
+from ton_node_control.core.exceptions import ConsoleError
+from ton_node_control.core.process import InteractiveProcess
+
+# Answers queries from a thread, after the next input lines have been
+# read, as validator-engine-console does; unknown commands at once.
+FAKE_CONSOLE: str = textwrap.dedent('''
+    import sys
+    import threading
+    import time
+
+    lock = threading.Lock()
+
+    def answer(text, delay=0.0):
+        time.sleep(delay)
+        with lock:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def query(text):
+        threading.Thread(target=answer, args=(text, 0.2)).start()
+
+    for line in sys.stdin:
+        name, *arguments = line.split()
+        if name == 'getstats':
+            query('unixtime\\t\\t\\t100\\nmasterchainblocktime\\t\\t\\t90\\n')
+        elif name == 'newkey':
+            query('created new key ' + 'AB' * 32 + '\\n')
+        elif name == 'exit':
+            break
+        elif name == 'hang':
+            pass
+        else:
+            answer('unknown command: ' + name + '\\n')
+''')
+
+
+@pytest.fixture
+def console_path(tmp_path: Path) -> Path:
+    path: Path = tmp_path.joinpath('validator-engine-console')
+    path.write_text(f'#!{sys.executable}\n{FAKE_CONSOLE}')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+@pytest.fixture
+def console(console_path: Path) -> ValidatorConsole:
+    with ValidatorConsole(console_path, Path('client'), Path('server.pub'), '127.0.0.1:1', timeout=2.0) as console:
+        yield console
+
+
+def test_interactive_process_reads_up_to_marker(console_path: Path) -> None:
+    process: InteractiveProcess = InteractiveProcess([str(console_path)])
+    process.start()
+    try:
+        process.write(b'first\nsecond\n')
+        assert process.read_until(b'second', deadline=time.monotonic() + 5) == b'unknown command: first\n'
+        assert process.is_running
+    finally:
+        process.stop()
+    assert not process.is_running
+
+
+def test_interactive_process_reports_exit(console_path: Path) -> None:
+    process: InteractiveProcess = InteractiveProcess([str(console_path)])
+    process.start()
+    try:
+        process.write(b'exit\n')
+        with pytest.raises(ConsoleError, match='exited unexpectedly'):
+            process.read_until(b'marker', deadline=time.monotonic() + 5)
+    finally:
+        process.stop()
+
+
+def test_batch_outputs_follow_asynchronous_answers(console: ValidatorConsole) -> None:
+    outputs = console.execute_batch(['getstats', 'nosuchcommand', 'newkey'])
+    assert outputs == [
+        'unixtime\t\t\t100\nmasterchainblocktime\t\t\t90\n',
+        'unknown command: nosuchcommand\n',
+        f'created new key {"AB" * 32}\n',
+    ]
+    assert console.get_stats().sync_lag == 10
+    assert console.new_key() == 'AB' * 32
+
+
+def test_batch_reuses_the_session(console: ValidatorConsole) -> None:
+    console.execute_batch(['getstats'])
+    process = console._process._process
+    console.execute_batch(['getstats'])
+    assert console._process._process is process
+
+
+def test_unknown_command_is_an_error(console: ValidatorConsole) -> None:
+    with pytest.raises(ConsoleError, match='nosuchcommand'):
+        console.run(['getstats', 'nosuchcommand'])
+
+
+def test_timeout_restarts_the_session(console_path: Path) -> None:
+    console: ValidatorConsole = ValidatorConsole(
+        console_path,
+        Path('client'),
+        Path('server.pub'),
+        '127.0.0.1:1',
+        timeout=0.3,
+    )
+    with console:
+        with pytest.raises(ConsoleError, match='Timed out'):
+            console.execute_batch(['hang'])
+        assert not console.is_open
+        assert console.execute_batch(['nosuchcommand']) == ['unknown command: nosuchcommand\n']
@@ -0,0 +1,60 @@
+import asyncio
+import base64
+import typing as t
+
+from ton_node_control.core.datasources.models import BlockIdExt, MasterchainInfo
+from ton_node_control.core.shards import ShardTopology
+from ton_node_control.events import BlockWatcher, EventBus, MasterchainBlock, ShardBlock, Subscription
+
+HASH: str = base64.b64encode(bytes(32)).decode()
+
+
+def _block(workchain: int, shard: int, seqno: int) -> BlockIdExt:
+    return BlockIdExt(workchain=workchain, shard=str(shard), seqno=seqno, root_hash=HASH, file_hash=HASH)
+
+
+class FakeDataSource:
+    def __init__(self) -> None:
+        self.seqno: int = 100
+        self.shards: t.List[BlockIdExt] = [_block(0, -(2 ** 63), 10)]
+
+    async def get_masterchain_info(self) -> MasterchainInfo:
+        last: BlockIdExt = _block(-1, -(2 ** 63), self.seqno)
+        return MasterchainInfo(last=last, state_root_hash=HASH, init=last)
+
+    async def get_shards(self, seqno: int) -> t.List[BlockIdExt]:
+        return self.shards
+
+
+def test_shard_blocks_go_to_the_topology() -> None:
+    datasource: FakeDataSource = FakeDataSource()
+    topology: ShardTopology = ShardTopology()
+    bus: EventBus = EventBus()
+
+    async def main() -> t.List[t.Any]:
+        subscription: Subscription = bus.subscribe(MasterchainBlock, ShardBlock)
+        watcher: BlockWatcher = BlockWatcher(
+            datasource,  # type: ignore[arg-type]
+            bus,
+            elector_address='-1:' + '3' * 64,
+            topology=topology,
+        )
+        await watcher.poll()
+        datasource.seqno = 101
+        # Split: both halves are new to the topology.
+        datasource.shards = [_block(0, 0x4000000000000000, 11), _block(0, -0x4000000000000000, 11)]
+        await watcher.poll()
+        datasource.seqno = 102
+        await watcher.poll()
+        subscription.close()
+        return [event async for event in subscription]
+
+    events: t.List[t.Any] = asyncio.run(main())
+    assert [type(event).__name__ for event in events] == [
+        'MasterchainBlock', 'ShardBlock', 'MasterchainBlock', 'ShardBlock', 'ShardBlock', 'MasterchainBlock',
+    ]
+    assert topology.masterchain_seqno == 102
+    assert [(block.shard, block.seqno) for block in topology.shards(0)] == [
+        (0x4000000000000000, 11),
+        (0xC000000000000000, 11),
+    ]
@@ -1,2 +1,14 @@
-from ton_node_control.cli import app as cli_app  # noqa: F401
-from ton_node_control.interactive import app as interactive_app  # noqa: F401
+import importlib
+import typing as t
+
+# Imported on first use: commands forwarded to the daemon never need them.
+_SUBMODULES: t.Dict[str, str] = {
+    'cli_app': 'ton_node_control.cli.app',
+    'interactive_app': 'ton_node_control.interactive.app',
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(_SUBMODULES[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,5 @@
+from .chunking import ChunkChanged, ChunkParameters  # noqa: F401
+from .manifest import BackupError, FileEntry, Manifest, StoredChunk  # noqa: F401
+from .snapshot import BackupReport, BackupWriter, collect_files, run_backup  # noqa: F401
+from .targets import BackupTarget, HttpTarget, LocalTarget, open_target  # noqa: F401
+from .restore import RestoreProgress, SnapshotRestorer, StageProgress, run_restore  # noqa: F401
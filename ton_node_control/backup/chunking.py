@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import lzma
+import mmap
+import os
+import typing as t
+import zlib
+
+from dataclasses import dataclass
+
+from ton_node_control.backup.manifest import BackupError
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+# Boundaries follow an anchor found in the data itself, so inserting or
+# removing bytes only changes the chunks around the edit. The anchor is
+# searched with "bytes.find", which runs at memory speed, a rolling hash
+# would have to look at every byte from Python.
+ANCHOR: t.Final[Bytes] = b'\x8a\x3f'
+ANCHOR_MASK: t.Final[Integer] = 0x0f
+DIGEST_SIZE: t.Final[Integer] = 32
+
+# A chunk: offset in the file, size, digest of its content.
+ChunkSpan = t.Tuple[Integer, Integer, String]
+
+
+class ChunkChanged(BackupError):
+    pass
+
+
+@dataclass(frozen=True)
+class ChunkParameters:
+    """
+    With random content chunks average "minimum" + 1 MiB, content without
+    anchors is cut every "maximum" bytes. Files are scanned in windows of
+    "window" bytes, which always end a chunk.
+    """
+
+    minimum: Integer = 256 * 1024
+    maximum: Integer = 4 * 1024 * 1024
+    window: Integer = 64 * 1024 * 1024
+
+
+def chunk_digest(data: t.Union[Bytes, memoryview]) -> String:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def find_boundaries(
+    data: t.Union[Bytes, mmap.mmap],
+    start: Integer,
+    end: Integer,
+    parameters: ChunkParameters,
+) -> t.List[Integer]:
+    """
+    Ends of the chunks of data[start:end], the last one is "end".
+    """
+    boundaries: t.List[Integer] = []
+    position: Integer = start
+    while end - position > parameters.minimum:
+        limit: Integer = min(position + parameters.maximum, end)
+        cut: Integer = limit
+        search: Integer = position + parameters.minimum
+        while True:
+            found: Integer = data.find(ANCHOR, search, limit - len(ANCHOR))
+            if found < 0:
+                break
+            if data[found + len(ANCHOR)] & ANCHOR_MASK == 0:
+                cut = found + len(ANCHOR) + 1
+                break
+            search = found + 1
+        boundaries.append(cut)
+        position = cut
+    if position < end:
+        boundaries.append(end)
+    return boundaries
+
+
+def scan_window(
+    path: String,
+    offset: Integer,
+    length: Integer,
+    parameters: ChunkParameters,
+) -> t.List[ChunkSpan]:
+    """
+    Chunks of a window of a file. Runs in a worker process.
+    """
+    if length == 0:
+        return []
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), length, access=mmap.ACCESS_READ, offset=offset) as data:
+            view: memoryview = memoryview(data)
+            try:
+                spans: t.List[ChunkSpan] = []
+                start: Integer = 0
+                for end in find_boundaries(data, 0, length, parameters):
+                    spans.append((offset + start, end - start, chunk_digest(view[start:end])))
+                    start = end
+                return spans
+            finally:
+                view.release()
+
+
+CODECS: t.Dict[String, t.Tuple[Integer, t.Callable[[Bytes, Integer], Bytes], t.Callable[[Bytes], Bytes]]] = {
+    'raw': (0, lambda data, level: data, lambda data: data),
+    'zlib': (1, zlib.compress, zlib.decompress),
+    'lzma': (2, lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+CODEC_NAMES: t.Dict[Integer, String] = {tag: name for name, (tag, _, _) in CODECS.items()}
+
+
+def pack_chunk(
+    path: String,
+    offset: Integer,
+    size: Integer,
+    digest: String,
+    codec: String,
+    level: Integer,
+) -> Bytes:
+    """
+    Reads a chunk back, checks it is still what was scanned and
+    compresses it; chunks that do not compress are stored as they are.
+    The first byte of the result tells how. Runs in a worker process.
+    """
+    descriptor: Integer = os.open(path, os.O_RDONLY)
+    try:
+        data: Bytes = os.pread(descriptor, size, offset)
+    finally:
+        os.close(descriptor)
+    if len(data) != size or chunk_digest(data) != digest:
+        raise ChunkChanged(f'"{path}" changed at {offset} while being read')
+    tag, compress, _ = CODECS[codec]
+    packed: Bytes = compress(data, level)
+    if len(packed) >= size - size // 32:
+        return bytes((CODECS['raw'][0],)) + data
+    return bytes((tag,)) + packed
+
+
+def unpack_chunk(payload: Bytes, digest: String) -> Bytes:
+    """
+    Decompresses a stored chunk and checks its content against the digest.
+    Runs in a worker process.
+    """
+    if not payload or payload[0] not in CODEC_NAMES:
+        raise ChunkChanged(f'Chunk {digest} is not a stored chunk')
+    data: Bytes = CODECS[CODEC_NAMES[payload[0]]][2](payload[1:])
+    if chunk_digest(data) != digest:
+        raise ChunkChanged(f'Chunk {digest} does not match its digest')
+    return data
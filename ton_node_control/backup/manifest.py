@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+from dataclasses import dataclass, field
+
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+MANIFEST_VERSION: t.Final[Integer] = 1
+
+
+class BackupError(TonNodeControlError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredChunk:
+    size: Integer
+    stored_size: Integer
+
+
+@dataclass
+class FileEntry:
+    """
+    A file of the snapshot, its content being the concatenation of its
+    chunks. "device", "inode" and "mtime" tell the next snapshot whether
+    the chunks can be reused without reading the file again.
+    """
+
+    path: String
+    size: Integer
+    mode: Integer
+    mtime: Integer
+    device: Integer = 0
+    inode: Integer = 0
+    chunks: t.List[String] = field(default_factory=list)
+    link: t.Optional[String] = None
+
+    def is_unchanged(self, size: Integer, mtime: Integer, device: Integer, inode: Integer) -> bool:
+        return (self.size, self.mtime, self.device, self.inode) == (size, mtime, device, inode)
+
+
+@dataclass
+class Manifest:
+    name: String
+    created: float
+    files: t.List[FileEntry] = field(default_factory=list)
+    chunks: t.Dict[String, StoredChunk] = field(default_factory=dict)
+    parameters: t.Dict[String, t.Any] = field(default_factory=dict)
+
+    @property
+    def size(self) -> Integer:
+        return sum(entry.size for entry in self.files)
+
+    @property
+    def stored_size(self) -> Integer:
+        return sum(chunk.stored_size for chunk in self.chunks.values())
+
+    def to_json(self) -> Bytes:
+        return json.dumps(
+            {
+                'version': MANIFEST_VERSION,
+                'name': self.name,
+                'created': self.created,
+                'parameters': self.parameters,
+                'chunks': {
+                    digest: [chunk.size, chunk.stored_size]
+                    for digest, chunk in self.chunks.items()
+                },
+                'files': [
+                    {
+                        'path': entry.path,
+                        'size': entry.size,
+                        'mode': entry.mode,
+                        'mtime': entry.mtime,
+                        'device': entry.device,
+                        'inode': entry.inode,
+                        'chunks': entry.chunks,
+                        **({'link': entry.link} if entry.link is not None else {}),
+                    }
+                    for entry in self.files
+                ],
+            },
+            separators=(',', ':'),
+        ).encode()
+
+    @classmethod
+    def from_json(cls, data: t.Union[Bytes, String]) -> Manifest:
+        try:
+            raw: t.Dict[String, t.Any] = json.loads(data)
+        except ValueError as error:
+            raise BackupError(f'Unreadable manifest: {error}') from None
+        if raw.get('version') != MANIFEST_VERSION:
+            raise BackupError(f'Unsupported manifest version {raw.get("version")}')
+        return cls(
+            name=raw['name'],
+            created=raw['created'],
+            parameters=raw.get('parameters', {}),
+            chunks={
+                digest: StoredChunk(size, stored_size)
+                for digest, (size, stored_size) in raw['chunks'].items()
+            },
+            files=[FileEntry(**entry) for entry in raw['files']],
+        )
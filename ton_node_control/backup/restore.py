@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import stat
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from ton_node_control.backup.chunking import unpack_chunk
+from ton_node_control.backup.manifest import BackupError, FileEntry, Manifest
+from ton_node_control.backup.targets import BackupTarget, gather_or_cancel
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+DEFAULT_WORKERS: t.Final[Integer] = os.cpu_count() or 1
+DEFAULT_FETCHES: t.Final[Integer] = 8
+FETCH_ATTEMPTS: t.Final[Integer] = 3
+CHECKPOINT_BYTES: t.Final[Integer] = 256 * 1024 * 1024
+CHECKPOINT_INTERVAL: t.Final[float] = 5.0
+STATE_PREFIX: t.Final[String] = '.restore-'
+
+# Where a chunk goes: index of the file, index of the chunk in it, offset.
+Placement = t.Tuple[Integer, Integer, Integer]
+
+
+@dataclass
+class StageProgress:
+    bytes: Integer = 0
+    chunks: Integer = 0
+    # Time spent in the stage summed over everything running in parallel.
+    busy: float = 0.0
+
+    def add(self, size: Integer, started: float) -> None:
+        self.bytes += size
+        self.chunks += 1
+        self.busy += time.monotonic() - started
+
+
+@dataclass
+class RestoreProgress:
+    name: String
+    total_bytes: Integer
+    total_chunks: Integer
+    skipped_bytes: Integer = 0
+    fetch: StageProgress = field(default_factory=StageProgress)
+    decompress: StageProgress = field(default_factory=StageProgress)
+    write: StageProgress = field(default_factory=StageProgress)
+    files: Integer = 0
+    started: float = field(default_factory=time.monotonic)
+    duration: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self.duration or time.monotonic() - self.started
+
+    @property
+    def done_bytes(self) -> Integer:
+        return self.skipped_bytes + self.write.bytes
+
+    def throughput(self, stage: StageProgress) -> float:
+        return stage.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class RestoreState:
+    """
+    Journal of the chunks already in place, next to the restored files. A
+    chunk is only journaled after the data of every file written since
+    the previous checkpoint reached the disk, so after an interruption the
+    restore continues with whatever is not journaled.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.done: t.Set[t.Tuple[Integer, Integer]] = set()
+        self._pending: t.List[t.Tuple[Integer, Integer]] = []
+        self._dirty: t.Set[Path] = set()
+        self._pending_bytes: Integer = 0
+        self._checkpointed_at: float = time.monotonic()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            lines: t.List[String] = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            file_index, _, chunk_index = line.partition(' ')
+            # A torn last line is simply not done.
+            if file_index.isdigit() and chunk_index.isdigit():
+                self.done.add((int(file_index), int(chunk_index)))
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def mark(self, path: Path, file_index: Integer, chunk_index: Integer, size: Integer) -> None:
+        self._pending.append((file_index, chunk_index))
+        self._dirty.add(path)
+        self._pending_bytes += size
+
+    def is_due(self) -> bool:
+        return self._pending_bytes >= CHECKPOINT_BYTES or (
+            bool(self._pending) and time.monotonic() - self._checkpointed_at >= CHECKPOINT_INTERVAL
+        )
+
+    def take(self) -> t.Tuple[t.List[t.Tuple[Integer, Integer]], t.Set[Path]]:
+        """
+        Chunks marked since the last checkpoint, and the files they went to.
+        """
+        batch: t.Tuple[t.List[t.Tuple[Integer, Integer]], t.Set[Path]] = (self._pending, self._dirty)
+        self._pending, self._dirty, self._pending_bytes = [], set(), 0
+        self._checkpointed_at = time.monotonic()
+        return batch
+
+    def checkpoint(self, batch: t.Tuple[t.List[t.Tuple[Integer, Integer]], t.Set[Path]]) -> None:
+        """
+        Flushes the files of a batch, then journals its chunks. Blocking.
+        """
+        chunks, dirty = batch
+        for path in dirty:
+            # Read-only is enough, and works for files already given
+            # their final read-only mode.
+            descriptor: Integer = os.open(path, os.O_RDONLY)
+            try:
+                os.fdatasync(descriptor)
+            finally:
+                os.close(descriptor)
+        with open(self.path, 'a') as file:
+            file.write(''.join(f'{file_index} {chunk_index}\n' for file_index, chunk_index in chunks))
+            file.flush()
+            os.fsync(file.fileno())
+        self.done.update(chunks)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _preallocate(path: Path, size: Integer) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode: Integer = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        pass
+    else:
+        if not mode & stat.S_IWUSR:
+            # Completed and given a read-only mode before the restore was
+            # interrupted, but not journaled: writable until done again.
+            os.chmod(path, mode | stat.S_IWUSR)
+    descriptor: Integer = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(descriptor).st_size != size:
+            os.ftruncate(descriptor, size)
+        if size:
+            try:
+                # Reserves the blocks in one go, the file does not fragment
+                # however the chunks arrive.
+                os.posix_fallocate(descriptor, 0, size)
+            except OSError:
+                pass
+    finally:
+        os.close(descriptor)
+
+
+def _write_chunk(paths: t.Sequence[t.Tuple[Path, Integer]], data: Bytes) -> None:
+    for path, offset in paths:
+        descriptor: Integer = os.open(path, os.O_WRONLY)
+        try:
+            view: memoryview = memoryview(data)
+            while view:
+                view = view[os.pwrite(descriptor, view, offset + len(data) - len(view)):]
+        finally:
+            os.close(descriptor)
+
+
+def _unpack(payload: Bytes, digest: String) -> t.Tuple[Bytes, float]:
+    # Timed in the worker, waiting for a free one is not decompressing.
+    started: float = time.monotonic()
+    return unpack_chunk(payload, digest), time.monotonic() - started
+
+
+class SnapshotRestorer:
+    """
+    Restores a snapshot as a pipeline of three stages running at once:
+    chunks are fetched from the target concurrently, decompressed and
+    checked against their digest on a pool of processes, and written
+    into files preallocated at their final size. Chunks shared by several
+    files are fetched once. Progress is journaled, an interrupted restore
+    started again skips what is already in place.
+    """
+
+    def __init__(
+        self,
+        target: BackupTarget,
+        destination: t.Union[String, Path],
+        *,
+        workers: Integer = DEFAULT_WORKERS,
+        fetches: Integer = DEFAULT_FETCHES,
+        on_progress: t.Optional[t.Callable[[RestoreProgress], None]] = None,
+        progress_interval: float = 1.0,
+    ) -> None:
+        self.target: BackupTarget = target
+        self.destination: Path = Path(destination)
+        self.workers: Integer = workers
+        self.fetches: Integer = fetches
+        self.on_progress: t.Optional[t.Callable[[RestoreProgress], None]] = on_progress
+        self.progress_interval: float = progress_interval
+
+    def _path(self, entry: FileEntry) -> Path:
+        relative: PurePosixPath = PurePosixPath(entry.path)
+        if relative.is_absolute() or '..' in relative.parts:
+            raise BackupError(f'Refusing to restore "{entry.path}" outside of the destination')
+        return self.destination.joinpath(*relative.parts)
+
+    async def _load_manifest(self, name: t.Optional[String]) -> Manifest:
+        data: t.Optional[Bytes] = await self.target.get_manifest(name)
+        if data is None:
+            raise BackupError(f'No snapshot {name or "at all"} in {self.target}')
+        return Manifest.from_json(data)
+
+    async def _fetch(self, digest: String, progress: RestoreProgress) -> Bytes:
+        for attempt in range(FETCH_ATTEMPTS):
+            started: float = time.monotonic()
+            try:
+                payload: Bytes = await self.target.get_chunk(digest)
+            except BackupError:
+                if attempt + 1 == FETCH_ATTEMPTS:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            progress.fetch.add(len(payload), started)
+            return payload
+        raise AssertionError('unreachable')
+
+    async def restore(self, name: t.Optional[String] = None) -> RestoreProgress:
+        manifest: Manifest = await self._load_manifest(name)
+        state: RestoreState = RestoreState(self.destination.joinpath(f'{STATE_PREFIX}{manifest.name}'))
+        if not state.exists and self.destination.is_dir() and any(self.destination.iterdir()):
+            raise BackupError(f'"{self.destination}" is not empty and holds no interrupted restore')
+        self.destination.mkdir(parents=True, exist_ok=True)
+        state.path.touch()
+
+        paths: t.List[Path] = [self._path(entry) for entry in manifest.files]
+        placements: t.Dict[String, t.List[Placement]] = {}
+        remaining: t.List[Integer] = []
+        progress: RestoreProgress = RestoreProgress(
+            manifest.name,
+            total_bytes=manifest.size,
+            total_chunks=sum(len(entry.chunks) for entry in manifest.files),
+        )
+        for file_index, entry in enumerate(manifest.files):
+            offset: Integer = 0
+            left: Integer = 0
+            for chunk_index, digest in enumerate(entry.chunks):
+                size: Integer = manifest.chunks[digest].size
+                if (file_index, chunk_index) in state.done:
+                    progress.skipped_bytes += size
+                else:
+                    placements.setdefault(digest, []).append((file_index, chunk_index, offset))
+                    left += 1
+                offset += size
+            remaining.append(left)
+            if entry.link is None and left:
+                _preallocate(paths[file_index], entry.size)
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        in_flight: asyncio.Semaphore = asyncio.Semaphore(self.fetches * 2)
+        fetching: asyncio.Semaphore = asyncio.Semaphore(self.fetches)
+
+        def _finish(file_index: Integer) -> None:
+            entry: FileEntry = manifest.files[file_index]
+            os.chmod(paths[file_index], entry.mode)
+            os.utime(paths[file_index], ns=(entry.mtime, entry.mtime))
+            progress.files += 1
+
+        async def _restore_chunk(
+            digest: String,
+            chunk_placements: t.List[Placement],
+            pool: concurrent.futures.ProcessPoolExecutor,
+        ) -> None:
+            async with in_flight:
+                async with fetching:
+                    payload: Bytes = await self._fetch(digest, progress)
+                data, elapsed = await loop.run_in_executor(pool, _unpack, payload, digest)
+                progress.decompress.add(len(data), time.monotonic() - elapsed)
+                started: float = time.monotonic()
+                await loop.run_in_executor(
+                    None,
+                    _write_chunk,
+                    [(paths[file_index], offset) for file_index, _, offset in chunk_placements],
+                    data,
+                )
+                for file_index, chunk_index, _ in chunk_placements:
+                    progress.write.add(len(data), started)
+                    started = time.monotonic()
+                    state.mark(paths[file_index], file_index, chunk_index, len(data))
+                    remaining[file_index] -= 1
+                    if remaining[file_index] == 0:
+                        _finish(file_index)
+                if state.is_due():
+                    await loop.run_in_executor(None, state.checkpoint, state.take())
+
+        async def _report_progress() -> None:
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                t.cast(t.Callable[[RestoreProgress], None], self.on_progress)(progress)
+
+        reporter: t.Optional[asyncio.Task] = None
+        if self.on_progress is not None:
+            reporter = asyncio.ensure_future(_report_progress())
+        try:
+            with concurrent.futures.ProcessPoolExecutor(self.workers) as pool:
+                pending: t.Iterator[t.Tuple[String, t.List[Placement]]] = iter(placements.items())
+
+                async def _restore_chunks() -> None:
+                    for digest, chunk_placements in pending:
+                        await _restore_chunk(digest, chunk_placements, pool)
+
+                await gather_or_cancel(_restore_chunks() for _ in range(self.fetches * 2))
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+            await loop.run_in_executor(None, state.checkpoint, state.take())
+        for file_index, entry in enumerate(manifest.files):
+            path: Path = paths[file_index]
+            if entry.link is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if not path.is_symlink():
+                    os.symlink(entry.link, path)
+            elif not entry.chunks:
+                _preallocate(path, 0)
+                _finish(file_index)
+            elif remaining[file_index] == 0 and path.stat().st_size != entry.size:
+                raise BackupError(f'"{path}" is {path.stat().st_size} bytes instead of {entry.size}')
+        state.remove()
+        progress.duration = time.monotonic() - progress.started
+        if self.on_progress is not None:
+            self.on_progress(progress)
+        return progress
+
+
+def run_restore(
+    target: BackupTarget,
+    destination: t.Union[String, Path],
+    *,
+    name: t.Optional[String] = None,
+    workers: Integer = DEFAULT_WORKERS,
+    fetches: Integer = DEFAULT_FETCHES,
+    on_progress: t.Optional[t.Callable[[RestoreProgress], None]] = None,
+) -> RestoreProgress:
+    async def _restore() -> RestoreProgress:
+        restorer: SnapshotRestorer = SnapshotRestorer(
+            target,
+            destination,
+            workers=workers,
+            fetches=fetches,
+            on_progress=on_progress,
+        )
+        try:
+            return await restorer.restore(name)
+        finally:
+            await target.aclose()
+
+    try:
+        return asyncio.run(_restore())
+    except BackupError:
+        raise
+    except OSError as error:
+        raise BackupError(str(error)) from error
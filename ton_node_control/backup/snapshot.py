@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import fnmatch
+import os
+import stat as stat_module
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.backup.chunking import (
+    ChunkChanged,
+    ChunkParameters,
+    ChunkSpan,
+    pack_chunk,
+    scan_window,
+)
+from ton_node_control.backup.manifest import BackupError, FileEntry, Manifest, StoredChunk
+from ton_node_control.backup.targets import BackupTarget, gather_or_cancel
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+DEFAULT_WORKERS: t.Final[Integer] = os.cpu_count() or 1
+DEFAULT_UPLOADS: t.Final[Integer] = 8
+# Files read again when they change under the scan before giving up.
+READ_ATTEMPTS: t.Final[Integer] = 3
+
+
+@dataclass(frozen=True)
+class SourceFile:
+    path: Path
+    name: String
+    stat: os.stat_result
+
+
+@dataclass
+class BackupReport:
+    name: String
+    files: Integer = 0
+    reused_files: Integer = 0
+    size: Integer = 0
+    chunks: Integer = 0
+    new_chunks: Integer = 0
+    stored: Integer = 0
+    duration: float = 0.0
+    skipped: t.List[String] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.size / self.duration if self.duration > 0 else 0.0
+
+
+def collect_files(sources: t.Mapping[String, Path], exclude: t.Sequence[String] = ()) -> t.List[SourceFile]:
+    """
+    Regular files and symlinks under every source, named "<source>/<relative
+    path>" in the snapshot.
+    """
+    files: t.List[SourceFile] = []
+    for source, root in sorted(sources.items()):
+        if not root.exists():
+            continue
+        if not root.is_dir():
+            files.append(SourceFile(root, f'{source}/{root.name}', os.lstat(root)))
+            continue
+        for directory, directories, names in os.walk(root):
+            directories.sort()
+            for name in sorted(names):
+                path: Path = Path(directory, name)
+                snapshot_name: String = f'{source}/{path.relative_to(root).as_posix()}'
+                if any(fnmatch.fnmatchcase(snapshot_name, pattern) for pattern in exclude):
+                    continue
+                try:
+                    stat: os.stat_result = os.lstat(path)
+                except FileNotFoundError:
+                    continue
+                if stat_module.S_ISREG(stat.st_mode) or stat_module.S_ISLNK(stat.st_mode):
+                    files.append(SourceFile(path, snapshot_name, stat))
+    return files
+
+
+class BackupWriter:
+    """
+    Writes a snapshot of a set of directories to a target. Files are cut
+    into content-defined chunks; scanning and compression run on a pool
+    of processes while chunks are streamed to the target as soon as they
+    are ready. A chunk the target already holds is never compressed or
+    sent again, and files unchanged since the previous snapshot are not
+    even read.
+    """
+
+    def __init__(
+        self,
+        target: BackupTarget,
+        *,
+        workers: Integer = DEFAULT_WORKERS,
+        uploads: Integer = DEFAULT_UPLOADS,
+        codec: String = 'zlib',
+        level: Integer = 3,
+        parameters: ChunkParameters = ChunkParameters(),
+    ) -> None:
+        self.target: BackupTarget = target
+        self.workers: Integer = workers
+        self.uploads: Integer = uploads
+        self.codec: String = codec
+        self.level: Integer = level
+        self.parameters: ChunkParameters = parameters
+        self._uploads: t.Optional[asyncio.Semaphore] = None
+        self._tasks: t.Optional[asyncio.Semaphore] = None
+        self._pool: t.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._chunks: t.Dict[String, StoredChunk] = {}
+        self._stored: t.Dict[String, asyncio.Future] = {}
+        self._report: BackupReport = BackupReport('')
+
+    async def _run(self, function: t.Callable[..., t.Any], *arguments: t.Any) -> t.Any:
+        async with t.cast(asyncio.Semaphore, self._tasks):
+            return await asyncio.get_running_loop().run_in_executor(self._pool, function, *arguments)
+
+    async def _store(self, source: SourceFile, span: ChunkSpan) -> None:
+        offset, size, digest = span
+        if digest in self._chunks:
+            # Listed by the previous manifest: no need to ask the target.
+            return
+        stored_size: t.Optional[Integer] = await self.target.stored_size(digest)
+        if stored_size is not None:
+            # Left by an older snapshot than the previous one.
+            self._chunks[digest] = StoredChunk(size, stored_size)
+            return
+        payload: Bytes = await self._run(pack_chunk, str(source.path), offset, size, digest, self.codec, self.level)
+        async with t.cast(asyncio.Semaphore, self._uploads):
+            await self.target.put_chunk(digest, payload)
+        self._chunks[digest] = StoredChunk(size, len(payload))
+        self._report.new_chunks += 1
+        self._report.stored += len(payload)
+
+    def _ensure_stored(self, source: SourceFile, span: ChunkSpan) -> asyncio.Future:
+        # Equal chunks of several files are stored once, whoever gets
+        # there first does it and the others wait for it.
+        digest: String = span[2]
+        future: t.Optional[asyncio.Future] = self._stored.get(digest)
+        if future is None or (future.done() and future.exception() is not None):
+            future = self._stored[digest] = asyncio.ensure_future(self._store(source, span))
+        return future
+
+    async def _scan(self, source: SourceFile) -> t.List[ChunkSpan]:
+        size: Integer = source.stat.st_size
+        window: Integer = self.parameters.window
+        windows: t.List[t.List[ChunkSpan]] = await asyncio.gather(*(
+            self._run(scan_window, str(source.path), offset, min(window, size - offset), self.parameters)
+            for offset in range(0, size, window)
+        ))
+        return [span for window in windows for span in window]
+
+    async def _backup_file(self, source: SourceFile, previous: t.Optional[FileEntry]) -> t.Optional[FileEntry]:
+        stat: os.stat_result = source.stat
+        entry: FileEntry = FileEntry(
+            path=source.name,
+            size=stat.st_size,
+            mode=stat_module.S_IMODE(stat.st_mode),
+            mtime=stat.st_mtime_ns,
+            device=stat.st_dev,
+            inode=stat.st_ino,
+        )
+        if stat_module.S_ISLNK(stat.st_mode):
+            entry.size, entry.link = 0, os.readlink(source.path)
+            return entry
+        if previous is not None and previous.is_unchanged(stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino):
+            entry.chunks = previous.chunks
+            self._report.reused_files += 1
+            return entry
+        for _ in range(READ_ATTEMPTS):
+            try:
+                spans: t.List[ChunkSpan] = await self._scan(source)
+                await asyncio.gather(*(self._ensure_stored(source, span) for span in spans))
+            except (ChunkChanged, ValueError):
+                # Being written to (or truncated, which fails the mapping
+                # of a window), read it again as it is now.
+                source = dataclasses.replace(source, stat=os.lstat(source.path))
+                entry.size, entry.mtime = source.stat.st_size, source.stat.st_mtime_ns
+                continue
+            except FileNotFoundError:
+                return None
+            entry.chunks = [digest for _, _, digest in spans]
+            return entry
+        self._report.skipped.append(source.name)
+        return None
+
+    async def _previous_manifest(self) -> t.Optional[Manifest]:
+        data: t.Optional[Bytes] = await self.target.get_manifest()
+        return None if data is None else Manifest.from_json(data)
+
+    async def backup(
+        self,
+        sources: t.Mapping[String, Path],
+        name: String,
+        *,
+        exclude: t.Sequence[String] = (),
+    ) -> BackupReport:
+        started: float = time.monotonic()
+        self._report = BackupReport(name)
+        self._tasks = asyncio.Semaphore(self.workers * 2)
+        self._uploads = asyncio.Semaphore(self.uploads)
+        self._chunks, self._stored = {}, {}
+        previous: t.Optional[Manifest] = await self._previous_manifest()
+        previous_files: t.Dict[String, FileEntry] = {}
+        if previous is not None:
+            # Chunks listed by the previous manifest are known to be stored.
+            self._chunks.update(previous.chunks)
+            previous_files = {entry.path: entry for entry in previous.files}
+        files: t.List[SourceFile] = collect_files(sources, exclude)
+        manifest: Manifest = Manifest(
+            name=name,
+            created=time.time(),
+            parameters={**dataclasses.asdict(self.parameters), 'codec': self.codec},
+        )
+        entries: t.List[t.Optional[FileEntry]] = [None] * len(files)
+        pending: t.Iterator[t.Tuple[Integer, SourceFile]] = iter(enumerate(files))
+
+        async def _backup_files() -> None:
+            for index, source in pending:
+                entries[index] = await self._backup_file(source, previous_files.get(source.name))
+
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as self._pool:
+            # A few files at a time per worker keep the pool busy, more
+            # would only hold more chunks in memory.
+            await gather_or_cancel(_backup_files() for _ in range(self.workers * 4))
+        self._pool = None
+        manifest.files = [entry for entry in entries if entry is not None]
+        used: t.Set[String] = {digest for entry in manifest.files for digest in entry.chunks}
+        manifest.chunks = {digest: chunk for digest, chunk in self._chunks.items() if digest in used}
+        await self.target.put_manifest(name, manifest.to_json())
+        report: BackupReport = self._report
+        report.files = len(manifest.files)
+        report.size = manifest.size
+        report.chunks = len(used)
+        report.duration = time.monotonic() - started
+        return report
+
+
+def default_snapshot_name() -> String:
+    return time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+
+
+def run_backup(
+    target: BackupTarget,
+    sources: t.Mapping[String, Path],
+    *,
+    name: t.Optional[String] = None,
+    exclude: t.Sequence[String] = (),
+    workers: Integer = DEFAULT_WORKERS,
+    codec: String = 'zlib',
+    level: Integer = 3,
+) -> BackupReport:
+    async def _backup() -> BackupReport:
+        writer: BackupWriter = BackupWriter(target, workers=workers, codec=codec, level=level)
+        try:
+            return await writer.backup(sources, name or default_snapshot_name(), exclude=exclude)
+        finally:
+            await target.aclose()
+
+    try:
+        return asyncio.run(_backup())
+    except BackupError:
+        raise
+    except OSError as error:
+        raise BackupError(str(error)) from error
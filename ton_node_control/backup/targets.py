@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import typing as t
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import httpx
+
+from ton_node_control.backup.manifest import BackupError
+from ton_node_control.core.datasources import get_client_pool
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+LATEST: t.Final[String] = 'LATEST'
+HTTP_TIMEOUT: httpx.Timeout = httpx.Timeout(120.0, connect=10.0)
+
+
+class BackupTarget(ABC):
+    """
+    Where snapshots are kept: chunks stored by digest, shared by every
+    snapshot, and one manifest per snapshot.
+    """
+
+    @staticmethod
+    def chunk_name(digest: String) -> String:
+        return f'chunks/{digest[:2]}/{digest}'
+
+    @staticmethod
+    def manifest_name(name: String) -> String:
+        return f'manifests/{name}.json'
+
+    @abstractmethod
+    async def read(self, name: String) -> t.Optional[Bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def write(self, name: String, data: Bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def size(self, name: String) -> t.Optional[Integer]:
+        """
+        Size of a stored object, None when there is none.
+        """
+        raise NotImplementedError
+
+    async def stored_size(self, digest: String) -> t.Optional[Integer]:
+        return await self.size(self.chunk_name(digest))
+
+    async def put_chunk(self, digest: String, payload: Bytes) -> None:
+        await self.write(self.chunk_name(digest), payload)
+
+    async def get_chunk(self, digest: String) -> Bytes:
+        payload: t.Optional[Bytes] = await self.read(self.chunk_name(digest))
+        if payload is None:
+            raise BackupError(f'Chunk {digest} is missing from {self}')
+        return payload
+
+    async def put_manifest(self, name: String, data: Bytes) -> None:
+        await self.write(self.manifest_name(name), data)
+        # Only a complete snapshot becomes the latest one.
+        await self.write(LATEST, name.encode())
+
+    async def get_manifest(self, name: t.Optional[String] = None) -> t.Optional[Bytes]:
+        if name is None:
+            name = await self.latest()
+            if name is None:
+                return None
+        return await self.read(self.manifest_name(name))
+
+    async def latest(self) -> t.Optional[String]:
+        data: t.Optional[Bytes] = await self.read(LATEST)
+        return None if data is None else data.decode().strip()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class LocalTarget(BackupTarget):
+    def __init__(self, directory: t.Union[String, Path]) -> None:
+        self.directory: Path = Path(directory)
+
+    def __str__(self) -> String:
+        return str(self.directory)
+
+    def _read(self, name: String) -> t.Optional[Bytes]:
+        try:
+            return self.directory.joinpath(name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: String, data: Bytes) -> None:
+        path: Path = self.directory.joinpath(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary: Path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(data)
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+    async def read(self, name: String) -> t.Optional[Bytes]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, name)
+
+    async def write(self, name: String, data: Bytes) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._write, name, data)
+
+    async def size(self, name: String) -> t.Optional[Integer]:
+        try:
+            return self.directory.joinpath(name).stat().st_size
+        except FileNotFoundError:
+            return None
+
+
+class HttpTarget(BackupTarget):
+    """
+    Any HTTP server that answers GET, HEAD and PUT on paths under the
+    base URL, such as nginx with WebDAV enabled or object storage behind
+    pre-authenticated URLs.
+    """
+
+    def __init__(self, url: String, *, headers: t.Optional[t.Dict[String, String]] = None) -> None:
+        self.url: String = url.rstrip('/')
+        self.headers: t.Dict[String, String] = headers or {}
+
+    def __str__(self) -> String:
+        return self.url
+
+    def _client(self) -> httpx.AsyncClient:
+        return get_client_pool().get(self.url, timeout=HTTP_TIMEOUT)
+
+    async def _request(self, method: String, name: String, content: t.Optional[Bytes] = None) -> httpx.Response:
+        url: String = f'{self.url}/{name}'
+        try:
+            response: httpx.Response = await self._client().request(
+                method,
+                url,
+                content=content,
+                headers=self.headers,
+            )
+        except httpx.HTTPError as error:
+            raise BackupError(f'{method} {url} failed: {error}') from error
+        if response.status_code >= 400 and response.status_code != 404:
+            raise BackupError(f'{method} {url} answered {response.status_code}')
+        return response
+
+    async def read(self, name: String) -> t.Optional[Bytes]:
+        response: httpx.Response = await self._request('GET', name)
+        return None if response.status_code == 404 else response.content
+
+    async def write(self, name: String, data: Bytes) -> None:
+        response: httpx.Response = await self._request('PUT', name, data)
+        if response.status_code == 404:
+            raise BackupError(f'PUT {self.url}/{name} answered 404')
+
+    async def size(self, name: String) -> t.Optional[Integer]:
+        response: httpx.Response = await self._request('HEAD', name)
+        if response.status_code == 404:
+            return None
+        return int(response.headers.get('content-length', 0))
+
+    async def aclose(self) -> None:
+        await get_client_pool().aclose()
+
+
+async def gather_or_cancel(coroutines: t.Iterable[t.Awaitable[t.Any]]) -> t.List[t.Any]:
+    """
+    Like "asyncio.gather", but the first failure cancels the others and
+    waits for them, nothing keeps using the target once it is closed.
+    """
+    tasks: t.List[asyncio.Future] = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def open_target(location: String) -> BackupTarget:
+    if location.startswith(('http://', 'https://')):
+        return HttpTarget(location)
+    return LocalTarget(location)
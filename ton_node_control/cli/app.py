@@ -1,16 +1,63 @@
+import asyncio
+import math
+import time
 import typing as t
 
 import click
 
 from pathlib import Path
 
+from ton_node_control.backup import (
+    BackupError,
+    BackupReport,
+    RestoreProgress,
+    open_target,
+    run_backup,
+    run_restore,
+)
+from ton_node_control.cli.utils.duration import Duration, Moment
+from ton_node_control.cli.utils.forwarding import ForwardingCommandCollection, ForwardingGroup
+from ton_node_control.cli.utils.messages import error
+from ton_node_control.cli.utils.paths import WorkingPath
+from ton_node_control.cli.utils.size import Size
+from ton_node_control.core.client.validator_console import BaseValidatorConsole
+from ton_node_control.core.contracts import Contract, ContractArtifact, ContractBuilder
+from ton_node_control.core.exceptions import ConsoleError
+from ton_node_control.daemon import socket_path
+from ton_node_control.daemon.server import Daemon, DaemonError, get_default_tasks
+from ton_node_control.disk import (
+    ArchivePruner,
+    ArchiveSlice,
+    DiskAnalyzer,
+    DiskLatencyMonitor,
+    DiskUsage,
+    DiskUsageError,
+    PruneReport,
+    find_archive_slices,
+    format_size,
+    growth_rate,
+    record_usage,
+    select_slices,
+)
+from ton_node_control.exporter import MetricsExporter
+from ton_node_control.logs import LineFilter, LogFollower, LogIndex, LogLevel, get_log_index
+from ton_node_control.metrics import Aggregate, HistoryStore, MetricsError, get_history_store
+from ton_node_control.settings import Settings, get_settings
+from ton_node_control.status import (
+    StatusReport,
+    collect_status,
+    find_process,
+    get_default_probes,
+    get_validator_console,
+    render_report,
+)
 from ton_node_control.tools.installer import Installer
 from ton_node_control.tools.installer._cursor import Cursor
 from ton_node_control.utils.typing import Integer
 
-main = click.Group()
+main = ForwardingGroup()
 wallet_commands = click.Group()
-cmds = click.CommandCollection(
+cmds = ForwardingCommandCollection(
     sources=[main, wallet_commands]
 )
 
@@ -30,6 +77,417 @@ def installer() -> Integer:
     return 1
 
 
+@main.command
+@click.option(
+    '--budget',
+    default=0.9,
+    type=float,
+    show_default=True,
+    help='Seconds to wait for the slowest probe.',
+)
+@click.option(
+    '--record',
+    default=False,
+    is_flag=True,
+    help='Append the numeric values to the node history.',
+)
+def status(budget: float, record: bool) -> Integer:
+    report: StatusReport = collect_status(budget=budget)
+    click.echo(render_report(report))
+    if record is True:
+        store: HistoryStore = get_history_store()
+        store.record_many(report.values())
+        store.enforce_retention()
+    return 1
+
+
+@main.command
+@click.argument('series', required=False)
+@click.option(
+    '--since',
+    default='1h',
+    type=Duration(),
+    show_default=True,
+    help='Window to summarise, e.g. "30m", "6h" or "7d".',
+)
+def history(series: t.Optional[str], since: float) -> Integer:
+    store: HistoryStore = get_history_store()
+    if series is None:
+        click.echo('\n'.join(store.names()))
+        return 1
+    try:
+        aggregate: t.Optional[Aggregate] = store.aggregate(series, time.time() - since)
+    except MetricsError as exception:
+        raise error(str(exception))
+    if aggregate is None:
+        raise error(f'No samples of "{series}" in the window')
+    click.echo(
+        f'{series}: {aggregate.count} samples, '
+        f'min {aggregate.minimum:g}, max {aggregate.maximum:g}, '
+        f'avg {aggregate.average:g}, last {aggregate.last:g}',
+    )
+    return 1
+
+
+@main.command
+@click.option('--host', default='0.0.0.0', show_default=True, help='Address to listen on.')
+@click.option('--port', default=9150, type=int, show_default=True, help='Port to listen on.')
+@click.option(
+    '--interval',
+    default='15s',
+    type=Duration(),
+    show_default=True,
+    help='How often the status is collected.',
+)
+@click.option(
+    '--budget',
+    default=5.0,
+    type=float,
+    show_default=True,
+    help='Seconds to wait for the slowest probe.',
+)
+def exporter(host: str, port: int, interval: float, budget: float) -> Integer:
+    metrics_exporter: MetricsExporter = MetricsExporter(
+        get_default_probes(get_settings(), timeout=budget),
+        interval=interval,
+        budget=budget,
+    )
+    try:
+        asyncio.run(metrics_exporter.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    return 1
+
+
+@main.command
+@click.option('--socket', 'path', default=None, help=f'Unix socket to listen on, "{socket_path()}" by default.')
+@click.option(
+    '--status-every',
+    default='1m',
+    type=Duration(),
+    show_default=True,
+    help='How often the status is added to the node history, on the next masterchain block, "0s" never.',
+)
+@click.option(
+    '--disk-every',
+    default='1h',
+    type=Duration(),
+    show_default=True,
+    help='How often disk usage is added to the node history, on the next masterchain block, "0s" never.',
+)
+@click.option(
+    '--index-logs-every',
+    default='1m',
+    type=Duration(),
+    show_default=True,
+    help='How often the time index of the node log is brought up to date, "0s" never.',
+)
+def daemon(path: t.Optional[str], status_every: float, disk_every: float, index_logs_every: float) -> Integer:
+    server: Daemon = Daemon(
+        cmds,
+        path=path,
+        tasks=get_default_tasks(
+            status_interval=status_every,
+            disk_interval=disk_every,
+            log_index_interval=index_logs_every,
+        ),
+    )
+    click.echo(f'Listening on {server.path}')
+    try:
+        server.serve_forever()
+    except DaemonError as exception:
+        raise error(str(exception))
+    except KeyboardInterrupt:
+        pass
+    return 1
+
+
+@main.command
+@click.argument('path', required=False, type=WorkingPath(file_okay=False, path_type=Path))
+@click.option('--workers', default=None, type=int, help='Directories listed in parallel.')
+@click.option('--full', default=False, is_flag=True, help='List every directory instead of reusing unchanged ones.')
+@click.option(
+    '--window',
+    default='1d',
+    type=Duration(),
+    show_default=True,
+    help='Window the growth rates are averaged over.',
+)
+@click.option('--no-record', default=False, is_flag=True, help='Do not add the scan to the node history.')
+def disk(path: t.Optional[Path], workers: t.Optional[int], full: bool, window: float, no_record: bool) -> Integer:
+    analyzer: DiskAnalyzer = DiskAnalyzer(path or get_settings().node.database)
+    if workers is not None:
+        analyzer.workers = workers
+    try:
+        usage: DiskUsage = analyzer.scan(full=full)
+    except DiskUsageError as exception:
+        raise error(str(exception))
+    store: HistoryStore = get_history_store()
+    if no_record is False:
+        record_usage(usage, store)
+    rows: t.List[t.Tuple[str, int, int, t.Optional[float]]] = [
+        (component, total.allocated, total.files, growth_rate(store, component, window))
+        for component, total in usage.components().items()
+    ]
+    rows.append(('total', usage.total.allocated, usage.total.files, growth_rate(store, 'total', window)))
+    for component, allocated, files, rate in rows:
+        growth: str = '' if rate is None else f'{format_size(rate * 86400)}/day'
+        click.echo(f'{component:<16} {format_size(allocated):>12} {files:>12,} files  {growth}')
+    click.echo(
+        f'Scanned {usage.scanned:,} directories, {usage.reused:,} unchanged, in {usage.duration:.2f}s',
+    )
+    return 1
+
+
+@main.command
+@click.option(
+    '--older-than',
+    default='7d',
+    type=Duration(),
+    show_default=True,
+    help='Only remove archive slices untouched for this long.',
+)
+@click.option('--below', default=None, type=int, help='Only remove packages below this masterchain seqno.')
+@click.option('--keep', default=2, type=int, show_default=True, help='Newest archive packages never removed.')
+@click.option('--rate', default='64M', type=Size(), show_default=True, help='Bytes freed per second.')
+@click.option('--ops', default=200.0, type=float, show_default=True, help='Filesystem operations per second.')
+@click.option(
+    '--max-lag',
+    default='20s',
+    type=Duration(),
+    show_default=True,
+    help='Slow down while the node is further behind than this.',
+)
+@click.option(
+    '--max-latency',
+    default=50.0,
+    type=float,
+    show_default=True,
+    help='Slow down while disk requests take longer than this, in milliseconds.',
+)
+@click.option('--dry-run', default=False, is_flag=True, help='Only list what would be removed.')
+def prune(
+    older_than: float,
+    below: t.Optional[int],
+    keep: int,
+    rate: int,
+    ops: float,
+    max_lag: float,
+    max_latency: float,
+    dry_run: bool,
+) -> Integer:
+    settings: Settings = get_settings()
+    slices: t.List[ArchiveSlice] = select_slices(
+        find_archive_slices(settings.node.database),
+        older_than=older_than,
+        below_package=below,
+        keep=keep,
+    )
+    total: int = sum(item.size for item in slices)
+    if dry_run is True or not slices:
+        for item in slices:
+            click.echo(f'{format_size(item.size):>12}  {item.path}')
+        click.echo(f'{len(slices)} archive slices, {format_size(total)}')
+        return 1
+    console: BaseValidatorConsole = get_validator_console(settings, 5.0)
+
+    def sync_lag() -> float:
+        return console.get_stats().sync_lag
+
+    pruner: ArchivePruner = ArchivePruner(
+        bytes_per_second=rate,
+        operations_per_second=ops,
+        max_sync_lag=max_lag,
+        max_latency=max_latency,
+        lag_source=sync_lag,
+        latency_monitor=DiskLatencyMonitor(settings.node.database),
+        validator_pid=find_process(settings.node.process_name),
+    )
+    click.echo(f'Removing {len(slices)} archive slices, {format_size(total)}')
+    report: PruneReport = pruner.prune(slices)
+    click.echo(
+        f'Freed {format_size(report.freed)} from {report.slices} slices in {report.duration:.1f}s, '
+        f'{format_size(report.throughput)}/s, {report.operations} operations, '
+        f'{report.throttled:.1f}s throttled, {report.backoffs} back-offs',
+    )
+    if report.lag_before is not None:
+        click.echo(
+            f'Sync lag: {report.lag_before:.0f}s before, {report.lag_max:.0f}s at most, '
+            f'{report.lag_after:.0f}s after',
+        )
+    if report.skipped:
+        click.echo(f'Skipped {len(report.skipped)} slices the validator has open')
+    return 1
+
+
+@main.command
+@click.argument('destination')
+@click.option('--name', default=None, help='Snapshot name, the current UTC time by default.')
+@click.option('--workers', default=None, type=int, help='Processes scanning and compressing chunks.')
+@click.option('--exclude', multiple=True, help='Snapshot paths to leave out, e.g. "db/archive/*".')
+@click.option('--codec', default='zlib', type=click.Choice(['zlib', 'lzma', 'raw']), show_default=True)
+@click.option('--level', default=3, type=int, show_default=True, help='Compression level.')
+def backup(
+    destination: str,
+    name: t.Optional[str],
+    workers: t.Optional[int],
+    exclude: t.Tuple[str, ...],
+    codec: str,
+    level: int,
+) -> Integer:
+    """
+    Snapshot the node keys and database to a directory or an HTTP URL.
+    Stop the node first, or point the database at a filesystem snapshot.
+    """
+    settings: Settings = get_settings()
+    sources: t.Dict[str, Path] = {
+        'db': settings.node.database,
+        'keys': settings.console.client_key.parent,
+    }
+    try:
+        report: BackupReport = run_backup(
+            open_target(destination),
+            sources,
+            name=name,
+            exclude=exclude,
+            codec=codec,
+            level=level,
+            **({'workers': workers} if workers is not None else {}),
+        )
+    except BackupError as exception:
+        raise error(str(exception))
+    click.echo(
+        f'Snapshot "{report.name}": {report.files:,} files, {format_size(report.size)} in {report.duration:.1f}s '
+        f'({format_size(report.throughput)}/s)',
+    )
+    click.echo(
+        f'{report.chunks:,} chunks, {report.new_chunks:,} new, {format_size(report.stored)} stored, '
+        f'{report.reused_files:,} files unchanged',
+    )
+    for skipped in report.skipped:
+        click.echo(f'Skipped "{skipped}", it kept changing while being read')
+    return 1
+
+
+def _render_restore_progress(progress: RestoreProgress) -> str:
+    stages: str = ', '.join(
+        f'{name} {format_size(progress.throughput(stage))}/s'
+        for name, stage in (
+            ('fetch', progress.fetch),
+            ('decompress', progress.decompress),
+            ('write', progress.write),
+        )
+    )
+    percent: float = 100 * progress.done_bytes / progress.total_bytes if progress.total_bytes else 100.0
+    return f'{percent:5.1f}% of {format_size(progress.total_bytes)}, {stages}'
+
+
+@main.command
+@click.argument('source')
+@click.argument('destination', type=click.Path(file_okay=False, path_type=Path))
+@click.option('--name', default=None, help='Snapshot to restore, the latest by default.')
+@click.option('--workers', default=None, type=int, help='Processes decompressing chunks.')
+@click.option('--fetches', default=8, type=int, show_default=True, help='Chunks downloaded at once.')
+def restore(source: str, destination: Path, name: t.Optional[str], workers: t.Optional[int], fetches: int) -> Integer:
+    """
+    Restore a snapshot from a directory or an HTTP URL. Started again
+    after an interruption, it continues where it stopped.
+    """
+    try:
+        progress: RestoreProgress = run_restore(
+            open_target(source),
+            destination,
+            name=name,
+            fetches=fetches,
+            on_progress=lambda current: click.echo(_render_restore_progress(current), err=True),
+            **({'workers': workers} if workers is not None else {}),
+        )
+    except BackupError as exception:
+        raise error(str(exception))
+    click.echo(
+        f'Restored snapshot "{progress.name}": {progress.files:,} files in {progress.duration:.1f}s'
+        + (f', {format_size(progress.skipped_bytes)} already in place' if progress.skipped_bytes else ''),
+    )
+    return 1
+
+
+@main.command
+@click.argument('sources', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--name', default=None, help='Contract name, the last source file name by default.')
+@click.option('--option', 'options', multiple=True, help='Option passed to "func", "-SPA" by default.')
+@click.option('--force', default=False, is_flag=True, help='Compile even if an up to date build is cached.')
+def build_contract(
+    sources: t.Tuple[Path, ...],
+    name: t.Optional[str],
+    options: t.Tuple[str, ...],
+    force: bool,
+) -> Integer:
+    """
+    Compile FunC sources, "stdlib.fc" first, to a BOC and print its path.
+    Builds are cached by the content of every file the sources include.
+    """
+    builder: ContractBuilder = ContractBuilder()
+    contract: Contract = Contract.make(name or sources[-1].stem, *sources, options=options or ('-SPA',))
+    try:
+        artifact: ContractArtifact = builder.build(contract, force=force)
+    except (ConsoleError, FileNotFoundError) as exception:
+        log: t.Optional[str] = getattr(exception, 'log', None)
+        raise error(f'{exception}\n{log}' if log else str(exception))
+    click.echo(f'{artifact.boc_path}{" (cached)" if artifact.cached else ""}')
+    return 1
+
+
+@main.command
+@click.argument('path', required=False, type=click.Path(dir_okay=False, path_type=Path))
+@click.option('-f', '--follow', default=False, is_flag=True, help='Keep printing lines as they are written.')
+@click.option('-g', '--grep', default=None, help='Only print lines matching this regular expression.')
+@click.option('-i', '--ignore-case', default=False, is_flag=True, help='Match "--grep" case-insensitively.')
+@click.option(
+    '-l',
+    '--level',
+    default=None,
+    type=click.Choice([level.name for level in LogLevel]),
+    help='Only print lines of this level or more severe.',
+)
+@click.option('-n', '--lines', default=10, type=int, show_default=True, help='Lines of history to start with.')
+@click.option('--since', default=None, type=Moment(), help='Only lines logged since, e.g. "2022-10-19 03:10" or "15m".')
+@click.option('--until', default=None, type=Moment(), help='Only lines logged before, same format as "--since".')
+def logs(
+    path: t.Optional[Path],
+    follow: bool,
+    grep: t.Optional[str],
+    ignore_case: bool,
+    level: t.Optional[str],
+    lines: int,
+    since: t.Optional[float],
+    until: t.Optional[float],
+) -> Integer:
+    line_filter: LineFilter = LineFilter(
+        pattern=grep,
+        max_level=None if level is None else LogLevel.parse(level),
+        ignore_case=ignore_case,
+    )
+    output: t.BinaryIO = click.get_binary_stream('stdout')
+    if since is not None or until is not None:
+        if follow is True:
+            raise error('"--follow" cannot be combined with "--since" or "--until"')
+        index: LogIndex = get_log_index(path or get_settings().node.log)
+        for line in index.query(since or 0.0, until or math.inf):
+            output.writelines(matched + b'\n' for matched in line_filter.lines(line + b'\n'))
+        output.flush()
+        return 1
+    # Searching without following looks through the whole file, like grep.
+    from_start: bool = not follow and not line_filter.is_pass_through
+    follower: LogFollower = LogFollower(path or get_settings().node.log, lines=lines, from_start=from_start)
+    try:
+        for chunk in follower.chunks(follow=follow):
+            output.writelines(line + b'\n' for line in line_filter.lines(chunk))
+            output.flush()
+    except KeyboardInterrupt:
+        pass
+    return 1
+
+
 @wallet_commands.command
 def test_wallet_command():
     pass
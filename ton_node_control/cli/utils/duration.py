@@ -0,0 +1,75 @@
+import calendar
+import re
+import time
+import typing as t
+
+import click
+
+DURATION_REGEX = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$')
+DURATION_UNITS: t.Dict[str, float] = {
+    '': 1.0,
+    's': 1.0,
+    'm': 60.0,
+    'h': 3600.0,
+    'd': 86400.0,
+    'w': 604800.0,
+}
+
+
+def parse_duration(text: str) -> float:
+    match: t.Optional[t.Match] = DURATION_REGEX.match(text)
+    if match is None:
+        raise ValueError(f'Invalid duration "{text}", expected e.g. "90s", "15m", "6h" or "7d"')
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+class Duration(click.ParamType):
+    name = 'duration'
+
+    def convert(
+        self,
+        value: t.Any,
+        parameter: t.Optional[click.Parameter],
+        context: t.Optional[click.Context],
+    ) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return parse_duration(value)
+        except ValueError as error:
+            self.fail(str(error), parameter, context)
+
+
+MOMENT_FORMATS: t.Tuple[str, ...] = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+
+def parse_moment(text: str, now: t.Optional[float] = None) -> float:
+    """
+    Unix time of an UTC date and time, or of a duration ago.
+    """
+    for moment_format in MOMENT_FORMATS:
+        try:
+            return calendar.timegm(time.strptime(text.strip(), moment_format))
+        except ValueError:
+            continue
+    try:
+        return (time.time() if now is None else now) - parse_duration(text)
+    except ValueError:
+        raise ValueError(f'Invalid time "{text}", expected e.g. "2022-10-19 03:10" (UTC) or "15m" ago') from None
+
+
+class Moment(click.ParamType):
+    name = 'time'
+
+    def convert(
+        self,
+        value: t.Any,
+        parameter: t.Optional[click.Parameter],
+        context: t.Optional[click.Context],
+    ) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return parse_moment(value)
+        except ValueError as error:
+            self.fail(str(error), parameter, context)
@@ -1,11 +1,19 @@
+import contextlib
+import json
+import mmap
+import os
+import threading
 import toml
 
-from typing import Any, AnyStr, Dict, Union
+from typing import Any, AnyStr, Dict, Iterator, Optional, Tuple, Union
 from pathlib import Path
 
 
 PathLike = Union[str, Path]
 
+DEFAULT_CHUNK_SIZE: int = 1024 * 1024
+CONFIG_CACHE_SIZE: int = 64
+
 
 def read_file(path: PathLike) -> AnyStr:
     with open(path, 'r') as file:
@@ -16,3 +24,122 @@ def read_toml_file(path: PathLike) -> Dict[str, Any]:
     with open(path, 'r') as file:
         data: Dict[str, Any] = toml.load(file)
     return data
+
+
+@contextlib.contextmanager
+def map_file(path: PathLike) -> Iterator[memoryview]:
+    """
+    Read-only memoryview over the whole file, backed by mmap: pages are
+    read on access and nothing is copied. Slices of the view must not
+    outlive the block, the mapping is closed on exit.
+    """
+    with open(path, 'rb') as file:
+        size: int = os.fstat(file.fileno()).st_size
+        if size == 0:
+            # Empty files cannot be mapped.
+            yield memoryview(b'')
+            return
+        mapped: mmap.mmap = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+        view: memoryview = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+
+def iter_chunks(
+    path: PathLike,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    buffer: Optional[bytearray] = None,
+) -> Iterator[memoryview]:
+    """
+    The file in consecutive chunks read into one reused buffer. Every
+    chunk is a view into that buffer and is overwritten by the next one,
+    copy it to keep it.
+    """
+    buffer = buffer if buffer is not None else bytearray(chunk_size)
+    view: memoryview = memoryview(buffer)
+    try:
+        with open(path, 'rb', buffering=0) as file:
+            while True:
+                read: int = file.readinto(view)
+                if not read:
+                    return
+                yield view[:read]
+    finally:
+        view.release()
+
+
+def iter_records(
+    path: PathLike,
+    *,
+    separator: bytes = b'\n',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Records of the file split on "separator", lines by default, without
+    it. Reads go through one fixed buffer, only the records themselves
+    are copied out of it.
+    """
+    buffer: bytearray = bytearray(chunk_size)
+    width: int = len(separator)
+    partial: bytes = b''
+    for chunk in iter_chunks(path, chunk_size=chunk_size, buffer=buffer):
+        length: int = len(chunk)
+        chunk.release()
+        start: int = 0
+        if partial:
+            # The record carried over may end in a separator that
+            # straddles the two chunks.
+            tail: bytes = partial[max(len(partial) - width + 1, 0):] if width > 1 else b''
+            position: int = (tail + bytes(buffer[:min(length, width - 1)])).find(separator)
+            if position >= 0:
+                yield partial[:len(partial) - len(tail) + position]
+                partial, start = b'', position + width - len(tail)
+            else:
+                end: int = buffer.find(separator, 0, length)
+                if end < 0:
+                    partial += bytes(buffer[:length])
+                    continue
+                yield partial + bytes(buffer[:end])
+                partial, start = b'', end + width
+        end = buffer.find(separator, start, length)
+        while end >= 0:
+            yield bytes(buffer[start:end])
+            start = end + width
+            end = buffer.find(separator, start, length)
+        partial = bytes(buffer[start:length])
+    if partial:
+        yield partial
+
+
+_config_cache: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+_config_lock: threading.Lock = threading.Lock()
+
+
+def read_config(path: PathLike) -> Any:
+    """
+    Parsed TOML or JSON file, by suffix. The result is cached until the
+    modification time or size of the file changes and is shared between
+    callers, it must not be modified.
+    """
+    path = Path(path)
+    stat: os.stat_result = os.stat(path)
+    key: Tuple[int, int] = (stat.st_mtime_ns, stat.st_size)
+    with _config_lock:
+        cached: Optional[Tuple[Tuple[int, int], Any]] = _config_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    data: Any
+    if path.suffix == '.json':
+        with open(path, 'rb') as file:
+            data = json.load(file)
+    else:
+        data = read_toml_file(path)
+    with _config_lock:
+        if len(_config_cache) >= CONFIG_CACHE_SIZE and path not in _config_cache:
+            _config_cache.pop(next(iter(_config_cache)))
+        _config_cache[path] = (key, data)
+    return data
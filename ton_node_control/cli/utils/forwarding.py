@@ -0,0 +1,27 @@
+import typing as t
+
+import click
+
+from ton_node_control.daemon import forward
+
+
+class ForwardingMixin:
+    """
+    Hands the commands the daemon answers over to it when it runs, they
+    run in-process otherwise. Mixed into the groups of the CLI.
+    """
+
+    def invoke(self, ctx: click.Context) -> t.Any:
+        arguments: t.List[str] = [*ctx.protected_args, *ctx.args]
+        code: t.Optional[int] = forward(arguments, prog_name=ctx.find_root().info_name)
+        if code is not None:
+            ctx.exit(code)
+        return super().invoke(ctx)  # type: ignore[misc]
+
+
+class ForwardingGroup(ForwardingMixin, click.Group):
+    pass
+
+
+class ForwardingCommandCollection(ForwardingMixin, click.CommandCollection):
+    pass
@@ -0,0 +1,24 @@
+import os
+import typing as t
+
+import click
+
+from ton_node_control.utils import runtime
+
+
+class WorkingPath(click.Path):
+    """
+    "click.Path" for the commands the daemon answers: a relative path is
+    taken from the directory the command was run in, not from the one
+    the daemon happens to be in.
+    """
+
+    def convert(
+        self,
+        value: t.Any,
+        parameter: t.Optional[click.Parameter],
+        context: t.Optional[click.Context],
+    ) -> t.Any:
+        if isinstance(value, (str, os.PathLike)):
+            value = runtime.working_path(os.fspath(value))
+        return super().convert(value, parameter, context)
@@ -0,0 +1,40 @@
+import re
+import typing as t
+
+import click
+
+SIZE_REGEX = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(i?b?)\s*$', re.IGNORECASE)
+SIZE_UNITS: t.Dict[str, int] = {
+    '': 1,
+    'k': 1024,
+    'm': 1024 ** 2,
+    'g': 1024 ** 3,
+    't': 1024 ** 4,
+}
+
+
+def parse_size(text: str) -> int:
+    """
+    Bytes of a size such as "512", "64K", "32MiB" or "1.5G", binary units.
+    """
+    match: t.Optional[t.Match] = SIZE_REGEX.match(text)
+    if match is None:
+        raise ValueError(f'Invalid size "{text}", expected e.g. "512K", "64M" or "2G"')
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+class Size(click.ParamType):
+    name = 'size'
+
+    def convert(
+        self,
+        value: t.Any,
+        parameter: t.Optional[click.Parameter],
+        context: t.Optional[click.Context],
+    ) -> int:
+        if isinstance(value, int):
+            return value
+        try:
+            return parse_size(value)
+        except ValueError as error:
+            self.fail(str(error), parameter, context)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import re
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+RECORD_SIZE: t.Final[Integer] = 36
+FRIENDLY_LENGTH: t.Final[Integer] = 48
+
+BOUNCEABLE_TAG: t.Final[Integer] = 0x11
+NON_BOUNCEABLE_TAG: t.Final[Integer] = 0x51
+TESTNET_FLAG: t.Final[Integer] = 0x80
+
+RAW_REGEX = re.compile(r'^(-?\d{1,3}):([0-9a-fA-F]{64})$')
+_TO_URL_SAFE: t.Dict[Integer, Integer] = str.maketrans('+/', '-_')
+
+
+class AddressError(ValueError):
+    pass
+
+
+def crc16(data: t.Union[Bytes, memoryview]) -> Integer:
+    """
+    CRC-16/XMODEM used by user-friendly addresses, computed in C.
+    """
+    return binascii.crc_hqx(data, 0)
+
+
+def _tag(bounceable: bool, testnet: bool) -> Integer:
+    return (BOUNCEABLE_TAG if bounceable else NON_BOUNCEABLE_TAG) | (TESTNET_FLAG if testnet else 0)
+
+
+@dataclass(frozen=True)
+class Address:
+    workchain: Integer
+    hash_part: Bytes
+    bounceable: bool = True
+    testnet: bool = False
+
+    def __post_init__(self) -> None:
+        if not -128 <= self.workchain <= 127:
+            raise AddressError(f'Workchain "{self.workchain}" does not fit into a user-friendly address')
+        if len(self.hash_part) != 32:
+            raise AddressError('Account id must be 32 bytes long')
+
+    @classmethod
+    def from_raw(cls, address: String) -> Address:
+        match: t.Optional[t.Match] = RAW_REGEX.match(address)
+        if match is None:
+            raise AddressError(f'Invalid raw address "{address}"')
+        return cls(int(match.group(1)), bytes.fromhex(match.group(2)))
+
+    @classmethod
+    def from_record(cls, record: t.Union[Bytes, memoryview]) -> Address:
+        if len(record) != RECORD_SIZE:
+            raise AddressError(f'Address record must be {RECORD_SIZE} bytes long')
+        if crc16(record[:34]) != int.from_bytes(record[34:], 'big'):
+            raise AddressError('Invalid address checksum')
+        tag: Integer = record[0]
+        if tag & ~TESTNET_FLAG not in (BOUNCEABLE_TAG, NON_BOUNCEABLE_TAG):
+            raise AddressError(f'Invalid address tag "{tag:#x}"')
+        workchain: Integer = record[1]
+        return cls(
+            workchain=workchain - 256 if workchain > 127 else workchain,
+            hash_part=bytes(record[2:34]),
+            bounceable=tag & ~TESTNET_FLAG == BOUNCEABLE_TAG,
+            testnet=bool(tag & TESTNET_FLAG),
+        )
+
+    @classmethod
+    def from_friendly(cls, address: String) -> Address:
+        if len(address) != FRIENDLY_LENGTH:
+            raise AddressError(f'Invalid user-friendly address "{address}"')
+        try:
+            record: Bytes = base64.b64decode(address.translate(_TO_URL_SAFE), altchars=b'-_', validate=True)
+        except (binascii.Error, ValueError):
+            raise AddressError(f'Invalid user-friendly address "{address}"') from None
+        return cls.from_record(record)
+
+    @classmethod
+    def parse(cls, address: String) -> Address:
+        if ':' in address:
+            return cls.from_raw(address)
+        return cls.from_friendly(address)
+
+    def to_raw(self) -> String:
+        return f'{self.workchain}:{self.hash_part.hex()}'
+
+    def to_record(self, bounceable: t.Optional[bool] = None, testnet: t.Optional[bool] = None) -> Bytes:
+        tag: Integer = _tag(
+            self.bounceable if bounceable is None else bounceable,
+            self.testnet if testnet is None else testnet,
+        )
+        payload: Bytes = bytes((tag, self.workchain & 0xFF)) + self.hash_part
+        return payload + crc16(payload).to_bytes(2, 'big')
+
+    def to_friendly(
+        self,
+        *,
+        bounceable: t.Optional[bool] = None,
+        testnet: t.Optional[bool] = None,
+        url_safe: bool = True,
+    ) -> String:
+        record: Bytes = self.to_record(bounceable, testnet)
+        encode: t.Callable[[Bytes], Bytes] = base64.urlsafe_b64encode if url_safe else base64.b64encode
+        return encode(record).decode()
+
+    def __str__(self) -> String:
+        return self.to_raw()
+
+
+def pack_records(
+    addresses: t.Iterable[String],
+    *,
+    bounceable: bool = True,
+    testnet: bool = False,
+) -> bytearray:
+    """
+    Packs raw "wc:hex" addresses into consecutive 36-byte records with
+    their checksums filled in.
+    """
+    tag: Integer = _tag(bounceable, testnet)
+    records = bytearray()
+    for position, address in enumerate(addresses):
+        workchain, _, account_id = address.partition(':')
+        try:
+            payload: Bytes = bytes((tag, int(workchain) & 0xFF)) + bytes.fromhex(account_id)
+        except ValueError:
+            raise AddressError(f'Invalid raw address #{position}: "{address}"') from None
+        if len(payload) != 34 or not -128 <= int(workchain) <= 127:
+            raise AddressError(f'Invalid raw address #{position}: "{address}"')
+        records += payload
+        records += binascii.crc_hqx(payload, 0).to_bytes(2, 'big')
+    return records
+
+
+def encode_records(
+    records: t.Union[Bytes, bytearray, memoryview],
+    *,
+    url_safe: bool = True,
+) -> t.List[String]:
+    """
+    Encodes a buffer of 36-byte records in a single base64 pass.
+    36 bytes are exactly 48 base64 characters, so the encoded buffer
+    splits into addresses without any per-address encoding.
+    """
+    view: memoryview = memoryview(records).cast('B')
+    if len(view) % RECORD_SIZE:
+        raise AddressError(f'Records buffer size must be a multiple of {RECORD_SIZE}')
+    encode: t.Callable[[t.Any], Bytes] = base64.urlsafe_b64encode if url_safe else base64.b64encode
+    encoded: String = encode(view).decode()
+    return [encoded[start:start + FRIENDLY_LENGTH] for start in range(0, len(encoded), FRIENDLY_LENGTH)]
+
+
+def decode_records(addresses: t.Sequence[String]) -> bytearray:
+    """
+    Decodes user-friendly addresses into 36-byte records in a single
+    base64 pass and verifies every checksum and tag.
+    """
+    for position, address in enumerate(addresses):
+        if len(address) != FRIENDLY_LENGTH:
+            raise AddressError(f'Invalid user-friendly address #{position}: "{address}"')
+    try:
+        records = bytearray(base64.b64decode(
+            ''.join(addresses).translate(_TO_URL_SAFE),
+            altchars=b'-_',
+            validate=True,
+        ))
+    except (binascii.Error, ValueError):
+        raise AddressError('Invalid base64 in user-friendly addresses') from None
+    if len(records) != RECORD_SIZE * len(addresses):
+        raise AddressError('Invalid base64 in user-friendly addresses')
+    view: memoryview = memoryview(records)
+    crc: t.Callable[[t.Any, Integer], Integer] = binascii.crc_hqx
+    for position, start in enumerate(range(0, len(records), RECORD_SIZE)):
+        if crc(view[start:start + 34], 0) != (records[start + 34] << 8 | records[start + 35]):
+            raise AddressError(f'Invalid checksum of address #{position}: "{addresses[position]}"')
+        if records[start] & ~TESTNET_FLAG not in (BOUNCEABLE_TAG, NON_BOUNCEABLE_TAG):
+            raise AddressError(f'Invalid tag of address #{position}: "{addresses[position]}"')
+    return records
+
+
+def raw_to_friendly(
+    addresses: t.Sequence[String],
+    *,
+    bounceable: bool = True,
+    testnet: bool = False,
+    url_safe: bool = True,
+) -> t.List[String]:
+    return encode_records(pack_records(addresses, bounceable=bounceable, testnet=testnet), url_safe=url_safe)
+
+
+def friendly_to_raw(addresses: t.Sequence[String]) -> t.List[String]:
+    records: bytearray = decode_records(addresses)
+    hexed: String = records.hex()
+    result: t.List[String] = []
+    for start in range(0, len(records), RECORD_SIZE):
+        workchain: Integer = records[start + 1]
+        offset: Integer = 2 * (start + 2)
+        result.append(f'{workchain - 256 if workchain > 127 else workchain}:{hexed[offset:offset + 64]}')
+    return result
+
+
+def convert_bounceability(
+    addresses: t.Sequence[String],
+    *,
+    bounceable: bool,
+    url_safe: bool = True,
+) -> t.List[String]:
+    """
+    Switches user-friendly addresses between their bounceable and
+    non-bounceable forms, keeping the testnet flag.
+    """
+    records: bytearray = decode_records(addresses)
+    view: memoryview = memoryview(records)
+    for start in range(0, len(records), RECORD_SIZE):
+        records[start] = _tag(bounceable, bool(records[start] & TESTNET_FLAG))
+        records[start + 34:start + 36] = binascii.crc_hqx(view[start:start + 34], 0).to_bytes(2, 'big')
+    view.release()
+    return encode_records(records, url_safe=url_safe)
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import mmap
+import sys
+import typing as t
+
+from array import array
+from pathlib import Path
+
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+BOC_GENERIC_MAGIC: t.Final[Bytes] = bytes.fromhex('b5ee9c72')
+BOC_INDEXED_MAGIC: t.Final[Bytes] = bytes.fromhex('68ff65f3')
+BOC_INDEXED_CRC32C_MAGIC: t.Final[Bytes] = bytes.fromhex('acc3a728')
+
+HASH_BYTES: t.Final[Integer] = 32
+DEPTH_BYTES: t.Final[Integer] = 2
+
+_UNSIGNED_TYPECODES: t.Dict[Integer, String] = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+class BocError(ValueError):
+    pass
+
+
+def _crc32c_table() -> t.List[Integer]:
+    table: t.List[Integer] = []
+    for byte in range(256):
+        value: Integer = byte
+        for _ in range(8):
+            value = (value >> 1) ^ 0x82F63B78 if value & 1 else value >> 1
+        table.append(value)
+    return table
+
+
+_CRC32C_TABLE: t.List[Integer] = _crc32c_table()
+
+
+def crc32c(data: t.Union[Bytes, memoryview]) -> Integer:
+    table: t.List[Integer] = _CRC32C_TABLE
+    value: Integer = 0xFFFFFFFF
+    for byte in bytes(data):
+        value = table[(value ^ byte) & 0xFF] ^ (value >> 8)
+    return value ^ 0xFFFFFFFF
+
+
+def _unsigned_array(buffer: memoryview, width: Integer, count: Integer) -> array:
+    typecode: t.Optional[String] = _UNSIGNED_TYPECODES.get(width)
+    if typecode is not None and array(typecode).itemsize == width:
+        values = array(typecode)
+        values.frombytes(buffer[:width * count])
+        if sys.byteorder == 'little' and width > 1:
+            values.byteswap()
+        return values
+    return array('Q', (
+        int.from_bytes(buffer[offset:offset + width], 'big')
+        for offset in range(0, width * count, width)
+    ))
+
+
+class Cell:
+    """
+    Lightweight view of one cell of a decoded bag of cells.
+    Nothing is copied: the data and references are read from the
+    underlying buffer whenever they are accessed.
+    """
+
+    __slots__ = ('boc', 'index')
+
+    def __init__(self, boc: BagOfCells, index: Integer) -> None:
+        self.boc: BagOfCells = boc
+        self.index: Integer = index
+
+    @property
+    def descriptors(self) -> t.Tuple[Integer, Integer]:
+        return self.boc.descriptors(self.index)
+
+    @property
+    def is_exotic(self) -> bool:
+        return bool(self.descriptors[0] & 8)
+
+    @property
+    def level_mask(self) -> Integer:
+        return self.descriptors[0] >> 5
+
+    @property
+    def bits_length(self) -> Integer:
+        return self.boc.bits_length(self.index)
+
+    @property
+    def data(self) -> memoryview:
+        """
+        Data bytes, including the completion tag of a partial last byte.
+        """
+        return self.boc.data(self.index)
+
+    @property
+    def reference_indexes(self) -> t.List[Integer]:
+        return self.boc.references(self.index)
+
+    @property
+    def refs(self) -> t.List[Cell]:
+        return [Cell(self.boc, index) for index in self.boc.references(self.index)]
+
+    def bits(self) -> String:
+        length: Integer = self.bits_length
+        if length == 0:
+            return ''
+        return bin(int.from_bytes(self.data, 'big'))[2:].zfill(len(self.data) * 8)[:length]
+
+    def __eq__(self, other: t.Any) -> bool:
+        return isinstance(other, Cell) and other.boc is self.boc and other.index == self.index
+
+    def __hash__(self) -> Integer:
+        return hash((id(self.boc), self.index))
+
+    def __repr__(self) -> String:
+        return (
+            f'<Cell #{self.index} bits={self.bits_length} '
+            f'refs={len(self.reference_indexes)} exotic={self.is_exotic}>'
+        )
+
+
+class BagOfCells:
+    """
+    Zero-copy decoder of serialized bags of cells.
+    Decoding only records where every cell starts, taken from the index
+    when the BOC has one and from a single descriptor scan otherwise.
+    Everything else is read from the buffer on access, so files can be
+    decoded straight from an mmap.
+    """
+
+    def __init__(
+        self,
+        buffer: t.Union[Bytes, bytearray, memoryview, mmap.mmap],
+        *,
+        verify: bool = False,
+    ) -> None:
+        self._buffer: memoryview = memoryview(buffer).cast('B')
+        self._mmap: t.Optional[mmap.mmap] = buffer if isinstance(buffer, mmap.mmap) else None
+        self._parse(verify)
+
+    @classmethod
+    def open(cls, path: t.Union[String, Path], *, verify: bool = False) -> BagOfCells:
+        with open(path, 'rb') as file:
+            mapped: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, verify=verify)
+
+    def close(self) -> None:
+        self._buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Cell data views are still alive, the mapping
+                # is released together with the last of them.
+                pass
+            self._mmap = None
+
+    def __enter__(self) -> BagOfCells:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def _read(self, offset: Integer, width: Integer) -> Integer:
+        if offset + width > len(self._buffer):
+            raise BocError('Unexpected end of BOC')
+        return int.from_bytes(self._buffer[offset:offset + width], 'big')
+
+    def _parse(self, verify: bool) -> None:
+        buffer: memoryview = self._buffer
+        magic: Bytes = bytes(buffer[:4])
+        if magic == BOC_GENERIC_MAGIC:
+            flags: Integer = self._read(4, 1)
+            has_index: bool = bool(flags & 0x80)
+            has_crc32c: bool = bool(flags & 0x40)
+            has_cache_bits: bool = bool(flags & 0x20)
+            size: Integer = flags & 0x07
+        elif magic in (BOC_INDEXED_MAGIC, BOC_INDEXED_CRC32C_MAGIC):
+            has_index, has_crc32c, has_cache_bits = True, magic == BOC_INDEXED_CRC32C_MAGIC, False
+            size = self._read(4, 1)
+        else:
+            raise BocError(f'Unknown BOC magic "{magic.hex()}"')
+        if not 1 <= size <= 4:
+            raise BocError(f'Invalid reference size "{size}"')
+        offset_bytes: Integer = self._read(5, 1)
+        if not 1 <= offset_bytes <= 8:
+            raise BocError(f'Invalid offset size "{offset_bytes}"')
+
+        position: Integer = 6
+        cells_count: Integer = self._read(position, size)
+        roots_count: Integer = self._read(position + size, size)
+        absent_count: Integer = self._read(position + 2 * size, size)
+        position += 3 * size
+        total_cells_size: Integer = self._read(position, offset_bytes)
+        position += offset_bytes
+        if roots_count < 1 or roots_count + absent_count > cells_count:
+            raise BocError('Invalid roots count')
+
+        roots_size: Integer = size * roots_count if magic == BOC_GENERIC_MAGIC else 0
+        index_size: Integer = offset_bytes * cells_count if has_index else 0
+        if position + roots_size + index_size > len(buffer):
+            raise BocError('Unexpected end of BOC')
+        if magic == BOC_GENERIC_MAGIC:
+            self.roots: array = _unsigned_array(buffer[position:], size, roots_count)
+            position += roots_size
+            if any(root >= cells_count for root in self.roots):
+                raise BocError('Root cell out of range')
+        else:
+            self.roots = array('Q', [0])
+        index: t.Optional[array] = None
+        if has_index:
+            index = _unsigned_array(buffer[position:], offset_bytes, cells_count)
+            position += offset_bytes * cells_count
+            if has_cache_bits:
+                index = array('Q', (value >> 1 for value in index))
+
+        data_start: Integer = position
+        data_end: Integer = data_start + total_cells_size
+        expected_end: Integer = data_end + (4 if has_crc32c else 0)
+        if expected_end > len(buffer):
+            raise BocError('Unexpected end of BOC')
+        if has_crc32c and verify is True:
+            stored: Integer = int.from_bytes(buffer[data_end:data_end + 4], 'little')
+            if crc32c(buffer[:data_end]) != stored:
+                raise BocError('CRC32C checksum mismatch')
+
+        self.reference_size: Integer = size
+        self.cells_count: Integer = cells_count
+        self.absent_count: Integer = absent_count
+        self._data_end: Integer = data_end
+
+        offsets = array('Q')
+        if index is not None:
+            offsets.append(data_start)
+            offsets.extend(data_start + end for end in index[:-1])
+            if index and index[-1] != total_cells_size:
+                raise BocError('Cells index does not match the cells size')
+        else:
+            cursor: Integer = data_start
+            for _ in range(cells_count):
+                if cursor + 2 > data_end:
+                    raise BocError('Unexpected end of cells data')
+                d1: Integer = buffer[cursor]
+                d2: Integer = buffer[cursor + 1]
+                offsets.append(cursor)
+                cursor += self._cell_size(d1, d2)
+            if cursor != data_end:
+                raise BocError('Cells data does not match the cells size')
+        self.offsets: array = offsets
+
+    def _cell_size(self, d1: Integer, d2: Integer) -> Integer:
+        return 2 + self._hashes_size(d1) + (d2 + 1) // 2 + (d1 & 7) * self.reference_size
+
+    @staticmethod
+    def _hashes_size(d1: Integer) -> Integer:
+        if not d1 & 16:
+            return 0
+        return (bin(d1 >> 5).count('1') + 1) * (HASH_BYTES + DEPTH_BYTES)
+
+    def __len__(self) -> Integer:
+        return self.cells_count
+
+    def _bounds(self, index: Integer) -> t.Tuple[Integer, Integer]:
+        # Checked on access rather than upfront, so that decoding with an
+        # index never has to visit every cell.
+        offset: Integer = self.offsets[index]
+        end: Integer = self.offsets[index + 1] if index + 1 < len(self.offsets) else self._data_end
+        if end - offset < 2 or end > self._data_end:
+            raise BocError(f'Cell #{index} is out of the cells data')
+        return offset, end
+
+    def descriptors(self, index: Integer) -> t.Tuple[Integer, Integer]:
+        offset, _ = self._bounds(index)
+        return self._buffer[offset], self._buffer[offset + 1]
+
+    def _data_offset(self, index: Integer) -> t.Tuple[Integer, Integer, Integer]:
+        offset, end = self._bounds(index)
+        d1: Integer = self._buffer[offset]
+        d2: Integer = self._buffer[offset + 1]
+        start: Integer = offset + 2 + self._hashes_size(d1)
+        if start + (d2 + 1) // 2 + (d1 & 7) * self.reference_size > end:
+            raise BocError(f'Cell #{index} overruns its data')
+        return d1, d2, start
+
+    def data(self, index: Integer) -> memoryview:
+        _, d2, start = self._data_offset(index)
+        return self._buffer[start:start + (d2 + 1) // 2]
+
+    def bits_length(self, index: Integer) -> Integer:
+        _, d2, start = self._data_offset(index)
+        if not d2 & 1:
+            return d2 * 4
+        last: Integer = self._buffer[start + d2 // 2]
+        if last == 0:
+            raise BocError(f'Cell #{index} has no completion tag')
+        return (d2 // 2) * 8 + 7 - ((last & -last).bit_length() - 1)
+
+    def references(self, index: Integer) -> t.List[Integer]:
+        d1, d2, start = self._data_offset(index)
+        size: Integer = self.reference_size
+        position: Integer = start + (d2 + 1) // 2
+        references: t.List[Integer] = [
+            int.from_bytes(self._buffer[position + size * number:position + size * (number + 1)], 'big')
+            for number in range(d1 & 7)
+        ]
+        for reference in references:
+            if not index < reference < self.cells_count:
+                raise BocError(f'Cell #{index} references cell #{reference} out of order')
+        return references
+
+    def cell(self, index: Integer) -> Cell:
+        if not 0 <= index < self.cells_count:
+            raise IndexError(index)
+        return Cell(self, index)
+
+    @property
+    def root(self) -> Cell:
+        return self.cell(self.roots[0])
+
+    def root_cells(self) -> t.List[Cell]:
+        return [self.cell(index) for index in self.roots]
+
+    def walk(self, start: t.Optional[Integer] = None) -> t.Iterator[Integer]:
+        """
+        Iterates over the indexes of cells reachable from a cell,
+        every cell once, without materialising any of them.
+        """
+        stack: t.List[Integer] = [self.roots[0] if start is None else start]
+        seen: t.Set[Integer] = set()
+        while stack:
+            index: Integer = stack.pop()
+            if index in seen:
+                continue
+            seen.add(index)
+            yield index
+            stack.extend(reversed(self.references(index)))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import typing as t
+
+from array import array
+
+from ton_node_control.core.boc import BagOfCells
+from ton_node_control.utils.typing import Bytes, Integer
+
+HASH_BYTES: t.Final[Integer] = 32
+
+
+class CellStore:
+    """
+    Interning store of cells shared by several versions of the same state.
+    A cell is identified by its representation hash, identical cells are
+    stored once and share one id, and the hash and depth of every cell are
+    computed exactly once, when the cell is interned.
+    All the cell attributes live in flat arrays indexed by the cell id.
+    """
+
+    def __init__(self) -> None:
+        self._ids: t.Dict[Bytes, Integer] = {}
+        self._descriptors: array = array('B')
+        self._data: bytearray = bytearray()
+        self._data_offsets: array = array('Q', [0])
+        self._references: array = array('I')
+        self._reference_offsets: array = array('Q', [0])
+        self._hashes: bytearray = bytearray()
+        self._depths: array = array('H')
+
+    def __len__(self) -> Integer:
+        return len(self._depths)
+
+    def __contains__(self, cell_hash: Bytes) -> bool:
+        return cell_hash in self._ids
+
+    def find(self, cell_hash: Bytes) -> t.Optional[Integer]:
+        return self._ids.get(cell_hash)
+
+    def hash(self, cell_id: Integer) -> Bytes:
+        return bytes(self._hashes[cell_id * HASH_BYTES:(cell_id + 1) * HASH_BYTES])
+
+    def depth(self, cell_id: Integer) -> Integer:
+        return self._depths[cell_id]
+
+    def descriptors(self, cell_id: Integer) -> t.Tuple[Integer, Integer]:
+        return self._descriptors[2 * cell_id], self._descriptors[2 * cell_id + 1]
+
+    def data(self, cell_id: Integer) -> Bytes:
+        return bytes(self._data[self._data_offsets[cell_id]:self._data_offsets[cell_id + 1]])
+
+    def references(self, cell_id: Integer) -> array:
+        return self._references[self._reference_offsets[cell_id]:self._reference_offsets[cell_id + 1]]
+
+    @property
+    def memory_usage(self) -> Integer:
+        """
+        Approximate size in bytes of the cell storage itself,
+        not counting the hash lookup table.
+        """
+        return sum((
+            len(self._descriptors) * self._descriptors.itemsize,
+            len(self._data),
+            len(self._data_offsets) * self._data_offsets.itemsize,
+            len(self._references) * self._references.itemsize,
+            len(self._reference_offsets) * self._reference_offsets.itemsize,
+            len(self._hashes),
+            len(self._depths) * self._depths.itemsize,
+        ))
+
+    def intern(
+        self,
+        d1: Integer,
+        d2: Integer,
+        data: t.Union[Bytes, memoryview],
+        references: t.Sequence[Integer] = (),
+    ) -> Integer:
+        """
+        Adds a cell given by its descriptors, data (including the completion
+        tag) and the ids of already interned children, and returns its id.
+        """
+        d1 &= ~16
+        if (d1 & 7) != len(references):
+            raise ValueError(f'Descriptor declares {d1 & 7} references, got {len(references)}')
+        depth: Integer = 0
+        representation = bytearray((d1, d2))
+        representation += data
+        for reference in references:
+            reference_depth: Integer = self._depths[reference]
+            representation += reference_depth.to_bytes(2, 'big')
+            depth = max(depth, reference_depth + 1)
+        for reference in references:
+            representation += self._hashes[reference * HASH_BYTES:(reference + 1) * HASH_BYTES]
+        cell_hash: Bytes = hashlib.sha256(representation).digest()
+        cell_id: t.Optional[Integer] = self._ids.get(cell_hash)
+        if cell_id is not None:
+            return cell_id
+
+        cell_id = len(self._depths)
+        self._ids[cell_hash] = cell_id
+        self._descriptors.append(d1)
+        self._descriptors.append(d2)
+        self._data += data
+        self._data_offsets.append(len(self._data))
+        self._references.extend(references)
+        self._reference_offsets.append(len(self._references))
+        self._hashes += cell_hash
+        self._depths.append(depth)
+        return cell_id
+
+    def load_boc(self, boc: BagOfCells) -> t.List[Integer]:
+        """
+        Interns every cell of a decoded BOC and returns the ids of its roots.
+        Children always follow their parents in a BOC, so cells are interned
+        from the last one to the first.
+        """
+        ids: t.List[Integer] = [0] * len(boc)
+        for index in range(len(boc) - 1, -1, -1):
+            d1, d2 = boc.descriptors(index)
+            ids[index] = self.intern(
+                d1,
+                d2,
+                boc.data(index),
+                [ids[reference] for reference in boc.references(index)],
+            )
+        return [ids[root] for root in boc.roots]
+
+    def walk(self, root: Integer) -> t.Iterator[Integer]:
+        stack: t.List[Integer] = [root]
+        seen: t.Set[Integer] = set()
+        while stack:
+            cell_id: Integer = stack.pop()
+            if cell_id in seen:
+                continue
+            seen.add(cell_id)
+            yield cell_id
+            stack.extend(self.references(cell_id))
+
+    def diff(
+        self,
+        old: Integer,
+        new: Integer,
+    ) -> t.Iterator[t.Tuple[t.Optional[Integer], t.Optional[Integer]]]:
+        """
+        Yields pairs of cells that differ between two trees, matching
+        children by position. Shared subtrees have the same id and are
+        skipped without being visited, so the cost is proportional to the
+        number of changed cells. Subtrees present on one side only are
+        reported by their roots.
+        """
+        stack: t.List[t.Tuple[t.Optional[Integer], t.Optional[Integer]]] = [(old, new)]
+        while stack:
+            left, right = stack.pop()
+            if left == right:
+                continue
+            yield left, right
+            if left is None or right is None:
+                continue
+            left_references: array = self.references(left)
+            right_references: array = self.references(right)
+            for position in range(max(len(left_references), len(right_references)) - 1, -1, -1):
+                stack.append((
+                    left_references[position] if position < len(left_references) else None,
+                    right_references[position] if position < len(right_references) else None,
+                ))
+
+    def compact(self, roots: t.Iterable[Integer]) -> t.Tuple[CellStore, t.Dict[Integer, Integer]]:
+        """
+        Copies the cells reachable from the given roots into a new store,
+        dropping versions nobody tracks anymore.
+        Returns the new store and the mapping of old ids to new ones.
+        """
+        reachable: t.Set[Integer] = set()
+        for root in roots:
+            reachable.update(self.walk(root))
+        store = CellStore()
+        mapping: t.Dict[Integer, Integer] = {}
+        # Children are always interned before their parents, so increasing
+        # ids are a valid bottom-up order.
+        for cell_id in sorted(reachable):
+            d1, d2 = self.descriptors(cell_id)
+            mapping[cell_id] = store.intern(
+                d1,
+                d2,
+                self.data(cell_id),
+                [mapping[reference] for reference in self.references(cell_id)],
+            )
+        return store, mapping
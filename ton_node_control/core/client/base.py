@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import typing as t
+
+from abc import ABC, abstractmethod
+
+from ton_node_control.utils.typing import String
+
+
+class BaseConsoleClient(ABC):
+    """
+    Line oriented client of a TON command line tool that accepts
+    one command per line and answers with free-form text.
+    """
+
+    @abstractmethod
+    def execute_batch(self, commands: t.Sequence[String]) -> t.List[String]:
+        """
+        Executes all the commands in order and returns their outputs.
+        """
+
+    def execute(self, command: String) -> String:
+        return self.execute_batch([command])[0]
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> BaseConsoleClient:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.utils.typing import Integer, String
+
+Source = t.TypeVar('Source')
+Result = t.TypeVar('Result')
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with about 10% resolution between
+    "minimum" and "maximum" seconds. Counts decay by half every
+    "half_life" observations, so quantiles follow recent behaviour.
+    """
+
+    GROWTH: float = 1.1
+
+    def __init__(
+        self,
+        *,
+        minimum: float = 0.001,
+        maximum: float = 60.0,
+        half_life: Integer = 512,
+    ) -> None:
+        self.minimum: float = minimum
+        self.half_life: Integer = half_life
+        size: Integer = math.ceil(math.log(maximum / minimum, self.GROWTH)) + 2
+        self._counts: t.List[float] = [0.0] * size
+        self._total: float = 0.0
+        self._observations: Integer = 0
+
+    def __len__(self) -> Integer:
+        return self._observations
+
+    def _bucket(self, latency: float) -> Integer:
+        if latency <= self.minimum:
+            return 0
+        return min(int(math.log(latency / self.minimum, self.GROWTH)) + 1, len(self._counts) - 1)
+
+    def _upper_bound(self, bucket: Integer) -> float:
+        return self.minimum * self.GROWTH ** bucket
+
+    def record(self, latency: float) -> None:
+        self._observations += 1
+        if self._observations % self.half_life == 0:
+            self._counts = [count / 2 for count in self._counts]
+            self._total /= 2
+        self._counts[self._bucket(latency)] += 1
+        self._total += 1
+
+    def quantile(self, quantile: float) -> t.Optional[float]:
+        if self._total == 0:
+            return None
+        threshold: float = self._total * quantile
+        accumulated: float = 0.0
+        for bucket, count in enumerate(self._counts):
+            accumulated += count
+            if accumulated >= threshold:
+                return self._upper_bound(bucket)
+        return self._upper_bound(len(self._counts) - 1)
+
+
+class HedgeBudget:
+    """
+    Caps hedged requests to a fraction of primary requests,
+    measured over a decaying window.
+    """
+
+    def __init__(self, ratio: float = 0.1, *, window: float = 1000.0) -> None:
+        self.ratio: float = ratio
+        self.window: float = window
+        self._primary: float = 0.0
+        self._hedged: float = 0.0
+
+    def _decay(self) -> None:
+        if self._primary > self.window:
+            self._hedged *= self.window / self._primary
+            self._primary = self.window
+
+    def record_primary(self) -> None:
+        self._primary += 1
+        self._decay()
+
+    def try_spend(self) -> bool:
+        # Allow a single hedge before any history exists, cold starts
+        # are exactly when a source is most likely to stall.
+        if self._hedged + 1 > max(self._primary * self.ratio, 1.0):
+            return False
+        self._hedged += 1
+        return True
+
+
+@dataclass
+class SourceStats:
+    name: String
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    requests: Integer = 0
+    failures: Integer = 0
+    wins: Integer = 0
+
+
+class HedgingError(TonNodeControlError):
+    def __init__(self, message: String, errors: t.Sequence[BaseException] = ()) -> None:
+        super().__init__(message)
+        self.errors: t.List[BaseException] = list(errors)
+
+
+class HedgedReader(t.Generic[Source]):
+    """
+    Runs read-only queries against redundant sources, liteservers or
+    datasources alike. The query goes to the source with the best recent
+    tail latency first; if it has not answered within its own p95, or has
+    failed, the same query is sent to the next source, budget permitting,
+    and the first consistent answer wins.
+    """
+
+    def __init__(
+        self,
+        sources: t.Mapping[String, Source],
+        *,
+        hedge_quantile: float = 0.95,
+        default_delay: float = 0.5,
+        minimum_delay: float = 0.005,
+        budget: t.Optional[HedgeBudget] = None,
+    ) -> None:
+        if not sources:
+            raise ValueError('At least one source is required')
+        self.sources: t.Dict[String, Source] = dict(sources)
+        self.stats: t.Dict[String, SourceStats] = {name: SourceStats(name) for name in sources}
+        self.hedge_quantile: float = hedge_quantile
+        self.default_delay: float = default_delay
+        self.minimum_delay: float = minimum_delay
+        self.budget: HedgeBudget = budget or HedgeBudget()
+        self.hedges: Integer = 0
+
+    def hedge_delay(self, name: String) -> float:
+        quantile: t.Optional[float] = self.stats[name].histogram.quantile(self.hedge_quantile)
+        if quantile is None or len(self.stats[name].histogram) < 20:
+            return self.default_delay
+        return max(quantile, self.minimum_delay)
+
+    def ranking(self) -> t.List[String]:
+        def _key(name: String) -> t.Tuple[float, float]:
+            stats: SourceStats = self.stats[name]
+            failure_rate: float = stats.failures / stats.requests if stats.requests else 0.0
+            return failure_rate > 0.5, self.hedge_delay(name)
+        return sorted(self.sources, key=_key)
+
+    async def _attempt(
+        self,
+        name: String,
+        query: t.Callable[[Source], t.Awaitable[Result]],
+    ) -> Result:
+        stats: SourceStats = self.stats[name]
+        stats.requests += 1
+        started: float = time.monotonic()
+        try:
+            result: Result = await query(self.sources[name])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.failures += 1
+            stats.histogram.record(time.monotonic() - started)
+            raise
+        stats.histogram.record(time.monotonic() - started)
+        return result
+
+    async def read(
+        self,
+        query: t.Callable[[Source], t.Awaitable[Result]],
+        *,
+        accept: t.Optional[t.Callable[[Result], bool]] = None,
+    ) -> Result:
+        order: t.List[String] = self.ranking()
+        pending: t.Dict[asyncio.Task, String] = {}
+        errors: t.List[BaseException] = []
+        self.budget.record_primary()
+
+        def _launch() -> None:
+            name: String = order.pop(0)
+            pending[asyncio.ensure_future(self._attempt(name, query))] = name
+
+        _launch()
+        try:
+            while pending:
+                delay: t.Optional[float] = None
+                if order:
+                    delay = self.hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if self.budget.try_spend():
+                        self.hedges += 1
+                        _launch()
+                    else:
+                        order.clear()
+                    continue
+                for task in done:
+                    name: String = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    result: Result = task.result()
+                    if accept is not None and not accept(result):
+                        errors.append(HedgingError(f'Inconsistent answer from "{name}"'))
+                        continue
+                    self.stats[name].wins += 1
+                    return result
+                # A failed or rejected answer is a reason to ask the next
+                # source right away, it does not need the hedge budget.
+                if order and not pending:
+                    _launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise HedgingError(
+            'No source returned a consistent answer' + (f', last error: {errors[-1]}' if errors else ''),
+            errors,
+        )
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import base64
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import typing as t
+
+from abc import ABC
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.core.client.base import BaseConsoleClient
+from ton_node_control.core.exceptions import ConsoleError
+from ton_node_control.core.process import InteractiveProcess
+from ton_node_control.core.shards import ShardDescriptor, parse_block_ids
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+ERROR_REGEX = re.compile(
+    r'^\s*(?:error|failed|query error)\b|\bunknown command\b',
+    re.IGNORECASE | re.MULTILINE,
+)
+NEW_KEY_REGEX = re.compile(r'created new key\s+([0-9a-fA-F]{64})')
+PUBLIC_KEY_REGEX = re.compile(r'got public key:\s*(\S+)')
+
+
+@dataclass(frozen=True)
+class ValidatorStats:
+    unixtime: Integer
+    masterchain_block_time: Integer
+    state_serializer_masterchain_seqno: t.Optional[Integer]
+    shard_client_masterchain_seqno: t.Optional[Integer]
+    masterchain_block: t.Optional[ShardDescriptor]
+    gc_masterchain_block: t.Optional[ShardDescriptor]
+    key_masterchain_block: t.Optional[ShardDescriptor]
+    rotate_masterchain_block: t.Optional[ShardDescriptor]
+    raw: t.Dict[String, String] = field(default_factory=dict, compare=False)
+
+    @property
+    def sync_lag(self) -> Integer:
+        return self.unixtime - self.masterchain_block_time
+
+    @property
+    def masterchain_seqno(self) -> t.Optional[Integer]:
+        return None if self.masterchain_block is None else self.masterchain_block.seqno
+
+    @property
+    def shard_client_lag(self) -> t.Optional[Integer]:
+        if self.masterchain_seqno is None or self.shard_client_masterchain_seqno is None:
+            return None
+        return self.masterchain_seqno - self.shard_client_masterchain_seqno
+
+
+@dataclass(frozen=True)
+class ElectionKeys:
+    election_id: Integer
+    key: String
+    adnl: String
+    public_key: String
+
+
+def parse_stats(text: String) -> ValidatorStats:
+    raw: t.Dict[String, String] = {}
+    for line in text.splitlines():
+        parts: t.List[String] = line.split(None, 1)
+        if len(parts) == 2:
+            raw[parts[0]] = parts[1].strip()
+
+    def _integer(key: String) -> t.Optional[Integer]:
+        value: t.Optional[String] = raw.get(key)
+        return int(value) if value is not None and value.lstrip('-').isdigit() else None
+
+    def _block(key: String) -> t.Optional[ShardDescriptor]:
+        blocks: t.List[ShardDescriptor] = parse_block_ids(raw.get(key, ''))
+        return blocks[0] if blocks else None
+
+    unixtime: t.Optional[Integer] = _integer('unixtime')
+    if unixtime is None:
+        raise ConsoleError('Unexpected "getstats" output', command='getstats', log=text)
+    return ValidatorStats(
+        unixtime=unixtime,
+        masterchain_block_time=_integer('masterchainblocktime') or 0,
+        state_serializer_masterchain_seqno=_integer('stateserializermasterchainseqno'),
+        shard_client_masterchain_seqno=_integer('shardclientmasterchainseqno'),
+        masterchain_block=_block('masterchainblock'),
+        gc_masterchain_block=_block('gcmasterchainblock'),
+        key_masterchain_block=_block('keymasterchainblock'),
+        rotate_masterchain_block=_block('rotatemasterchainblock'),
+        raw=raw,
+    )
+
+
+def _search(regex: t.Pattern, command: String, output: String) -> String:
+    match: t.Optional[t.Match] = regex.search(output)
+    if match is None:
+        raise ConsoleError(f'Unexpected output of "{command}"', command=command, log=output)
+    return match.group(1)
+
+
+class BaseValidatorConsole(BaseConsoleClient, ABC):
+    def run(self, commands: t.Sequence[String]) -> t.List[String]:
+        """
+        Executes a batch and raises on the first command that
+        validator-engine reports as failed.
+        """
+        outputs: t.List[String] = self.execute_batch(commands)
+        for command, output in zip(commands, outputs):
+            if ERROR_REGEX.search(output) is not None:
+                raise ConsoleError(f'Command "{command}" failed', command=command, log=output)
+        return outputs
+
+    def get_stats(self) -> ValidatorStats:
+        return parse_stats(self.run(['getstats'])[0])
+
+    def get_config(self) -> t.Dict[String, t.Any]:
+        output: String = self.run(['getconfig'])[0]
+        return json.loads(output[output.find('{'):])
+
+    def new_key(self) -> String:
+        return _search(NEW_KEY_REGEX, 'newkey', self.run(['newkey'])[0]).upper()
+
+    def export_public_key(self, key: String) -> String:
+        command: String = f'exportpub {key}'
+        return _search(PUBLIC_KEY_REGEX, command, self.run([command])[0])
+
+    def add_permanent_key(self, key: String, election_id: Integer, expire_at: Integer) -> None:
+        self.run([f'addpermkey {key} {election_id} {expire_at}'])
+
+    def add_temporary_key(self, permanent_key: String, key: String, expire_at: Integer) -> None:
+        self.run([f'addtempkey {permanent_key} {key} {expire_at}'])
+
+    def add_validator_address(self, permanent_key: String, adnl: String, expire_at: Integer) -> None:
+        self.run([f'addvalidatoraddr {permanent_key} {adnl} {expire_at}'])
+
+    def rotate_election_keys(self, election_id: Integer, expire_at: Integer) -> ElectionKeys:
+        """
+        Creates and registers the validator and ADNL keys for an election
+        over one console session instead of seven console invocations.
+        """
+        key_output, adnl_output = self.run(['newkey', 'newkey'])
+        key: String = _search(NEW_KEY_REGEX, 'newkey', key_output).upper()
+        adnl: String = _search(NEW_KEY_REGEX, 'newkey', adnl_output).upper()
+        outputs: t.List[String] = self.run([
+            f'addpermkey {key} {election_id} {expire_at}',
+            f'addtempkey {key} {key} {expire_at}',
+            f'addadnl {adnl} 0',
+            f'addvalidatoraddr {key} {adnl} {expire_at}',
+            f'exportpub {key}',
+        ])
+        return ElectionKeys(
+            election_id=election_id,
+            key=key,
+            adnl=adnl,
+            public_key=_search(PUBLIC_KEY_REGEX, f'exportpub {key}', outputs[-1]),
+        )
+
+
+class ValidatorConsole(BaseValidatorConsole):
+    """
+    Keeps a single authenticated "validator-engine-console" session open
+    and runs command batches over it, one command at a time: the console
+    answers queries asynchronously, so a command is only sent once the
+    previous one has answered. An unknown sync command, sent after the
+    answer has started to arrive, marks its end with its error echo.
+    """
+
+    SYNC_COMMAND: String = '__ton_node_control_sync_{}'
+
+    def __init__(
+        self,
+        console_path: Path,
+        client_key_path: Path,
+        server_public_key_path: Path,
+        address: String,
+        *,
+        timeout: float = 10.0,
+    ) -> None:
+        self.console_path: Path = console_path
+        self.client_key_path: Path = client_key_path
+        self.server_public_key_path: Path = server_public_key_path
+        self.address: String = address
+        self.timeout: float = timeout
+
+        self._process: InteractiveProcess = InteractiveProcess([
+            str(self.console_path),
+            '-k', str(self.client_key_path),
+            '-p', str(self.server_public_key_path),
+            '-a', self.address,
+            '-v', '0',
+        ])
+        self._counter: t.Iterator[Integer] = itertools.count()
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._process.is_running
+
+    def open(self) -> None:
+        self._process.start()
+
+    def close(self) -> None:
+        self._process.stop()
+
+    def execute_batch(self, commands: t.Sequence[String]) -> t.List[String]:
+        with self._lock:
+            self.open()
+            outputs: t.List[String] = []
+            try:
+                for command in commands:
+                    marker: String = self.SYNC_COMMAND.format(next(self._counter))
+                    deadline: float = time.monotonic() + self.timeout
+                    self._process.write(f'{command}\n'.encode())
+                    self._process.wait_for_output(deadline)
+                    self._process.write(f'{marker}\n'.encode())
+                    outputs.append(self._process.read_until(marker.encode(), deadline).decode(errors='replace'))
+                return outputs
+            except (OSError, ConsoleError):
+                # The session state is unknown after a failure,
+                # the next batch starts from a fresh process.
+                self.close()
+                raise
+
+
+class LocalValidatorConsole(BaseValidatorConsole):
+    """
+    In-memory stand-in for "validator-engine-console" that answers in the
+    same text format, so the parsing and batching code can be exercised
+    without a running node.
+    """
+
+    def __init__(
+        self,
+        *,
+        masterchain_seqno: Integer = 1,
+        sync_lag: Integer = 0,
+        config: t.Optional[t.Dict[String, t.Any]] = None,
+    ) -> None:
+        self.masterchain_seqno: Integer = masterchain_seqno
+        self.sync_lag: Integer = sync_lag
+        self.config: t.Dict[String, t.Any] = config or {'@type': 'engine.validator.config'}
+
+        self.keys: t.Dict[String, Bytes] = {}
+        self.permanent_keys: t.Dict[String, t.Tuple[Integer, Integer]] = {}
+        self.temporary_keys: t.Dict[String, t.Tuple[String, Integer]] = {}
+        self.validator_addresses: t.Dict[String, t.Tuple[String, Integer]] = {}
+        self.adnl_addresses: t.Dict[String, Integer] = {}
+
+        self.executed: t.List[String] = []
+        self.batches: Integer = 0
+
+    def execute_batch(self, commands: t.Sequence[String]) -> t.List[String]:
+        self.batches += 1
+        outputs: t.List[String] = []
+        for command in commands:
+            self.executed.append(command)
+            name, *arguments = command.split()
+            handler: t.Optional[t.Callable[..., String]] = getattr(self, f'_command_{name}', None)
+            if handler is None:
+                outputs.append(f'unknown command: {name}\n')
+                continue
+            try:
+                outputs.append(handler(*arguments))
+            except (KeyError, TypeError, ValueError) as error:
+                outputs.append(f'error: {name}: {error!r}\n')
+        return outputs
+
+    @staticmethod
+    def _require(keys: t.Mapping[String, t.Any], key: String) -> None:
+        if key not in keys:
+            raise KeyError(key)
+
+    def _command_getstats(self) -> String:
+        now: Integer = int(time.time())
+        block: String = f'(-1,8000000000000000,{self.masterchain_seqno}):{"0" * 64}:{"0" * 64}'
+        return (
+            f'unixtime\t\t\t{now}\n'
+            f'masterchainblocktime\t\t\t{now - self.sync_lag}\n'
+            f'stateserializermasterchainseqno\t\t\t{self.masterchain_seqno}\n'
+            f'shardclientmasterchainseqno\t\t\t{self.masterchain_seqno}\n'
+            f'masterchainblock\t\t\t{block}\n'
+            f'gcmasterchainblock\t\t\t{block}\n'
+            f'keymasterchainblock\t\t\t{block}\n'
+            f'rotatemasterchainblock\t\t\t{block}\n'
+        )
+
+    def _command_getconfig(self) -> String:
+        return f'---------\n{json.dumps(self.config, indent=2)}\n'
+
+    def _command_newkey(self) -> String:
+        key: String = os.urandom(32).hex().upper()
+        self.keys[key] = os.urandom(32)
+        return f'created new key {key}\n'
+
+    def _command_exportpub(self, key: String) -> String:
+        public_key: Bytes = b'\xc6\xb4\x13\x48' + self.keys[key]
+        return f'got public key: {base64.urlsafe_b64encode(public_key).decode()}\n'
+
+    def _command_addpermkey(self, key: String, election_id: String, expire_at: String) -> String:
+        self._require(self.keys, key)
+        self.permanent_keys[key] = (int(election_id), int(expire_at))
+        return 'success\n'
+
+    def _command_addtempkey(self, permanent_key: String, key: String, expire_at: String) -> String:
+        self._require(self.permanent_keys, permanent_key)
+        self.temporary_keys[key] = (permanent_key, int(expire_at))
+        return 'success\n'
+
+    def _command_addadnl(self, key: String, category: String) -> String:
+        self._require(self.keys, key)
+        self.adnl_addresses[key] = int(category)
+        return 'success\n'
+
+    def _command_addvalidatoraddr(self, permanent_key: String, adnl: String, expire_at: String) -> String:
+        self._require(self.permanent_keys, permanent_key)
+        self.validator_addresses[permanent_key] = (adnl, int(expire_at))
+        return 'success\n'
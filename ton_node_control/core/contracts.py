@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import typing as t
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.cli.utils.system import get_cpu_count
+from ton_node_control.core.exceptions import ContractBuildError
+from ton_node_control.core.fift import FiftPool, get_fift_pool
+from ton_node_control.core.setup import locate_func
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Integer, String
+
+INCLUDE_REGEX = re.compile(rb'^\s*#include\s+"([^"]+)"', re.MULTILINE)
+
+TO_BOC_SCRIPT: String = '"{assembly}" include 2 boc+>B "contract.boc" B>file'
+
+
+@dataclass(frozen=True)
+class Contract:
+    """
+    Compilation unit: FunC sources passed to "func" in this order,
+    usually "stdlib.fc" followed by the contract itself.
+    """
+    name: String
+    sources: t.Tuple[Path, ...]
+    options: t.Tuple[String, ...] = ('-SPA',)
+
+    @classmethod
+    def make(cls, name: String, *sources: Path, options: t.Sequence[String] = ('-SPA',)) -> Contract:
+        return cls(name, tuple(path.resolve() for path in sources), tuple(options))
+
+
+@dataclass(frozen=True)
+class ContractArtifact:
+    contract: Contract
+    key: String
+    assembly_path: Path
+    boc_path: Path
+    dependencies: t.Tuple[Path, ...] = field(default=(), compare=False)
+    cached: bool = False
+
+
+class IncludeGraph:
+    """
+    Memoized "#include" dependency graph of FunC sources.
+    Entries are invalidated by file modification time and size,
+    so one graph can be reused across builds of a long living process.
+    """
+
+    def __init__(self) -> None:
+        self._entries: t.Dict[Path, t.Tuple[t.Tuple[Integer, Integer], t.Tuple[Path, ...]]] = {}
+
+    def includes(self, path: Path) -> t.Tuple[Path, ...]:
+        stat: os.stat_result = path.stat()
+        signature: t.Tuple[Integer, Integer] = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        included: t.Tuple[Path, ...] = tuple(
+            path.parent.joinpath(name.decode()).resolve()
+            for name in INCLUDE_REGEX.findall(path.read_bytes())
+        )
+        self._entries[path] = (signature, included)
+        return included
+
+    def closure(self, sources: t.Iterable[Path]) -> t.Tuple[Path, ...]:
+        """
+        Returns every file the sources depend on, including themselves,
+        in a stable depth-first order.
+        """
+        seen: t.Dict[Path, None] = {}
+        stack: t.List[Path] = list(reversed(list(sources)))
+        while stack:
+            path: Path = stack.pop()
+            if path in seen:
+                continue
+            if not path.is_file():
+                raise ContractBuildError(f'Included file "{path}" does not exist', command=str(path))
+            seen[path] = None
+            stack.extend(reversed(self.includes(path)))
+        return tuple(seen)
+
+
+class ContractBuilder:
+    """
+    Incremental FunC to BOC builder.
+    Artifacts are stored under a key derived from the content of every
+    source in the include closure, the compiler options and the "func"
+    version, so unchanged contracts are never compiled twice, neither on
+    this host nor on any host sharing the cache directory.
+    """
+
+    def __init__(
+        self,
+        *,
+        func_path: t.Optional[Path] = None,
+        fift_pool: t.Optional[FiftPool] = None,
+        cache_directory: t.Optional[Path] = None,
+        workers: t.Optional[Integer] = None,
+    ) -> None:
+        self._func_path: t.Optional[Path] = func_path
+        self._fift_pool: t.Optional[FiftPool] = fift_pool
+        self.cache_directory: Path = cache_directory or get_ton_node_control_home('cache', 'contracts')
+        self.workers: Integer = workers or get_cpu_count() or 1
+        self.graph: IncludeGraph = IncludeGraph()
+        self._func_version: t.Optional[String] = None
+
+    @property
+    def func_path(self) -> Path:
+        if self._func_path is None:
+            self._func_path = locate_func()
+        return self._func_path
+
+    @property
+    def fift_pool(self) -> FiftPool:
+        if self._fift_pool is None:
+            self._fift_pool = get_fift_pool()
+        return self._fift_pool
+
+    @property
+    def func_version(self) -> String:
+        if self._func_version is None:
+            process = subprocess.run(
+                [str(self.func_path), '-V'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            self._func_version = process.stdout.decode(errors='replace').strip()
+        return self._func_version
+
+    def key(self, contract: Contract, dependencies: t.Sequence[Path]) -> String:
+        # Paths count relative to the directory holding the whole include
+        # closure, so the same sources checked out elsewhere share a key.
+        root: Path = Path(os.path.commonpath([path.parent for path in dependencies]))
+        digest = hashlib.sha256()
+        digest.update(self.func_version.encode() + b'\0')
+        digest.update('\0'.join(contract.options).encode() + b'\0')
+        digest.update('\0'.join(path.relative_to(root).as_posix() for path in contract.sources).encode() + b'\0')
+        for path in dependencies:
+            digest.update(path.relative_to(root).as_posix().encode() + b'\0')
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+        return digest.hexdigest()
+
+    def _artifact_directory(self, key: String) -> Path:
+        return self.cache_directory.joinpath(key[:2], key)
+
+    def _lookup(
+        self,
+        contract: Contract,
+        key: String,
+        dependencies: t.Tuple[Path, ...],
+    ) -> t.Optional[ContractArtifact]:
+        directory: Path = self._artifact_directory(key)
+        if not directory.joinpath('meta.json').is_file():
+            return None
+        return ContractArtifact(
+            contract=contract,
+            key=key,
+            assembly_path=directory.joinpath('contract.fif'),
+            boc_path=directory.joinpath('contract.boc'),
+            dependencies=dependencies,
+            cached=True,
+        )
+
+    def _compile(
+        self,
+        contract: Contract,
+        key: String,
+        dependencies: t.Tuple[Path, ...],
+    ) -> ContractArtifact:
+        directory: Path = self._artifact_directory(key)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        staging: Path = Path(tempfile.mkdtemp(prefix=f'{key}.', dir=directory.parent))
+        try:
+            assembly_path: Path = staging.joinpath('contract.fif')
+            process = subprocess.run(
+                [
+                    str(self.func_path),
+                    *contract.options,
+                    '-o', str(assembly_path),
+                    *(str(path) for path in contract.sources),
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            if process.returncode != 0:
+                raise ContractBuildError(
+                    f'Unable to compile contract "{contract.name}"',
+                    command=contract.name,
+                    log=process.stdout.decode(errors='replace'),
+                    return_code=process.returncode,
+                )
+            result = self.fift_pool.run(
+                TO_BOC_SCRIPT.format(assembly=assembly_path.resolve()),
+                outputs=['contract.boc'],
+            )
+            staging.joinpath('contract.boc').write_bytes(result.files['contract.boc'])
+            staging.joinpath('meta.json').write_text(json.dumps({
+                'name': contract.name,
+                'sources': [str(path) for path in contract.sources],
+                'dependencies': [str(path) for path in dependencies],
+                'func_version': self.func_version,
+            }))
+            try:
+                os.rename(staging, directory)
+            except OSError:
+                # Built concurrently by another process, which is just as good.
+                if not directory.joinpath('meta.json').is_file():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return ContractArtifact(
+            contract=contract,
+            key=key,
+            assembly_path=directory.joinpath('contract.fif'),
+            boc_path=directory.joinpath('contract.boc'),
+            dependencies=dependencies,
+        )
+
+    def build(self, contract: Contract, *, force: bool = False) -> ContractArtifact:
+        dependencies: t.Tuple[Path, ...] = self.graph.closure(contract.sources)
+        key: String = self.key(contract, dependencies)
+        if force is False:
+            artifact: t.Optional[ContractArtifact] = self._lookup(contract, key, dependencies)
+            if artifact is not None:
+                return artifact
+        shutil.rmtree(self._artifact_directory(key), ignore_errors=True)
+        return self._compile(contract, key, dependencies)
+
+    def build_all(
+        self,
+        contracts: t.Iterable[Contract],
+        *,
+        force: bool = False,
+    ) -> t.Dict[String, ContractArtifact]:
+        """
+        Builds independent contracts in parallel, "func" runs as a
+        separate process so threads are enough to keep every core busy.
+        """
+        contracts = list(contracts)
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(len(contracts), 1))) as executor:
+            artifacts: t.List[ContractArtifact] = list(executor.map(
+                lambda contract: self.build(contract, force=force),
+                contracts,
+            ))
+        return {artifact.contract.name: artifact for artifact in artifacts}
@@ -0,0 +1,4 @@
+from ._pool import ClientPool, get_client_pool  # noqa: F401
+from .base import ExternalSystemDataSource, JsonRpcDataSource  # noqa: F401
+from .toncenter import TonCenterDataSource  # noqa: F401
+from ._limits import AdaptiveLimiter, RequestPriority  # noqa: F401
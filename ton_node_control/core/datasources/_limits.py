@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import email.utils
+import enum
+import heapq
+import itertools
+import re
+import time
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.utils.typing import Integer, String
+
+RATE_LIMIT_POLICY_REGEX = re.compile(r'^\s*(\d+)\s*;\s*w\s*=\s*(\d+)')
+
+
+class RequestPriority(enum.IntEnum):
+    alerting = 0
+    interactive = 10
+    background = 20
+
+
+class TokenBucket:
+    """
+    Request rate limiter whose rate follows the limits the API announces
+    in its response headers.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.paused_until: float = 0.0
+        self._updated: float = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """
+        Seconds to wait before a token is available, zero when one is.
+        """
+        now: float = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    @staticmethod
+    def _seconds(value: String) -> t.Optional[float]:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            moment = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(moment.timestamp() - time.time(), 0.0)
+
+    def update_from_headers(self, headers: t.Mapping[String, String]) -> None:
+        retry_after: t.Optional[String] = headers.get('retry-after')
+        if retry_after is not None:
+            seconds: t.Optional[float] = self._seconds(retry_after)
+            if seconds is not None:
+                self.pause(seconds)
+
+        limit: t.Optional[String] = headers.get('x-ratelimit-limit') or headers.get('ratelimit-limit')
+        window: float = 1.0
+        policy: t.Optional[t.Match] = RATE_LIMIT_POLICY_REGEX.match(headers.get('ratelimit-policy', ''))
+        if policy is not None:
+            limit, window = policy.group(1), float(policy.group(2)) or 1.0
+        if limit is not None and limit.split(',')[0].strip().isdigit():
+            requests: Integer = int(limit.split(',')[0])
+            if requests > 0:
+                self.rate = requests / window
+                self.burst = max(1.0, float(requests))
+
+        remaining: t.Optional[String] = headers.get('x-ratelimit-remaining') or headers.get('ratelimit-remaining')
+        reset: t.Optional[String] = headers.get('x-ratelimit-reset') or headers.get('ratelimit-reset')
+        if remaining is not None and remaining.strip() == '0' and reset is not None:
+            seconds = self._seconds(reset)
+            # Some APIs send an epoch timestamp instead of a delay.
+            if seconds is not None and seconds > 10 ** 9:
+                seconds = max(seconds - time.time(), 0.0)
+            if seconds is not None:
+                self.pause(seconds)
+
+
+class AimdConcurrency:
+    """
+    Additive increase, multiplicative decrease of the number of requests
+    in flight, driven by throttling, server errors and latency inflation
+    over the best latency seen recently.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        *,
+        minimum: float = 1,
+        maximum: float = 64,
+        backoff: float = 0.7,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self.limit: float = initial
+        self.minimum: float = minimum
+        self.maximum: float = maximum
+        self.backoff: float = backoff
+        self.latency_tolerance: float = latency_tolerance
+
+        self.baseline_latency: t.Optional[float] = None
+        self.latency: t.Optional[float] = None
+        self.error_rate: float = 0.0
+        self._last_decrease: float = 0.0
+
+    def _decrease(self, now: float) -> None:
+        # One decrease per round trip, a burst of failures is one signal.
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+    def record(self, latency: float, *, throttled: bool = False, failed: bool = False) -> None:
+        now: float = time.monotonic()
+        self.error_rate = 0.9 * self.error_rate + (0.1 if throttled or failed else 0.0)
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if throttled or failed:
+            self._decrease(now)
+            return
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            # Let the baseline drift up, otherwise a single lucky
+            # request would pin the limit down forever.
+            self.baseline_latency *= 1.01
+        if self.latency > self.baseline_latency * self.latency_tolerance:
+            self._decrease(now)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+@dataclass(frozen=True)
+class LimiterStats:
+    rate: float
+    concurrency_limit: float
+    in_flight: Integer
+    waiting: Integer
+    latency: t.Optional[float]
+    error_rate: float
+
+
+class AdaptiveLimiter:
+    """
+    Admission control of one datasource: requests wait in a priority
+    queue and are let through while both the concurrency limit and the
+    token bucket allow it, highest priority first.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 10.0,
+        burst: float = 10.0,
+        concurrency: float = 4,
+        max_concurrency: float = 64,
+    ) -> None:
+        self.bucket: TokenBucket = TokenBucket(rate, burst)
+        self.concurrency: AimdConcurrency = AimdConcurrency(concurrency, maximum=max_concurrency)
+        self.in_flight: Integer = 0
+
+        self._waiters: t.List[t.Tuple[Integer, Integer, asyncio.Future]] = []
+        self._sequence: t.Iterator[Integer] = itertools.count()
+        self._timer: t.Optional[asyncio.TimerHandle] = None
+
+    @property
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            rate=self.bucket.rate,
+            concurrency_limit=self.concurrency.limit,
+            in_flight=self.in_flight,
+            waiting=len(self._waiters),
+            latency=self.concurrency.latency,
+            error_rate=self.concurrency.error_rate,
+        )
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters and self.in_flight < int(self.concurrency.limit):
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            delay: float = self.bucket.delay()
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            _, _, waiter = heapq.heappop(self._waiters)
+            self.bucket.take()
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    async def acquire(self, priority: Integer = RequestPriority.interactive) -> None:
+        waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), waiter))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    def record(
+        self,
+        latency: float,
+        *,
+        status_code: t.Optional[Integer] = None,
+        headers: t.Optional[t.Mapping[String, String]] = None,
+    ) -> None:
+        if headers is not None:
+            self.bucket.update_from_headers(headers)
+        self.concurrency.record(
+            latency,
+            throttled=status_code == 429,
+            failed=status_code is None or status_code >= 500,
+        )
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Integer = RequestPriority.interactive) -> t.AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import typing as t
+
+import httpx
+
+from ton_node_control.utils.typing import String
+
+DEFAULT_LIMITS: httpx.Limits = httpx.Limits(
+    max_connections=64,
+    max_keepalive_connections=32,
+    keepalive_expiry=60.0,
+)
+DEFAULT_TIMEOUT: httpx.Timeout = httpx.Timeout(10.0, connect=5.0)
+
+
+@functools.lru_cache(maxsize=None)
+def is_http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ClientPool:
+    """
+    One keep-alive "httpx.AsyncClient" per origin and event loop, shared by
+    every datasource talking to that origin.
+    """
+
+    def __init__(self) -> None:
+        self._clients: t.Dict[
+            t.Tuple[String, t.Any, t.Any],
+            t.Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient],
+        ] = {}
+
+    @staticmethod
+    def origin(url: String) -> String:
+        parsed: httpx.URL = httpx.URL(url)
+        return f'{parsed.scheme}://{parsed.netloc.decode()}'
+
+    def get(
+        self,
+        base_url: String,
+        *,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        headers: t.Optional[t.Dict[String, String]] = None,
+        transport: t.Optional[httpx.AsyncBaseTransport] = None,
+    ) -> httpx.AsyncClient:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self._discard_closed_loops()
+        key = (self.origin(base_url), id(loop), id(transport) if transport is not None else None)
+        entry = self._clients.get(key)
+        if entry is None or entry[1].is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.origin(base_url),
+                limits=limits,
+                timeout=timeout,
+                headers=headers,
+                http2=transport is None and is_http2_available(),
+                transport=transport,
+            )
+            entry = self._clients[key] = (loop, client)
+        return entry[1]
+
+    def _discard_closed_loops(self) -> None:
+        for key in [key for key, (loop, _) in self._clients.items() if loop.is_closed()]:
+            del self._clients[key]
+
+    async def aclose(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        for key, (client_loop, client) in list(self._clients.items()):
+            if client_loop is loop:
+                await client.aclose()
+                del self._clients[key]
+
+
+@functools.lru_cache(maxsize=None)
+def get_client_pool() -> ClientPool:
+    return ClientPool()
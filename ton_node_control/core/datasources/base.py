@@ -1,8 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+import typing as t
+
 from abc import ABC
 
+import httpx
+import pydantic
+
+from ton_node_control.core.datasources._limits import AdaptiveLimiter, RequestPriority
+from ton_node_control.core.datasources._pool import (
+    DEFAULT_LIMITS,
+    DEFAULT_TIMEOUT,
+    ClientPool,
+    get_client_pool,
+)
+from ton_node_control.core.exceptions import DataSourceError
+from ton_node_control.utils.typing import Integer, String
+
+Model = t.TypeVar('Model', bound=pydantic.BaseModel)
+JsonRpcCall = t.Tuple[String, t.Optional[t.Dict[String, t.Any]]]
+
 
 class ExternalSystemDataSource(ABC):
-    client: None
+    """
+    HTTP API the node controller reads chain data from.
+    Requests go through the "httpx.AsyncClient" shared by every
+    datasource of the same origin, and are admitted by an adaptive
+    limiter that follows the rate limits and the health of the API.
+    """
+
+    base_url: String = ''
+    limits: httpx.Limits = DEFAULT_LIMITS
+    timeout: httpx.Timeout = DEFAULT_TIMEOUT
+
+    rate_limit: float = 10.0
+    rate_burst: float = 10.0
+    concurrency: float = 4
+    max_concurrency: float = 64
+    throttled_retries: Integer = 2
+
+    def __init__(
+        self,
+        base_url: t.Optional[String] = None,
+        *,
+        headers: t.Optional[t.Dict[String, String]] = None,
+        transport: t.Optional[httpx.AsyncBaseTransport] = None,
+        pool: t.Optional[ClientPool] = None,
+    ) -> None:
+        self.base_url = (base_url or self.base_url).rstrip('/')
+        self.headers: t.Dict[String, String] = headers or {}
+        self.transport: t.Optional[httpx.AsyncBaseTransport] = transport
+        self.pool: ClientPool = pool or get_client_pool()
+
+        self._limiter: t.Optional[AdaptiveLimiter] = None
+        self._limiter_loop: t.Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def name(self) -> String:
+        return f'{type(self).__name__}({self.base_url})'
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.pool.get(
+            self.base_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            transport=self.transport,
+        )
+
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if self._limiter is None or self._limiter_loop is not loop:
+            self._limiter = AdaptiveLimiter(
+                rate=self.rate_limit,
+                burst=self.rate_burst,
+                concurrency=self.concurrency,
+                max_concurrency=self.max_concurrency,
+            )
+            self._limiter_loop = loop
+        return self._limiter
+
+    def url(self, path: String) -> String:
+        return f'{self.base_url}/{path.lstrip("/")}' if path else self.base_url
+
+    async def _send(
+        self,
+        method: String,
+        url: String,
+        priority: RequestPriority,
+        **kwargs: t.Any,
+    ) -> httpx.Response:
+        limiter: AdaptiveLimiter = self.limiter
+        await limiter.acquire(priority)
+        started: float = time.monotonic()
+        response: t.Optional[httpx.Response] = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            return response
+        except httpx.HTTPError as error:
+            raise DataSourceError(f'Request to "{url}" failed: {error!r}', url=url) from error
+        finally:
+            limiter.record(
+                time.monotonic() - started,
+                status_code=None if response is None else response.status_code,
+                headers=None if response is None else response.headers,
+            )
+            limiter.release()
+
+    async def request(
+        self,
+        method: String,
+        path: String = '',
+        *,
+        priority: RequestPriority = RequestPriority.interactive,
+        **kwargs: t.Any,
+    ) -> httpx.Response:
+        url: String = self.url(path)
+        headers: t.Dict[String, String] = {**self.headers, **kwargs.pop('headers', {})}
+        for _ in range(self.throttled_retries + 1):
+            response: httpx.Response = await self._send(method, url, priority, headers=headers, **kwargs)
+            # The limiter has already paused for "Retry-After",
+            # the retry waits in the queue like any other request.
+            if response.status_code != 429:
+                break
+        if response.is_error:
+            raise DataSourceError(
+                f'"{url}" answered with "{response.status_code}"',
+                url=url,
+                status_code=response.status_code,
+                log=response.text,
+            )
+        return response
+
+    async def get_json(self, path: String = '', **kwargs: t.Any) -> t.Any:
+        return (await self.request('GET', path, **kwargs)).json()
+
+    async def get_model(self, model: t.Type[Model], path: String = '', **kwargs: t.Any) -> Model:
+        return pydantic.parse_obj_as(model, await self.get_json(path, **kwargs))
+
+
+class JsonRpcDataSource(ExternalSystemDataSource):
+    """
+    JSON-RPC over HTTP. Batches are sent as one JSON array when the API
+    accepts them and as concurrent requests over the pooled connections
+    otherwise.
+    """
+
+    endpoint: String = ''
+    supports_batching: bool = True
+    max_batch_size: Integer = 32
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._ids: t.Iterator[Integer] = itertools.count(1)
+
+    def _payload(self, method: String, params: t.Optional[t.Dict[String, t.Any]]) -> t.Dict[String, t.Any]:
+        return {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params or {}}
+
+    def _result(self, method: String, answer: t.Any) -> t.Any:
+        if not isinstance(answer, dict):
+            raise DataSourceError(f'Malformed answer to "{method}"', url=self.url(self.endpoint))
+        if answer.get('error') is not None or answer.get('ok') is False:
+            raise DataSourceError(
+                f'"{method}" failed: {answer.get("error")!r}',
+                url=self.url(self.endpoint),
+                status_code=answer.get('code'),
+            )
+        return answer.get('result')
+
+    async def call(
+        self,
+        method: String,
+        params: t.Optional[t.Dict[String, t.Any]] = None,
+        *,
+        priority: RequestPriority = RequestPriority.interactive,
+    ) -> t.Any:
+        response: httpx.Response = await self.request(
+            'POST',
+            self.endpoint,
+            priority=priority,
+            json=self._payload(method, params),
+        )
+        return self._result(method, response.json())
+
+    async def call_model(
+        self,
+        model: t.Type[Model],
+        method: String,
+        params: t.Optional[t.Dict[String, t.Any]] = None,
+        *,
+        priority: RequestPriority = RequestPriority.interactive,
+    ) -> Model:
+        return pydantic.parse_obj_as(model, await self.call(method, params, priority=priority))
 
-    def __init__(self) -> None:
-        client = None
+    async def batch(
+        self,
+        calls: t.Sequence[JsonRpcCall],
+        *,
+        priority: RequestPriority = RequestPriority.interactive,
+    ) -> t.List[t.Any]:
+        if not self.supports_batching:
+            return list(await asyncio.gather(*(
+                self.call(method, params, priority=priority) for method, params in calls
+            )))
+        results: t.List[t.Any] = []
+        for start in range(0, len(calls), self.max_batch_size):
+            chunk: t.Sequence[JsonRpcCall] = calls[start:start + self.max_batch_size]
+            payloads: t.List[t.Dict[String, t.Any]] = [
+                self._payload(method, params) for method, params in chunk
+            ]
+            response: httpx.Response = await self.request(
+                'POST',
+                self.endpoint,
+                priority=priority,
+                json=payloads,
+            )
+            answers: t.Dict[t.Any, t.Any] = {
+                answer.get('id'): answer for answer in response.json() if isinstance(answer, dict)
+            }
+            results.extend(
+                self._result(method, answers.get(payload['id']))
+                for (method, _), payload in zip(chunk, payloads)
+            )
+        return results
@@ -0,0 +1,44 @@
+import typing as t
+
+import pydantic
+
+from ton_node_control.utils.typing import Integer, String
+
+
+class DataSourceModel(pydantic.BaseModel):
+    class Config:
+        allow_population_by_field_name = True
+        extra = pydantic.Extra.ignore
+
+
+class BlockIdExt(DataSourceModel):
+    workchain: Integer
+    shard: String
+    seqno: Integer
+    root_hash: String
+    file_hash: String
+
+
+class MasterchainInfo(DataSourceModel):
+    last: BlockIdExt
+    state_root_hash: String
+    init: BlockIdExt
+
+
+class Shards(DataSourceModel):
+    shards: t.List[BlockIdExt] = []
+
+
+class AddressInformation(DataSourceModel):
+    balance: Integer
+    state: String
+    code: t.Optional[String] = None
+    data: t.Optional[String] = None
+    last_transaction_id: t.Optional[t.Dict[String, t.Any]] = None
+    sync_utime: t.Optional[Integer] = None
+
+
+class GetMethodResult(DataSourceModel):
+    gas_used: Integer
+    exit_code: Integer
+    stack: t.List[t.Any] = []
@@ -0,0 +1,66 @@
+import base64
+import typing as t
+
+from ton_node_control.core.datasources.base import JsonRpcDataSource
+from ton_node_control.core.datasources.models import (
+    AddressInformation,
+    BlockIdExt,
+    GetMethodResult,
+    MasterchainInfo,
+    Shards,
+)
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+
+class TonCenterDataSource(JsonRpcDataSource):
+    base_url: String = 'https://toncenter.com/api/v2'
+    endpoint: String = 'jsonRPC'
+    supports_batching = False
+
+    def __init__(self, *args: t.Any, api_key: t.Optional[String] = None, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+        if api_key is not None:
+            self.headers['X-API-Key'] = api_key
+
+    async def get_masterchain_info(self) -> MasterchainInfo:
+        return await self.call_model(MasterchainInfo, 'getMasterchainInfo')
+
+    async def get_shards(self, seqno: Integer) -> t.List[BlockIdExt]:
+        """
+        Last blocks of the shardchains as of a masterchain block.
+        """
+        return (await self.call_model(Shards, 'shards', {'seqno': seqno})).shards
+
+    async def get_address_information(self, address: String) -> AddressInformation:
+        return await self.call_model(AddressInformation, 'getAddressInformation', {'address': address})
+
+    async def get_addresses_information(self, addresses: t.Sequence[String]) -> t.List[AddressInformation]:
+        results: t.List[t.Any] = await self.batch([
+            ('getAddressInformation', {'address': address}) for address in addresses
+        ])
+        return [AddressInformation.parse_obj(result) for result in results]
+
+    async def get_address_balance(self, address: String) -> Integer:
+        return int(await self.call('getAddressBalance', {'address': address}))
+
+    async def run_get_method(
+        self,
+        address: String,
+        method: String,
+        stack: t.Sequence[t.Any] = (),
+    ) -> GetMethodResult:
+        return await self.call_model(
+            GetMethodResult,
+            'runGetMethod',
+            {'address': address, 'method': method, 'stack': list(stack)},
+        )
+
+    async def get_config_param(self, number: Integer, *, seqno: t.Optional[Integer] = None) -> Bytes:
+        """
+        Serialized bag of cells holding the value of a configuration parameter.
+        """
+        params: t.Dict[String, t.Any] = {'config_id': number}
+        if seqno is not None:
+            params['seqno'] = seqno
+        result: t.Any = await self.call('getConfigParam', params)
+        return base64.b64decode(result['config']['bytes'])
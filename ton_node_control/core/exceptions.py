@@ -0,0 +1,43 @@
+import typing as t
+
+from ton_node_control.utils.typing import Integer, String
+
+
+class TonNodeControlError(RuntimeError):
+    pass
+
+
+class ConsoleError(TonNodeControlError):
+    def __init__(
+        self,
+        message: String,
+        command: t.Optional[String] = None,
+        log: t.Optional[String] = None,
+        return_code: t.Optional[Integer] = None,
+    ) -> None:
+        super().__init__(message)
+        self.command: t.Optional[String] = command
+        self.log: t.Optional[String] = log
+        self.return_code: t.Optional[Integer] = return_code
+
+
+class FiftError(ConsoleError):
+    pass
+
+
+class ContractBuildError(ConsoleError):
+    pass
+
+
+class DataSourceError(TonNodeControlError):
+    def __init__(
+        self,
+        message: String,
+        url: t.Optional[String] = None,
+        status_code: t.Optional[Integer] = None,
+        log: t.Optional[String] = None,
+    ) -> None:
+        super().__init__(message)
+        self.url: t.Optional[String] = url
+        self.status_code: t.Optional[Integer] = status_code
+        self.log: t.Optional[String] = log
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import atexit
+import base64
+import functools
+import hashlib
+import itertools
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.cli.utils.system import get_cpu_count
+from ton_node_control.core.exceptions import ConsoleError, FiftError
+from ton_node_control.core.process import InteractiveProcess
+from ton_node_control.core.setup import locate_fift, locate_fift_includes
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+# How fift reports a failure: an unknown word is echoed back followed by
+# "-?", other errors in an included file, as every script run is, are
+# prefixed with "<file>:<line>:<tab>", and "fift -s" leads with "Error
+# interpreting". What a script prints itself is never matched.
+FIFT_ERROR_REGEX = re.compile(r'^(?:.+:\d+:\t|error interpreting\b)|\s?-\?$', re.IGNORECASE | re.MULTILINE)
+
+Script = t.Union[Path, String]
+
+
+@dataclass(frozen=True)
+class FiftToolchain:
+    fift_path: Path
+    includes: t.Tuple[Path, ...]
+    version: String
+
+    @property
+    def include_argument(self) -> String:
+        return ':'.join(str(path) for path in self.includes)
+
+    @classmethod
+    def locate(cls) -> FiftToolchain:
+        fift_path: Path = locate_fift()
+        process = subprocess.run(
+            [str(fift_path), '-V'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return cls(
+            fift_path=fift_path,
+            includes=tuple(locate_fift_includes()),
+            version=process.stdout.decode(errors='replace').strip(),
+        )
+
+
+@dataclass(frozen=True)
+class FiftResult:
+    output: String
+    files: t.Dict[String, Bytes] = field(default_factory=dict)
+    cached: bool = False
+    duration: float = 0.0
+
+
+class FiftCache:
+    """
+    On-disk cache of deterministic fift runs, keyed by the script, its
+    arguments and inputs and the version of the "fift" binary.
+    """
+
+    def __init__(self, directory: t.Optional[Path] = None) -> None:
+        self.directory: Path = directory or get_ton_node_control_home('cache', 'fift')
+
+    @staticmethod
+    def key(
+        version: String,
+        script: Bytes,
+        arguments: t.Sequence[String],
+        inputs: t.Mapping[String, Bytes],
+        outputs: t.Sequence[String],
+    ) -> String:
+        digest = hashlib.sha256()
+        for part in (version.encode(), script, *(argument.encode() for argument in arguments)):
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        for name in sorted(inputs):
+            digest.update(name.encode() + b'\0' + hashlib.sha256(inputs[name]).digest())
+        for name in outputs:
+            digest.update(b'>' + name.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: String) -> Path:
+        return self.directory.joinpath(key[:2], f'{key}.json')
+
+    def get(self, key: String) -> t.Optional[FiftResult]:
+        try:
+            data: t.Dict[String, t.Any] = json.loads(self._path(key).read_text())
+        except (OSError, ValueError):
+            return None
+        return FiftResult(
+            output=data['output'],
+            files={name: base64.b64decode(value) for name, value in data['files'].items()},
+            cached=True,
+        )
+
+    def put(self, key: String, result: FiftResult) -> None:
+        path: Path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary: Path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        temporary.write_text(json.dumps({
+            'output': result.output,
+            'files': {name: base64.b64encode(value).decode() for name, value in result.files.items()},
+        }))
+        os.replace(temporary, path)
+
+
+def _fift_string(value: String) -> String:
+    if '"' in value or '\n' in value:
+        raise ValueError(f'Value {value!r} cannot be passed as a fift string literal')
+    return f'"{value}"'
+
+
+class FiftWorker:
+    """
+    Interactive "fift" process with "Fift.fif" and "Asm.fif" already loaded.
+    Scripts are included into it with "$0".."$n" and "$#" redefined for
+    every run, so they see the same words as with "fift -s".
+    """
+
+    MARKER: String = '__ton_node_control_done_{}'
+
+    def __init__(self, toolchain: FiftToolchain, *, timeout: float = 30.0) -> None:
+        self.toolchain: FiftToolchain = toolchain
+        self.timeout: float = timeout
+        self.directory: Path = Path(tempfile.mkdtemp(prefix='tnc-fift-'))
+
+        self._process: InteractiveProcess = InteractiveProcess(
+            [str(toolchain.fift_path), '-I', toolchain.include_argument, '-i'],
+            cwd=self.directory,
+        )
+        self._counter: t.Iterator[Integer] = itertools.count()
+        self._defined_arguments: Integer = 0
+
+    def _execute(self, source: String) -> String:
+        marker: String = self.MARKER.format(next(self._counter))
+        self._process.write(f'{source}\ncr ."{marker}" cr\n'.encode())
+        response: Bytes = self._process.read_until(
+            marker.encode(),
+            time.monotonic() + self.timeout,
+        )
+        lines: t.List[String] = response.decode(errors='replace').splitlines()
+        return '\n'.join(line for line in lines if line.strip() != 'ok')
+
+    def start(self) -> None:
+        if self._process.is_running:
+            return
+        self._process.start()
+        self._defined_arguments = 0
+        output: String = self._execute('"Asm.fif" include')
+        if FIFT_ERROR_REGEX.search(output) is not None:
+            raise FiftError('Unable to load "Asm.fif"', log=output)
+
+    def stop(self) -> None:
+        self._process.stop()
+
+    def close(self) -> None:
+        self.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run(
+        self,
+        script_path: Path,
+        arguments: t.Sequence[String],
+        outputs: t.Sequence[String],
+    ) -> t.Tuple[String, t.Dict[String, Bytes]]:
+        self.start()
+        definitions: t.List[String] = [
+            f'{_fift_string(value)} constant ${position}'
+            for position, value in enumerate([str(script_path), *arguments])
+        ]
+        definitions.extend(
+            f'forget ${position}'
+            for position in range(len(arguments) + 1, self._defined_arguments + 1)
+        )
+        definitions.append(f'{len(arguments)} constant $#')
+        try:
+            output: String = self._execute(
+                'depth { drop } swap times\n'
+                + '\n'.join(definitions) + '\n'
+                + f'{_fift_string(str(script_path))} include',
+            )
+        except (OSError, ConsoleError):
+            self.stop()
+            raise
+        self._defined_arguments = len(arguments)
+        if FIFT_ERROR_REGEX.search(output) is not None:
+            # Aborted scripts may leave half defined words behind.
+            self.stop()
+            raise FiftError(f'Script "{script_path}" failed', command=str(script_path), log=output)
+        files: t.Dict[String, Bytes] = {}
+        for name in outputs:
+            path: Path = self.directory.joinpath(name)
+            files[name] = path.read_bytes()
+            path.unlink()
+        return output, files
+
+
+class FiftPool:
+    """
+    Pool of warm fift interpreters shared by wallet, election and
+    contract tooling, with an optional cache for deterministic runs.
+    """
+
+    def __init__(
+        self,
+        toolchain: t.Optional[FiftToolchain] = None,
+        *,
+        size: t.Optional[Integer] = None,
+        cache: t.Optional[FiftCache] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        self._toolchain: t.Optional[FiftToolchain] = toolchain
+        self.size: Integer = size or min(get_cpu_count() or 1, 4)
+        self.cache: FiftCache = cache or FiftCache()
+        self.timeout: float = timeout
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._workers: t.List[FiftWorker] = []
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def toolchain(self) -> FiftToolchain:
+        if self._toolchain is None:
+            self._toolchain = FiftToolchain.locate()
+        return self._toolchain
+
+    def _acquire(self) -> FiftWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = FiftWorker(self.toolchain, timeout=self.timeout)
+                self._workers.append(worker)
+                return worker
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise FiftError(f'No fift interpreter was free within {self.timeout:.2f}s') from None
+
+    def warm_up(self) -> None:
+        workers: t.List[FiftWorker] = [self._acquire() for _ in range(self.size)]
+        for worker in workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def _run_cold(
+        self,
+        script_path: Path,
+        arguments: t.Sequence[String],
+        outputs: t.Sequence[String],
+    ) -> t.Tuple[String, t.Dict[String, Bytes]]:
+        with tempfile.TemporaryDirectory(prefix='tnc-fift-') as directory:
+            process = subprocess.run(
+                [
+                    str(self.toolchain.fift_path),
+                    '-I', self.toolchain.include_argument,
+                    '-s', str(script_path),
+                    *arguments,
+                ],
+                cwd=directory,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                timeout=self.timeout,
+            )
+            output: String = process.stdout.decode(errors='replace')
+            if process.returncode != 0:
+                raise FiftError(
+                    f'Script "{script_path}" failed',
+                    command=str(script_path),
+                    log=output,
+                    return_code=process.returncode,
+                )
+            return output, {name: Path(directory, name).read_bytes() for name in outputs}
+
+    def run(
+        self,
+        script: Script,
+        arguments: t.Sequence[String] = (),
+        *,
+        outputs: t.Sequence[String] = (),
+        inputs: t.Sequence[Path] = (),
+        deterministic: bool = False,
+    ) -> FiftResult:
+        """
+        Runs a fift script given either as a path or as source text.
+        Files named in "outputs" are written by the script relative to its
+        working directory and returned. Runs marked as deterministic are
+        served from the cache, with the contents of "inputs" in the key.
+        """
+        started: float = time.monotonic()
+        source: Bytes = script.read_bytes() if isinstance(script, Path) else script.encode()
+        key: t.Optional[String] = None
+        if deterministic is True:
+            key = self.cache.key(
+                self.toolchain.version,
+                source,
+                arguments,
+                {str(path): path.read_bytes() for path in inputs},
+                outputs,
+            )
+            cached: t.Optional[FiftResult] = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        worker: FiftWorker = self._acquire()
+        try:
+            script_path: Path = script if isinstance(script, Path) else worker.directory.joinpath(
+                f'script-{hashlib.sha256(source).hexdigest()[:16]}.fif',
+            )
+            if not isinstance(script, Path):
+                script_path.write_bytes(source)
+            try:
+                output, files = worker.run(script_path.resolve(), arguments, outputs)
+            except ValueError:
+                output, files = self._run_cold(script_path.resolve(), arguments, outputs)
+        finally:
+            self._idle.put(worker)
+
+        result = FiftResult(output=output, files=files, duration=time.monotonic() - started)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers.clear()
+        self._idle = queue.LifoQueue()
+
+
+@functools.lru_cache(maxsize=None)
+def get_fift_pool() -> FiftPool:
+    """
+    The pool shared by the whole process, closed when it exits; whoever
+    uses it leaves it open for the next one.
+    """
+    pool: FiftPool = FiftPool()
+    atexit.register(pool.close)
+    return pool
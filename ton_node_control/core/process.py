@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import select
+import subprocess
+import time
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.core.exceptions import ConsoleError
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+
+class InteractiveProcess:
+    """
+    Long living child process driven through its stdin, whose responses are
+    read from the merged stdout and stderr up to a line holding a marker.
+    """
+
+    def __init__(
+        self,
+        arguments: t.Sequence[String],
+        *,
+        cwd: t.Optional[Path] = None,
+        env: t.Optional[t.Dict[String, String]] = None,
+    ) -> None:
+        self.arguments: t.List[String] = list(arguments)
+        self.cwd: t.Optional[Path] = cwd
+        self.env: t.Optional[t.Dict[String, String]] = env
+
+        self._process: t.Optional[subprocess.Popen] = None
+        self._buffer: bytearray = bytearray()
+
+    @property
+    def name(self) -> String:
+        return Path(self.arguments[0]).name
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._buffer.clear()
+        self._process = subprocess.Popen(
+            self.arguments,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self.cwd,
+            env=self.env,
+            bufsize=0,
+        )
+
+    def stop(self) -> None:
+        process: t.Optional[subprocess.Popen] = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def write(self, payload: Bytes) -> None:
+        self._process.stdin.write(payload)
+
+    def _fill(self, deadline: float) -> None:
+        stdout: t.IO[Bytes] = self._process.stdout
+        remaining: float = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ConsoleError(f'Timed out waiting for "{self.name}"')
+        ready, _, _ = select.select([stdout], [], [], remaining)
+        if not ready:
+            return
+        chunk: Bytes = os.read(stdout.fileno(), 65536)
+        if not chunk:
+            raise ConsoleError(
+                f'"{self.name}" exited unexpectedly',
+                log=self._buffer.decode(errors='replace'),
+                return_code=self._process.poll(),
+            )
+        self._buffer += chunk
+
+    def wait_for_output(self, deadline: float) -> None:
+        """
+        Returns once there is a complete line not read yet.
+        """
+        while b'\n' not in self._buffer:
+            self._fill(deadline)
+
+    def read_until(self, marker: Bytes, deadline: float) -> Bytes:
+        """
+        Returns everything before the line containing the marker
+        and consumes that line.
+        """
+        while True:
+            position: Integer = self._buffer.find(marker)
+            if position != -1:
+                line_end: Integer = self._buffer.find(b'\n', position)
+                if line_end != -1:
+                    line_start: Integer = self._buffer.rfind(b'\n', 0, position) + 1
+                    response: Bytes = bytes(self._buffer[:line_start])
+                    del self._buffer[:line_end + 1]
+                    return response
+            self._fill(deadline)
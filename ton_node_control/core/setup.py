@@ -1,5 +1,58 @@
+import os
 import pathlib
+import shutil
+import sys
+import typing as t
+
+from ton_node_control.utils.locations import (
+    BINARIES_PATH,
+    SOURCES_PATH,
+    get_ton_binaries_directory,
+)
+from ton_node_control.utils.typing import String
+
+
+def _binary_candidates(name: String, *relative: String) -> t.Iterator[pathlib.Path]:
+    which: t.Optional[String] = shutil.which(name)
+    if which is not None:
+        yield pathlib.Path(which)
+    for root in (get_ton_binaries_directory(), BINARIES_PATH[sys.platform].joinpath('ton')):
+        yield root.joinpath('bin', name)
+        yield root.joinpath(*relative, name)
+
+
+def _locate_binary(name: String, *relative: String) -> pathlib.Path:
+    for candidate in _binary_candidates(name, *relative):
+        if candidate.is_file() and os.access(candidate, os.X_OK):
+            return candidate
+    raise FileNotFoundError(f'Unable to locate "{name}" binary')
 
 
 def locate_fift() -> pathlib.Path:
-    pass
+    return _locate_binary('fift', 'crypto')
+
+
+def locate_func() -> pathlib.Path:
+    return _locate_binary('func', 'crypto')
+
+
+def locate_fift_includes() -> t.List[pathlib.Path]:
+    """
+    Returns the directories "fift" has to search for "Fift.fif", "Asm.fif"
+    and the smart contract scripts, honouring "FIFTPATH" first.
+    """
+    candidates: t.List[pathlib.Path] = [
+        pathlib.Path(path) for path in os.getenv('FIFTPATH', '').split(':') if path
+    ]
+    for root in (get_ton_binaries_directory(), SOURCES_PATH[sys.platform].joinpath('ton')):
+        candidates.append(root.joinpath('crypto', 'fift', 'lib'))
+        candidates.append(root.joinpath('crypto', 'smartcont'))
+        candidates.append(root.joinpath('lib', 'fift'))
+        candidates.append(root.joinpath('share', 'ton', 'smartcont'))
+    includes: t.List[pathlib.Path] = []
+    for candidate in candidates:
+        if candidate.is_dir() and candidate not in includes:
+            includes.append(candidate)
+    if not any(path.joinpath('Fift.fif').is_file() for path in includes):
+        raise FileNotFoundError('Unable to locate "Fift.fif" library')
+    return includes
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import re
+import threading
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+MASTERCHAIN: t.Final[Integer] = -1
+BASECHAIN: t.Final[Integer] = 0
+SHARD_FULL: t.Final[Integer] = 0x8000000000000000
+
+BLOCK_ID_REGEX = re.compile(
+    r'\((-?\d+),([0-9a-fA-F]{16}),(\d+)\)'
+    r'(?::([0-9a-fA-F]{64}):([0-9a-fA-F]{64}))?'
+)
+
+
+@dataclass(frozen=True)
+class ShardDescriptor:
+    workchain: Integer
+    shard: Integer
+    seqno: Integer
+    root_hash: t.Optional[String] = None
+    file_hash: t.Optional[String] = None
+
+    @property
+    def prefix_length(self) -> Integer:
+        return shard_prefix_length(self.shard)
+
+    @property
+    def shard_hex(self) -> String:
+        return f'{self.shard:016x}'
+
+    def contains(self, account_prefix: Integer) -> bool:
+        lowest_bit: Integer = self.shard & -self.shard
+        mask: Integer = ~((lowest_bit << 1) - 1) & 0xFFFFFFFFFFFFFFFF
+        return (account_prefix & mask) == (self.shard & mask)
+
+    def __str__(self) -> String:
+        return f'({self.workchain},{self.shard_hex},{self.seqno})'
+
+
+def shard_prefix_length(shard: Integer) -> Integer:
+    if shard <= 0 or shard > 0xFFFFFFFFFFFFFFFF:
+        raise ValueError(f'Invalid shard identifier: "{shard:x}"')
+    return 63 - ((shard & -shard).bit_length() - 1)
+
+
+def account_prefix(account_id: t.Union[Bytes, Integer, String]) -> Integer:
+    """
+    Returns the top 64 bits of an account id, which is all that the
+    shard routing ever looks at.
+    """
+    if isinstance(account_id, int):
+        return account_id >> 192
+    if isinstance(account_id, str):
+        account_id = bytes.fromhex(account_id.split(':')[-1])
+    if len(account_id) != 32:
+        raise ValueError(f'Account id must be 32 bytes long, got {len(account_id)}')
+    return int.from_bytes(account_id[:8], 'big')
+
+
+def parse_block_ids(text: String) -> t.List[ShardDescriptor]:
+    """
+    Extracts block ids in the "(workchain,shard,seqno):root_hash:file_hash"
+    notation that lite-client prints for "allshards" and "last".
+    """
+    return [
+        ShardDescriptor(
+            workchain=int(workchain),
+            shard=int(shard, 16),
+            seqno=int(seqno),
+            root_hash=root_hash.upper() if root_hash else None,
+            file_hash=file_hash.upper() if file_hash else None,
+        )
+        for workchain, shard, seqno, root_hash, file_hash in BLOCK_ID_REGEX.findall(text)
+    ]
+
+
+class _TrieNode:
+    __slots__ = ('children', 'shard')
+
+    def __init__(self) -> None:
+        self.children: t.List[t.Optional[_TrieNode]] = [None, None]
+        self.shard: t.Optional[ShardDescriptor] = None
+
+
+class ShardTrie:
+    """
+    Binary trie over shard prefixes of a single workchain.
+    Every leaf holds exactly one shard, so looking an account up costs at
+    most the prefix length of the shard it belongs to.
+    """
+
+    def __init__(self) -> None:
+        self._root: _TrieNode = _TrieNode()
+        self._size: Integer = 0
+
+    def __len__(self) -> Integer:
+        return self._size
+
+    @staticmethod
+    def _bits(shard: Integer) -> t.Iterator[Integer]:
+        for position in range(shard_prefix_length(shard)):
+            yield (shard >> (63 - position)) & 1
+
+    def insert(self, descriptor: ShardDescriptor) -> None:
+        node: _TrieNode = self._root
+        for bit in self._bits(descriptor.shard):
+            child: t.Optional[_TrieNode] = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _TrieNode()
+            node = child
+        if node.shard is None:
+            self._size += 1
+        node.shard = descriptor
+
+    def remove(self, shard: Integer) -> t.Optional[ShardDescriptor]:
+        path: t.List[t.Tuple[_TrieNode, Integer]] = []
+        node: t.Optional[_TrieNode] = self._root
+        for bit in self._bits(shard):
+            path.append((node, bit))
+            node = node.children[bit]
+            if node is None:
+                return None
+        removed: t.Optional[ShardDescriptor] = node.shard
+        if removed is None:
+            return None
+        node.shard = None
+        self._size -= 1
+        for parent, bit in reversed(path):
+            child: _TrieNode = parent.children[bit]
+            if child.shard is not None or child.children != [None, None]:
+                break
+            parent.children[bit] = None
+        return removed
+
+    def lookup(self, prefix: Integer) -> t.Optional[ShardDescriptor]:
+        node: t.Optional[_TrieNode] = self._root
+        for position in range(64):
+            if node.shard is not None:
+                return node.shard
+            node = node.children[(prefix >> (63 - position)) & 1]
+            if node is None:
+                return None
+        return node.shard
+
+    def __iter__(self) -> t.Iterator[ShardDescriptor]:
+        stack: t.List[_TrieNode] = [self._root]
+        while stack:
+            node: _TrieNode = stack.pop()
+            if node.shard is not None:
+                yield node.shard
+            stack.extend(child for child in reversed(node.children) if child is not None)
+
+
+class ShardTopology:
+    """
+    Current account to shard routing, kept in sync with the shard hashes of
+    the latest applied masterchain block.
+    Updates are incremental: only shards that were split, merged or
+    produced a new block are touched.
+    """
+
+    def __init__(self) -> None:
+        self._lock: threading.RLock = threading.RLock()
+        self._tries: t.Dict[Integer, ShardTrie] = {}
+        self._shards: t.Dict[t.Tuple[Integer, Integer], ShardDescriptor] = {}
+        self._masterchain_seqno: t.Optional[Integer] = None
+
+    @property
+    def masterchain_seqno(self) -> t.Optional[Integer]:
+        return self._masterchain_seqno
+
+    @property
+    def workchains(self) -> t.List[Integer]:
+        with self._lock:
+            return sorted(self._tries)
+
+    def shards(self, workchain: t.Optional[Integer] = None) -> t.List[ShardDescriptor]:
+        with self._lock:
+            return sorted(
+                (
+                    descriptor for descriptor in self._shards.values()
+                    if workchain is None or descriptor.workchain == workchain
+                ),
+                key=lambda descriptor: (descriptor.workchain, descriptor.shard),
+            )
+
+    def update(
+        self,
+        masterchain_seqno: Integer,
+        shards: t.Iterable[ShardDescriptor],
+    ) -> bool:
+        """
+        Applies the shard hashes of a masterchain block.
+        Blocks older than the already applied one are ignored, so concurrent
+        watchers may feed the same topology without coordinating.
+        Returns whether the topology has been changed.
+        """
+        incoming: t.Dict[t.Tuple[Integer, Integer], ShardDescriptor] = {
+            (descriptor.workchain, descriptor.shard): descriptor
+            for descriptor in shards
+            if descriptor.workchain != MASTERCHAIN
+        }
+        with self._lock:
+            if self._masterchain_seqno is not None and masterchain_seqno <= self._masterchain_seqno:
+                return False
+            self._masterchain_seqno = masterchain_seqno
+            changed: bool = False
+            for key in self._shards.keys() - incoming.keys():
+                self._tries[key[0]].remove(key[1])
+                del self._shards[key]
+                changed = True
+            for key, descriptor in incoming.items():
+                if self._shards.get(key) == descriptor:
+                    continue
+                self._tries.setdefault(key[0], ShardTrie()).insert(descriptor)
+                self._shards[key] = descriptor
+                changed = True
+            for workchain in [workchain for workchain, trie in self._tries.items() if not trie]:
+                del self._tries[workchain]
+            return changed
+
+    def update_from_text(self, masterchain_seqno: Integer, text: String) -> bool:
+        return self.update(masterchain_seqno, parse_block_ids(text))
+
+    def route(
+        self,
+        workchain: Integer,
+        account_id: t.Union[Bytes, Integer, String],
+    ) -> ShardDescriptor:
+        if workchain == MASTERCHAIN:
+            return ShardDescriptor(
+                workchain=MASTERCHAIN,
+                shard=SHARD_FULL,
+                seqno=self._masterchain_seqno or 0,
+            )
+        prefix: Integer = account_prefix(account_id)
+        with self._lock:
+            trie: t.Optional[ShardTrie] = self._tries.get(workchain)
+            descriptor: t.Optional[ShardDescriptor] = None if trie is None else trie.lookup(prefix)
+        if descriptor is None:
+            raise LookupError(
+                f'No shard of workchain "{workchain}" covers account prefix "{prefix:016x}"',
+            )
+        return descriptor
+
+    def route_address(self, address: String) -> ShardDescriptor:
+        workchain, account_id = address.split(':', 1)
+        return self.route(int(workchain), account_id)
+
+
+_shard_topology: t.Optional[ShardTopology] = None
+_shard_topology_lock: threading.Lock = threading.Lock()
+
+
+def get_shard_topology() -> ShardTopology:
+    global _shard_topology
+    with _shard_topology_lock:
+        if _shard_topology is None:
+            _shard_topology = ShardTopology()
+        return _shard_topology
@@ -0,0 +1,2 @@
+from .codec import TlCodec, TlObject, get_tl_codec  # noqa: F401
+from .schema import TlCombinator, TlParameter, TlSchema, parse_schema  # noqa: F401
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import importlib.util
+import os
+import types
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.core.tl.generator import GENERATOR_VERSION, generate_module
+from ton_node_control.core.tl.schema import TlSchema, locate_schemas, parse_schema
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Bytes, String
+
+TlObject = t.Dict[String, t.Any]
+
+
+class TlCodec:
+    """
+    Serializer of TL objects, represented as dicts with an "@type" key,
+    backed by a module generated from the schema once and cached on disk
+    by the hash of the schema and of the generator.
+    """
+
+    def __init__(self, module: types.ModuleType, schema: TlSchema) -> None:
+        self.module: types.ModuleType = module
+        self.schema: TlSchema = schema
+        self.error: t.Type[ValueError] = module.TlDecodeError
+
+    @classmethod
+    def from_sources(
+        cls,
+        sources: t.Sequence[String],
+        *,
+        cache_directory: t.Optional[Path] = None,
+    ) -> TlCodec:
+        digest = hashlib.sha256(f'generator-{GENERATOR_VERSION}'.encode())
+        schema = TlSchema()
+        for source in sources:
+            digest.update(source.encode())
+            schema.extend(parse_schema(source))
+        schema_hash: String = digest.hexdigest()
+
+        directory: Path = cache_directory or get_ton_node_control_home('cache', 'tl')
+        path: Path = directory.joinpath(f'tl_codec_{schema_hash[:24]}.py')
+        if not path.is_file():
+            directory.mkdir(parents=True, exist_ok=True)
+            temporary: Path = path.with_suffix(f'.{os.getpid()}.tmp')
+            temporary.write_text(generate_module(schema, schema_hash))
+            os.replace(temporary, path)
+
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module: types.ModuleType = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if module.SCHEMA_HASH != schema_hash:
+            path.unlink()
+            raise ImportError(f'Generated TL codec "{path}" does not match its schema')
+        return cls(module, schema)
+
+    @classmethod
+    def from_files(cls, paths: t.Sequence[Path], **kwargs: t.Any) -> TlCodec:
+        return cls.from_sources([path.read_text() for path in paths], **kwargs)
+
+    def serialize(self, value: TlObject) -> Bytes:
+        return self.module.serialize(value)
+
+    def deserialize(self, data: t.Union[Bytes, memoryview]) -> TlObject:
+        return self.module.deserialize(data)
+
+
+@functools.lru_cache(maxsize=None)
+def get_tl_codec() -> TlCodec:
+    return TlCodec.from_files(locate_schemas())
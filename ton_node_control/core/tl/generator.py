@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import re
+import struct
+import typing as t
+
+from ton_node_control.core.tl.schema import TlCombinator, TlParameter, TlSchema
+from ton_node_control.utils.typing import Integer, String
+
+GENERATOR_VERSION: t.Final[Integer] = 2
+
+BOOL_TRUE: t.Final[Integer] = 0x997275b5
+BOOL_FALSE: t.Final[Integer] = 0xbc799737
+
+# type: (struct format, encode expression, decode expression)
+FIXED_TYPES: t.Dict[String, t.Tuple[String, String, String]] = {
+    '#': ('I', '{}', '{}'),
+    'int': ('i', '{}', '{}'),
+    'long': ('q', '{}', '{}'),
+    'double': ('d', '{}', '{}'),
+    'int128': ('16s', '{}', '{}'),
+    'int256': ('32s', '{}', '{}'),
+    'Bool': ('I', '(_BOOL_TRUE if {} else _BOOL_FALSE)', '_bool({})'),
+}
+BYTES_TYPES: t.FrozenSet[String] = frozenset({'bytes', 'secureBytes'})
+STRING_TYPES: t.FrozenSet[String] = frozenset({'string', 'secureString'})
+
+HEADER: String = '''\
+# Generated by ton_node_control.core.tl, do not edit.
+import struct
+
+SCHEMA_HASH = {schema_hash!r}
+
+_BOOL_TRUE = {bool_true:#x}
+_BOOL_FALSE = {bool_false:#x}
+_ID = struct.Struct('<I')
+_COUNT = struct.Struct('<I')
+
+
+class TlDecodeError(ValueError):
+    pass
+
+
+def _bool(value):
+    if value == _BOOL_TRUE:
+        return True
+    if value == _BOOL_FALSE:
+        return False
+    raise TlDecodeError('Invalid Bool constructor %#x' % value)
+
+
+def _write_bytes(value, out):
+    length = len(value)
+    if length < 254:
+        out.append(length)
+        padding = (length + 1) % 4
+    else:
+        out += (0xfe | (length << 8)).to_bytes(4, 'little')
+        padding = length % 4
+    out += value
+    if padding:
+        out += bytes(4 - padding)
+
+
+def _read_bytes(buffer, offset):
+    length = buffer[offset]
+    if length < 254:
+        start = offset + 1
+    else:
+        if offset + 4 > len(buffer):
+            raise TlDecodeError('Unexpected end of data')
+        length = int.from_bytes(buffer[offset + 1:offset + 4], 'little')
+        start = offset + 4
+    end = start + length
+    if end > len(buffer):
+        raise TlDecodeError('Unexpected end of data')
+    return bytes(buffer[start:end]), end + (-(end - offset) % 4)
+
+
+def _write_string(value, out):
+    _write_bytes(value.encode('utf-8', 'surrogateescape'), out)
+
+
+def _read_string(buffer, offset):
+    value, offset = _read_bytes(buffer, offset)
+    return value.decode('utf-8', 'surrogateescape'), offset
+
+
+def _encode_boxed(value, out):
+    try:
+        encoder = ENCODERS[value['@type']]
+    except KeyError:
+        raise TypeError('Unknown TL constructor %r' % value.get('@type')) from None
+    encoder(value, out)
+
+
+def _decode_boxed(buffer, offset):
+    constructor, = _ID.unpack_from(buffer, offset)
+    try:
+        decoder = DECODERS[constructor]
+    except KeyError:
+        raise TlDecodeError('Unknown TL constructor id %#x' % constructor) from None
+    return decoder(buffer, offset + 4)
+
+'''
+
+FOOTER: String = '''
+
+def serialize(value):
+    out = bytearray()
+    _encode_boxed(value, out)
+    return bytes(out)
+
+
+def deserialize(data):
+    buffer = memoryview(data)
+    try:
+        value, offset = _decode_boxed(buffer, 0)
+    except (struct.error, IndexError) as error:
+        raise TlDecodeError(str(error) or 'Unexpected end of data') from None
+    except RecursionError:
+        raise TlDecodeError('Objects nested too deeply') from None
+    if offset != len(buffer):
+        raise TlDecodeError('%d trailing bytes' % (len(buffer) - offset))
+    return value
+'''
+
+
+def _identifier(name: String) -> String:
+    return re.sub(r'\W', '_', name)
+
+
+class _ModuleWriter:
+    def __init__(self, schema: TlSchema) -> None:
+        self.schema: TlSchema = schema
+        self.lines: t.List[String] = []
+        self.structs: t.Dict[String, String] = {}
+
+    def struct(self, fmt: String) -> String:
+        if fmt not in self.structs:
+            self.structs[fmt] = f'_S{len(self.structs)}'
+        return self.structs[fmt]
+
+    def is_bare(self, type_name: String) -> bool:
+        return type_name in self.schema.by_name and type_name.split('.')[-1][:1].islower()
+
+    def min_size(self, type_name: String, seen: t.FrozenSet[String] = frozenset()) -> Integer:
+        """
+        Fewest bytes a value of the type takes on the wire.
+        """
+        if type_name in FIXED_TYPES:
+            return struct.calcsize('<' + FIXED_TYPES[type_name][0])
+        if type_name == 'true':
+            return 0
+        if not self.is_bare(type_name) or TlParameter('', type_name).vector_of is not None:
+            # A length, a count or a constructor id.
+            return 4
+        if type_name in seen:
+            return 0
+        return sum(
+            self.min_size(parameter.type, seen | {type_name})
+            for parameter in self.schema.by_name[type_name].parameters
+            if parameter.condition is None
+        )
+
+    def _groups(self, parameters: t.Sequence[TlParameter]) -> t.Iterator[t.List[TlParameter]]:
+        group: t.List[TlParameter] = []
+        for parameter in parameters:
+            if parameter.condition is None and parameter.type in FIXED_TYPES:
+                group.append(parameter)
+                continue
+            if group:
+                yield group
+                group = []
+            yield [parameter]
+        if group:
+            yield group
+
+    def encode_value(self, type_name: String, value: String, indent: String) -> t.List[String]:
+        if type_name in FIXED_TYPES:
+            fmt, expression, _ = FIXED_TYPES[type_name]
+            return [f'{indent}out += {self.struct("<" + fmt)}.pack({expression.format(value)})']
+        if type_name in BYTES_TYPES:
+            return [f'{indent}_write_bytes({value}, out)']
+        if type_name in STRING_TYPES:
+            return [f'{indent}_write_string({value}, out)']
+        if type_name == 'true':
+            return []
+        element: t.Optional[String] = TlParameter('', type_name).vector_of
+        if element is not None:
+            lines: t.List[String] = [f'{indent}out += _COUNT.pack(len({value}))']
+            if element in FIXED_TYPES and FIXED_TYPES[element][1] == '{}':
+                lines.append(
+                    f'{indent}out += struct.pack("<" + {FIXED_TYPES[element][0]!r} * len({value}), *{value})'
+                )
+                return lines
+            lines.append(f'{indent}for item in {value}:')
+            lines.extend(self.encode_value(element, 'item', indent + '    '))
+            return lines
+        if self.is_bare(type_name):
+            return [f'{indent}_encode_bare_{_identifier(type_name)}({value}, out)']
+        return [f'{indent}_encode_boxed({value}, out)']
+
+    def decode_value(self, type_name: String, target: String, indent: String) -> t.List[String]:
+        if type_name in FIXED_TYPES:
+            fmt, _, expression = FIXED_TYPES[type_name]
+            structure: String = self.struct('<' + fmt)
+            return [
+                f'{indent}{target}, = {structure}.unpack_from(buffer, offset)',
+                f'{indent}offset += {structure}.size',
+            ] + ([f'{indent}{target} = {expression.format(target)}'] if expression != '{}' else [])
+        if type_name in BYTES_TYPES:
+            return [f'{indent}{target}, offset = _read_bytes(buffer, offset)']
+        if type_name in STRING_TYPES:
+            return [f'{indent}{target}, offset = _read_string(buffer, offset)']
+        if type_name == 'true':
+            return [f'{indent}{target} = True']
+        element: t.Optional[String] = TlParameter('', type_name).vector_of
+        if element is not None:
+            lines: t.List[String] = [
+                f'{indent}count, = _COUNT.unpack_from(buffer, offset)',
+                f'{indent}offset += 4',
+            ]
+            # The count comes from the data: check it against what is left
+            # before allocating anything for it.
+            size: Integer = self.min_size(element)
+            if size:
+                lines.extend([
+                    f'{indent}if count * {size} > len(buffer) - offset:',
+                    f"{indent}    raise TlDecodeError('Vector of %d items exceeds the data' % count)",
+                ])
+            # Byte strings go through the loop, "<3" + "16s" would be one string.
+            if element in FIXED_TYPES and FIXED_TYPES[element][2] == '{}' and len(FIXED_TYPES[element][0]) == 1:
+                fmt: String = FIXED_TYPES[element][0]
+                lines.extend([
+                    f"{indent}items = struct.Struct(f'<{{count}}{fmt}')",
+                    f'{indent}{target} = list(items.unpack_from(buffer, offset))',
+                    f'{indent}offset += items.size',
+                ])
+                return lines
+            lines.append(f'{indent}{target} = []')
+            lines.append(f'{indent}for _ in range(count):')
+            lines.extend(self.decode_value(element, 'item', indent + '    '))
+            lines.append(f'{indent}    {target}.append(item)')
+            return lines
+        if self.is_bare(type_name):
+            return [f'{indent}{target}, offset = _decode_bare_{_identifier(type_name)}(buffer, offset)']
+        return [f'{indent}{target}, offset = _decode_boxed(buffer, offset)']
+
+    def combinator(self, combinator: TlCombinator) -> None:
+        name: String = _identifier(combinator.name)
+        encoder: t.List[String] = [f'def _encode_bare_{name}(value, out):']
+        decoder: t.List[String] = [f'def _decode_bare_{name}(buffer, offset):']
+        for group in self._groups(combinator.parameters):
+            parameter: TlParameter = group[0]
+            if len(group) > 1:
+                structure: String = self.struct('<' + ''.join(FIXED_TYPES[item.type][0] for item in group))
+                encoder.append(f'    out += {structure}.pack(' + ', '.join(
+                    FIXED_TYPES[item.type][1].format(f'value[{item.name!r}]') for item in group
+                ) + ')')
+                decoder.append(
+                    '    ' + ', '.join(f'v_{item.name}' for item in group)
+                    + f', = {structure}.unpack_from(buffer, offset)'
+                )
+                decoder.append(f'    offset += {structure}.size')
+                decoder.extend(
+                    f'    v_{item.name} = ' + FIXED_TYPES[item.type][2].format(f'v_{item.name}')
+                    for item in group if FIXED_TYPES[item.type][2] != '{}'
+                )
+                continue
+            if parameter.condition is None:
+                encoder.extend(self.encode_value(parameter.type, f'value[{parameter.name!r}]', '    '))
+                decoder.extend(self.decode_value(parameter.type, f'v_{parameter.name}', '    '))
+                continue
+            flags, bit = parameter.condition
+            encoder.append(f'    if value[{flags!r}] & {1 << bit}:')
+            encoder.extend(
+                self.encode_value(parameter.type, f'value[{parameter.name!r}]', '        ') or ['        pass']
+            )
+            decoder.append(f'    v_{parameter.name} = None')
+            decoder.append(f'    if v_{flags} & {1 << bit}:')
+            decoder.extend(self.decode_value(parameter.type, f'v_{parameter.name}', '        '))
+        if len(encoder) == 1:
+            encoder.append('    pass')
+        fields: String = ''.join(
+            f', {parameter.name!r}: v_{parameter.name}' for parameter in combinator.parameters
+        )
+        decoder.append(f"    return {{'@type': {combinator.name!r}{fields}}}, offset")
+        self.lines.extend(['', ''] + encoder + ['', ''] + decoder)
+        self.lines.extend([
+            '',
+            '',
+            f'def _encode_{name}(value, out):',
+            f'    out += {combinator.id & 0xffffffff:#010x}.to_bytes(4, "little")',
+            f'    _encode_bare_{name}(value, out)',
+        ])
+
+    def render(self, schema_hash: String) -> String:
+        for combinator in self.schema.combinators:
+            self.combinator(combinator)
+        structs: t.List[String] = [
+            f'{name} = struct.Struct({fmt!r})' for fmt, name in self.structs.items()
+        ]
+        encoders: t.List[String] = [
+            f'    {combinator.name!r}: _encode_{_identifier(combinator.name)},'
+            for combinator in self.schema.combinators
+        ]
+        decoders: t.List[String] = [
+            f'    {combinator.id & 0xffffffff:#010x}: _decode_bare_{_identifier(combinator.name)},'
+            for combinator in self.schema.combinators
+        ]
+        return (
+            HEADER.format(schema_hash=schema_hash, bool_true=BOOL_TRUE, bool_false=BOOL_FALSE)
+            + '\n'.join(structs) + '\n'
+            + '\n'.join(self.lines) + '\n\n\n'
+            + 'ENCODERS = {\n' + '\n'.join(encoders) + '\n}\n\n'
+            + 'DECODERS = {\n' + '\n'.join(decoders) + '\n}\n'
+            + FOOTER
+        )
+
+
+def generate_module(schema: TlSchema, schema_hash: String) -> String:
+    """
+    Renders Python source of a codec for every combinator of the schema.
+    Consecutive fixed width fields are packed and unpacked with a single
+    precompiled "struct.Struct".
+    """
+    return _ModuleWriter(schema).render(schema_hash)
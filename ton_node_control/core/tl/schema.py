@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import re
+import sys
+import typing as t
+import zlib
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.utils.locations import SOURCES_PATH, get_ton_binaries_directory
+from ton_node_control.utils.typing import Integer, String
+
+BUILTIN_TYPES: t.FrozenSet[String] = frozenset({
+    '#', 'int', 'long', 'double', 'int128', 'int256', 'string', 'bytes',
+    'secureString', 'secureBytes', 'Bool', 'true', 'Object', 'Function',
+})
+
+# Declarations of the builtin types themselves at the top of the schemas.
+SKIPPED_COMBINATORS: t.FrozenSet[String] = frozenset({
+    'int', 'long', 'double', 'string', 'bytes', 'int32', 'int53', 'int64',
+    'int128', 'int256', 'object', 'function', 'vector', 'true',
+    'secureString', 'secureBytes', 'boolTrue', 'boolFalse',
+})
+
+SCHEMA_FILES: t.Tuple[String, ...] = ('lite_api.tl', 'ton_api.tl')
+
+COMBINATOR_REGEX = re.compile(
+    r'^(?P<name>[\w.]+)(?:#(?P<id>[0-9a-fA-F]{1,8}))?'
+    r'(?P<parameters>.*?)=\s*(?P<result>[^;]+?)\s*$',
+    re.DOTALL,
+)
+PARAMETER_REGEX = re.compile(
+    r'(?P<name>\w+):(?:(?P<flags>\w+)\.(?P<bit>\d+)\?)?(?P<type>\(.+?\)|[^\s()]+)'
+)
+
+
+@dataclass(frozen=True)
+class TlParameter:
+    name: String
+    type: String
+    condition: t.Optional[t.Tuple[String, Integer]] = None
+
+    @property
+    def vector_of(self) -> t.Optional[String]:
+        parts: t.List[String] = self.type.strip('()').split()
+        if len(parts) == 2 and parts[0] in ('vector', 'Vector'):
+            return parts[1]
+        return None
+
+
+@dataclass(frozen=True)
+class TlCombinator:
+    name: String
+    id: Integer
+    parameters: t.Tuple[TlParameter, ...]
+    result: String
+    is_function: bool = False
+
+
+@dataclass
+class TlSchema:
+    combinators: t.List[TlCombinator] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.by_name: t.Dict[String, TlCombinator] = {}
+        self.by_id: t.Dict[Integer, TlCombinator] = {}
+        for combinator in self.combinators:
+            self._index(combinator)
+
+    def _index(self, combinator: TlCombinator) -> None:
+        self.by_name[combinator.name] = combinator
+        self.by_id[combinator.id] = combinator
+
+    def add(self, combinator: TlCombinator) -> None:
+        self.combinators.append(combinator)
+        self._index(combinator)
+
+    def extend(self, other: TlSchema) -> None:
+        for combinator in other.combinators:
+            if combinator.name not in self.by_name:
+                self.add(combinator)
+
+
+def combinator_id(declaration: String) -> Integer:
+    """
+    CRC32 of the normalized declaration, which is what the TL compiler
+    assigns to combinators declared without an explicit id.
+    """
+    normalized: String = re.sub(r'\{[^}]*\}', ' ', declaration)
+    normalized = normalized.replace('(', ' ').replace(')', ' ').replace(';', ' ')
+    return zlib.crc32(' '.join(normalized.split()).encode())
+
+
+def _statements(text: String) -> t.Iterator[t.Tuple[String, bool]]:
+    is_function: bool = False
+    statement: t.List[String] = []
+    for line in text.splitlines():
+        line = line.split('//', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith('---'):
+            is_function = 'functions' in line
+            continue
+        statement.append(line)
+        if line.endswith(';'):
+            yield ' '.join(statement)[:-1].strip(), is_function
+            statement = []
+
+
+def parse_schema(text: String) -> TlSchema:
+    schema = TlSchema()
+    for declaration, is_function in _statements(text):
+        match: t.Optional[t.Match] = COMBINATOR_REGEX.match(declaration)
+        if match is None or '?' in match.group('result') or '[' in declaration:
+            continue
+        name: String = match.group('name')
+        if name in SKIPPED_COMBINATORS:
+            continue
+        parameters: t.List[TlParameter] = []
+        for parameter in PARAMETER_REGEX.finditer(match.group('parameters')):
+            condition: t.Optional[t.Tuple[String, Integer]] = None
+            if parameter.group('flags') is not None:
+                condition = (parameter.group('flags'), int(parameter.group('bit')))
+            parameters.append(TlParameter(
+                name=parameter.group('name'),
+                type=parameter.group('type').lstrip('!'),
+                condition=condition,
+            ))
+        explicit_id: t.Optional[String] = match.group('id')
+        schema.add(TlCombinator(
+            name=name,
+            id=int(explicit_id, 16) if explicit_id else combinator_id(declaration),
+            parameters=tuple(parameters),
+            result=match.group('result').strip(),
+            is_function=is_function,
+        ))
+    return schema
+
+
+def locate_schemas() -> t.List[Path]:
+    """
+    Returns the TL schemas of the ton sources the installer downloads.
+    """
+    for root in (get_ton_binaries_directory(), SOURCES_PATH[sys.platform].joinpath('ton')):
+        directory: Path = root.joinpath('tl', 'generate', 'scheme')
+        paths: t.List[Path] = [directory.joinpath(name) for name in SCHEMA_FILES]
+        if all(path.is_file() for path in paths):
+            return paths
+    raise FileNotFoundError('Unable to locate TL schemas of the ton sources')
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.core.boc import BagOfCells, BocError, Cell
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+VALIDATORS_TAG: t.Final[Integer] = 0x11
+VALIDATORS_EXT_TAG: t.Final[Integer] = 0x12
+VALIDATOR_TAG: t.Final[Integer] = 0x53
+VALIDATOR_ADDR_TAG: t.Final[Integer] = 0x73
+ED25519_PUBKEY_TAG: t.Final[Integer] = 0x8e81278a
+VALIDATOR_SET_KEY_BITS: t.Final[Integer] = 16
+
+
+class _Slice:
+    def __init__(self, cell: Cell) -> None:
+        self.cell: Cell = cell
+        self.bits: String = cell.bits()
+        self.position: Integer = 0
+
+    def load_uint(self, length: Integer) -> Integer:
+        if self.position + length > len(self.bits):
+            raise BocError(f'Cell #{self.cell.index} has no {length} more bits')
+        value: String = self.bits[self.position:self.position + length]
+        self.position += length
+        return int(value, 2) if value else 0
+
+    def load_bits(self, length: Integer) -> String:
+        start: Integer = self.position
+        self.load_uint(length)
+        return self.bits[start:self.position]
+
+    def load_bytes(self, length: Integer) -> Bytes:
+        return self.load_uint(length * 8).to_bytes(length, 'big')
+
+
+def _load_label(data: _Slice, maximum: Integer) -> String:
+    # HmLabel: hml_short$0, hml_long$10 or hml_same$11,
+    # "#<= m" fields take the bit length of "m".
+    width: Integer = maximum.bit_length()
+    if data.load_uint(1) == 0:
+        length: Integer = 0
+        while data.load_uint(1) == 1:
+            length += 1
+        return data.load_bits(length)
+    if data.load_uint(1) == 0:
+        return data.load_bits(data.load_uint(width))
+    bit: String = data.load_bits(1)
+    return bit * data.load_uint(width)
+
+
+def _iterate_hashmap(cell: Cell, key_bits: Integer, prefix: String = '') -> t.Iterator[t.Tuple[Integer, _Slice]]:
+    data: _Slice = _Slice(cell)
+    label: String = _load_label(data, key_bits)
+    remaining: Integer = key_bits - len(label)
+    if remaining == 0:
+        yield int(prefix + label, 2), data
+        return
+    left, right = cell.refs[:2]
+    yield from _iterate_hashmap(left, remaining - 1, prefix + label + '0')
+    yield from _iterate_hashmap(right, remaining - 1, prefix + label + '1')
+
+
+@dataclass(frozen=True)
+class ValidatorDescription:
+    public_key: String
+    weight: Integer
+    adnl: t.Optional[String] = None
+
+
+@dataclass(frozen=True)
+class ValidatorSet:
+    utime_since: Integer
+    utime_until: Integer
+    total: Integer
+    main: Integer
+    total_weight: t.Optional[Integer]
+    validators: t.Tuple[ValidatorDescription, ...]
+
+    def index_of(self, public_key: String) -> t.Optional[Integer]:
+        public_key = public_key.lower()
+        for index, validator in enumerate(self.validators):
+            if validator.public_key == public_key:
+                return index
+        return None
+
+
+def _parse_validator(data: _Slice) -> ValidatorDescription:
+    tag: Integer = data.load_uint(8)
+    if tag not in (VALIDATOR_TAG, VALIDATOR_ADDR_TAG):
+        raise BocError(f'Unexpected validator description tag "{tag:#x}"')
+    if data.load_uint(32) != ED25519_PUBKEY_TAG:
+        raise BocError('Validator public key is not an Ed25519 key')
+    public_key: String = data.load_bytes(32).hex()
+    weight: Integer = data.load_uint(64)
+    adnl: t.Optional[String] = data.load_bytes(32).hex() if tag == VALIDATOR_ADDR_TAG else None
+    return ValidatorDescription(public_key, weight, adnl)
+
+
+def parse_validator_set(cell: Cell) -> ValidatorSet:
+    """
+    Decodes a "ValidatorSet" cell, the value of configuration
+    parameters 32 to 37.
+    """
+    data: _Slice = _Slice(cell)
+    tag: Integer = data.load_uint(8)
+    if tag not in (VALIDATORS_TAG, VALIDATORS_EXT_TAG):
+        raise BocError(f'Unexpected validator set tag "{tag:#x}"')
+    utime_since: Integer = data.load_uint(32)
+    utime_until: Integer = data.load_uint(32)
+    total: Integer = data.load_uint(16)
+    main: Integer = data.load_uint(16)
+
+    total_weight: t.Optional[Integer] = None
+    root: t.Optional[Cell] = cell.refs[0] if cell.refs else None
+    if tag == VALIDATORS_EXT_TAG:
+        total_weight = data.load_uint(64)
+        # HashmapE, an empty map has no root reference.
+        if data.load_uint(1) == 0:
+            root = None
+
+    validators: t.List[ValidatorDescription] = []
+    if root is not None:
+        entries: t.List[t.Tuple[Integer, _Slice]] = sorted(
+            _iterate_hashmap(root, VALIDATOR_SET_KEY_BITS),
+            key=lambda entry: entry[0],
+        )
+        validators = [_parse_validator(value) for _, value in entries]
+    return ValidatorSet(utime_since, utime_until, total, main, total_weight, tuple(validators))
+
+
+def load_validator_set(boc: t.Union[Bytes, bytearray, memoryview]) -> ValidatorSet:
+    return parse_validator_set(BagOfCells(boc).root)
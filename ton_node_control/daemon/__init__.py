@@ -0,0 +1,11 @@
+# The server is not re-exported: clients import this package on every
+# invocation and have to stay cheap, see "ton_node_control.daemon.server".
+from .protocol import (  # noqa: F401
+    FORWARDED_COMMANDS,
+    NO_DAEMON_VARIABLE,
+    SOCKET_VARIABLE,
+    connect,
+    forward,
+    is_forwarded,
+    socket_path,
+)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import typing as t
+
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+# Nothing beyond the standard library here: clients import this on every
+# invocation, before deciding whether the rest of the package is needed.
+
+SOCKET_VARIABLE: t.Final[String] = 'TON_NODE_CONTROL_SOCKET'
+# Set to run every command in-process, the daemon sets it for itself.
+NO_DAEMON_VARIABLE: t.Final[String] = 'TON_NODE_CONTROL_NO_DAEMON'
+CONNECT_TIMEOUT: t.Final[float] = 1.0
+# What the commands read from the environment, fixed in the daemon by its
+# own: a client that sets them otherwise runs its commands in-process.
+# The socket variable only picks the daemon, the connection settles it.
+ENVIRONMENT_VARIABLES: t.Tuple[String, ...] = ('TON_NODE_CONTROL_HOME',)
+
+# Short commands cron jobs and probes run over and over. Long-running,
+# interactive or streaming ones always run in-process.
+FORWARDED_COMMANDS: t.FrozenSet[String] = frozenset({'status', 'history', 'disk'})
+
+FRAME_HEADER = struct.Struct('>cI')
+EXIT_CODE = struct.Struct('>i')
+REQUEST: t.Final[Bytes] = b'r'
+STDOUT: t.Final[Bytes] = b'o'
+STDERR: t.Final[Bytes] = b'e'
+EXIT: t.Final[Bytes] = b'x'
+# The daemon does not run the command, the client runs it in-process.
+REFUSED: t.Final[Bytes] = b'n'
+
+
+def socket_path() -> String:
+    runtime: String = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.environ.get(SOCKET_VARIABLE) or os.path.join(runtime, f'ton-node-control-{os.getuid()}.sock')
+
+
+def send_frame(connection: socket.socket, kind: Bytes, payload: Bytes = b'') -> None:
+    connection.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _receive_exactly(connection: socket.socket, size: Integer) -> t.Optional[Bytes]:
+    data: bytearray = bytearray()
+    while len(data) < size:
+        chunk: Bytes = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def receive_frame(connection: socket.socket) -> t.Optional[t.Tuple[Bytes, Bytes]]:
+    """
+    The next frame, None once the other end has closed the connection.
+    """
+    header: t.Optional[Bytes] = _receive_exactly(connection, FRAME_HEADER.size)
+    if header is None:
+        return None
+    kind, size = FRAME_HEADER.unpack(header)
+    payload: t.Optional[Bytes] = _receive_exactly(connection, size)
+    return None if payload is None else (kind, payload)
+
+
+def environment() -> t.Dict[String, t.Optional[String]]:
+    return {name: os.environ.get(name) for name in ENVIRONMENT_VARIABLES}
+
+
+def is_forwarded(argv: t.Sequence[String]) -> bool:
+    return bool(argv) and argv[0] in FORWARDED_COMMANDS and not os.environ.get(NO_DAEMON_VARIABLE)
+
+
+def connect(path: t.Optional[String] = None) -> t.Optional[socket.socket]:
+    """
+    A connection to the running daemon, None when there is none. A socket
+    someone else owns is ignored: the default one lives in a shared
+    directory when there is no XDG_RUNTIME_DIR.
+    """
+    path = path or socket_path()
+    try:
+        status: os.stat_result = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        return None
+    connection: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(CONNECT_TIMEOUT)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    connection.settimeout(None)
+    return connection
+
+
+def forward(
+    argv: t.Sequence[String],
+    *,
+    prog_name: t.Optional[String] = None,
+    path: t.Optional[String] = None,
+) -> t.Optional[Integer]:
+    """
+    Runs a command in the daemon, copying its output to ours, and
+    returns its exit code. None means it has to run in-process: not a
+    forwarded command, no daemon, or one that refused it. Once the
+    daemon has started the command there is no going back, it may have
+    run even if the daemon went away before answering.
+    """
+    if not is_forwarded(argv):
+        return None
+    connection: t.Optional[socket.socket] = connect(path)
+    if connection is None:
+        return None
+    request: t.Dict[String, t.Any] = {
+        'argv': list(argv),
+        'cwd': os.getcwd(),
+        'environment': environment(),
+        'prog_name': prog_name or os.path.basename(sys.argv[0]),
+        'tty': [sys.stdout.isatty(), sys.stderr.isatty()],
+    }
+    with connection:
+        try:
+            send_frame(connection, REQUEST, json.dumps(request).encode())
+        except OSError:
+            return None
+        streams: t.Dict[Bytes, t.BinaryIO] = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+        while True:
+            try:
+                frame: t.Optional[t.Tuple[Bytes, Bytes]] = receive_frame(connection)
+            except OSError:
+                frame = None
+            if frame is None:
+                sys.stderr.write('The daemon closed the connection before the command finished\n')
+                return 1
+            kind, payload = frame
+            if kind == REFUSED:
+                return None
+            if kind == EXIT:
+                return EXIT_CODE.unpack(payload)[0]
+            stream: t.Optional[t.BinaryIO] = streams.get(kind)
+            if stream is not None:
+                stream.write(payload)
+                stream.flush()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+import typing as t
+
+import click
+
+from ton_node_control.core.datasources import TonCenterDataSource, get_client_pool
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.daemon.protocol import (
+    EXIT,
+    EXIT_CODE,
+    FORWARDED_COMMANDS,
+    NO_DAEMON_VARIABLE,
+    REFUSED,
+    REQUEST,
+    STDERR,
+    STDOUT,
+    connect,
+    environment,
+    receive_frame,
+    send_frame,
+    socket_path,
+)
+from ton_node_control.disk import DiskAnalyzer, record_usage
+from ton_node_control.events import BlockWatcher, EventBus, MasterchainBlock
+from ton_node_control.logs import get_log_index
+from ton_node_control.metrics import HistoryStore, MetricsStore, get_history_store
+from ton_node_control.scheduler import Scheduler, Task
+from ton_node_control.settings import Settings, get_settings, get_settings_path
+from ton_node_control.status import collect_status
+from ton_node_control.utils import runtime
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+logger = logging.getLogger(__name__)
+
+# Tasks doing what the forwarded command of the same name does.
+EXCLUSIVE_TASKS: t.Final[t.FrozenSet[String]] = frozenset({'disk'})
+# Tasks run right after a new masterchain block, on fresh data.
+BLOCK_TASKS: t.Final[t.FrozenSet[String]] = frozenset({'status', 'disk'})
+
+
+class DaemonError(TonNodeControlError):
+    pass
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    One output stream of a forwarded command, sent to the client as it is
+    written.
+    """
+
+    def __init__(self, connection: socket.socket, kind: Bytes, tty: bool) -> None:
+        super().__init__()
+        self.connection: socket.socket = connection
+        self.kind: Bytes = kind
+        self.tty: bool = tty
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, data: t.Union[Bytes, bytearray, memoryview]) -> Integer:  # type: ignore[override]
+        if data:
+            send_frame(self.connection, self.kind, bytes(data))
+        return len(data)
+
+
+class _Streams(threading.local):
+    stdout: t.Optional[t.TextIO] = None
+    stderr: t.Optional[t.TextIO] = None
+
+
+_streams: _Streams = _Streams()
+
+
+class _StreamProxy:
+    """
+    Stands in for "sys.stdout" or "sys.stderr": a thread running a
+    forwarded command writes to its client, any other thread to the
+    daemon's own stream.
+    """
+
+    def __init__(self, name: String, fallback: t.TextIO) -> None:
+        self._name: String = name
+        self._fallback: t.TextIO = fallback
+
+    def _target(self) -> t.TextIO:
+        return getattr(_streams, self._name) or self._fallback
+
+    def __getattr__(self, name: String) -> t.Any:
+        return getattr(self._target(), name)
+
+    def write(self, text: String) -> Integer:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+
+def _text_stream(connection: socket.socket, kind: Bytes, tty: bool) -> io.TextIOWrapper:
+    return io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(connection, kind, tty)),
+        encoding='utf-8',
+        errors='replace',
+        line_buffering=True,
+    )
+
+
+def _exit_code(code: t.Any) -> Integer:
+    # What "sys.exit" would make of it.
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    click.echo(str(code), err=True)
+    return 1
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: _Server
+
+    def handle(self) -> None:
+        frame: t.Optional[t.Tuple[Bytes, Bytes]] = receive_frame(self.request)
+        if frame is None or frame[0] != REQUEST:
+            return
+        request: t.Dict[String, t.Any] = json.loads(frame[1])
+        try:
+            refusal: t.Optional[String] = self.server.daemon.refusal(request)
+            if refusal is not None:
+                logger.info('Refused %s: %s', request.get('argv'), refusal)
+                send_frame(self.request, REFUSED, refusal.encode())
+                return
+            code: Integer = self.server.daemon.execute(request, self.request)
+            send_frame(self.request, EXIT, EXIT_CODE.pack(code))
+        except OSError:
+            # The client went away.
+            pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: String, daemon: Daemon) -> None:
+        self.daemon: Daemon = daemon
+        super().__init__(path, _Handler)
+
+
+class Daemon:
+    """
+    Answers the short CLI commands in a process that stays up, so they
+    skip the imports, the configuration parsing and the connection setup
+    a fresh process pays for, and share the caches it builds up. Commands
+    run one at a time, with relative paths taken from the working
+    directory of the client that sent them; their output is streamed
+    back as they write it. Meanwhile one block watcher follows the chain
+    and periodic tasks run, on the same warm state; the tasks named in
+    "on_block" are triggered by every new masterchain block. A blocking
+    task named in "exclusive" never runs alongside the command of its
+    name: it skips its turn while the command runs, the command waits
+    for a run in progress.
+    """
+
+    def __init__(
+        self,
+        command: click.BaseCommand,
+        *,
+        path: t.Optional[String] = None,
+        tasks: t.Sequence[Task] = (),
+        exclusive: t.Collection[String] = EXCLUSIVE_TASKS,
+        on_block: t.Collection[String] = BLOCK_TASKS,
+        workers: Integer = 2,
+    ) -> None:
+        self.command: click.BaseCommand = command
+        self.path: String = path or socket_path()
+        self.bus: EventBus = EventBus()
+        self.on_block: t.FrozenSet[String] = frozenset(on_block)
+        self.commands: Integer = 0
+        self._exclusive: t.Dict[String, threading.Lock] = {
+            task.name: threading.Lock() for task in tasks if task.name in exclusive
+        }
+        self.scheduler: Scheduler = Scheduler(
+            [
+                dataclasses.replace(task, run=functools.partial(self._run_exclusive, task))
+                if task.name in self._exclusive else task
+                for task in tasks
+            ],
+            workers=workers,
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._settings_stamp: t.Optional[t.Tuple[Integer, Integer]] = None
+        self._server: t.Optional[_Server] = None
+
+    def _refresh_settings(self) -> None:
+        try:
+            status: os.stat_result = get_settings_path().stat()
+            stamp: t.Optional[t.Tuple[Integer, Integer]] = (status.st_mtime_ns, status.st_size)
+        except OSError:
+            stamp = None
+        if stamp != self._settings_stamp:
+            self._settings_stamp = stamp
+            get_settings.cache_clear()
+
+    def _invoke(self, argv: t.List[String], prog_name: String) -> Integer:
+        # As the same command run in-process ends, see "__main__".
+        try:
+            result: t.Any = self.command.main(args=argv, prog_name=prog_name, standalone_mode=False)
+        except SystemExit as exit_:
+            return _exit_code(exit_.code)
+        except Exception as exception:
+            logger.exception('Forwarded command %s failed', argv)
+            traceback.print_exception(type(exception), exception, exception.__traceback__)
+            return 1
+        return _exit_code(result)
+
+    def refusal(self, request: t.Dict[String, t.Any]) -> t.Optional[String]:
+        """
+        Why the request is better run in-process by the client, None if
+        the daemon runs it.
+        """
+        argv: t.List[String] = list(request.get('argv') or ())
+        if not argv or argv[0] not in FORWARDED_COMMANDS:
+            return f'"{" ".join(argv)}" is not a command the daemon runs'
+        if request.get('environment') != environment():
+            return 'The environment of the client differs from the one of the daemon'
+        return None
+
+    def execute(self, request: t.Dict[String, t.Any], connection: socket.socket) -> Integer:
+        argv: t.List[String] = list(request['argv'])
+        stdout_tty, stderr_tty = request.get('tty', (False, False))
+        stdout: io.TextIOWrapper = _text_stream(connection, STDOUT, stdout_tty)
+        stderr: io.TextIOWrapper = _text_stream(connection, STDERR, stderr_tty)
+        exclusive: t.ContextManager = self._exclusive.get(argv[0]) or contextlib.nullcontext()
+        with self._lock, exclusive, runtime.working_directory(request['cwd']):
+            self.commands += 1
+            self._refresh_settings()
+            _streams.stdout, _streams.stderr = stdout, stderr
+            try:
+                code: Integer = self._invoke(argv, request.get('prog_name') or 'ton-node-control')
+            finally:
+                _streams.stdout = _streams.stderr = None
+        stdout.flush()
+        stderr.flush()
+        return code
+
+    def _run_exclusive(self, task: Task, **values: t.Any) -> None:
+        lock: threading.Lock = self._exclusive[task.name]
+        if not lock.acquire(blocking=False):
+            logger.info('Task %s skipped, the command of the same name runs', task.name)
+            return
+        try:
+            task.run(**values)
+        finally:
+            lock.release()
+
+    async def _trigger_on_blocks(self) -> None:
+        # Only the latest block matters, the ones that came meanwhile are
+        # dropped.
+        with self.bus.subscribe(MasterchainBlock, maxsize=1) as subscription:
+            async for _ in subscription:
+                for name in self.on_block:
+                    self.scheduler.trigger(name)
+
+    async def _run_background(self) -> None:
+        settings: Settings = get_settings()
+        watcher: BlockWatcher = BlockWatcher(
+            TonCenterDataSource(settings.toncenter.url, api_key=settings.toncenter.api_key),
+            self.bus,
+            elector_address=settings.elector_address,
+            wallet_address=settings.wallet_address,
+        )
+        running: t.List[asyncio.Future] = [asyncio.ensure_future(self._trigger_on_blocks())]
+        running.append(asyncio.ensure_future(watcher.run()))
+        try:
+            # Until "stop" is called.
+            await self.scheduler.run()
+        finally:
+            for future in running:
+                future.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def _bind(self) -> _Server:
+        existing: t.Optional[socket.socket] = connect(self.path)
+        if existing is not None:
+            existing.close()
+            raise DaemonError(f'A daemon already listens on {self.path}')
+        if os.path.exists(self.path):
+            # Left by one that did not exit cleanly.
+            os.unlink(self.path)
+        umask: Integer = os.umask(0o177)
+        try:
+            return _Server(self.path, self)
+        finally:
+            os.umask(umask)
+
+    def serve_forever(self) -> None:
+        try:
+            self._server = self._bind()
+        except OSError as exception:
+            raise DaemonError(f'Cannot listen on {self.path}: {exception}') from exception
+        os.environ[NO_DAEMON_VARIABLE] = '1'
+        history: HistoryStore = get_history_store()
+        # Recent history is summarised from memory from now on.
+        history.memory = MetricsStore()
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _StreamProxy('stdout', stdout), _StreamProxy('stderr', stderr)  # type: ignore
+        previous: t.Any = signal.signal(signal.SIGTERM, lambda *_: self.shutdown())
+        try:
+            with runtime.shared_loop() as loop:
+                background: asyncio.Future = asyncio.run_coroutine_threadsafe(self._run_background(), loop)
+                try:
+                    self._server.serve_forever()
+                finally:
+                    loop.call_soon_threadsafe(self.scheduler.stop)
+                    background.result()
+                    runtime.run(get_client_pool().aclose())
+                    history.close()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            sys.stdout, sys.stderr = stdout, stderr
+            history.memory = None
+            self._server.server_close()
+            os.unlink(self.path)
+            self._server = None
+
+    def shutdown(self) -> None:
+        server: t.Optional[_Server] = self._server
+        if server is not None:
+            # From a thread of its own: "shutdown" waits for the loop,
+            # which may be the caller, as in a signal handler.
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+
+def _record_status() -> None:
+    store: HistoryStore = get_history_store()
+    store.record_many(collect_status(budget=5.0).values())
+    store.enforce_retention()
+
+
+def _record_disk_usage() -> None:
+    record_usage(DiskAnalyzer(get_settings().node.database).scan(), get_history_store())
+
+
+def _index_logs() -> None:
+    get_log_index(get_settings().node.log).update()
+
+
+def get_default_tasks(*, status_interval: float, disk_interval: float, log_index_interval: float) -> t.List[Task]:
+    """
+    What cron would otherwise run, a zero interval leaves a task out.
+    """
+    tasks: t.List[Task] = []
+    # Triggered by blocks, see "BLOCK_TASKS": these run on the next block
+    # an interval after the last run, or a whole interval later when no
+    # block comes, as while the API is unreachable.
+    if status_interval > 0:
+        tasks.append(Task('status', _record_status, 2 * status_interval, blocking=True))
+    if disk_interval > 0:
+        # The "disk" command scans and records the same way.
+        tasks.append(Task('disk', _record_disk_usage, 2 * disk_interval, blocking=True, timeout=disk_interval))
+    if log_index_interval > 0:
+        # "logs --since" then only indexes what was logged since the last run.
+        tasks.append(Task('logs.index', _index_logs, log_index_interval, blocking=True))
+    return tasks
@@ -0,0 +1,19 @@
+from .usage import (  # noqa: F401
+    DirectoryListing,
+    DiskAnalyzer,
+    DiskUsage,
+    DiskUsageError,
+    Usage,
+    format_size,
+    growth_rate,
+    record_usage,
+)
+from .pruning import (  # noqa: F401
+    ArchivePruner,
+    ArchiveSlice,
+    DiskLatencyMonitor,
+    PruneReport,
+    Throttle,
+    find_archive_slices,
+    select_slices,
+)
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.utils.typing import Integer, String
+
+ARCHIVE_SLICE_REGEX = re.compile(r'^(key\.)?archive\.(\d+)(?:\.(-?\d+:[0-9A-Fa-f]+))?\.pack$')
+DEFAULT_STEP: t.Final[Integer] = 8 * 1024 * 1024
+MINIMUM_SCALE: t.Final[float] = 0.05
+
+LagSource = t.Callable[[], t.Optional[float]]
+
+
+@dataclass(frozen=True)
+class ArchiveSlice:
+    """
+    One archive package file of the node, "archive.<seqno>.pack" for the
+    masterchain or "archive.<seqno>.<workchain>:<shard>.pack" for a shard.
+    The slices of a package share whatever else is stored next to them
+    under its name, such as its index.
+    """
+
+    path: Path
+    package: Integer
+    shard: t.Optional[String]
+    is_key: bool
+    size: Integer
+    mtime: float
+
+    @property
+    def prefix(self) -> String:
+        return f'{"key." if self.is_key else ""}archive.{self.path.name.split(".")[1 + self.is_key]}.'
+
+    def siblings(self) -> t.Tuple[t.List[Path], t.List[Path]]:
+        """
+        Other slices of the same package, and the files the package keeps
+        besides its slices.
+        """
+        slices: t.List[Path] = []
+        extra: t.List[Path] = []
+        for path in self.path.parent.iterdir():
+            if path == self.path or not path.name.startswith(self.prefix):
+                continue
+            (slices if ARCHIVE_SLICE_REGEX.match(path.name) else extra).append(path)
+        return sorted(slices), sorted(extra)
+
+
+def find_archive_slices(database: Path) -> t.List[ArchiveSlice]:
+    slices: t.List[ArchiveSlice] = []
+    packages: Path = database.joinpath('archive', 'packages')
+    if not packages.is_dir():
+        return slices
+    for directory in packages.iterdir():
+        if not directory.is_dir():
+            continue
+        for entry in os.scandir(directory):
+            match: t.Optional[t.Match] = ARCHIVE_SLICE_REGEX.match(entry.name)
+            if match is None or not entry.is_file(follow_symlinks=False):
+                continue
+            stat: os.stat_result = entry.stat(follow_symlinks=False)
+            slices.append(ArchiveSlice(
+                path=Path(entry.path),
+                package=int(match.group(2)),
+                shard=match.group(3),
+                is_key=match.group(1) is not None,
+                size=stat.st_blocks * 512,
+                mtime=stat.st_mtime,
+            ))
+    return sorted(slices, key=lambda item: (item.package, item.shard or ''))
+
+
+def select_slices(
+    slices: t.Sequence[ArchiveSlice],
+    *,
+    older_than: float,
+    below_package: t.Optional[Integer] = None,
+    keep: Integer = 2,
+    now: t.Optional[float] = None,
+) -> t.List[ArchiveSlice]:
+    """
+    Slices that may go, oldest first: not key block packages, untouched for
+    "older_than" seconds, below the given package seqno, and never one of
+    the "keep" newest packages.
+    """
+    now = time.time() if now is None else now
+    packages: t.List[Integer] = sorted({item.package for item in slices if not item.is_key})
+    protected: t.Set[Integer] = set(packages[-keep:]) if keep > 0 else set()
+    return [
+        item for item in slices
+        if not item.is_key
+        and item.package not in protected
+        and item.mtime < now - older_than
+        and (below_package is None or item.package < below_package)
+    ]
+
+
+def open_files(pid: t.Optional[Integer]) -> t.Set[String]:
+    if pid is None:
+        return set()
+    paths: t.Set[String] = set()
+    directory: String = f'/proc/{pid}/fd'
+    try:
+        descriptors: t.List[String] = os.listdir(directory)
+    except OSError:
+        return paths
+    for descriptor in descriptors:
+        try:
+            paths.add(os.readlink(os.path.join(directory, descriptor)))
+        except OSError:
+            continue
+    return paths
+
+
+def _is_open(path: Path, busy: t.Set[String]) -> bool:
+    prefix: String = f'{path}/'
+    return str(path) in busy or any(name.startswith(prefix) for name in busy)
+
+
+class Throttle:
+    """
+    Paces work to a rate of bytes and of operations per second. Each
+    acquisition books time on both schedules and sleeps until the later
+    one is due; unused time accumulates for at most "burst" seconds.
+    "scale" slows both rates down without losing the schedule.
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: float,
+        operations_per_second: float,
+        *,
+        burst: float = 0.5,
+        clock: t.Callable[[], float] = time.monotonic,
+        sleep: t.Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.bytes_per_second: float = bytes_per_second
+        self.operations_per_second: float = operations_per_second
+        self.burst: float = burst
+        self.scale: float = 1.0
+        self._clock: t.Callable[[], float] = clock
+        self._sleep: t.Callable[[float], None] = sleep
+        self._bytes_due: float = clock()
+        self._operations_due: float = clock()
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self, size: Integer, operations: Integer = 1) -> float:
+        """
+        Waits until "size" bytes and "operations" operations fit the rates,
+        returns the seconds slept.
+        """
+        with self._lock:
+            now: float = self._clock()
+            self._bytes_due = max(self._bytes_due, now - self.burst) + size / (self.bytes_per_second * self.scale)
+            self._operations_due = (
+                max(self._operations_due, now - self.burst)
+                + operations / (self.operations_per_second * self.scale)
+            )
+            delay: float = max(self._bytes_due, self._operations_due) - now
+        if delay > 0:
+            self._sleep(delay)
+            return delay
+        return 0.0
+
+
+class DiskLatencyMonitor:
+    """
+    Average time an I/O request of the disk holding "path" took since the
+    previous sample, from "/proc/diskstats".
+    """
+
+    def __init__(self, path: Path) -> None:
+        device: Integer = os.stat(path).st_dev
+        self.device: t.Tuple[Integer, Integer] = (os.major(device), os.minor(device))
+        self._previous: t.Optional[t.Tuple[Integer, Integer]] = self._read()
+
+    def _read(self) -> t.Optional[t.Tuple[Integer, Integer]]:
+        try:
+            with open('/proc/diskstats') as file:
+                lines: t.List[String] = file.readlines()
+        except OSError:
+            return None
+        for line in lines:
+            fields: t.List[String] = line.split()
+            if len(fields) < 11 or (int(fields[0]), int(fields[1])) != self.device:
+                continue
+            # Reads and writes completed, milliseconds spent on each.
+            return int(fields[3]) + int(fields[7]), int(fields[6]) + int(fields[10])
+        return None
+
+    def sample(self) -> t.Optional[float]:
+        current: t.Optional[t.Tuple[Integer, Integer]] = self._read()
+        previous, self._previous = self._previous, current
+        if current is None or previous is None or current[0] <= previous[0]:
+            return None
+        return (current[1] - previous[1]) / (current[0] - previous[0])
+
+
+@dataclass(frozen=True)
+class PressureSample:
+    timestamp: float
+    sync_lag: t.Optional[float]
+    latency: t.Optional[float]
+    scale: float
+
+
+@dataclass
+class PruneReport:
+    slices: Integer = 0
+    files: Integer = 0
+    freed: Integer = 0
+    operations: Integer = 0
+    throttled: float = 0.0
+    backoffs: Integer = 0
+    duration: float = 0.0
+    skipped: t.List[Path] = field(default_factory=list)
+    samples: t.List[PressureSample] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.freed / self.duration if self.duration > 0 else 0.0
+
+    def _lags(self) -> t.List[float]:
+        return [sample.sync_lag for sample in self.samples if sample.sync_lag is not None]
+
+    @property
+    def lag_before(self) -> t.Optional[float]:
+        lags: t.List[float] = self._lags()
+        return lags[0] if lags else None
+
+    @property
+    def lag_after(self) -> t.Optional[float]:
+        lags: t.List[float] = self._lags()
+        return lags[-1] if lags else None
+
+    @property
+    def lag_max(self) -> t.Optional[float]:
+        lags: t.List[float] = self._lags()
+        return max(lags) if lags else None
+
+
+class ArchivePruner:
+    """
+    Removes archive slices at a bounded rate. Large files are unlinked and
+    then shrunk through a descriptor kept open with a series of
+    truncations, so the filesystem frees their extents a few megabytes at
+    a time instead of in one long stall.
+    The rate is halved whenever the sync lag of the node or the latency of
+    its disk go over their limits and recovers gradually once they are
+    back. Files the validator has open are left alone.
+    """
+
+    def __init__(
+        self,
+        *,
+        bytes_per_second: float = 64 * 1024 * 1024,
+        operations_per_second: float = 200.0,
+        max_sync_lag: float = 20.0,
+        max_latency: float = 50.0,
+        lag_source: t.Optional[LagSource] = None,
+        latency_monitor: t.Optional[DiskLatencyMonitor] = None,
+        validator_pid: t.Optional[Integer] = None,
+        check_interval: float = 1.0,
+        step: Integer = DEFAULT_STEP,
+        throttle: t.Optional[Throttle] = None,
+    ) -> None:
+        self.throttle: Throttle = throttle or Throttle(bytes_per_second, operations_per_second)
+        self.max_sync_lag: float = max_sync_lag
+        self.max_latency: float = max_latency
+        self.lag_source: t.Optional[LagSource] = lag_source
+        self.latency_monitor: t.Optional[DiskLatencyMonitor] = latency_monitor
+        self.validator_pid: t.Optional[Integer] = validator_pid
+        self.check_interval: float = check_interval
+        self.step: Integer = step
+        self._checked_at: float = -float('inf')
+        self._stopped: threading.Event = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _sync_lag(self) -> t.Optional[float]:
+        if self.lag_source is None:
+            return None
+        try:
+            return self.lag_source()
+        except Exception:
+            # An unreachable console is no reason to stop, nor to speed up.
+            return None
+
+    def _check_pressure(self, report: PruneReport, *, force: bool = False) -> None:
+        now: float = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        lag: t.Optional[float] = self._sync_lag()
+        latency: t.Optional[float] = None if self.latency_monitor is None else self.latency_monitor.sample()
+        if (lag is not None and lag > self.max_sync_lag) or (latency is not None and latency > self.max_latency):
+            if self.throttle.scale > MINIMUM_SCALE:
+                report.backoffs += 1
+            self.throttle.scale = max(self.throttle.scale / 2, MINIMUM_SCALE)
+        else:
+            self.throttle.scale = min(self.throttle.scale + 0.1, 1.0)
+        report.samples.append(PressureSample(time.time(), lag, latency, self.throttle.scale))
+
+    def _acquire(self, report: PruneReport, size: Integer) -> None:
+        self._check_pressure(report)
+        report.throttled += self.throttle.acquire(size)
+        report.operations += 1
+
+    def _remove_file(self, path: Path, report: PruneReport) -> None:
+        try:
+            descriptor: Integer = os.open(path, os.O_WRONLY | getattr(os, 'O_CLOEXEC', 0))
+        except FileNotFoundError:
+            return
+        try:
+            allocated: Integer = os.fstat(descriptor).st_blocks * 512
+            # Unlinked first, so an interrupted removal never leaves a
+            # truncated file behind; the open descriptor keeps the extents
+            # around to be freed step by step.
+            path.unlink(missing_ok=True)
+            report.files += 1
+            size: Integer = os.fstat(descriptor).st_size
+            while size > self.step and not self._stopped.is_set():
+                size -= self.step
+                self._acquire(report, self.step)
+                os.ftruncate(descriptor, size)
+            if not self._stopped.is_set():
+                self._acquire(report, size)
+        finally:
+            os.close(descriptor)
+        report.freed += allocated
+
+    def _remove_tree(self, path: Path, report: PruneReport) -> None:
+        for directory, directories, files in os.walk(path, topdown=False):
+            for name in files:
+                if self._stopped.is_set():
+                    return
+                self._remove_file(Path(directory, name), report)
+            for name in directories:
+                self._acquire(report, 0)
+                os.rmdir(os.path.join(directory, name))
+        self._acquire(report, 0)
+        os.rmdir(path)
+
+    def prune(self, slices: t.Sequence[ArchiveSlice]) -> PruneReport:
+        report: PruneReport = PruneReport()
+        started: float = time.monotonic()
+        self._stopped.clear()
+        self._check_pressure(report, force=True)
+        for item in slices:
+            if self._stopped.is_set():
+                break
+            siblings, extra = item.siblings()
+            # The files of the package go with its last slice.
+            related: t.List[Path] = [item.path] if siblings else [item.path, *extra]
+            # Right before removing: the validator opens packages as it goes.
+            busy: t.Set[String] = open_files(self.validator_pid)
+            if any(_is_open(path, busy) for path in related):
+                report.skipped.append(item.path)
+                continue
+            for path in related:
+                if path.is_dir() and not path.is_symlink():
+                    self._remove_tree(path, report)
+                else:
+                    self._remove_file(path, report)
+            report.slices += not self._stopped.is_set()
+        self._check_pressure(report, force=True)
+        report.duration = time.monotonic() - started
+        return report
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import stat as stat_module
+import threading
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.metrics import HistoryStore, Samples
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Integer, String
+
+CACHE_VERSION: t.Final[Integer] = 2
+DEFAULT_WORKERS: t.Final[Integer] = min(32, (os.cpu_count() or 1) * 4)
+# Directories changed this close to the scan may change again within the
+# same mtime tick, their listing is not trusted by the next scan.
+RACY_WINDOW: t.Final[float] = 2.0
+# Files growing in place, like the archive package being written, do not
+# change the mtime of their directory: one holding a file written this
+# recently is listed again by the next scan.
+ACTIVE_WINDOW: t.Final[float] = 3600.0
+SERIES_PREFIX: t.Final[String] = 'disk.'
+ROOT_FILES: t.Final[String] = '.'
+
+
+class DiskUsageError(TonNodeControlError):
+    pass
+
+
+@dataclass(frozen=True)
+class Usage:
+    files: Integer = 0
+    size: Integer = 0
+    # Bytes actually taken on disk, sparse files and small files differ.
+    allocated: Integer = 0
+
+    def __add__(self, other: Usage) -> Usage:
+        return Usage(self.files + other.files, self.size + other.size, self.allocated + other.allocated)
+
+
+@dataclass(frozen=True)
+class DirectoryListing:
+    """
+    What a directory holds by itself: its files and the names of its
+    subdirectories, valid as long as its mtime does not change and its
+    newest file is not being written to.
+    """
+
+    mtime: Integer
+    own: Usage
+    directories: t.Tuple[String, ...]
+    newest: Integer = 0
+
+
+@dataclass
+class DiskUsage:
+    root: Path
+    listings: t.Dict[String, DirectoryListing]
+    scanned: Integer
+    reused: Integer
+    duration: float
+    timestamp: float = field(default_factory=time.time)
+
+    def totals(self) -> t.Dict[String, Usage]:
+        """
+        Usage of every directory including its subtree, by path relative
+        to the root.
+        """
+        totals: t.Dict[String, Usage] = {}
+        # Deepest first, children are summed before their parents.
+        for relative in sorted(self.listings, key=lambda path: path.count('/') + bool(path), reverse=True):
+            listing: DirectoryListing = self.listings[relative]
+            total: Usage = listing.own
+            for name in listing.directories:
+                child: t.Optional[Usage] = totals.get(_join(relative, name))
+                if child is not None:
+                    total = total + child
+            totals[relative] = total
+        return totals
+
+    def components(self) -> t.Dict[String, Usage]:
+        """
+        Usage of every top-level directory ("archive", "celldb", ...), with
+        the files lying directly in the root as ".".
+        """
+        totals: t.Dict[String, Usage] = self.totals()
+        root: t.Optional[DirectoryListing] = self.listings.get('')
+        if root is None:
+            return {}
+        components: t.Dict[String, Usage] = {
+            name: totals[name] for name in sorted(root.directories) if name in totals
+        }
+        if root.own.files:
+            components[ROOT_FILES] = root.own
+        return components
+
+    @property
+    def total(self) -> Usage:
+        return self.totals().get('', Usage())
+
+
+def _join(relative: String, name: String) -> String:
+    return f'{relative}/{name}' if relative else name
+
+
+def _list_directory(path: String, device: Integer) -> t.Tuple[Usage, t.Tuple[String, ...], Integer]:
+    files: Integer = 0
+    size: Integer = 0
+    allocated: Integer = 0
+    newest: Integer = 0
+    directories: t.List[String] = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.name)
+                    continue
+                stat: os.stat_result = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                # Removed while listing, e.g. a compacted rocksdb file.
+                continue
+            if stat.st_dev != device or not stat_module.S_ISREG(stat.st_mode):
+                continue
+            files += 1
+            size += stat.st_size
+            allocated += stat.st_blocks * 512
+            newest = max(newest, stat.st_mtime_ns)
+    return Usage(files, size, allocated), tuple(directories), newest
+
+
+class DiskAnalyzer:
+    """
+    Disk usage of the node database, computed with a pool of threads
+    listing directories in parallel. Listings are cached by directory
+    mtime: on later scans a directory whose mtime did not change costs a
+    single stat, only directories that gained or lost entries, or hold a
+    file written to lately, are listed again. "full" scans list
+    everything.
+    """
+
+    def __init__(
+        self,
+        root: t.Union[String, Path],
+        *,
+        cache_directory: t.Optional[Path] = None,
+        workers: Integer = DEFAULT_WORKERS,
+    ) -> None:
+        self.root: Path = Path(root)
+        self.workers: Integer = workers
+        directory: Path = cache_directory or get_ton_node_control_home('cache', 'disk-usage')
+        digest: String = hashlib.blake2b(str(self.root.absolute()).encode(), digest_size=8).hexdigest()
+        self.cache_path: Path = directory.joinpath(f'{digest}.json')
+
+    def _load_cache(self) -> t.Dict[String, DirectoryListing]:
+        try:
+            data: t.Dict[String, t.Any] = json.loads(self.cache_path.read_bytes())
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != CACHE_VERSION or data.get('root') != str(self.root):
+            return {}
+        return {
+            relative: DirectoryListing(mtime, Usage(files, size, allocated), tuple(directories), newest)
+            for relative, (mtime, files, size, allocated, directories, newest) in data['directories'].items()
+        }
+
+    def _save_cache(self, listings: t.Mapping[String, DirectoryListing]) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary: Path = self.cache_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        temporary.write_text(json.dumps(
+            {
+                'version': CACHE_VERSION,
+                'root': str(self.root),
+                'directories': {
+                    relative: [
+                        listing.mtime,
+                        listing.own.files,
+                        listing.own.size,
+                        listing.own.allocated,
+                        listing.directories,
+                        listing.newest,
+                    ]
+                    for relative, listing in listings.items()
+                },
+            },
+            separators=(',', ':'),
+        ))
+        os.replace(temporary, self.cache_path)
+
+    def _visit(
+        self,
+        relative: String,
+        device: Integer,
+        cached: t.Optional[DirectoryListing],
+        racy_after: Integer,
+        active_after: Integer,
+    ) -> t.Tuple[t.Optional[DirectoryListing], bool]:
+        path: String = os.path.join(self.root, relative) if relative else str(self.root)
+        try:
+            # The database itself may well be a symlink to a data disk.
+            stat: os.stat_result = os.lstat(path) if relative else os.stat(path)
+        except FileNotFoundError:
+            return None, False
+        if stat.st_dev != device or not stat_module.S_ISDIR(stat.st_mode):
+            # Other filesystems mounted inside are not part of the database.
+            return None, False
+        if cached is not None and cached.mtime == stat.st_mtime_ns and cached.newest < active_after:
+            return cached, True
+        try:
+            own, directories, newest = _list_directory(path, device)
+        except (FileNotFoundError, NotADirectoryError):
+            return None, False
+        mtime: Integer = stat.st_mtime_ns if stat.st_mtime_ns < racy_after else -1
+        return DirectoryListing(mtime, own, directories, newest), False
+
+    def scan(self, *, full: bool = False) -> DiskUsage:
+        started: float = time.monotonic()
+        try:
+            device: Integer = os.stat(self.root).st_dev
+        except FileNotFoundError:
+            raise DiskUsageError(f'"{self.root}" does not exist') from None
+        cache: t.Dict[String, DirectoryListing] = {} if full else self._load_cache()
+        racy_after: Integer = int((time.time() - RACY_WINDOW) * 1e9)
+        active_after: Integer = int((time.time() - ACTIVE_WINDOW) * 1e9)
+        listings: t.Dict[String, DirectoryListing] = {}
+        reused: Integer = 0
+        with concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='disk-scan') as executor:
+            pending: t.Dict[concurrent.futures.Future, String] = {
+                executor.submit(self._visit, '', device, cache.get(''), racy_after, active_after): '',
+            }
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    relative: String = pending.pop(future)
+                    listing, from_cache = future.result()
+                    if listing is None:
+                        continue
+                    listings[relative] = listing
+                    reused += from_cache
+                    for name in listing.directories:
+                        child: String = _join(relative, name)
+                        pending[executor.submit(
+                            self._visit,
+                            child,
+                            device,
+                            cache.get(child),
+                            racy_after,
+                            active_after,
+                        )] = child
+        self._save_cache(listings)
+        return DiskUsage(
+            root=self.root,
+            listings=listings,
+            scanned=len(listings) - reused,
+            reused=reused,
+            duration=time.monotonic() - started,
+        )
+
+
+def series_name(component: String) -> String:
+    return SERIES_PREFIX + ('root' if component == ROOT_FILES else re.sub(r'[^A-Za-z0-9_.:-]', '_', component))
+
+
+def record_usage(usage: DiskUsage, store: HistoryStore) -> Integer:
+    """
+    Appends the allocated bytes of every component and of the whole
+    database to the node history.
+    """
+    values: t.Dict[String, Integer] = {
+        series_name(component): total.allocated for component, total in usage.components().items()
+    }
+    values[SERIES_PREFIX + 'total'] = usage.total.allocated
+    return store.record_many(values, usage.timestamp)
+
+
+def growth_rate(
+    store: HistoryStore,
+    component: String,
+    window: float,
+    now: t.Optional[float] = None,
+) -> t.Optional[float]:
+    """
+    Average growth of a component over the window in bytes per second,
+    None without two recorded scans in it.
+    """
+    now = time.time() if now is None else now
+    samples: Samples = store.query(series_name(component), now - window)
+    if len(samples) < 2 or samples.timestamps[-1] <= samples.timestamps[0]:
+        return None
+    return (samples.values[-1] - samples.values[0]) / (samples.timestamps[-1] - samples.timestamps[0])
+
+
+def format_size(value: float) -> String:
+    sign: String = '-' if value < 0 else ''
+    value = abs(value)
+    if value < 1024:
+        return f'{sign}{value:.0f} B'
+    for unit in ('KiB', 'MiB', 'GiB', 'TiB'):
+        value /= 1024
+        if value < 1024:
+            break
+    return f'{sign}{value:.1f} {unit}'
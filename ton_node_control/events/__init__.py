@@ -0,0 +1,10 @@
+from .events import (  # noqa: F401
+    ElectionsClosed,
+    ElectionsOpened,
+    Event,
+    MasterchainBlock,
+    ShardBlock,
+    StakeReturned,
+)
+from .bus import DropPolicy, EventBus, Subscription  # noqa: F401
+from .watcher import BlockWatcher, block_descriptor  # noqa: F401
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import typing as t
+
+from ton_node_control.events.events import Event
+from ton_node_control.utils.typing import Integer, String
+
+DEFAULT_QUEUE_SIZE: t.Final[Integer] = 256
+
+EventType = t.Type[Event]
+
+
+class DropPolicy(str, enum.Enum):
+    # The publisher waits for room, which holds up every subscriber.
+    block = 'block'
+    drop_oldest = 'drop-oldest'
+    drop_newest = 'drop-newest'
+
+
+class _Closed:
+    pass
+
+
+_CLOSED: t.Final[_Closed] = _Closed()
+
+
+class Subscription:
+    """
+    Events of some types, queued for one consumer. Iterate over it to
+    receive them; closing it ends the iteration. When the consumer falls
+    behind by "maxsize" events, the policy decides: "block" holds the
+    publisher up, for at most "timeout" seconds when given, after which
+    the event is dropped; the others drop an event right away.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        types: t.Tuple[EventType, ...],
+        *,
+        maxsize: Integer = DEFAULT_QUEUE_SIZE,
+        policy: DropPolicy = DropPolicy.drop_oldest,
+        timeout: t.Optional[float] = None,
+    ) -> None:
+        self.bus: EventBus = bus
+        self.types: t.Tuple[EventType, ...] = types
+        self.policy: DropPolicy = policy
+        self.timeout: t.Optional[float] = timeout
+        self.delivered: Integer = 0
+        self.dropped: Integer = 0
+        self.closed: bool = False
+        self.maxsize: Integer = maxsize
+        # Bounded by "offer" rather than by the queue itself, so closing
+        # never has to wait for room.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._space: asyncio.Event = asyncio.Event()
+
+    def __repr__(self) -> String:
+        names: String = ', '.join(type_.__name__ for type_ in self.types)
+        return f'<Subscription to {names}, {self.pending} pending, {self.dropped} dropped>'
+
+    @property
+    def pending(self) -> Integer:
+        return self._queue.qsize()
+
+    def matches(self, event: Event) -> bool:
+        return isinstance(event, self.types)
+
+    def wants(self, types: t.Tuple[EventType, ...]) -> bool:
+        return any(issubclass(type_, self.types) for type_ in types)
+
+    def _is_full(self) -> bool:
+        return self._queue.qsize() >= self.maxsize
+
+    def offer(self, event: Event) -> bool:
+        """
+        Queues the event unless the queue is full and the policy drops it.
+        """
+        if self.closed:
+            return False
+        if self._is_full():
+            if self.policy is DropPolicy.drop_newest:
+                self.dropped += 1
+                return False
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+        self.delivered += 1
+        return True
+
+    async def put(self, event: Event) -> bool:
+        if self.policy is not DropPolicy.block or not self._is_full():
+            return self.offer(event)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: t.Optional[float] = None if self.timeout is None else loop.time() + self.timeout
+        while self._is_full() and not self.closed:
+            remaining: t.Optional[float] = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                self.dropped += 1
+                return False
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return self.offer(event)
+
+    async def get(self) -> Event:
+        item: t.Union[Event, _Closed] = await self._queue.get()
+        if item is _CLOSED:
+            # Later calls end too.
+            self._queue.put_nowait(_CLOSED)
+            raise StopAsyncIteration
+        self._space.set()
+        return t.cast(Event, item)
+
+    def __aiter__(self) -> Subscription:
+        return self
+
+    async def __anext__(self) -> Event:
+        return await self.get()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.bus._unsubscribe(self)
+        self._queue.put_nowait(_CLOSED)
+        self._space.set()
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe. Producers publish each event once,
+    whatever the number of subscribers; every subscriber gets the events
+    of the types it asked for, subclasses included, through its own
+    bounded queue.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: t.List[Subscription] = []
+        self.published: t.Dict[String, Integer] = {}
+
+    def subscribe(
+        self,
+        *types: EventType,
+        maxsize: Integer = DEFAULT_QUEUE_SIZE,
+        policy: DropPolicy = DropPolicy.drop_oldest,
+        timeout: t.Optional[float] = None,
+    ) -> Subscription:
+        subscription: Subscription = Subscription(
+            self,
+            types or (Event,),
+            maxsize=maxsize,
+            policy=policy,
+            timeout=timeout,
+        )
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def has_subscribers(self, *types: EventType) -> bool:
+        """
+        Whether anyone receives events of any of these types; producers
+        skip fetching what nobody listens to.
+        """
+        return any(subscription.wants(types) for subscription in self.subscriptions)
+
+    async def publish(self, event: Event) -> Integer:
+        """
+        Hands the event to every matching subscriber and returns how many
+        got it. Waits only for subscribers with the "block" policy.
+        """
+        name: String = type(event).__name__
+        self.published[name] = self.published.get(name, 0) + 1
+        delivered: Integer = 0
+        waiting: t.List[t.Awaitable[bool]] = []
+        for subscription in list(self.subscriptions):
+            if not subscription.matches(event):
+                continue
+            if subscription.policy is DropPolicy.block:
+                waiting.append(subscription.put(event))
+            elif subscription.offer(event):
+                delivered += 1
+        if waiting:
+            delivered += sum(await asyncio.gather(*waiting))
+        return delivered
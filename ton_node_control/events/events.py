@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.core.shards import ShardDescriptor
+from ton_node_control.utils.typing import Integer
+
+
+class Event:
+    """
+    Base of everything published on the event bus; subscribing to it
+    receives every event.
+    """
+
+
+@dataclass(frozen=True)
+class MasterchainBlock(Event):
+    """
+    A new last masterchain block. Blocks produced between two polls are
+    not published one by one, "previous_seqno" tells how many there were.
+    """
+
+    block: ShardDescriptor
+    previous_seqno: t.Optional[Integer] = None
+
+
+@dataclass(frozen=True)
+class ShardBlock(Event):
+    block: ShardDescriptor
+    masterchain_seqno: Integer
+
+
+@dataclass(frozen=True)
+class ElectionsOpened(Event):
+    election_id: Integer
+    masterchain_seqno: Integer
+
+
+@dataclass(frozen=True)
+class ElectionsClosed(Event):
+    election_id: Integer
+    masterchain_seqno: Integer
+
+
+@dataclass(frozen=True)
+class StakeReturned(Event):
+    """
+    The elector holds stake or rewards of the wallet that can be
+    recovered, "amount" in nanotons.
+    """
+
+    amount: Integer
+    masterchain_seqno: Integer
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import typing as t
+
+from ton_node_control.core.address import Address
+from ton_node_control.core.datasources import TonCenterDataSource
+from ton_node_control.core.datasources.models import BlockIdExt, GetMethodResult, MasterchainInfo
+from ton_node_control.core.shards import ShardDescriptor, ShardTopology, get_shard_topology
+from ton_node_control.events.bus import EventBus
+from ton_node_control.events.events import (
+    ElectionsClosed,
+    ElectionsOpened,
+    MasterchainBlock,
+    ShardBlock,
+    StakeReturned,
+)
+from ton_node_control.utils.typing import Integer, String
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL: t.Final[float] = 2.0
+# Masterchain blocks between two looks at the elector, about a minute.
+DEFAULT_ELECTOR_EVERY: t.Final[Integer] = 12
+
+
+def _hash_hex(value: String) -> String:
+    return base64.b64decode(value).hex().upper()
+
+
+def block_descriptor(block: BlockIdExt) -> ShardDescriptor:
+    """
+    A block id as toncenter gives it, with a signed shard and base64
+    hashes, in the notation the rest of the tree uses.
+    """
+    return ShardDescriptor(
+        workchain=block.workchain,
+        shard=int(block.shard) & 0xFFFFFFFFFFFFFFFF,
+        seqno=block.seqno,
+        root_hash=_hash_hex(block.root_hash),
+        file_hash=_hash_hex(block.file_hash),
+    )
+
+
+def _stack_integer(result: GetMethodResult, method: String) -> Integer:
+    if result.exit_code != 0 or not result.stack:
+        raise RuntimeError(f'"{method}" exited with code {result.exit_code}')
+    return int(result.stack[0][1], 16)
+
+
+class BlockWatcher:
+    """
+    The one poller of the process: looks at the last masterchain block
+    every "interval" seconds and publishes what changed on the bus.
+    The shard blocks of each new masterchain block go to the process
+    wide shard topology, and are published against what it held before.
+    The elector is only asked every "elector_every" masterchain blocks
+    while someone subscribes to election or stake events, so the load on
+    the API depends on what is watched, not on how many watch it. The
+    state found by the first poll is published as a change.
+    """
+
+    def __init__(
+        self,
+        datasource: TonCenterDataSource,
+        bus: EventBus,
+        *,
+        elector_address: String,
+        wallet_address: t.Optional[String] = None,
+        interval: float = DEFAULT_INTERVAL,
+        elector_every: Integer = DEFAULT_ELECTOR_EVERY,
+        topology: t.Optional[ShardTopology] = None,
+    ) -> None:
+        self.datasource: TonCenterDataSource = datasource
+        self.bus: EventBus = bus
+        self.elector_address: String = elector_address
+        self.wallet_address: t.Optional[String] = wallet_address
+        self.interval: float = interval
+        self.elector_every: Integer = elector_every
+        self.topology: ShardTopology = topology or get_shard_topology()
+        self.polls: Integer = 0
+        self.seqno: t.Optional[Integer] = None
+        self._election_id: t.Optional[Integer] = None
+        self._returned_stake: t.Optional[Integer] = None
+        self._elector_seqno: t.Optional[Integer] = None
+
+    async def _poll_shards(self, seqno: Integer) -> None:
+        known: t.Dict[t.Tuple[Integer, Integer], Integer] = {
+            (block.workchain, block.shard): block.seqno for block in self.topology.shards()
+        }
+        blocks: t.List[ShardDescriptor] = list(map(block_descriptor, await self.datasource.get_shards(seqno)))
+        # Split and merged shards drop out of the topology.
+        if not self.topology.update(seqno, blocks) or not self.bus.has_subscribers(ShardBlock):
+            return
+        for block in blocks:
+            if known.get((block.workchain, block.shard), -1) < block.seqno:
+                await self.bus.publish(ShardBlock(block, seqno))
+
+    async def _poll_elections(self, seqno: Integer) -> None:
+        election_id: Integer = _stack_integer(
+            await self.datasource.run_get_method(self.elector_address, 'active_election_id'),
+            'active_election_id',
+        )
+        previous: t.Optional[Integer] = self._election_id
+        self._election_id = election_id
+        if previous == election_id:
+            return
+        if previous:
+            await self.bus.publish(ElectionsClosed(previous, seqno))
+        if election_id:
+            await self.bus.publish(ElectionsOpened(election_id, seqno))
+
+    async def _poll_stake(self, seqno: Integer, wallet_address: String) -> None:
+        account: Integer = int.from_bytes(Address.parse(wallet_address).hash_part, 'big')
+        amount: Integer = _stack_integer(
+            await self.datasource.run_get_method(
+                self.elector_address,
+                'compute_returned_stake',
+                [['num', hex(account)]],
+            ),
+            'compute_returned_stake',
+        )
+        previous: t.Optional[Integer] = self._returned_stake
+        self._returned_stake = amount
+        if amount > 0 and amount != previous:
+            await self.bus.publish(StakeReturned(amount, seqno))
+
+    def _elector_due(self, seqno: Integer) -> bool:
+        return self._elector_seqno is None or seqno - self._elector_seqno >= self.elector_every
+
+    async def poll(self) -> None:
+        """
+        One look at the chain. Raises when the API fails, whatever was
+        published before that stays published.
+        """
+        self.polls += 1
+        info: MasterchainInfo = await self.datasource.get_masterchain_info()
+        block: ShardDescriptor = block_descriptor(info.last)
+        if self.seqno is not None and block.seqno <= self.seqno:
+            return
+        previous, self.seqno = self.seqno, block.seqno
+        await self.bus.publish(MasterchainBlock(block, previous))
+        await self._poll_shards(block.seqno)
+        wants_elections: bool = self.bus.has_subscribers(ElectionsOpened, ElectionsClosed)
+        wants_stake: bool = self.wallet_address is not None and self.bus.has_subscribers(StakeReturned)
+        if (wants_elections or wants_stake) and self._elector_due(block.seqno):
+            if wants_elections:
+                await self._poll_elections(block.seqno)
+            if wants_stake:
+                await self._poll_stake(block.seqno, t.cast(String, self.wallet_address))
+            self._elector_seqno = block.seqno
+
+    async def run(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            started: float = loop.time()
+            try:
+                await self.poll()
+            except Exception as error:
+                logger.warning('Block watcher poll failed: %s', error)
+            await asyncio.sleep(max(self.interval - (loop.time() - started), 0.0))
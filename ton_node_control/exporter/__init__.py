@@ -0,0 +1,2 @@
+from .exposition import Exposition, render_exposition, render_scheduler_metrics  # noqa: F401
+from .server import MetricsExporter  # noqa: F401
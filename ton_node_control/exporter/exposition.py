@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import math
+import time
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.scheduler.scheduler import DependencyMetrics, TaskMetrics
+from ton_node_control.status.engine import MetricFamily, Probe, ProbeState, StatusReport
+from ton_node_control.utils.typing import Bytes, String
+
+CONTENT_TYPE: t.Final[String] = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape_help(text: String) -> String:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(text: String) -> String:
+    return text.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> String:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _render_family(
+    lines: t.List[String],
+    family: MetricFamily,
+    samples: t.Iterable[t.Tuple[String, float]],
+) -> None:
+    lines.append(f'# HELP {family.name} {_escape_help(family.help)}')
+    lines.append(f'# TYPE {family.name} {family.type}')
+    lines.extend(f'{family.name}{labels} {_format_value(value)}' for labels, value in samples)
+
+
+def render_exposition(probes: t.Sequence[Probe], report: StatusReport) -> Bytes:
+    """
+    Prometheus text exposition of a status report: the families the
+    probes registered, followed by the success and duration of every probe.
+    """
+    lines: t.List[String] = []
+
+    def _family(family: MetricFamily, samples: t.Iterable[t.Tuple[String, float]]) -> None:
+        _render_family(lines, family, samples)
+
+    results = {result.name: result for result in report.results}
+    for probe in probes:
+        result = results.get(probe.name)
+        for family in probe.families:
+            value: t.Any = None if result is None else result.values.get(family.key)
+            # Stale values are worse than none, a probe that timed out
+            # without this value leaves the family empty.
+            if isinstance(value, (int, float)):
+                _family(family, [('', float(value))])
+            else:
+                _family(family, [])
+
+    probe_labels: t.List[t.Tuple[String, t.Any]] = [
+        (f'{{probe="{_escape_label(result.name)}"}}', result) for result in report.results
+    ]
+    _family(
+        MetricFamily('', 'ton_node_control_probe_success', 'Whether the probe answered in time, fully.'),
+        [(labels, float(result.state is ProbeState.ok)) for labels, result in probe_labels],
+    )
+    _family(
+        MetricFamily('', 'ton_node_control_probe_duration_seconds', 'Time the probe took.'),
+        [(labels, result.duration) for labels, result in probe_labels],
+    )
+    _family(
+        MetricFamily('', 'ton_node_control_collection_duration_seconds', 'Time the last collection took.'),
+        [('', report.duration)],
+    )
+    _family(
+        MetricFamily('', 'ton_node_control_collection_timestamp_seconds', 'When the last collection finished.'),
+        [('', time.time())],
+    )
+    return ('\n'.join(lines) + '\n').encode()
+
+
+TASK_FAMILIES: t.Tuple[t.Tuple[String, String, String, t.Callable[[TaskMetrics], float]], ...] = (
+    ('ton_node_control_task_runs_total', 'counter', 'Runs of the task.', lambda metrics: metrics.runs),
+    (
+        'ton_node_control_task_failures_total',
+        'counter',
+        'Runs of the task that failed.',
+        lambda metrics: metrics.failures,
+    ),
+    (
+        'ton_node_control_task_skipped_total',
+        'counter',
+        'Runs of the task skipped: the previous one was still running, or the loop was held up past them.',
+        lambda metrics: metrics.skipped,
+    ),
+    ('ton_node_control_task_run_seconds', 'gauge', 'Time the last run took.', lambda metrics: metrics.last_run_time),
+    (
+        'ton_node_control_task_run_seconds_max',
+        'gauge',
+        'Longest time a run took.',
+        lambda metrics: metrics.max_run_time,
+    ),
+    (
+        'ton_node_control_task_lateness_seconds',
+        'gauge',
+        'How late after its due time the last run started.',
+        lambda metrics: metrics.last_lateness,
+    ),
+    (
+        'ton_node_control_task_lateness_seconds_max',
+        'gauge',
+        'Latest a run started after its due time.',
+        lambda metrics: metrics.max_lateness,
+    ),
+)
+DEPENDENCY_FAMILIES: t.Tuple[t.Tuple[String, String, String, t.Callable[[DependencyMetrics], float]], ...] = (
+    (
+        'ton_node_control_dependency_fetches_total',
+        'counter',
+        'Fetches of data shared by tasks.',
+        lambda metrics: metrics.fetches,
+    ),
+    (
+        'ton_node_control_dependency_shared_total',
+        'counter',
+        'Times a task got shared data without a fetch of its own.',
+        lambda metrics: metrics.shared,
+    ),
+)
+
+
+def render_scheduler_metrics(
+    tasks: t.Mapping[String, TaskMetrics],
+    dependencies: t.Mapping[String, DependencyMetrics],
+) -> Bytes:
+    """
+    Prometheus text exposition of the scheduler's run time and lateness
+    of every task and of the fetches of their dependencies.
+    """
+    lines: t.List[String] = []
+    for name, type_, help_, value in TASK_FAMILIES:
+        _render_family(
+            lines,
+            MetricFamily('', name, help_, type_),
+            [(f'{{task="{_escape_label(task)}"}}', value(metrics)) for task, metrics in sorted(tasks.items())],
+        )
+    for name, type_, help_, value in DEPENDENCY_FAMILIES:
+        _render_family(
+            lines,
+            MetricFamily('', name, help_, type_),
+            [
+                (f'{{dependency="{_escape_label(dependency)}"}}', value(metrics))
+                for dependency, metrics in sorted(dependencies.items())
+            ],
+        )
+    return ('\n'.join(lines) + '\n').encode()
+
+
+@dataclass(frozen=True)
+class Exposition:
+    """
+    One rendered scrape answer, in every form it is served in.
+    """
+
+    body: Bytes
+    gzipped: Bytes
+    etag: String
+    generated_at: float
+
+    @classmethod
+    def build(cls, body: Bytes) -> Exposition:
+        return cls(
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=6, mtime=0),
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            generated_at=time.time(),
+        )
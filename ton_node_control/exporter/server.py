@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import email.utils
+import logging
+import re
+import typing as t
+
+from ton_node_control.core.datasources import get_client_pool
+from ton_node_control.exporter.exposition import (
+    CONTENT_TYPE,
+    Exposition,
+    render_exposition,
+    render_scheduler_metrics,
+)
+from ton_node_control.scheduler.scheduler import Scheduler, Task
+from ton_node_control.status.engine import Probe, StatusEngine, StatusReport
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH: t.Final[String] = '/metrics'
+MAX_HEADER_BYTES: t.Final[Integer] = 16 * 1024
+IDLE_TIMEOUT: t.Final[float] = 30.0
+COLLECT_TASK: t.Final[String] = 'exporter.collect'
+# "gzip" among the accepted encodings, unless given a zero weight.
+GZIP_REGEX = re.compile(r'(?:^|,)\s*gzip\s*(?:,|$|;(?!\s*q=0(?:\.0*)?\s*(?:,|$)))', re.IGNORECASE)
+
+# Status line and headers, then the body.
+Response = t.Tuple[Bytes, Bytes]
+
+
+class MetricsExporter:
+    """
+    Serves the node status to Prometheus. Collection is a task of the
+    scheduler, run while serving, and renders the exposition once;
+    scrapes only pick the cached bytes, plain or gzipped, or answer "304
+    Not Modified", so the node sees the same load however many scrapers
+    there are. The run time and lateness of the scheduler's tasks are
+    exported along with the status.
+    """
+
+    def __init__(
+        self,
+        probes: t.Sequence[Probe],
+        *,
+        interval: float = 15.0,
+        budget: float = 5.0,
+        scheduler: t.Optional[Scheduler] = None,
+    ) -> None:
+        self.probes: t.List[Probe] = list(probes)
+        self.scheduler: Scheduler = scheduler if scheduler is not None else Scheduler()
+        self.interval: float = interval
+        self.engine: StatusEngine = StatusEngine(self.probes, budget=budget)
+        self._answers: t.Optional[t.Tuple[Exposition, Response, Response, Response]] = None
+        self.scrapes: Integer = 0
+        self._ready: t.Optional[asyncio.Event] = None
+
+    async def refresh(self) -> Exposition:
+        report: StatusReport = await self.engine.collect()
+        body: Bytes = render_exposition(self.probes, report)
+        body += render_scheduler_metrics(self.scheduler.task_metrics, self.scheduler.dependency_metrics)
+        exposition: Exposition = Exposition.build(body)
+        common: t.List[t.Tuple[String, String]] = [
+            ('ETag', exposition.etag),
+            ('Last-Modified', email.utils.formatdate(exposition.generated_at, usegmt=True)),
+            ('Cache-Control', f'max-age={int(self.interval)}'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        # Swapped in one assignment, a scrape sees either set of answers whole.
+        self._answers = (
+            exposition,
+            self._response('304 Not Modified', common),
+            self._response('200 OK', [*common, ('Content-Type', CONTENT_TYPE)], exposition.body),
+            self._response(
+                '200 OK',
+                [*common, ('Content-Type', CONTENT_TYPE), ('Content-Encoding', 'gzip')],
+                exposition.gzipped,
+            ),
+        )
+        return exposition
+
+    @property
+    def exposition(self) -> t.Optional[Exposition]:
+        return None if self._answers is None else self._answers[0]
+
+    async def _collect(self) -> None:
+        try:
+            await self.refresh()
+        finally:
+            if self._ready is not None:
+                self._ready.set()
+
+    @staticmethod
+    def _response(
+        status: String,
+        headers: t.Sequence[t.Tuple[String, String]],
+        body: Bytes = b'',
+    ) -> Response:
+        lines: t.List[String] = [f'HTTP/1.1 {status}', *(f'{name}: {value}' for name, value in headers)]
+        lines.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode(), body
+
+    def answer(self, method: String, path: String, headers: t.Mapping[String, String]) -> Response:
+        if method not in ('GET', 'HEAD'):
+            return self._response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+        if path.split('?', 1)[0] != METRICS_PATH:
+            return self._response('404 Not Found', [('Content-Type', 'text/plain')], b'Not found\n')
+        answers: t.Optional[t.Tuple[Exposition, Response, Response, Response]] = self._answers
+        if answers is None:
+            return self._response('503 Service Unavailable', [('Retry-After', '1')])
+        self.scrapes += 1
+        exposition, not_modified, plain, gzipped = answers
+        if exposition.etag in headers.get('if-none-match', ''):
+            return not_modified
+        return gzipped if GZIP_REGEX.search(headers.get('accept-encoding', '')) else plain
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request: Bytes = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    return
+                request_line, *header_lines = request.decode('latin-1').split('\r\n')
+                parts: t.List[String] = request_line.split()
+                if len(parts) != 3:
+                    writer.write(b''.join(self._response('400 Bad Request', [('Connection', 'close')])))
+                    return
+                method, path, version = parts
+                headers: t.Dict[String, String] = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                head, body = self.answer(method, path, headers)
+                writer.write(head)
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                connection: String = headers.get('connection', '').lower()
+                if connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive'):
+                    return
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, host: String = '0.0.0.0', port: Integer = 9150) -> None:
+        self._ready = asyncio.Event()
+        # Fixed rate from the start: the first scrape finds data at once.
+        self.scheduler.add(Task(COLLECT_TASK, self._collect, self.interval, jitter=0.0, delay=0.0))
+        scheduling: asyncio.Future = asyncio.ensure_future(self.scheduler.run())
+        try:
+            # Start listening with data to serve, Prometheus would
+            # otherwise record a failed scrape on every restart.
+            await self._ready.wait()
+            server: asyncio.AbstractServer = await asyncio.start_server(
+                self._handle,
+                host,
+                port,
+                limit=MAX_HEADER_BYTES,
+            )
+            logger.info('Serving metrics on http://%s:%s%s', host, port, METRICS_PATH)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.scheduler.stop()
+            scheduling.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await scheduling
+            self.scheduler.remove(COLLECT_TASK)
+            await get_client_pool().aclose()
@@ -1,11 +1,22 @@
+import click
+
 from simple_term_menu import TerminalMenu
 
 from ton_node_control.interactive.menu.main import MainMenuEntries
+from ton_node_control.status import collect_status, render_report
+
+
+def show_status() -> None:
+    click.echo(render_report(collect_status()))
 
 
 def run() -> None:
-    TerminalMenu(
+    index = TerminalMenu(
         MainMenuEntries.choices(),
         title='Available commands'
     ).show()
-
+    if index is None:
+        return
+    entry: MainMenuEntries = list(MainMenuEntries)[index]
+    if entry is MainMenuEntries.status:
+        show_status()
@@ -0,0 +1,4 @@
+from .filters import LineFilter, LogLevel  # noqa: F401
+from .follower import LogFollower, tail_offset  # noqa: F401
+from .inotify import FileWatcher, is_inotify_available  # noqa: F401
+from .index import LogIndex, get_log_index, parse_timestamp  # noqa: F401
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import enum
+import re
+import typing as t
+
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+
+class LogLevel(enum.IntEnum):
+    """
+    Verbosity levels of "validator-engine", written as "[ N]" at the
+    start of every line.
+    """
+
+    fatal = 0
+    error = 1
+    warning = 2
+    info = 3
+    debug = 4
+
+    @classmethod
+    def parse(cls, value: t.Union[String, Integer]) -> LogLevel:
+        if isinstance(value, int) or str(value).isdigit():
+            return cls(int(value))
+        try:
+            return cls[str(value).lower()]
+        except KeyError:
+            raise ValueError(f'Unknown log level "{value}"') from None
+
+
+class LineFilter:
+    """
+    Selects lines out of raw chunks of complete lines without decoding
+    or splitting the chunk: the most selective pattern is searched over
+    the whole chunk in one pass, and only the lines it hits are checked
+    against the rest.
+    """
+
+    def __init__(
+        self,
+        *,
+        pattern: t.Optional[t.Union[String, Bytes]] = None,
+        max_level: t.Optional[LogLevel] = None,
+        ignore_case: bool = False,
+    ) -> None:
+        flags: Integer = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        self.pattern: t.Optional[t.Pattern[Bytes]] = None
+        if pattern is not None:
+            self.pattern = re.compile(pattern.encode() if isinstance(pattern, str) else pattern, flags)
+        self.level: t.Optional[t.Pattern[Bytes]] = None
+        self._level_scan: t.Optional[t.Pattern[Bytes]] = None
+        if max_level is not None:
+            self.level = re.compile(rb'\[ *[0-%d]\]' % int(max_level))
+            # Starting with a literal line break lets the regex engine skip
+            # ahead between lines, "^" in multiline mode would try every byte.
+            self._level_scan = re.compile(rb'\n\[ *[0-%d]\]' % int(max_level))
+
+    @property
+    def is_pass_through(self) -> bool:
+        return self.pattern is None and self.level is None
+
+    def _line_starts(self, chunk: t.Union[Bytes, bytearray]) -> t.Iterator[Integer]:
+        if self.pattern is not None:
+            last_end: Integer = -1
+            for match in self.pattern.finditer(chunk):
+                start: Integer = chunk.rfind(b'\n', 0, match.start()) + 1
+                # Several hits on one line make it a candidate once.
+                if start > last_end:
+                    last_end = chunk.find(b'\n', match.start())
+                    if last_end < 0:
+                        last_end = len(chunk)
+                    yield start
+            return
+        level: t.Pattern[Bytes] = t.cast(t.Pattern[Bytes], self.level)
+        if level.match(chunk, 0) is not None:
+            yield 0
+        for match in t.cast(t.Pattern[Bytes], self._level_scan).finditer(chunk):
+            yield match.start() + 1
+
+    def lines(self, chunk: t.Union[Bytes, bytearray]) -> t.Iterator[Bytes]:
+        """
+        Matching lines of a chunk that ends with a line break, without it.
+        """
+        if self.is_pass_through:
+            if chunk:
+                yield from bytes(chunk[:-1] if chunk.endswith(b'\n') else chunk).split(b'\n')
+            return
+        check_level: bool = self.pattern is not None and self.level is not None
+        for start in self._line_starts(chunk):
+            if check_level and t.cast(t.Pattern[Bytes], self.level).match(chunk, start) is None:
+                continue
+            end: Integer = chunk.find(b'\n', start)
+            yield bytes(chunk[start:end if end >= 0 else len(chunk)])
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import threading
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.logs.inotify import FileWatcher
+from ton_node_control.utils.typing import Bytes, Integer
+
+DEFAULT_CHUNK_SIZE: t.Final[Integer] = 1024 * 1024
+
+
+def tail_offset(descriptor: Integer, lines: Integer, *, chunk_size: Integer = 64 * 1024) -> Integer:
+    """
+    Offset of the start of the last "lines" complete lines, found by
+    reading backwards from the end of the file.
+    """
+    end: Integer = os.fstat(descriptor).st_size
+    if lines <= 0 or end == 0:
+        return end
+    position: Integer = end
+    # A missing final line break means the last line is still being written.
+    needed: Integer = lines + 1 if os.pread(descriptor, 1, end - 1) == b'\n' else lines
+    while position > 0:
+        size: Integer = min(chunk_size, position)
+        position -= size
+        chunk: Bytes = os.pread(descriptor, size, position)
+        index: Integer = len(chunk)
+        while True:
+            index = chunk.rfind(b'\n', 0, index)
+            if index < 0:
+                break
+            needed -= 1
+            if needed == 0:
+                return position + index + 1
+    return 0
+
+
+class LogFollower:
+    """
+    Follows a growing log file the way "tail -F" does: starts at the end
+    (or a few lines before it), reads what is appended in large chunks
+    into a reused buffer and hands out runs of complete lines. Renames
+    and truncation of the file are detected on every wake-up, whatever
+    was left in the old file is read before switching to the new one.
+    """
+
+    def __init__(
+        self,
+        path: t.Union[str, Path],
+        *,
+        lines: Integer = 0,
+        from_start: bool = False,
+        chunk_size: Integer = DEFAULT_CHUNK_SIZE,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.path: Path = Path(path)
+        self.lines: Integer = lines
+        self.from_start: bool = from_start
+        self.chunk_size: Integer = chunk_size
+        self.poll_interval: float = poll_interval
+        self.rotations: Integer = 0
+        self.truncations: Integer = 0
+
+        self._descriptor: t.Optional[Integer] = None
+        self._inode: t.Optional[t.Tuple[Integer, Integer]] = None
+        self._position: Integer = 0
+        self._buffer: bytearray = bytearray(chunk_size)
+        self._partial: bytearray = bytearray()
+        self._stopped: threading.Event = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _open(self, *, at_end: bool) -> bool:
+        try:
+            descriptor: Integer = os.open(self.path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+        except FileNotFoundError:
+            return False
+        stat: os.stat_result = os.fstat(descriptor)
+        self._descriptor = descriptor
+        self._inode = (stat.st_dev, stat.st_ino)
+        self._position = tail_offset(descriptor, self.lines, chunk_size=self.chunk_size) if at_end else 0
+        self._partial.clear()
+        return True
+
+    def _close(self) -> None:
+        if self._descriptor is not None:
+            os.close(self._descriptor)
+            self._descriptor = None
+
+    def _read_available(self) -> t.Iterator[bytearray]:
+        descriptor: Integer = t.cast(Integer, self._descriptor)
+        view: memoryview = memoryview(self._buffer)
+        try:
+            while True:
+                read: Integer = os.preadv(descriptor, [view], self._position)
+                if read == 0:
+                    return
+                self._position += read
+                end: Integer = self._buffer.rfind(b'\n', 0, read) + 1
+                if end == 0:
+                    self._partial += view[:read]
+                    continue
+                # Complete lines go out in one piece, the unfinished
+                # last line waits for the rest of it.
+                chunk: bytearray = self._partial + view[:end]
+                self._partial = bytearray(view[end:read])
+                yield chunk
+        finally:
+            view.release()
+
+    def _check_file(self) -> t.Optional[str]:
+        try:
+            stat: os.stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if (stat.st_dev, stat.st_ino) != self._inode:
+            return 'rotated'
+        if stat.st_size < self._position:
+            return 'truncated'
+        return None
+
+    def chunks(self, *, follow: bool = True) -> t.Iterator[bytearray]:
+        """
+        Runs of complete lines, each ending with a line break, until "stop",
+        or until the current end of the file when not following it.
+        """
+        self._stopped.clear()
+        if not follow:
+            if self._open(at_end=not self.from_start):
+                try:
+                    yield from self._read_available()
+                    if self._partial:
+                        yield self._partial + b'\n'
+                finally:
+                    self._close()
+            return
+        with FileWatcher(self.path, poll_interval=self.poll_interval) as watcher:
+            opened: bool = self._open(at_end=not self.from_start)
+            try:
+                while not self._stopped.is_set():
+                    if opened:
+                        yield from self._read_available()
+                        change: t.Optional[str] = self._check_file()
+                        if change == 'rotated':
+                            # Whatever was written before the rename comes first.
+                            yield from self._read_available()
+                            if self._partial:
+                                yield self._partial + b'\n'
+                            self._close()
+                            self.rotations += 1
+                            opened = self._open(at_end=False)
+                            continue
+                        if change == 'truncated':
+                            self.truncations += 1
+                            self._position = 0
+                            self._partial.clear()
+                            continue
+                    else:
+                        opened = self._open(at_end=False)
+                        if opened:
+                            continue
+                    # Wake up regularly: a rename into place is not always
+                    # reported for the name being followed.
+                    watcher.wait(timeout=self.poll_interval * 4)
+            finally:
+                self._close()
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        for chunk in self.chunks():
+            yield from bytes(chunk[:-1]).split(b'\n')
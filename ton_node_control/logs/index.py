@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import bisect
+import calendar
+import functools
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import typing as t
+
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+INDEX_MAGIC: t.Final[Bytes] = b'TNCLIDX1'
+INDEX_HEADER = struct.Struct('<8sQQQ')
+INDEX_ENTRY = struct.Struct('<dQ')
+DEFAULT_STRIDE: t.Final[Integer] = 1024 * 1024
+# Lines of different threads reach the file slightly out of order.
+DEFAULT_SLACK: t.Final[float] = 2.0
+PROBE_SIZE: t.Final[Integer] = 64 * 1024
+IDENTITY_SIZE: t.Final[Integer] = 4096
+
+TIMESTAMP_REGEX = re.compile(
+    rb'\[(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)(\.\d+)?\]',
+)
+
+
+def parse_timestamp(line: t.Union[Bytes, bytearray, memoryview]) -> t.Optional[float]:
+    """
+    Timestamp of a "validator-engine" line, taken as UTC, None for
+    lines without one such as continuations of a multi-line message.
+    """
+    match: t.Optional[t.Match[Bytes]] = TIMESTAMP_REGEX.search(bytes(line[:96]))
+    if match is None:
+        return None
+    year, month, day, hour, minute, second = (int(part) for part in match.groups()[:6])
+    fraction: t.Optional[Bytes] = match.group(7)
+    return calendar.timegm((year, month, day, hour, minute, second)) + (float(fraction) if fraction else 0.0)
+
+
+def _identity(descriptor: Integer) -> t.Optional[String]:
+    # Content of the head of the file: unlike the path it does not
+    # change on rotation, unlike the inode it is not reused.
+    head: Bytes = os.pread(descriptor, IDENTITY_SIZE, 0)
+    end: Integer = head.find(b'\n')
+    if end < 0:
+        return None
+    return hashlib.blake2b(head[:end + 1], digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    timestamp: float
+    offset: Integer
+
+
+class SegmentIndex:
+    """
+    Sparse timestamp to offset checkpoints of one log file, one every
+    "stride" bytes at the first line carrying a timestamp. Extending it
+    only probes a few kilobytes per stride, nothing in between is read.
+    """
+
+    def __init__(self, path: Path, index_path: Path, *, stride: Integer = DEFAULT_STRIDE) -> None:
+        self.path: Path = path
+        self.index_path: Path = index_path
+        self.stride: Integer = stride
+        self.indexed_until: Integer = 0
+        self.timestamps: array = array('d')
+        self.offsets: array = array('Q')
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data: Bytes = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return
+        if len(data) < INDEX_HEADER.size:
+            return
+        magic, stride, indexed_until, count = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or stride != self.stride:
+            return
+        # Entries are written before the header that counts them,
+        # a short file means the index itself was cut off.
+        stored: Integer = min(count, (len(data) - INDEX_HEADER.size) // INDEX_ENTRY.size)
+        for timestamp, offset in INDEX_ENTRY.iter_unpack(
+            data[INDEX_HEADER.size:INDEX_HEADER.size + stored * INDEX_ENTRY.size],
+        ):
+            self.timestamps.append(timestamp)
+            self.offsets.append(offset)
+        if stored == count:
+            self.indexed_until = indexed_until
+        elif self.offsets:
+            self.indexed_until = self.offsets[-1] + 1
+
+    def _save(self, new_entries: Integer) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.index_path.exists():
+            self.index_path.write_bytes(INDEX_HEADER.pack(INDEX_MAGIC, self.stride, 0, 0))
+            new_entries = len(self.offsets)
+        with open(self.index_path, 'r+b') as file:
+            file.seek(INDEX_HEADER.size + (len(self.offsets) - new_entries) * INDEX_ENTRY.size)
+            file.write(b''.join(
+                INDEX_ENTRY.pack(self.timestamps[index], self.offsets[index])
+                for index in range(len(self.offsets) - new_entries, len(self.offsets))
+            ))
+            file.truncate()
+            file.seek(0)
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, self.stride, self.indexed_until, len(self.offsets)))
+
+    @staticmethod
+    def _probe(descriptor: Integer, offset: Integer) -> t.Optional[Checkpoint]:
+        head: Bytes = os.pread(descriptor, PROBE_SIZE, offset)
+        # The first whole line at or after the offset.
+        position: Integer = 0
+        if offset:
+            position = head.find(b'\n') + 1
+            if position == 0:
+                return None
+        while True:
+            end: Integer = head.find(b'\n', position)
+            if end < 0:
+                return None
+            timestamp: t.Optional[float] = parse_timestamp(head[position:end])
+            if timestamp is not None:
+                return Checkpoint(timestamp, offset + position)
+            position = end + 1
+
+    def update(self, descriptor: Integer) -> Integer:
+        """
+        Extends the index to the end of the file, returns the number of
+        new checkpoints.
+        """
+        size: Integer = os.fstat(descriptor).st_size
+        if self.offsets and size <= self.offsets[-1]:
+            # Truncated in place: start over.
+            self.timestamps, self.offsets, self.indexed_until = array('d'), array('Q'), 0
+            self.index_path.unlink(missing_ok=True)
+        added: Integer = 0
+        offset: Integer = self.indexed_until
+        while offset < size:
+            checkpoint: t.Optional[Checkpoint] = self._probe(descriptor, offset)
+            if checkpoint is None and offset + PROBE_SIZE < size:
+                # A stride without a timestamped line near its start,
+                # nothing to checkpoint there.
+                offset += self.stride
+                self.indexed_until = offset
+                continue
+            if checkpoint is None:
+                # The end of the file is still being written.
+                break
+            if not self.offsets or checkpoint.offset > self.offsets[-1]:
+                self.timestamps.append(checkpoint.timestamp)
+                self.offsets.append(checkpoint.offset)
+                added += 1
+            offset += self.stride
+            self.indexed_until = offset
+        if added or not self.index_path.exists():
+            self._save(added)
+        return added
+
+    @property
+    def first_timestamp(self) -> t.Optional[float]:
+        return self.timestamps[0] if self.timestamps else None
+
+    def start_offset(self, since: float, slack: float = DEFAULT_SLACK) -> Integer:
+        """
+        Offset to start reading from for lines at or after "since": the
+        last checkpoint comfortably before it.
+        """
+        position: Integer = bisect.bisect_left(self.timestamps, since - slack)
+        return self.offsets[position - 1] if position else 0
+
+
+class LogIndex:
+    """
+    Time-range queries over a log and its rotated segments ("log",
+    "log.1", ...). Every segment has its own index under the
+    ton-node-control home, named after the head of its content, so a
+    rotated segment keeps its index and only new data is ever indexed.
+    The indexes of one log live in a directory of their own, so that
+    pruning those of vanished segments leaves other logs alone.
+    """
+
+    def __init__(
+        self,
+        path: t.Union[String, Path],
+        *,
+        directory: t.Optional[Path] = None,
+        stride: Integer = DEFAULT_STRIDE,
+        slack: float = DEFAULT_SLACK,
+    ) -> None:
+        self.path: Path = Path(path)
+        log: String = hashlib.blake2b(os.fsencode(self.path.absolute()), digest_size=8).hexdigest()
+        self.directory: Path = (directory or get_ton_node_control_home('cache', 'log-index')).joinpath(log)
+        self.stride: Integer = stride
+        self.slack: float = slack
+        self._indexes: t.Dict[String, SegmentIndex] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def segments(self) -> t.List[Path]:
+        """
+        The log and its uncompressed rotated segments.
+        """
+        parent: Path = self.path.parent
+        if not parent.is_dir():
+            return []
+        return [
+            path for path in parent.iterdir()
+            if (path.name == self.path.name or path.name.startswith(self.path.name + '.'))
+            and path.suffix not in ('.gz', '.xz', '.zst', '.bz2')
+            and path.is_file()
+        ]
+
+    def _index(self, identity: String, path: Path) -> SegmentIndex:
+        index: t.Optional[SegmentIndex] = self._indexes.get(identity)
+        if index is None:
+            index = self._indexes[identity] = SegmentIndex(
+                path,
+                self.directory.joinpath(f'{identity}.idx'),
+                stride=self.stride,
+            )
+        index.path = path
+        return index
+
+    def update(self) -> t.List[t.Tuple[SegmentIndex, Integer]]:
+        """
+        Brings the index of every segment up to date; returns them with the
+        number of checkpoints added, ordered by time.
+        """
+        updated: t.List[t.Tuple[SegmentIndex, Integer]] = []
+        with self._lock:
+            live: t.Set[String] = set()
+            for path in self.segments():
+                try:
+                    descriptor: Integer = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    continue
+                try:
+                    identity: t.Optional[String] = _identity(descriptor)
+                    if identity is None:
+                        continue
+                    live.add(identity)
+                    index: SegmentIndex = self._index(identity, path)
+                    updated.append((index, index.update(descriptor)))
+                finally:
+                    os.close(descriptor)
+            self._prune(live)
+        return sorted(updated, key=lambda entry: entry[0].first_timestamp or 0.0)
+
+    def _prune(self, live: t.Set[String]) -> None:
+        for identity in set(self._indexes) - live:
+            del self._indexes[identity]
+        if self.directory.is_dir():
+            for path in self.directory.glob('*.idx'):
+                if path.stem not in live:
+                    path.unlink(missing_ok=True)
+
+    def query(self, since: float, until: float) -> t.Iterator[Bytes]:
+        """
+        Lines logged in [since, until), oldest segment first. Lines without
+        a timestamp go with the line before them.
+        """
+        segments: t.List[t.Tuple[SegmentIndex, Integer]] = self.update()
+        for position, (index, _) in enumerate(segments):
+            following: t.Optional[float] = (
+                segments[position + 1][0].first_timestamp if position + 1 < len(segments) else None
+            )
+            if following is not None and following < since - self.slack:
+                continue
+            if index.first_timestamp is not None and index.first_timestamp > until + self.slack:
+                break
+            yield from self._scan(index, since, until)
+
+    def _scan(self, index: SegmentIndex, since: float, until: float) -> t.Iterator[Bytes]:
+        try:
+            file: t.BinaryIO = open(index.path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            size: Integer = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+            buffer: mmap.mmap = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                position: Integer = index.start_offset(since, self.slack)
+                current: t.Optional[float] = None
+                while position < size:
+                    end: Integer = buffer.find(b'\n', position)
+                    if end < 0:
+                        end = size
+                    line: Bytes = buffer[position:end]
+                    position = end + 1
+                    timestamp: t.Optional[float] = parse_timestamp(line)
+                    if timestamp is not None:
+                        current = timestamp
+                        if timestamp >= until + self.slack:
+                            return
+                    if current is not None and since <= current < until:
+                        yield line
+            finally:
+                buffer.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_log_index(path: Path) -> LogIndex:
+    """
+    One index per log in the process, the daemon keeps it current.
+    """
+    return LogIndex(path)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import time
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.utils.typing import Integer, String
+
+IN_MODIFY: t.Final[Integer] = 0x00000002
+IN_ATTRIB: t.Final[Integer] = 0x00000004
+IN_CLOSE_WRITE: t.Final[Integer] = 0x00000008
+IN_MOVED_FROM: t.Final[Integer] = 0x00000040
+IN_MOVED_TO: t.Final[Integer] = 0x00000080
+IN_CREATE: t.Final[Integer] = 0x00000100
+IN_DELETE: t.Final[Integer] = 0x00000200
+IN_Q_OVERFLOW: t.Final[Integer] = 0x00004000
+IN_NONBLOCK: t.Final[Integer] = os.O_NONBLOCK
+IN_CLOEXEC: t.Final[Integer] = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+FILE_EVENTS: t.Final[Integer] = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+@functools.lru_cache(maxsize=None)
+def _libc() -> t.Optional[ctypes.CDLL]:
+    name: t.Optional[String] = ctypes.util.find_library('c')
+    try:
+        libc: ctypes.CDLL = ctypes.CDLL(name or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def is_inotify_available() -> bool:
+    return _libc() is not None
+
+
+class FileWatcher:
+    """
+    Blocks until a file may have changed. Uses inotify on the directory
+    of the file, which also reports rotation and re-creation, and falls
+    back to sleeping for the poll interval where inotify is missing.
+    """
+
+    def __init__(self, path: Path, *, poll_interval: float = 0.5) -> None:
+        self.path: Path = path
+        self.poll_interval: float = poll_interval
+        self._descriptor: t.Optional[Integer] = None
+        libc: t.Optional[ctypes.CDLL] = _libc()
+        if libc is None:
+            return
+        descriptor: Integer = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if descriptor < 0:
+            return
+        directory: bytes = os.fsencode(path.parent if str(path.parent) else Path('.'))
+        if libc.inotify_add_watch(descriptor, directory, FILE_EVENTS) < 0:
+            os.close(descriptor)
+            return
+        self._descriptor = descriptor
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._descriptor is not None
+
+    def wait(self, timeout: t.Optional[float] = None) -> bool:
+        """
+        Waits for a change of the watched file, at most "timeout" seconds.
+        Returns False when nothing happened; with polling every wake-up
+        counts as a possible change.
+        """
+        if self._descriptor is None:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            return True
+        readable, _, _ = select.select([self._descriptor], [], [], timeout)
+        if not readable:
+            return False
+        return self._drain()
+
+    def _drain(self) -> bool:
+        name: bytes = os.fsencode(self.path.name)
+        relevant: bool = False
+        while True:
+            try:
+                data: bytes = os.read(t.cast(Integer, self._descriptor), 64 * 1024)
+            except BlockingIOError:
+                return relevant
+            offset: Integer = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                event_name: bytes = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                # Rotation schemes rename the file away and create a new one
+                # under the same name, both show up as events of that name.
+                if event_name == name or mask & IN_Q_OVERFLOW:
+                    relevant = True
+
+    def close(self) -> None:
+        if self._descriptor is not None:
+            os.close(self._descriptor)
+            self._descriptor = None
+
+    def __enter__(self) -> FileWatcher:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
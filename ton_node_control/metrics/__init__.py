@@ -0,0 +1,10 @@
+from .history import HistoryStore, SeriesHistory, get_history_store  # noqa: F401
+from .ring import Rollups, Samples  # noqa: F401
+from .store import (  # noqa: F401
+    HOUR,
+    MINUTE,
+    Aggregate,
+    MetricsError,
+    MetricsStore,
+    SeriesLayout,
+)
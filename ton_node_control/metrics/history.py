@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import fcntl
+import functools
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import typing as t
+
+from array import array
+from pathlib import Path
+
+from ton_node_control.metrics.ring import Samples
+from ton_node_control.metrics.store import Aggregate, MetricsError, MetricsStore
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import Bytes, Integer, String
+
+SEGMENT_MAGIC: t.Final[Bytes] = b'TNCSEG\x00\x01'
+SEGMENT_SUFFIX: t.Final[String] = '.seg'
+INDEX_SUFFIX: t.Final[String] = '.idx'
+HEADER = struct.Struct('<8sHHdd')
+HEADER_SIZE: t.Final[Integer] = 64
+BLOCK_RECORDS: t.Final[Integer] = 256
+# One page per block: all timestamps of the block, then all values.
+BLOCK_SIZE: t.Final[Integer] = BLOCK_RECORDS * 16
+DEFAULT_SEGMENT_SPAN: t.Final[float] = 24 * 3600.0
+DEFAULT_RETENTION: t.Final[float] = 30 * 24 * 3600.0
+
+# Not "." or "..", a series is a directory of the history.
+SERIES_NAME_REGEX = re.compile(r'^(?!\.+$)[A-Za-z0-9_.:-]+$')
+
+
+def _doubles(data: t.Union[Bytes, memoryview]) -> array:
+    values: array = array('d')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _pack_double(value: float) -> Bytes:
+    return struct.pack('<d', value)
+
+
+class Segment:
+    """
+    One append-only file of a series, covering "span" seconds from "start".
+    Records are written into fixed blocks of BLOCK_RECORDS timestamps
+    followed by as many values; the file grows one zero-filled block at a
+    time. The value of a record is written before its timestamp, and a
+    zero timestamp marks a free slot, so a torn tail is recognised and
+    dropped when the segment is opened for writing again. Writers, in this
+    process or another, take an exclusive "flock" on the file to append.
+
+    The ".idx" sidecar is the sparse time index: the first timestamp of
+    every block, so readers find a range by bisecting it and only map
+    the blocks they need.
+    """
+
+    def __init__(self, path: Path, *, writable: bool = False) -> None:
+        self.path: Path = path
+        self.index_path: Path = path.with_suffix(INDEX_SUFFIX)
+        self.writable: bool = writable
+        self._file: t.BinaryIO = open(path, 'r+b' if writable else 'rb')
+        self._mmap: t.Optional[mmap.mmap] = None
+        self._mapped_size: Integer = 0
+
+        header: Bytes = self._file.read(HEADER_SIZE)
+        if len(header) < HEADER.size or not header.startswith(SEGMENT_MAGIC):
+            self._file.close()
+            raise MetricsError(f'"{path}" is not a history segment')
+        _, _, block_records, self.start, self.span = HEADER.unpack_from(header)
+        if block_records != BLOCK_RECORDS:
+            self._file.close()
+            raise MetricsError(f'"{path}" has {block_records} records per block, not {BLOCK_RECORDS}')
+
+        self.index: array = self._load_index()
+        self.records: Integer = 0
+        self.last_timestamp: float = -math.inf
+        if writable:
+            with self._locked():
+                self._recover()
+
+    @classmethod
+    def create(cls, path: Path, start: float, span: float) -> Segment:
+        """
+        Creates the segment, unless another writer just did, and opens it
+        for writing. The header is linked in place whole, so nobody opens
+        a segment without one.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_suffix(INDEX_SUFFIX).touch()
+        temporary: Path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        descriptor: Integer = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(HEADER.pack(SEGMENT_MAGIC, 1, BLOCK_RECORDS, start, span).ljust(HEADER_SIZE, b'\0'))
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(temporary)
+        return cls(path, writable=True)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.span
+
+    @property
+    def blocks(self) -> Integer:
+        return max(os.fstat(self._file.fileno()).st_size - HEADER_SIZE, 0) // BLOCK_SIZE
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self) -> Segment:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    @contextlib.contextmanager
+    def _locked(self) -> t.Iterator[None]:
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _load_index(self) -> array:
+        try:
+            data: Bytes = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return array('d')
+        # A torn append leaves a partial entry behind.
+        return _doubles(data[:len(data) - len(data) % 8])
+
+    def _block_offset(self, block: Integer) -> Integer:
+        return HEADER_SIZE + block * BLOCK_SIZE
+
+    def _read_timestamps(self, block: Integer) -> array:
+        # Not through the file buffer, which does not see other writers.
+        return _doubles(os.pread(self._file.fileno(), BLOCK_RECORDS * 8, self._block_offset(block)))
+
+    @staticmethod
+    def _valid_prefix(timestamps: array, after: float) -> Integer:
+        count: Integer = 0
+        for timestamp in timestamps:
+            if timestamp <= 0 or timestamp < after or not math.isfinite(timestamp):
+                break
+            after = timestamp
+            count += 1
+        return count
+
+    def _recover(self) -> None:
+        # A crash can leave a partly grown file, an index lagging
+        # behind the blocks, or a torn last record.
+        size: Integer = os.fstat(self._file.fileno()).st_size
+        whole: Integer = HEADER_SIZE + max(size - HEADER_SIZE, 0) // BLOCK_SIZE * BLOCK_SIZE
+        if whole != size:
+            os.ftruncate(self._file.fileno(), whole)
+        blocks: Integer = self.blocks
+
+        # Trust the index up to its last but one entry, re-read the rest.
+        first: Integer = max(min(len(self.index), blocks) - 1, 0)
+        del self.index[first:]
+        previous: float = self.index[first - 1] if first else -math.inf
+        for block in range(first, blocks):
+            timestamps: array = self._read_timestamps(block)
+            valid: Integer = self._valid_prefix(timestamps, previous)
+            if valid == 0:
+                os.ftruncate(self._file.fileno(), self._block_offset(block))
+                break
+            self.index.append(timestamps[0])
+            previous = timestamps[valid - 1]
+            if valid < BLOCK_RECORDS:
+                # Zero the torn tail so the slots read as free again.
+                os.pwrite(
+                    self._file.fileno(),
+                    bytes((BLOCK_RECORDS - valid) * 8),
+                    self._block_offset(block) + valid * 8,
+                )
+                os.ftruncate(self._file.fileno(), self._block_offset(block + 1))
+                break
+        self._write_index()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        # Other writers may have appended since, count the records again.
+        blocks: Integer = self.blocks
+        if len(self.index) < blocks:
+            self.index = self._load_index()
+        self.records, self.last_timestamp = 0, -math.inf
+        if blocks:
+            timestamps: array = self._read_timestamps(blocks - 1)
+            valid: Integer = self._valid_prefix(timestamps, -math.inf)
+            self.records = (blocks - 1) * BLOCK_RECORDS + valid
+            if valid:
+                self.last_timestamp = timestamps[valid - 1]
+            elif blocks > 1:
+                # A writer died between growing the file and its first record.
+                self.last_timestamp = self._read_timestamps(blocks - 2)[-1]
+
+    def _write_index(self) -> None:
+        data: array = array('d', self.index)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        with open(self.index_path, 'wb') as file:
+            file.write(data.tobytes())
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """
+        Returns False, writing nothing, for a timestamp older than the
+        last record, which may come from another writer of the file.
+        """
+        if not self.writable:
+            raise MetricsError(f'"{self.path}" is open for reading only')
+        if not self.start <= timestamp < self.end:
+            raise MetricsError(f'Timestamp {timestamp} is outside of "{self.path}"')
+        if not timestamp > 0:
+            raise MetricsError(f'Timestamp {timestamp} is not positive')
+        with self._locked():
+            self._refresh()
+            if timestamp < self.last_timestamp:
+                return False
+            block, slot = divmod(self.records, BLOCK_RECORDS)
+            descriptor: Integer = self._file.fileno()
+            if slot == 0:
+                os.ftruncate(descriptor, self._block_offset(block + 1))
+                # Unless a writer died before writing the first record.
+                if len(self.index) <= block:
+                    with open(self.index_path, 'ab') as index:
+                        index.write(_pack_double(timestamp))
+                    self.index.append(timestamp)
+            offset: Integer = self._block_offset(block)
+            os.pwrite(descriptor, _pack_double(value), offset + BLOCK_RECORDS * 8 + slot * 8)
+            os.pwrite(descriptor, _pack_double(timestamp), offset + slot * 8)
+            self.records += 1
+            self.last_timestamp = timestamp
+        return True
+
+    def sync(self) -> None:
+        os.fsync(self._file.fileno())
+
+    def _buffer(self) -> t.Optional[mmap.mmap]:
+        size: Integer = os.fstat(self._file.fileno()).st_size
+        if size <= HEADER_SIZE:
+            return None
+        if self._mmap is None or self._mapped_size != size:
+            # The writer grows the file, remap to see the new blocks.
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._mmap
+
+    def _refresh_index(self, blocks: Integer) -> None:
+        if not self.writable and len(self.index) < blocks:
+            self.index = self._load_index()
+
+    def read(self, since: float, until: float = math.inf) -> Samples:
+        """
+        Samples with timestamps in [since, until), read through the
+        mapping without touching blocks outside the range.
+        """
+        timestamps: array = array('d')
+        values: array = array('d')
+        buffer: t.Optional[mmap.mmap] = self._buffer()
+        if buffer is None:
+            return Samples(timestamps, values)
+        blocks: Integer = (self._mapped_size - HEADER_SIZE) // BLOCK_SIZE
+        self._refresh_index(blocks)
+        indexed: Integer = min(len(self.index), blocks)
+        first: Integer = max(bisect.bisect_right(self.index, since, 0, indexed) - 1, 0)
+        last: Integer = bisect.bisect_left(self.index, until, 0, indexed)
+        view: memoryview = memoryview(buffer)
+        try:
+            for block in range(first, last):
+                offset: Integer = self._block_offset(block)
+                block_timestamps: array = _doubles(view[offset:offset + BLOCK_RECORDS * 8])
+                # Only the last block has free slots, which read as zero.
+                count: Integer = BLOCK_RECORDS
+                if block == blocks - 1 and 0.0 in block_timestamps:
+                    count = block_timestamps.index(0.0)
+                low: Integer = bisect.bisect_left(block_timestamps, since, 0, count)
+                high: Integer = bisect.bisect_left(block_timestamps, until, 0, count)
+                if low == high:
+                    continue
+                timestamps.extend(block_timestamps[low:high])
+                start: Integer = offset + BLOCK_RECORDS * 8
+                values.extend(_doubles(view[start + low * 8:start + high * 8]))
+        finally:
+            view.release()
+        return Samples(timestamps, values)
+
+
+class SeriesHistory:
+    """
+    Segments of one series, one file per "segment_span" seconds.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        segment_span: float = DEFAULT_SEGMENT_SPAN,
+        retention: float = DEFAULT_RETENTION,
+    ) -> None:
+        self.directory: Path = directory
+        self.segment_span: float = segment_span
+        self.retention: float = retention
+        self._writer: t.Optional[Segment] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def segment_paths(self) -> t.List[t.Tuple[float, Path]]:
+        if not self.directory.is_dir():
+            return []
+        paths: t.List[t.Tuple[float, Path]] = []
+        for path in self.directory.glob(f'*{SEGMENT_SUFFIX}'):
+            try:
+                paths.append((float(path.stem), path))
+            except ValueError:
+                continue
+        return sorted(paths)
+
+    def _writer_for(self, timestamp: float) -> Segment:
+        start: float = timestamp - timestamp % self.segment_span
+        writer: t.Optional[Segment] = self._writer
+        if writer is not None and writer.start == start:
+            return writer
+        if writer is not None:
+            writer.close()
+            self._writer = None
+        path: Path = self.directory.joinpath(f'{int(start)}{SEGMENT_SUFFIX}')
+        self._writer = Segment(path, writable=True) if path.exists() else Segment.create(
+            path,
+            start,
+            self.segment_span,
+        )
+        return self._writer
+
+    def append(self, timestamp: float, value: float) -> bool:
+        with self._lock:
+            return self._writer_for(timestamp).append(timestamp, value)
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def query(self, since: float, until: float = math.inf) -> Samples:
+        timestamps: array = array('d')
+        values: array = array('d')
+        for start, path in self.segment_paths():
+            if start + self.segment_span <= since or start >= until:
+                continue
+            with Segment(path) as segment:
+                samples: Samples = segment.read(since, until)
+            timestamps.extend(samples.timestamps)
+            values.extend(samples.values)
+        return Samples(timestamps, values)
+
+    def enforce_retention(self, now: t.Optional[float] = None) -> Integer:
+        """
+        Deletes segments that ended before the retention window,
+        returns how many were deleted.
+        """
+        horizon: float = (time.time() if now is None else now) - self.retention
+        removed: Integer = 0
+        for start, path in self.segment_paths():
+            if start + self.segment_span > horizon:
+                break
+            with self._lock:
+                if self._writer is not None and self._writer.path == path:
+                    self._writer.close()
+                    self._writer = None
+                path.unlink()
+                path.with_suffix(INDEX_SUFFIX).unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+class HistoryStore:
+    """
+    On-disk history of every series, one directory per series under
+    "$TON_NODE_CONTROL_HOME/history".
+    A long-running process, the daemon, keeps a "memory" store next to
+    it: whatever it records goes to both, and windows the memory store
+    has seen whole are summarised from its rollups instead of the files.
+    """
+
+    def __init__(
+        self,
+        directory: t.Optional[Path] = None,
+        *,
+        segment_span: float = DEFAULT_SEGMENT_SPAN,
+        retention: float = DEFAULT_RETENTION,
+        memory: t.Optional[MetricsStore] = None,
+    ) -> None:
+        self.directory: Path = directory or get_ton_node_control_home('history')
+        self.segment_span: float = segment_span
+        self.retention: float = retention
+        self.memory: t.Optional[MetricsStore] = memory
+        self._series: t.Dict[String, SeriesHistory] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def names(self) -> t.List[String]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.name for path in self.directory.iterdir() if path.is_dir())
+
+    def series(self, name: String) -> SeriesHistory:
+        if not SERIES_NAME_REGEX.match(name):
+            raise MetricsError(f'Invalid series name "{name}"')
+        with self._lock:
+            if name not in self._series:
+                self._series[name] = SeriesHistory(
+                    self.directory.joinpath(name),
+                    segment_span=self.segment_span,
+                    retention=self.retention,
+                )
+            return self._series[name]
+
+    def record(self, name: String, value: float, timestamp: t.Optional[float] = None) -> bool:
+        timestamp = time.time() if timestamp is None else timestamp
+        recorded: bool = self.series(name).append(timestamp, value)
+        memory: t.Optional[MetricsStore] = self.memory
+        if recorded and memory is not None:
+            try:
+                memory.record(name, value, timestamp)
+            except MetricsError:
+                # Over its budget, the files still answer for the series.
+                pass
+        return recorded
+
+    def record_many(self, values: t.Mapping[String, t.Any], timestamp: t.Optional[float] = None) -> Integer:
+        timestamp = time.time() if timestamp is None else timestamp
+        recorded: Integer = 0
+        for name, value in values.items():
+            if isinstance(value, (int, float)):
+                recorded += self.record(name, float(value), timestamp)
+        return recorded
+
+    def query(self, name: String, since: float, until: float = math.inf) -> Samples:
+        return self.series(name).query(since, until)
+
+    def aggregate(self, name: String, since: float, until: float = math.inf) -> t.Optional[Aggregate]:
+        memory: t.Optional[MetricsStore] = self.memory
+        if memory is not None and memory.covers(name, since):
+            return memory.aggregate(name, since, until)
+        return Aggregate.of(self.query(name, since, until))
+
+    def sync(self) -> None:
+        for series in list(self._series.values()):
+            series.sync()
+
+    def enforce_retention(self, now: t.Optional[float] = None) -> Integer:
+        return sum(self.series(name).enforce_retention(now) for name in self.names())
+
+    def close(self) -> None:
+        for series in list(self._series.values()):
+            series.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_history_store() -> HistoryStore:
+    """
+    The store of the process, the daemon's commands and tasks share it.
+    """
+    return HistoryStore()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import bisect
+import typing as t
+
+from array import array
+from dataclasses import dataclass
+
+from ton_node_control.utils.typing import Integer
+
+
+class _LogicalView:
+    # Sequence over a ring column in insertion order, for "bisect".
+    __slots__ = ('column', 'start', 'size')
+
+    def __init__(self, column: array, start: Integer, size: Integer) -> None:
+        self.column: array = column
+        self.start: Integer = start
+        self.size: Integer = size
+
+    def __len__(self) -> Integer:
+        return self.size
+
+    def __getitem__(self, index: Integer) -> float:
+        return self.column[(self.start + index) % len(self.column)]
+
+
+class RingColumns:
+    """
+    Fixed-capacity columns sharing one ring position. Memory is allocated
+    once, appends overwrite the oldest row once the ring is full.
+    The first column holds timestamps, which only ever grow.
+    """
+
+    def __init__(self, capacity: Integer, typecodes: t.Sequence[str]) -> None:
+        if capacity < 1:
+            raise ValueError('Ring capacity must be positive')
+        self.capacity: Integer = capacity
+        self.columns: t.Tuple[array, ...] = tuple(
+            array(typecode, bytes(array(typecode).itemsize * capacity)) for typecode in typecodes
+        )
+        self.start: Integer = 0
+        self.size: Integer = 0
+
+    def __len__(self) -> Integer:
+        return self.size
+
+    @property
+    def nbytes(self) -> Integer:
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+    @property
+    def is_full(self) -> bool:
+        return self.size == self.capacity
+
+    @property
+    def oldest(self) -> t.Optional[float]:
+        return self.columns[0][self.start] if self.size else None
+
+    @property
+    def last_index(self) -> Integer:
+        return (self.start + self.size - 1) % self.capacity
+
+    def append(self, *row: float) -> Integer:
+        if self.size < self.capacity:
+            index: Integer = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        for column, value in zip(self.columns, row):
+            column[index] = value
+        return index
+
+    def bounds(self, since: float, until: float) -> t.Tuple[Integer, Integer]:
+        """
+        Logical row range with timestamps in [since, until).
+        """
+        timestamps: _LogicalView = _LogicalView(self.columns[0], self.start, self.size)
+        return bisect.bisect_left(timestamps, since), bisect.bisect_left(timestamps, until)
+
+    def slice(self, column: Integer, first: Integer, last: Integer) -> array:
+        """
+        Copy of the logical rows [first, last) of a column, made of at
+        most two contiguous array slices.
+        """
+        data: array = self.columns[column]
+        if first >= last:
+            return array(data.typecode)
+        begin: Integer = (self.start + first) % self.capacity
+        end: Integer = begin + (last - first)
+        if end <= self.capacity:
+            return data[begin:end]
+        return data[begin:] + data[:end - self.capacity]
+
+
+@dataclass(frozen=True)
+class Samples:
+    timestamps: array
+    values: array
+
+    def __len__(self) -> Integer:
+        return len(self.timestamps)
+
+
+@dataclass(frozen=True)
+class Rollups:
+    resolution: float
+    timestamps: array
+    minimum: array
+    maximum: array
+    total: array
+    count: array
+    last: array
+
+    def __len__(self) -> Integer:
+        return len(self.timestamps)
+
+    @property
+    def average(self) -> t.List[float]:
+        return [total / count for total, count in zip(self.total, self.count)]
+
+
+class SampleRing:
+    """
+    Raw samples of one series.
+    """
+
+    def __init__(self, capacity: Integer) -> None:
+        self._ring: RingColumns = RingColumns(capacity, 'dd')
+
+    def __len__(self) -> Integer:
+        return len(self._ring)
+
+    @property
+    def nbytes(self) -> Integer:
+        return self._ring.nbytes
+
+    @property
+    def is_full(self) -> bool:
+        return self._ring.is_full
+
+    @property
+    def oldest(self) -> t.Optional[float]:
+        return self._ring.oldest
+
+    def append(self, timestamp: float, value: float) -> None:
+        self._ring.append(timestamp, value)
+
+    def window(self, since: float, until: float) -> Samples:
+        first, last = self._ring.bounds(since, until)
+        return Samples(self._ring.slice(0, first, last), self._ring.slice(1, first, last))
+
+
+class RollupRing:
+    """
+    Fixed-resolution rollups of one series. A sample updates the row of
+    its bucket in place, so downsampling costs nothing beyond the append.
+    """
+
+    def __init__(self, capacity: Integer, resolution: float) -> None:
+        self.resolution: float = resolution
+        # bucket start, min, max, sum, last, count
+        self._ring: RingColumns = RingColumns(capacity, 'dddddI')
+
+    def __len__(self) -> Integer:
+        return len(self._ring)
+
+    @property
+    def nbytes(self) -> Integer:
+        return self._ring.nbytes
+
+    @property
+    def is_full(self) -> bool:
+        return self._ring.is_full
+
+    @property
+    def oldest(self) -> t.Optional[float]:
+        return self._ring.oldest
+
+    def append(self, timestamp: float, value: float) -> None:
+        bucket: float = timestamp - timestamp % self.resolution
+        ring: RingColumns = self._ring
+        if ring.size:
+            index: Integer = ring.last_index
+            starts, minimum, maximum, total, last, count = ring.columns
+            if starts[index] == bucket:
+                if value < minimum[index]:
+                    minimum[index] = value
+                if value > maximum[index]:
+                    maximum[index] = value
+                total[index] += value
+                last[index] = value
+                count[index] += 1
+                return
+        ring.append(bucket, value, value, value, value, 1)
+
+    def window(self, since: float, until: float) -> Rollups:
+        # A bucket belongs to the window when it overlaps it.
+        first, last = self._ring.bounds(since - since % self.resolution, until)
+        columns: t.List[array] = [self._ring.slice(column, first, last) for column in range(6)]
+        return Rollups(
+            resolution=self.resolution,
+            timestamps=columns[0],
+            minimum=columns[1],
+            maximum=columns[2],
+            total=columns[3],
+            last=columns[4],
+            count=columns[5],
+        )
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+import typing as t
+
+from dataclasses import dataclass
+
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.metrics.ring import Rollups, RollupRing, SampleRing, Samples
+from ton_node_control.utils.typing import Integer, String
+
+MINUTE: t.Final[float] = 60.0
+HOUR: t.Final[float] = 3600.0
+DEFAULT_MEMORY_BUDGET: t.Final[Integer] = 32 * 1024 * 1024
+
+
+class MetricsError(TonNodeControlError):
+    pass
+
+
+@dataclass(frozen=True)
+class SeriesLayout:
+    """
+    Slots kept per series: raw samples, minute and hour rollups.
+    The defaults hold half an hour of samples taken every second,
+    two days of minutes and a month of hours, about 200 KiB.
+    """
+
+    samples: Integer = 1800
+    minutes: Integer = 2 * 24 * 60
+    hours: Integer = 30 * 24
+
+    @property
+    def nbytes(self) -> Integer:
+        return self.samples * 16 + (self.minutes + self.hours) * 44
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    count: Integer
+    minimum: float
+    maximum: float
+    average: float
+    last: float
+
+    @classmethod
+    def of(cls, samples: Samples) -> t.Optional[Aggregate]:
+        if not samples:
+            return None
+        return cls(
+            count=len(samples),
+            minimum=min(samples.values),
+            maximum=max(samples.values),
+            average=math.fsum(samples.values) / len(samples),
+            last=samples.values[-1],
+        )
+
+
+class Series:
+    def __init__(self, name: String, layout: SeriesLayout) -> None:
+        self.name: String = name
+        self.samples: SampleRing = SampleRing(layout.samples)
+        self.minutes: RollupRing = RollupRing(layout.minutes, MINUTE)
+        self.hours: RollupRing = RollupRing(layout.hours, HOUR)
+        self.first_timestamp: float = math.inf
+        self.last_timestamp: float = -math.inf
+
+    @property
+    def nbytes(self) -> Integer:
+        return self.samples.nbytes + self.minutes.nbytes + self.hours.nbytes
+
+    def append(self, timestamp: float, value: float) -> bool:
+        # Rings are ordered by time, late samples are dropped.
+        if timestamp < self.last_timestamp:
+            return False
+        self.first_timestamp = min(self.first_timestamp, timestamp)
+        self.last_timestamp = timestamp
+        self.samples.append(timestamp, value)
+        self.minutes.append(timestamp, value)
+        self.hours.append(timestamp, value)
+        return True
+
+    def resolution_for(self, since: float) -> t.Optional[float]:
+        """
+        Finest resolution holding everything from "since" on,
+        None for raw samples.
+        """
+        rings: t.Tuple[t.Tuple[t.Optional[float], t.Union[SampleRing, RollupRing]], ...] = (
+            (None, self.samples),
+            (MINUTE, self.minutes),
+        )
+        for resolution, ring in rings:
+            # A ring that has never wrapped still holds every sample.
+            if not ring.is_full or t.cast(float, ring.oldest) <= since:
+                return resolution
+        return HOUR
+
+
+class MetricsStore:
+    """
+    In-memory history of numeric series. Every series is allocated its
+    full layout up front, so memory use is fixed by the number of series
+    and the store refuses new series beyond its budget, however long the
+    process runs. Writes and window reads take one lock, as the daemon
+    records from its commands and its tasks at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        memory_budget: Integer = DEFAULT_MEMORY_BUDGET,
+        layout: SeriesLayout = SeriesLayout(),
+    ) -> None:
+        self.memory_budget: Integer = memory_budget
+        self.layout: SeriesLayout = layout
+        self._series: t.Dict[String, Series] = {}
+        self._lock: threading.RLock = threading.RLock()
+
+    @property
+    def max_series(self) -> Integer:
+        return self.memory_budget // self.layout.nbytes
+
+    def __contains__(self, name: String) -> bool:
+        return name in self._series
+
+    def names(self) -> t.List[String]:
+        with self._lock:
+            return sorted(self._series)
+
+    def memory_usage(self) -> Integer:
+        with self._lock:
+            return sum(series.nbytes for series in self._series.values())
+
+    def series(self, name: String) -> Series:
+        series: t.Optional[Series] = self._series.get(name)
+        if series is not None:
+            return series
+        with self._lock:
+            if name not in self._series:
+                if len(self._series) >= self.max_series:
+                    raise MetricsError(
+                        f'Cannot add series "{name}": the memory budget '
+                        f'of {self.memory_budget} bytes holds {self.max_series} series',
+                    )
+                self._series[name] = Series(name, self.layout)
+            return self._series[name]
+
+    def record(self, name: String, value: float, timestamp: t.Optional[float] = None) -> bool:
+        with self._lock:
+            return self.series(name).append(time.time() if timestamp is None else timestamp, value)
+
+    def record_many(self, values: t.Mapping[String, t.Any], timestamp: t.Optional[float] = None) -> Integer:
+        """
+        Records every numeric value of a mapping, such as the values of a
+        status report, and returns how many were recorded.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        recorded: Integer = 0
+        with self._lock:
+            for name, value in values.items():
+                if isinstance(value, (int, float)):
+                    recorded += self.record(name, float(value), timestamp)
+        return recorded
+
+    def covers(self, name: String, since: float) -> bool:
+        """
+        Whether the store holds the series from "since" on, at one
+        resolution or another, so that it can answer for that window.
+        """
+        with self._lock:
+            series: t.Optional[Series] = self._series.get(name)
+            if series is None or series.first_timestamp > since:
+                return False
+            return not series.hours.is_full or t.cast(float, series.hours.oldest) <= since
+
+    def _get(self, name: String) -> Series:
+        try:
+            return self._series[name]
+        except KeyError:
+            raise MetricsError(f'Unknown series "{name}"') from None
+
+    def samples(self, name: String, since: float, until: float = math.inf) -> Samples:
+        with self._lock:
+            return self._get(name).samples.window(since, until)
+
+    def rollups(self, name: String, resolution: float, since: float, until: float = math.inf) -> Rollups:
+        with self._lock:
+            series: Series = self._get(name)
+            if resolution == MINUTE:
+                return series.minutes.window(since, until)
+            if resolution == HOUR:
+                return series.hours.window(since, until)
+        raise MetricsError(f'No rollups at a resolution of {resolution}s')
+
+    def aggregate(self, name: String, since: float, until: float = math.inf) -> t.Optional[Aggregate]:
+        """
+        Summary of a window, read from the finest resolution covering it.
+        """
+        with self._lock:
+            resolution: t.Optional[float] = self._get(name).resolution_for(since)
+            if resolution is None:
+                return Aggregate.of(self.samples(name, since, until))
+            rollups: Rollups = self.rollups(name, resolution, since, until)
+        if not rollups:
+            return None
+        count: Integer = sum(rollups.count)
+        return Aggregate(
+            count=count,
+            minimum=min(rollups.minimum),
+            maximum=max(rollups.maximum),
+            average=math.fsum(rollups.total) / count,
+            last=rollups.last[-1],
+        )
+
+    def rate(self, name: String, since: float, until: float = math.inf) -> t.Optional[float]:
+        """
+        Average change per second over a window, e.g. blocks per second
+        from a seqno series.
+        """
+        samples: Samples = self.samples(name, since, until)
+        if len(samples) < 2 or samples.timestamps[-1] == samples.timestamps[0]:
+            return None
+        return (samples.values[-1] - samples.values[0]) / (samples.timestamps[-1] - samples.timestamps[0])
@@ -0,0 +1,8 @@
+from .scheduler import (  # noqa: F401
+    Dependency,
+    DependencyMetrics,
+    Scheduler,
+    SchedulerError,
+    Task,
+    TaskMetrics,
+)
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import heapq
+import logging
+import random
+import typing as t
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from ton_node_control.core.exceptions import TonNodeControlError
+from ton_node_control.utils.typing import Integer, String
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS: t.Final[Integer] = 4
+DEFAULT_COALESCE_WINDOW: t.Final[float] = 1.0
+
+
+class SchedulerError(TonNodeControlError):
+    pass
+
+
+@dataclass(frozen=True)
+class Dependency:
+    """
+    Data several tasks need, such as the last masterchain block or the
+    validator console stats. Tasks due together share one fetch, and a
+    value younger than "max_age" is handed out again without fetching.
+    "fetch" is a coroutine function, or a blocking function when
+    "blocking" is set, taking no arguments.
+    """
+
+    name: String
+    fetch: t.Callable[[], t.Any]
+    max_age: float = 0.0
+    blocking: bool = False
+    timeout: float = 10.0
+
+
+@dataclass(frozen=True)
+class Task:
+    """
+    Work run every "interval" seconds, give or take "jitter" of it.
+    "run" is given the value of every dependency as a keyword argument
+    named after it; like for probes, it is either a coroutine function
+    or a blocking function run on the scheduler's thread pool. The first
+    run is "delay" seconds after the start, at a random point of the
+    first interval when not given.
+    """
+
+    name: String
+    run: t.Callable[..., t.Any]
+    interval: float
+    jitter: float = 0.1
+    dependencies: t.Tuple[Dependency, ...] = ()
+    blocking: bool = False
+    timeout: float = 60.0
+    delay: t.Optional[float] = None
+
+
+@dataclass
+class TaskMetrics:
+    """
+    Lateness is how long after its due time a run started, waiting for
+    the loop, a worker or its dependencies.
+    """
+
+    runs: Integer = 0
+    failures: Integer = 0
+    skipped: Integer = 0
+    last_run_time: float = 0.0
+    max_run_time: float = 0.0
+    total_run_time: float = 0.0
+    last_lateness: float = 0.0
+    max_lateness: float = 0.0
+    total_lateness: float = 0.0
+    last_error: t.Optional[String] = None
+    next_due: t.Optional[float] = None
+
+    @property
+    def average_run_time(self) -> float:
+        return self.total_run_time / self.runs if self.runs else 0.0
+
+    @property
+    def average_lateness(self) -> float:
+        return self.total_lateness / self.runs if self.runs else 0.0
+
+    def add_run(self, run_time: float, lateness: float, error: t.Optional[String]) -> None:
+        self.runs += 1
+        self.last_run_time = run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+        self.total_run_time += run_time
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+        if error is not None:
+            self.failures += 1
+            self.last_error = error
+
+
+@dataclass
+class DependencyMetrics:
+    """
+    "shared" counts the times a task got the value without a fetch of
+    its own: from a fetch already in flight or from the cache.
+    """
+
+    fetches: Integer = 0
+    shared: Integer = 0
+    failures: Integer = 0
+    last_fetch_time: float = 0.0
+    last_error: t.Optional[String] = None
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    sequence: Integer
+    name: String = field(compare=False)
+
+
+class Scheduler:
+    """
+    Runs periodic tasks from one timer heap on the event loop. Tasks due
+    within "coalesce_window" of each other start together and fetch each
+    dependency they have in common once. Blocking work goes to a pool of
+    "workers" threads and no more than "workers" tasks run at a time; a
+    task still running when it is due again skips that run rather than
+    piling up behind itself, also past its timeout when blocking, as its
+    thread cannot be interrupted.
+    """
+
+    def __init__(
+        self,
+        tasks: t.Iterable[Task] = (),
+        *,
+        workers: Integer = DEFAULT_WORKERS,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+    ) -> None:
+        self.workers: Integer = workers
+        self.coalesce_window: float = coalesce_window
+        self.tasks: t.Dict[String, Task] = {}
+        self.task_metrics: t.Dict[String, TaskMetrics] = {}
+        self.dependency_metrics: t.Dict[String, DependencyMetrics] = {}
+        self._heap: t.List[_Entry] = []
+        self._sequence: Integer = 0
+        # Heap entries of removed or rescheduled tasks are left in place
+        # and dropped when they come up: only the latest one counts.
+        self._current: t.Dict[String, Integer] = {}
+        self._busy: t.Set[String] = set()
+        self._values: t.Dict[String, t.Tuple[float, t.Any]] = {}
+        self._fetching: t.Dict[String, asyncio.Future] = {}
+        self._running: t.Set[asyncio.Future] = set()
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: t.Optional[asyncio.Event] = None
+        self._slots: t.Optional[asyncio.Semaphore] = None
+        self._executor: t.Optional[ThreadPoolExecutor] = None
+        self._stopping: bool = False
+        for task in tasks:
+            self.add(task)
+
+    def _now(self) -> float:
+        return self._loop.time() if self._loop is not None else 0.0
+
+    def _push(self, name: String, due: float) -> None:
+        self._sequence += 1
+        self._current[name] = self._sequence
+        self.task_metrics[name].next_due = due
+        heapq.heappush(self._heap, _Entry(due, self._sequence, name))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _first_due(self, task: Task) -> float:
+        delay: float = task.delay if task.delay is not None else random.uniform(0.0, task.interval)
+        return self._now() + delay
+
+    def add(self, task: Task) -> None:
+        if task.name in self.tasks:
+            raise SchedulerError(f'Task "{task.name}" is already scheduled')
+        if task.interval <= 0:
+            raise SchedulerError(f'Task "{task.name}" needs a positive interval')
+        self.tasks[task.name] = task
+        self.task_metrics.setdefault(task.name, TaskMetrics())
+        for dependency in task.dependencies:
+            self.dependency_metrics.setdefault(dependency.name, DependencyMetrics())
+        if self._loop is not None:
+            self._push(task.name, self._first_due(task))
+
+    def remove(self, name: String) -> None:
+        self.tasks.pop(name, None)
+        self._current.pop(name, None)
+
+    def trigger(self, name: String) -> bool:
+        """
+        Runs a task now, as an event it waits for came, rather than at its
+        next due time; unless that is more than half an interval away, so
+        a task triggered by events runs at most every half interval, and
+        still every interval without them. Returns whether it was pulled
+        forward.
+        """
+        task: t.Optional[Task] = self.tasks.get(name)
+        if task is None or self._loop is None or name in self._busy:
+            return False
+        due: t.Optional[float] = self.task_metrics[name].next_due
+        now: float = self._now()
+        if due is None or due - now > task.interval / 2:
+            return False
+        self._push(name, now)
+        return True
+
+    def metrics(self) -> t.Dict[String, TaskMetrics]:
+        return dict(self.task_metrics)
+
+    def _next_due(self, task: Task, due: float, now: float) -> float:
+        # Fixed rate from the due time, not from when the run ended, so
+        # slow runs do not make a task drift; runs missed while the loop
+        # was held up are not made up for.
+        spread: float = task.interval * task.jitter
+        due += task.interval + random.uniform(-spread, spread)
+        if due <= now:
+            missed: Integer = int((now - due) // task.interval) + 1
+            self.task_metrics[task.name].skipped += missed
+            due += missed * task.interval
+        return due
+
+    def _call(self, function: t.Callable[..., t.Any], blocking: bool, **arguments: t.Any) -> asyncio.Future:
+        if blocking:
+            return asyncio.wrap_future(self._executor.submit(functools.partial(function, **arguments)))
+        return asyncio.ensure_future(function(**arguments))
+
+    async def _fetch(self, dependency: Dependency) -> t.Any:
+        metrics: DependencyMetrics = self.dependency_metrics[dependency.name]
+        started: float = self._now()
+        try:
+            value: t.Any = await asyncio.wait_for(
+                self._call(dependency.fetch, dependency.blocking),
+                dependency.timeout,
+            )
+        except asyncio.TimeoutError:
+            metrics.failures += 1
+            metrics.last_error = f'No answer within {dependency.timeout:.2f}s'
+            raise SchedulerError(f'Dependency "{dependency.name}": {metrics.last_error}') from None
+        except Exception as error:
+            metrics.failures += 1
+            metrics.last_error = str(error) or type(error).__name__
+            raise
+        finally:
+            metrics.fetches += 1
+            metrics.last_fetch_time = self._now() - started
+            self._fetching.pop(dependency.name, None)
+        self._values[dependency.name] = (self._now(), value)
+        return value
+
+    def _resolve(self, dependency: Dependency) -> asyncio.Future:
+        cached: t.Optional[t.Tuple[float, t.Any]] = self._values.get(dependency.name)
+        if cached is not None and self._now() - cached[0] < dependency.max_age:
+            self.dependency_metrics[dependency.name].shared += 1
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            future.set_result(cached[1])
+            return future
+        fetching: t.Optional[asyncio.Future] = self._fetching.get(dependency.name)
+        if fetching is not None:
+            self.dependency_metrics[dependency.name].shared += 1
+            return fetching
+        fetching = self._fetching[dependency.name] = asyncio.ensure_future(self._fetch(dependency))
+        return fetching
+
+    async def _run(self, task: Task, due: float, futures: t.Dict[String, asyncio.Future]) -> None:
+        metrics: TaskMetrics = self.task_metrics[task.name]
+        error: t.Optional[String] = None
+        started: float = self._now()
+        try:
+            async with t.cast(asyncio.Semaphore, self._slots):
+                values: t.Dict[String, t.Any] = {}
+                for name, future in futures.items():
+                    values[name] = await asyncio.shield(future)
+                started = self._now()
+                running: asyncio.Future = self._call(task.run, task.blocking, **values)
+                try:
+                    await asyncio.wait_for(asyncio.shield(running), task.timeout)
+                except asyncio.TimeoutError:
+                    error = f'No answer within {task.timeout:.2f}s'
+                    if not task.blocking:
+                        running.cancel()
+                    # A thread cannot be cancelled: the task stays busy, and
+                    # keeps its slot, until the run actually returns.
+                    await asyncio.gather(running, return_exceptions=True)
+                finally:
+                    running.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as error_:
+            error = str(error_) or type(error_).__name__
+        finally:
+            self._busy.discard(task.name)
+        if error is not None:
+            logger.warning('Task %s failed: %s', task.name, error)
+        # Runs pulled forward by coalescing are not early, only late.
+        metrics.add_run(self._now() - started, max(started - due, 0.0), error)
+
+    def _start_batch(self, now: float) -> None:
+        batch: t.List[t.Tuple[Task, float]] = []
+        while self._heap and self._heap[0].due <= now + self.coalesce_window:
+            entry: _Entry = heapq.heappop(self._heap)
+            task: t.Optional[Task] = self.tasks.get(entry.name)
+            if task is None or self._current.get(entry.name) != entry.sequence:
+                continue
+            self._push(task.name, self._next_due(task, entry.due, now))
+            if task.name in self._busy:
+                self.task_metrics[task.name].skipped += 1
+                continue
+            self._busy.add(task.name)
+            batch.append((task, entry.due))
+        # Every task of the batch asks for its dependencies before any of
+        # them runs, so the ones they have in common are fetched once.
+        resolved: t.List[t.Dict[String, asyncio.Future]] = [
+            {dependency.name: self._resolve(dependency) for dependency in task.dependencies}
+            for task, _ in batch
+        ]
+        for (task, due), futures in zip(batch, resolved):
+            future: asyncio.Future = asyncio.ensure_future(self._run(task, due, futures))
+            self._running.add(future)
+            future.add_done_callback(self._running.discard)
+
+    async def run(self) -> None:
+        """
+        Runs the tasks until "stop" is called or the coroutine is cancelled;
+        tasks still running then are cancelled.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._stopping = False
+        self._heap, self._current = [], {}
+        for task in self.tasks.values():
+            self._push(task.name, self._first_due(task))
+        # A dedicated pool: blocking runs still going when the scheduler
+        # stops are abandoned, not awaited.
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduler')
+        try:
+            while not self._stopping:
+                self._wakeup.clear()
+                now: float = self._now()
+                if self._heap and self._heap[0].due <= now:
+                    self._start_batch(now)
+                    continue
+                timeout: t.Optional[float] = self._heap[0].due - now if self._heap else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            running: t.List[asyncio.Future] = [*self._running, *self._fetching.values()]
+            for future in running:
+                future.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._busy.clear()
+            self._loop = self._wakeup = None
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
@@ -0,0 +1,62 @@
+import functools
+import typing as t
+
+from pathlib import Path
+
+import pydantic
+
+from ton_node_control.cli.utils.file_read import read_config
+from ton_node_control.utils.locations import get_ton_node_control_home
+from ton_node_control.utils.typing import String
+
+TON_WORK_DIRECTORY: Path = Path('/var/ton-work')
+
+
+class SettingsModel(pydantic.BaseModel):
+    class Config:
+        extra = pydantic.Extra.ignore
+
+
+class ConsoleSettings(SettingsModel):
+    path: Path = Path('/usr/bin/ton/validator-engine-console/validator-engine-console')
+    client_key: Path = TON_WORK_DIRECTORY.joinpath('keys', 'client')
+    server_key: Path = TON_WORK_DIRECTORY.joinpath('keys', 'server.pub')
+    address: String = '127.0.0.1:3030'
+    timeout: float = 5.0
+
+
+class NodeSettings(SettingsModel):
+    database: Path = TON_WORK_DIRECTORY.joinpath('db')
+    log: Path = TON_WORK_DIRECTORY.joinpath('log')
+    process_name: String = 'validator-engine'
+
+
+class ToncenterApiSettings(SettingsModel):
+    url: String = 'https://toncenter.com/api/v2'
+    api_key: t.Optional[String] = None
+
+
+class ToncenterSettings(ToncenterApiSettings):
+    # Other toncenter compatible APIs, asked the same query when this one is slow.
+    mirrors: t.List[ToncenterApiSettings] = []
+
+
+class Settings(SettingsModel):
+    console: ConsoleSettings = ConsoleSettings()
+    node: NodeSettings = NodeSettings()
+    toncenter: ToncenterSettings = ToncenterSettings()
+    wallet_address: t.Optional[String] = None
+    validator_public_key: t.Optional[String] = None
+    elector_address: String = '-1:' + '3' * 64
+
+
+def get_settings_path() -> Path:
+    return get_ton_node_control_home('config.toml')
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    path: Path = get_settings_path()
+    if not path.is_file():
+        return Settings()
+    return Settings.parse_obj(read_config(path))
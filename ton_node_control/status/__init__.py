@@ -0,0 +1,11 @@
+from .engine import (  # noqa: F401
+    MetricFamily,
+    Probe,
+    ProbeResult,
+    ProbeSkipped,
+    ProbeState,
+    StatusEngine,
+    StatusReport,
+)
+from .probes import collect_status, find_process, get_default_probes, get_validator_console  # noqa: F401
+from .report import render_report  # noqa: F401
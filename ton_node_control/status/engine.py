@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import functools
+import threading
+import time
+import typing as t
+
+from dataclasses import dataclass, field
+
+from ton_node_control.utils import runtime
+from ton_node_control.utils.typing import String
+
+ProbeValues = t.Dict[String, t.Any]
+
+
+class ProbeState(str, enum.Enum):
+    ok = 'ok'
+    partial = 'partial'
+    timeout = 'timeout'
+    failed = 'failed'
+    skipped = 'skipped'
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    """
+    Exported form of one probe value, in Prometheus terms.
+    """
+
+    key: String
+    name: String
+    help: String
+    type: String = 'gauge'
+
+
+@dataclass(frozen=True)
+class Probe:
+    """
+    One independent piece of the node status. "collect" is either a
+    coroutine function or a blocking function, the latter runs on a
+    daemon thread of its own. Either is given the mapping its values go to
+    and may fill it as it goes: whatever is in it when the deadline
+    passes is reported as a partial result.
+    """
+
+    name: String
+    collect: t.Callable[..., t.Any]
+    timeout: float = 0.8
+    blocking: bool = False
+    families: t.Tuple[MetricFamily, ...] = ()
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    name: String
+    state: ProbeState
+    values: ProbeValues = field(default_factory=dict)
+    duration: float = 0.0
+    error: t.Optional[String] = None
+
+    @property
+    def is_ok(self) -> bool:
+        return self.state is ProbeState.ok
+
+
+@dataclass(frozen=True)
+class StatusReport:
+    results: t.Tuple[ProbeResult, ...]
+    duration: float
+
+    @property
+    def is_complete(self) -> bool:
+        return all(result.state in (ProbeState.ok, ProbeState.skipped) for result in self.results)
+
+    def __getitem__(self, name: String) -> ProbeResult:
+        for result in self.results:
+            if result.name == name:
+                return result
+        raise KeyError(name)
+
+    def values(self) -> ProbeValues:
+        return {
+            f'{result.name}.{key}': value
+            for result in self.results
+            for key, value in result.values.items()
+        }
+
+
+class _SharedValues(dict):
+    """
+    Values of one probe run. A blocking probe that overruns is abandoned
+    but keeps writing from its thread, so writes and the copy reported
+    for the run go through a lock.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __setitem__(self, key: String, value: t.Any) -> None:
+        with self._lock:
+            super().__setitem__(key, value)
+
+    def update(self, *args: t.Any, **kwargs: t.Any) -> None:
+        with self._lock:
+            super().update(*args, **kwargs)
+
+    def snapshot(self) -> ProbeValues:
+        with self._lock:
+            return dict(self)
+
+
+class ProbeSkipped(Exception):
+    """
+    Raised by a probe that has nothing to report in this setup,
+    e.g. no wallet is configured.
+    """
+
+
+class StatusEngine:
+    """
+    Runs every probe concurrently, each under its own timeout and all of
+    them under a total budget. Whatever has not answered by then is
+    reported as timed out, with the values it managed to collect, so a
+    slow source never holds up the whole status.
+    """
+
+    def __init__(self, probes: t.Sequence[Probe], *, budget: float = 0.9) -> None:
+        self.probes: t.List[Probe] = list(probes)
+        self.budget: float = budget
+
+    async def _run(self, probe: Probe, values: _SharedValues) -> None:
+        result: t.Optional[ProbeValues]
+        if probe.blocking:
+            # Blocking probes that overrun are abandoned, not awaited,
+            # neither here nor when the process exits.
+            result = await asyncio.wrap_future(runtime.run_in_thread(
+                functools.partial(probe.collect, values),
+                name=f'status-probe-{probe.name}',
+            ))
+        else:
+            result = await probe.collect(values)
+        values.update(result or {})
+
+    async def _probe(self, probe: Probe, deadline: float) -> ProbeResult:
+        started: float = time.monotonic()
+        timeout: float = max(min(probe.timeout, deadline - started), 0.0)
+        values: _SharedValues = _SharedValues()
+        try:
+            await asyncio.wait_for(self._run(probe, values), timeout)
+        except asyncio.TimeoutError:
+            partial: ProbeValues = values.snapshot()
+            return ProbeResult(
+                probe.name,
+                ProbeState.partial if partial else ProbeState.timeout,
+                partial,
+                time.monotonic() - started,
+                f'No answer within {timeout:.2f}s',
+            )
+        except ProbeSkipped as skipped:
+            return ProbeResult(probe.name, ProbeState.skipped, {}, time.monotonic() - started, str(skipped))
+        except Exception as error:
+            return ProbeResult(
+                probe.name,
+                ProbeState.failed,
+                values.snapshot(),
+                time.monotonic() - started,
+                str(error) or type(error).__name__,
+            )
+        return ProbeResult(probe.name, ProbeState.ok, values.snapshot(), time.monotonic() - started)
+
+    async def collect(self) -> StatusReport:
+        started: float = time.monotonic()
+        deadline: float = started + self.budget
+        results: t.List[ProbeResult] = await asyncio.gather(*(
+            self._probe(probe, deadline) for probe in self.probes
+        ))
+        return StatusReport(tuple(results), time.monotonic() - started)
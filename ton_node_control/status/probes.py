@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import os
+import time
+import typing as t
+
+from pathlib import Path
+
+from ton_node_control.core.address import Address
+from ton_node_control.core.client.hedging import HedgedReader
+from ton_node_control.core.client.validator_console import (
+    BaseValidatorConsole,
+    ValidatorConsole,
+    ValidatorStats,
+)
+from ton_node_control.core.datasources import TonCenterDataSource, get_client_pool
+from ton_node_control.core.datasources.models import GetMethodResult
+from ton_node_control.core.shards import ShardDescriptor, get_shard_topology
+from ton_node_control.core.validator_set import ValidatorSet, load_validator_set
+from ton_node_control.settings import Settings, get_settings
+from ton_node_control.status.engine import (
+    MetricFamily,
+    Probe,
+    ProbeSkipped,
+    ProbeValues,
+    StatusEngine,
+    StatusReport,
+)
+from ton_node_control.utils import runtime
+from ton_node_control.utils.typing import Integer, String
+
+NANOTONS: t.Final[Integer] = 10 ** 9
+CURRENT_VALIDATORS_PARAM: t.Final[Integer] = 34
+
+DataSourceReader = HedgedReader[TonCenterDataSource]
+
+SYNC_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('sync_lag', 'ton_node_sync_lag_seconds', 'Age of the last masterchain block the node applied.'),
+    MetricFamily('masterchain_seqno', 'ton_node_masterchain_seqno', 'Last masterchain block seqno of the node.'),
+    MetricFamily(
+        'shard_client_lag',
+        'ton_node_shard_client_lag_blocks',
+        'Masterchain blocks the shard client is behind.',
+    ),
+)
+PROCESS_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('running', 'ton_node_process_up', 'Whether the validator-engine process is running.'),
+    MetricFamily('uptime', 'ton_node_process_uptime_seconds', 'Uptime of the validator-engine process.'),
+    MetricFamily('rss', 'ton_node_process_resident_memory_bytes', 'Resident memory of the validator-engine process.'),
+)
+CPU_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('cpus', 'ton_node_system_cpus', 'Number of CPUs.'),
+    MetricFamily('load1', 'ton_node_system_load1', 'One minute load average.'),
+    MetricFamily('load5', 'ton_node_system_load5', 'Five minute load average.'),
+    MetricFamily('load15', 'ton_node_system_load15', 'Fifteen minute load average.'),
+)
+MEMORY_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('total', 'ton_node_system_memory_total_bytes', 'Total memory.'),
+    MetricFamily('available', 'ton_node_system_memory_available_bytes', 'Memory available for new processes.'),
+    MetricFamily('swap_used', 'ton_node_system_swap_used_bytes', 'Swap in use.'),
+)
+DISK_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('total', 'ton_node_database_disk_total_bytes', 'Size of the disk holding the node database.'),
+    MetricFamily('free', 'ton_node_database_disk_free_bytes', 'Free space on the disk holding the node database.'),
+)
+NETWORK_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('seqno', 'ton_network_masterchain_seqno', 'Last masterchain block seqno of the network.'),
+)
+ELECTIONS_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('active', 'ton_elections_active', 'Whether validator elections are open.'),
+    MetricFamily('election_id', 'ton_elections_active_id', 'Identifier of the open elections, zero when closed.'),
+)
+WALLET_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('balance', 'ton_wallet_balance_nanotons', 'Balance of the validator wallet.'),
+)
+VALIDATOR_FAMILIES: t.Tuple[MetricFamily, ...] = (
+    MetricFamily('elected', 'ton_validator_elected', 'Whether the node is in the current validator set.'),
+    MetricFamily('index', 'ton_validator_index', 'Index of the node in the current validator set.'),
+    MetricFamily('validators', 'ton_validator_set_size', 'Number of validators in the current set.'),
+    MetricFamily('round_left', 'ton_validator_round_remaining_seconds', 'Seconds until the current set expires.'),
+)
+
+
+def _read_proc(*parts: String) -> String:
+    return Path('/proc', *parts).read_text()
+
+
+def collect_cpu(values: ProbeValues) -> None:
+    values['cpus'] = os.cpu_count()
+    values['load1'], values['load5'], values['load15'] = os.getloadavg()
+
+
+def collect_memory(values: ProbeValues) -> None:
+    info: t.Dict[String, Integer] = {}
+    for line in _read_proc('meminfo').splitlines():
+        key, _, value = line.partition(':')
+        fields: t.List[String] = value.split()
+        if fields and fields[0].isdigit():
+            info[key] = int(fields[0]) * 1024
+    values['total'] = info['MemTotal']
+    values['available'] = info.get('MemAvailable', info.get('MemFree', 0))
+    values['used_percent'] = round(100 * (1 - values['available'] / values['total']), 1)
+    values['swap_used'] = info.get('SwapTotal', 0) - info.get('SwapFree', 0)
+
+
+def disk_probe(path: Path) -> t.Callable[[ProbeValues], None]:
+    def collect_disk(values: ProbeValues) -> None:
+        # The database may not exist yet, report the disk it would live on.
+        target: Path = path
+        while not target.exists() and target != target.parent:
+            target = target.parent
+        stat: os.statvfs_result = os.statvfs(target)
+        values['path'] = str(path)
+        values['total'] = stat.f_blocks * stat.f_frsize
+        values['free'] = stat.f_bavail * stat.f_frsize
+        values['used_percent'] = round(100 * (1 - stat.f_bavail / stat.f_blocks), 1) if stat.f_blocks else 0.0
+    return collect_disk
+
+
+def find_process(name: String) -> t.Optional[Integer]:
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            if _read_proc(entry.name, 'comm').strip() == name[:15]:
+                return int(entry.name)
+        except OSError:
+            continue
+    return None
+
+
+def process_probe(name: String) -> t.Callable[[ProbeValues], None]:
+    def collect_process(values: ProbeValues) -> None:
+        pid: t.Optional[Integer] = find_process(name)
+        values['running'] = pid is not None
+        if pid is None:
+            return
+        values['pid'] = pid
+        # Fields after the parenthesised command name, which may hold spaces.
+        stat: t.List[String] = _read_proc(str(pid), 'stat').rpartition(')')[2].split()
+        ticks: Integer = os.sysconf('SC_CLK_TCK')
+        boot_uptime: float = float(_read_proc('uptime').split()[0])
+        values['uptime'] = round(boot_uptime - int(stat[19]) / ticks, 1)
+        values['rss'] = int(stat[21]) * os.sysconf('SC_PAGE_SIZE')
+    return collect_process
+
+
+def sync_probe(console: BaseValidatorConsole) -> t.Callable[[ProbeValues], None]:
+    def collect_sync(values: ProbeValues) -> None:
+        stats: ValidatorStats = console.get_stats()
+        values['sync_lag'] = stats.sync_lag
+        values['masterchain_seqno'] = stats.masterchain_seqno
+        values['shard_client_lag'] = stats.shard_client_lag
+    return collect_sync
+
+
+def masterchain_probe(reader: DataSourceReader) -> t.Callable[[ProbeValues], t.Awaitable[None]]:
+    async def collect_masterchain(values: ProbeValues) -> None:
+        values['seqno'] = (await reader.read(lambda datasource: datasource.get_masterchain_info())).last.seqno
+    return collect_masterchain
+
+
+def elections_probe(
+    reader: DataSourceReader,
+    elector_address: String,
+) -> t.Callable[[ProbeValues], t.Awaitable[None]]:
+    async def collect_elections(values: ProbeValues) -> None:
+        result: GetMethodResult = await reader.read(
+            lambda datasource: datasource.run_get_method(elector_address, 'active_election_id'),
+        )
+        if result.exit_code != 0 or not result.stack:
+            raise RuntimeError(f'"active_election_id" exited with code {result.exit_code}')
+        election_id: Integer = int(result.stack[0][1], 16)
+        values['active'] = election_id != 0
+        values['election_id'] = election_id
+    return collect_elections
+
+
+def wallet_probe(
+    reader: DataSourceReader,
+    address: t.Optional[String],
+) -> t.Callable[[ProbeValues], t.Awaitable[None]]:
+    async def collect_wallet(values: ProbeValues) -> None:
+        if address is None:
+            raise ProbeSkipped('No wallet address configured')
+        parsed: Address = Address.parse(address)
+        values['address'] = parsed.to_friendly()
+        # Known once the block watcher of the daemon has seen the shards.
+        try:
+            shard: ShardDescriptor = get_shard_topology().route_address(parsed.to_raw())
+        except LookupError:
+            pass
+        else:
+            values['shard'] = f'{shard.workchain}:{shard.shard_hex}'
+        balance: Integer = await reader.read(lambda datasource: datasource.get_address_balance(address))
+        values['balance'] = balance
+        values['balance_ton'] = balance / NANOTONS
+    return collect_wallet
+
+
+def validator_probe(
+    reader: DataSourceReader,
+    public_key: t.Optional[String],
+) -> t.Callable[[ProbeValues], t.Awaitable[None]]:
+    async def collect_validator(values: ProbeValues) -> None:
+        if public_key is None:
+            raise ProbeSkipped('No validator public key configured')
+        validators: ValidatorSet = load_validator_set(
+            await reader.read(lambda datasource: datasource.get_config_param(CURRENT_VALIDATORS_PARAM)),
+        )
+        index: t.Optional[Integer] = validators.index_of(public_key)
+        values['validators'] = len(validators.validators)
+        values['elected'] = index is not None
+        values['index'] = index
+        values['utime_until'] = validators.utime_until
+        values['round_left'] = max(validators.utime_until - int(time.time()), 0)
+    return collect_validator
+
+
+@functools.lru_cache(maxsize=None)
+def _get_validator_console(
+    console_path: Path,
+    client_key_path: Path,
+    server_key_path: Path,
+    address: String,
+    timeout: float,
+) -> ValidatorConsole:
+    console: ValidatorConsole = ValidatorConsole(
+        console_path,
+        client_key_path,
+        server_key_path,
+        address,
+        timeout=timeout,
+    )
+    atexit.register(console.close)
+    return console
+
+
+def get_validator_console(settings: Settings, timeout: float) -> BaseValidatorConsole:
+    """
+    One long-lived console session per configuration and timeout, for
+    callers that query the node over and over. It reopens by itself after
+    a failure and must not be closed by its users.
+    """
+    return _get_validator_console(
+        settings.console.path,
+        settings.console.client_key,
+        settings.console.server_key,
+        settings.console.address,
+        timeout,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_datasource_reader(apis: t.Tuple[t.Tuple[String, t.Optional[String]], ...]) -> DataSourceReader:
+    return HedgedReader({url: TonCenterDataSource(url, api_key=api_key) for url, api_key in apis})
+
+
+def get_datasource_reader(settings: Settings) -> DataSourceReader:
+    """
+    Reads from the configured toncenter API and its mirrors, hedged. One
+    reader per configuration, so the latencies it learns outlive a run.
+    """
+    apis = (settings.toncenter, *settings.toncenter.mirrors)
+    return _get_datasource_reader(tuple((api.url, api.api_key) for api in apis))
+
+
+def get_default_probes(
+    settings: Settings,
+    *,
+    reader: t.Optional[DataSourceReader] = None,
+    console: t.Optional[BaseValidatorConsole] = None,
+    timeout: float = 0.8,
+) -> t.List[Probe]:
+    if reader is None:
+        reader = get_datasource_reader(settings)
+    if console is None:
+        console = get_validator_console(settings, timeout)
+    return [
+        Probe('node.sync', sync_probe(console), timeout, blocking=True, families=SYNC_FAMILIES),
+        Probe(
+            'node.process',
+            process_probe(settings.node.process_name),
+            timeout,
+            blocking=True,
+            families=PROCESS_FAMILIES,
+        ),
+        Probe('system.cpu', collect_cpu, timeout, blocking=True, families=CPU_FAMILIES),
+        Probe('system.memory', collect_memory, timeout, blocking=True, families=MEMORY_FAMILIES),
+        Probe('system.disk', disk_probe(settings.node.database), timeout, blocking=True, families=DISK_FAMILIES),
+        Probe('network.masterchain', masterchain_probe(reader), timeout, families=NETWORK_FAMILIES),
+        Probe(
+            'elections.active',
+            elections_probe(reader, settings.elector_address),
+            timeout,
+            families=ELECTIONS_FAMILIES,
+        ),
+        Probe(
+            'wallet.balance',
+            wallet_probe(reader, settings.wallet_address),
+            timeout,
+            families=WALLET_FAMILIES,
+        ),
+        Probe(
+            'validator.index',
+            validator_probe(reader, settings.validator_public_key),
+            timeout,
+            families=VALIDATOR_FAMILIES,
+        ),
+    ]
+
+
+def collect_status(settings: t.Optional[Settings] = None, *, budget: float = 0.9) -> StatusReport:
+    engine: StatusEngine = StatusEngine(
+        get_default_probes(settings or get_settings(), timeout=budget),
+        budget=budget,
+    )
+
+    async def _collect() -> StatusReport:
+        try:
+            return await engine.collect()
+        finally:
+            # The daemon keeps its connections for the next command.
+            if not runtime.is_shared():
+                await get_client_pool().aclose()
+
+    return runtime.run(_collect())
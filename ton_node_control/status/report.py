@@ -0,0 +1,44 @@
+import typing as t
+
+import click
+
+from ton_node_control.status.engine import ProbeResult, ProbeState, StatusReport
+from ton_node_control.utils.typing import String
+
+STATE_COLORS: t.Dict[ProbeState, String] = {
+    ProbeState.ok: 'green',
+    ProbeState.partial: 'yellow',
+    ProbeState.timeout: 'yellow',
+    ProbeState.failed: 'red',
+    ProbeState.skipped: 'bright_black',
+}
+
+
+def _format_value(value: t.Any) -> String:
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+
+def render_result(result: ProbeResult) -> String:
+    state: String = click.style(f'{result.state.value:<8}', fg=STATE_COLORS[result.state])
+    details: String = ', '.join(f'{key}={_format_value(value)}' for key, value in result.values.items())
+    if result.error is not None:
+        details = f'{details} ({result.error})' if details else result.error
+    return f'{result.name:<20} {state} {result.duration * 1000:6.0f}ms  {details}'
+
+
+def _incomplete(report: StatusReport) -> String:
+    states: t.Set[ProbeState] = {result.state for result in report.results}
+    problems: t.List[String] = []
+    if ProbeState.failed in states:
+        problems.append('some probes failed')
+    if states & {ProbeState.timeout, ProbeState.partial}:
+        problems.append('some did not answer in time' if problems else 'some probes did not answer in time')
+    return ', ' + ' and '.join(problems) if problems else ''
+
+
+def render_report(report: StatusReport) -> String:
+    lines: t.List[String] = [render_result(result) for result in report.results]
+    lines.append(f'Collected in {report.duration * 1000:.0f}ms{_incomplete(report)}')
+    return '\n'.join(lines)
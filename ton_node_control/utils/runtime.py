@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+import typing as t
+
+T = t.TypeVar('T')
+
+_shared_loop: t.Optional[asyncio.AbstractEventLoop] = None
+_shared_thread: t.Optional[threading.Thread] = None
+
+
+class _Local(threading.local):
+    working_directory: t.Optional[str] = None
+
+
+_local: _Local = _Local()
+
+
+def is_shared() -> bool:
+    """
+    Whether coroutines run on a long-lived loop, as in the daemon; pooled
+    connections and caches are then kept for the next command.
+    """
+    return _shared_loop is not None
+
+
+def run_in_thread(function: t.Callable[[], T], *, name: t.Optional[str] = None) -> concurrent.futures.Future:
+    """
+    Runs a blocking function on a daemon thread of its own. Unlike the
+    threads of an executor, which are joined when the interpreter exits,
+    one that overruns and is given up on does not hold up the process.
+    """
+    future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def _target() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result: T = function()
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=_target, name=name, daemon=True).start()
+    return future
+
+
+def working_path(path: str) -> str:
+    """
+    A path given to a command, relative ones taken from the working
+    directory of whoever ran it: the process's own, or the client's when
+    the daemon runs the command.
+    """
+    if _local.working_directory is None or os.path.isabs(path):
+        return path
+    return os.path.join(_local.working_directory, path)
+
+
+@contextlib.contextmanager
+def working_directory(path: str) -> t.Iterator[None]:
+    """
+    Makes "working_path" resolve relative paths against "path" on this
+    thread for the duration; the process wide one, shared with every
+    other thread, is left alone.
+    """
+    previous: t.Optional[str] = _local.working_directory
+    _local.working_directory = path
+    try:
+        yield
+    finally:
+        _local.working_directory = previous
+
+
+def run(coroutine: t.Coroutine[t.Any, t.Any, T]) -> T:
+    """
+    "asyncio.run", or, inside the daemon, a run on its shared loop.
+    """
+    loop: t.Optional[asyncio.AbstractEventLoop] = _shared_loop
+    if loop is None:
+        return asyncio.run(coroutine)
+    if threading.current_thread() is _shared_thread:
+        coroutine.close()
+        raise RuntimeError('Blocking on the shared event loop from its own thread')
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+@contextlib.contextmanager
+def shared_loop() -> t.Iterator[asyncio.AbstractEventLoop]:
+    """
+    Runs an event loop on a thread of its own for the duration, used by
+    "run" meanwhile.
+    """
+    global _shared_loop, _shared_thread
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    thread: threading.Thread = threading.Thread(target=loop.run_forever, name='shared-loop', daemon=True)
+    thread.start()
+    _shared_loop, _shared_thread = loop, thread
+    try:
+        yield loop
+    finally:
+        _shared_loop = _shared_thread = None
+
+        async def _shutdown() -> None:
+            tasks: t.List[asyncio.Task] = [
+                task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()